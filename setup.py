@@ -76,6 +76,14 @@ cy_defs.append(["viscid.cython.cyamr",
                 ["viscid/cython/cyamr"],
                 dict()
                ])
+cy_defs.append(["viscid.cython.pathline",
+                ["viscid/cython/pathline"],
+                dict()
+               ])
+cy_defs.append(["viscid.cython.relayout",
+                ["viscid/cython/relayout"],
+                dict()
+               ])
 
 fort_fcflags = []
 fort_ldflags = []
@@ -4,6 +4,9 @@ from __future__ import print_function
 import sys
 import os
 import argparse
+import tempfile
+
+import numpy as np
 
 _viscid_root = os.path.realpath(os.path.dirname(__file__) + '/../viscid/')
 if not _viscid_root in sys.path:
@@ -12,12 +15,59 @@ if not _viscid_root in sys.path:
 import viscid
 from viscid import vutil
 from viscid.plot import mpl
+from viscid.readers import text_table
+
+def run_text_table_test():
+    fname = _viscid_root + '/../sample/ath_sample.0000.tab'
+    ref = np.loadtxt(fname, ndmin=2)
+
+    cache_dir = text_table.cache_dir
+    use_disk_cache = text_table.use_disk_cache
+    max_nbytes = text_table.max_disk_cache_nbytes
+    text_table.cache_dir = tempfile.mkdtemp()
+    text_table.use_disk_cache = True
+    try:
+        text_table.clear_cache()
+        parsed = text_table.load_table(fname)
+        if len(os.listdir(text_table.cache_dir)) != 1:
+            raise RuntimeError("load_table didn't save to the disk cache")
+        text_table.clear_cache()
+        from_disk = text_table.load_table(fname)
+        from_mem = text_table.load_table(fname)
+        if not (np.array_equal(parsed, ref) and np.array_equal(from_disk, ref)):
+            raise RuntimeError("load_table doesn't match np.loadtxt")
+        if from_mem is not from_disk:
+            raise RuntimeError("load_table didn't use its memory cache")
+
+        # different parse options aren't mixed up in the caches
+        fname2 = os.path.join(text_table.cache_dir, "table.txt")
+        with open(fname2, 'w') as f:
+            f.write("5 6\n1 2\n")
+        if (text_table.load_table(fname2, comments='#').shape != (2, 2) or
+                text_table.load_table(fname2, comments='5').shape != (1, 2)):
+            raise RuntimeError("cache ignored the comments option")
+        os.remove(fname2)
+
+        # the disk cache is kept under its size limit
+        text_table.max_disk_cache_nbytes = 1
+        text_table.clear_cache()
+        text_table.load_table(fname, dtype='f4')
+        if os.listdir(text_table.cache_dir):
+            raise RuntimeError("disk cache wasn't pruned")
+        text_table.clear_cache(disk=True)
+    finally:
+        os.rmdir(text_table.cache_dir)
+        text_table.cache_dir = cache_dir
+        text_table.use_disk_cache = use_disk_cache
+        text_table.max_disk_cache_nbytes = max_nbytes
 
 def main():
     parser = argparse.ArgumentParser(description="Test xdmf")
     parser.add_argument("--show", "--plot", action="store_true")
     args = vutil.common_argparse(parser)
 
+    run_text_table_test()
+
     f = viscid.load_file(_viscid_root + '/../sample/test.asc')
     mpl.plot(f['c1'], show=args.show)
 
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+""" make sure the benchmark suite runs, and results round trip """
+
+from __future__ import print_function
+import sys
+import os
+import argparse
+import shutil
+import tempfile
+
+_viscid_root = os.path.realpath(os.path.dirname(__file__) + '/../viscid/')
+if not _viscid_root in sys.path:
+    sys.path.append(_viscid_root)
+
+from viscid import vutil
+from viscid import bench
+
+def run_bench_test():
+    results = bench.run(pattern="open_|load_|slice_plane|interp_trilin_f8|"
+                        "streamlines_rk12$", n=24, repeat=2, min_time=0.005,
+                        verbose=False)
+    expected = ["open_npz", "load_npz", "open_fortbin", "load_fortbin",
+                "slice_plane_index", "slice_plane_float", "interp_trilin_f8",
+                "streamlines_rk12"]
+    for name in expected:
+        if name not in results:
+            raise RuntimeError("benchmark {0} didn't run".format(name))
+    for res in results.values():
+        if not 0.0 < res["best"] <= res["median"] or res["number"] < 1:
+            raise RuntimeError("bad timing result: {0}".format(res))
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        fname = os.path.join(tmpdir, "bench.json")
+        bench.save_results(fname, results, n=24)
+        loaded = bench.load_results(fname)
+        if list(loaded.keys()) != list(results.keys()):
+            raise RuntimeError("results didn't round trip through JSON")
+
+        # pretend the old run was twice as fast at opening npz files
+        old = dict((k, dict(v)) for k, v in loaded.items())
+        old["open_npz"]["best"] /= 2.0
+        regressions = bench.compare(old, results, threshold=1.5,
+                                    verbose=False)
+        if regressions != ["open_npz"]:
+            raise RuntimeError("compare found {0}".format(regressions))
+
+        ret = bench.main(["-k", "slice_plane_index", "-n", "8", "--repeat",
+                          "1", "--min-time", "0.001", "-o", fname])
+        if ret != 0 or list(bench.load_results(fname)) != ["slice_plane_index"]:
+            raise RuntimeError("main didn't save results")
+    finally:
+        shutil.rmtree(tmpdir)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--show", "--plot", action="store_true")
+    args = vutil.common_argparse(parser)  # pylint: disable=unused-variable
+
+    run_bench_test()
+
+if __name__ == "__main__":
+    main()
+
+##
+## EOF
+##
@@ -51,6 +51,81 @@ def run_mag_test(fld, show=False):
     if show:
         mpl.mplshow()
 
+def run_reduction_test(fld):
+    """chunked / threaded reductions should match numpy on .data"""
+    arr = np.array(fld.data)
+    for op in ["min", "max", "sum", "mean", "std"]:
+        t0 = time()
+        val = viscid.reduction.chunked_reduce(fld, op, threads=4, nbytes=2**16)
+        t1 = time()
+        logger.info("chunked %s runtime: %g", op, t1 - t0)
+        if not np.isclose(val, getattr(arr, op)(), rtol=1e-5):
+            raise RuntimeError("chunked {0} differs from numpy: {1} != {2}"
+                               "".format(op, val, getattr(arr, op)()))
+    if not np.isclose(viscid.abs_max(fld, preferred="chunked", only=True),
+                      np.max(np.abs(arr))):
+        raise RuntimeError("chunked abs_max differs from numpy")
+    if fld.std().dtype != arr.std().dtype:
+        raise RuntimeError("chunked std has the wrong dtype: {0} != {1}"
+                           "".format(fld.std().dtype, arr.std().dtype))
+
+    # masks of data that isn't loaded yet are respected too
+    cut = 0.5 * (arr.min() + arr.max())
+    masked = fld.wrap(np.ma.masked_greater(arr, cut))
+    if masked.is_loaded():
+        raise RuntimeError("expected a field that isn't loaded")
+    if masked.max() > cut or not np.isclose(masked.max(),
+                                            arr[arr <= cut].max()):
+        raise RuntimeError("chunked max ignored the mask")
+    if not np.isclose(masked.mean(), arr[arr <= cut].mean(), rtol=1e-5):
+        raise RuntimeError("chunked mean ignored the mask")
+
+def run_evaluator_test(fld):
+    """compiled equations should match numpy, with and without numexpr"""
+    from viscid.calculator import evaluator
+    grid = viscid.grid.Grid()
+    grid.set_crds(fld.crds)
+    for comp in "xyz":
+        grid.add_field(viscid.wrap_field(np.array(fld[comp].data), fld.crds,
+                                         name="v" + comp, center=fld.center))
+    vx, vy, vz = [np.array(fld[comp].data) for comp in "xyz"]
+    exact = np.sqrt(vx**2 + vy**2) + (vx * vy)**2 - np.abs(vz)
+
+    evaluator.enabled = True
+    for try_ne in [True, False]:
+        with evaluator.shared_operands():
+            t0 = time()
+            result = evaluator.evaluate(grid, "r", "sqrt(vx**2 + vy**2) + "
+                                        "(vx * vy)**2 - abs(vz)",
+                                        try_numexpr=try_ne)
+            t1 = time()
+        logger.info("evaluator (numexpr=%s) runtime: %g", try_ne, t1 - t0)
+        if not np.allclose(result.data, exact, rtol=1e-5, atol=1e-5):
+            raise RuntimeError("evaluator result differs from numpy")
+
+    # fields loaded before shared_operands stay loaded, and slices work
+    grid.fields["vx"].data  # pylint: disable=pointless-statement
+    with evaluator.shared_operands():
+        result = grid.get_field("r=vx*2", slc=np.s_[:, :, 0])
+    if not grid.fields["vx"].is_loaded():
+        raise RuntimeError("shared_operands unloaded a field it didn't load")
+    if not np.allclose(result.data, 2 * vx[:, :, :1]):
+        raise RuntimeError("sliced evaluator result differs from numpy")
+
+    # syntax that can't be run elementwise falls back to whole fields
+    grid.add_field(fld)
+    others = {"V['x']**2": vx**2,
+              "0 < vx < 1": (0 < vx) & (vx < 1),
+              "where(vx > 1, vx, 0)": np.where(vx > 1, vx, 0),
+              "vx if 1 else vy": vx}
+    for eqn, val in others.items():
+        for try_ne in [True, False]:
+            result = evaluator.evaluate(grid, "r", eqn, try_numexpr=try_ne)
+            if not isinstance(result, viscid.field.Field):
+                raise RuntimeError("'{0}' didn't give a field".format(eqn))
+            if not np.allclose(result.data, val):
+                raise RuntimeError("'{0}' differs from numpy".format(eqn))
+
 def main():
     parser = argparse.ArgumentParser(description="Test calc")
     parser.add_argument("--show", "--plot", action="store_true")
@@ -70,6 +145,12 @@ def main():
     logger.info("Testing node centered magnitudes")
     run_mag_test(v, show=args.show)
 
+    logger.info("Testing chunked reductions")
+    run_reduction_test(v)
+
+    logger.info("Testing evaluator")
+    run_evaluator_test(v)
+
     logger.info("Testing cell centered magnitudes")
     v = v.as_centered('cell')
     run_mag_test(v, show=args.show)
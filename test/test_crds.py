@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+""" test sharing / memoizing coordinates """
+
+from __future__ import print_function
+import sys
+import os
+import argparse
+
+import numpy as np
+
+_viscid_root = os.path.realpath(os.path.dirname(__file__) + '/../viscid/')
+if not _viscid_root in sys.path:
+    sys.path.append(_viscid_root)
+
+import viscid
+from viscid import vutil
+from viscid import coordinate
+
+def run_intern_test():
+    x = np.linspace(-10, 10, 21)
+    y = np.array([-2.0, -1.0, 0.5, 3.0])
+    for make_crds in (lambda: viscid.arrays2crds([x, y]),
+                      lambda: viscid.arrays2crds([x, x[:5]])):
+        crds0 = coordinate.intern_crds(make_crds())
+        crds1 = coordinate.intern_crds(make_crds())
+        if crds1 is not crds0:
+            raise RuntimeError("identical crds weren't interned")
+
+    crds = coordinate.intern_crds(viscid.arrays2crds([x, y]))
+    other = coordinate.intern_crds(viscid.arrays2crds([x, y + 1.0]))
+    if other is crds:
+        raise RuntimeError("different crds were interned together")
+
+    # reflecting makes a new (shared) object, and leaves the old one alone
+    refl = crds.with_reflections("x")
+    if refl is crds or crds.reflect_axes or refl.reflect_axes != "x":
+        raise RuntimeError("with_reflections changed shared crds")
+    if refl is not viscid.arrays2crds([x, y]).with_reflections("x"):
+        raise RuntimeError("reflected crds aren't shared")
+    if not np.all(refl.get_crd('x') == -x[::-1]):
+        raise RuntimeError("with_reflections didn't reflect")
+    if coordinate.intern_crds(viscid.arrays2crds([x, y])) is not crds:
+        raise RuntimeError("reflected crds were handed out as unreflected")
+
+def run_memo_test():
+    x = np.linspace(-10, 10, 21)
+    y = np.array([-2.0, -1.0, 0.5, 3.0])
+    for crds in (viscid.arrays2crds([x, x[:5]]), viscid.arrays2crds([x, y])):
+        ext = crds.extend_by_half()
+        if crds.extend_by_half() is not ext:
+            raise RuntimeError("extend_by_half isn't memoized")
+        if list(ext.shape_cc) != list(crds.shape_nc):
+            raise RuntimeError("extend_by_half has the wrong shape")
+        shrunk = crds.cc_as_nc()
+        if crds.cc_as_nc() is not shrunk:
+            raise RuntimeError("cc_as_nc isn't memoized")
+        if list(shrunk.shape_nc) != list(crds.shape_cc):
+            raise RuntimeError("cc_as_nc has the wrong shape")
+        if crds.get_crd('X', shaped=True).base is None:
+            raise RuntimeError("shaped crds aren't views")
+
+    # changing the crds has to forget everything derived from them
+    crds = viscid.arrays2crds([x, y])
+    ext = crds.extend_by_half()
+    crds.set_crds([('y', 2.0 * y)])
+    if crds.extend_by_half() is ext or not np.all(crds.get_crd('y') == 2 * y):
+        raise RuntimeError("set_crds didn't clear cached crds")
+
+    fld0 = viscid.wrap_field(np.zeros((21, 4)), crds)
+    fld1 = viscid.wrap_field(np.ones((21, 4)), crds)
+    if fld0.as_cell_centered().crds is not fld1.as_cell_centered().crds:
+        raise RuntimeError("as_cell_centered doesn't share crds")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--show", "--plot", action="store_true")
+    args = vutil.common_argparse(parser)  # pylint: disable=unused-variable
+
+    run_intern_test()
+    run_memo_test()
+
+if __name__ == "__main__":
+    main()
+
+##
+## EOF
+##
@@ -6,6 +6,7 @@ import sys
 import os
 import argparse
 
+import h5py
 import numpy as np
 
 _viscid_root = os.path.realpath(os.path.dirname(__file__) + '/../viscid/')
@@ -52,12 +53,55 @@ def main():
     plt.subplot(133)
     mpl.plot(f['b'].component_fields()[2], "y=0")
 
+    if not np.allclose(f['psi'].data, psi.data):
+        raise RuntimeError("psi changed in the round trip")
+
+    # append a few compressed time steps with uniform crds
+    h5_fname2 = _viscid_root + "/../sample/test_append.h5"
+    xdmf_fname2 = h5_fname2[:-3] + ".xdmf"
+    crds = viscid.wrap_crds("uniform_cartesian", [('x', [-1.0, 1.0, 16]),
+                                                  ('y', [0.0, 2.0, 8]),
+                                                  ('z', [0.0, 1.0, 4])])
+    arrs = []
+    for i in range(3):
+        arrs.append(np.random.rand(16, 8, 4) + i)
+        fld = viscid.wrap_field(arrs[-1], crds, name='u', center='node',
+                                time=float(i))
+        viscid.save_fields(h5_fname2, [fld], compression='gzip',
+                           shuffle=True, append=(i > 0))
+    f2 = viscid.load_file(xdmf_fname2)
+    for i, grid in enumerate(f2.iter_times()):
+        if grid.time != float(i) or not np.allclose(grid['u'].data, arrs[i]):
+            raise RuntimeError("bad data for appended step {0}".format(i))
+        if not isinstance(grid['u'].crds, viscid.coordinate.UniformCrds):
+            raise RuntimeError("uniform crds came back nonuniform")
+
+    # append to a file from the old writer, which saved no attributes
+    h5_fname3 = _viscid_root + "/../sample/test_oldfmt.h5"
+    xdmf_fname3 = h5_fname3[:-3] + ".xdmf"
+    with h5py.File(h5_fname3, 'w') as h5:
+        for ax, arr in zip("xyz", [x, y, z]):
+            h5["/crds/" + ax] = arr
+        h5["/flds_nc/psi"] = psi.data.T
+    psi2 = viscid.wrap_field(psi.data + 1.0, psi.crds, name='psi',
+                             center='node', time=1.0)
+    viscid.save_fields(h5_fname3, [psi2], append=True)
+    f3 = viscid.load_file(xdmf_fname3)
+    for i, grid in enumerate(f3.iter_times()):
+        if grid.time != float(i) or not np.allclose(grid['psi'].data,
+                                                    psi.data + i):
+            raise RuntimeError("bad data appending to an old style file")
+
     if args.show:
         plt.show()
 
     if not args.keep:
         os.remove(h5_fname)
         os.remove(xdmf_fname)
+        os.remove(h5_fname2)
+        os.remove(xdmf_fname2)
+        os.remove(h5_fname3)
+        os.remove(xdmf_fname3)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+""" Make sure `import viscid` stays quick and imports things lazily """
+
+from __future__ import print_function
+import sys
+import os
+import argparse
+import subprocess as sub
+
+_viscid_root = os.path.realpath(os.path.dirname(__file__) + '/../viscid/')
+if not _viscid_root in sys.path:
+    sys.path.append(_viscid_root)
+
+import viscid
+from viscid import vutil
+
+# none of these should be imported by a bare `import viscid`
+HEAVY_MODULES = ["h5py", "numexpr", "viscid.readers.xdmf",
+                 "viscid.calculator.calc", "viscid.cython.streamline"]
+
+_TIMER_SCRIPT = """
+from timeit import default_timer as time
+t0 = time()
+import viscid
+t1 = time()
+import sys
+print(t1 - t0)
+print(" ".join(sorted(sys.modules)))
+"""
+
+def _run_fresh(script):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([os.path.dirname(_viscid_root),
+                                         env.get("PYTHONPATH", "")])
+    out = sub.check_output([sys.executable, "-c", script], env=env)
+    return out.decode().strip().split("\n")
+
+def run_import_time_test(nr_runs=5, max_time=None):
+    times = []
+    for _ in range(nr_runs):
+        t, modules = _run_fresh(_TIMER_SCRIPT)
+        times.append(float(t))
+    modules = modules.split()
+    print("import viscid: best {0:.1f} ms of {1} runs"
+          "".format(1e3 * min(times), nr_runs))
+
+    if sys.version_info >= (3, 7):
+        loaded = [m for m in HEAVY_MODULES if m in modules]
+        if loaded:
+            raise RuntimeError("import viscid eagerly loaded {0}"
+                               "".format(loaded))
+    if max_time is not None and min(times) > max_time:
+        raise RuntimeError("import viscid took {0:.3f} s > {1:.3f} s"
+                           "".format(min(times), max_time))
+
+def run_lazy_names_test():
+    from viscid.calculator import calc, plasma
+    from viscid.cython import streamline
+
+    expected = set(calc.__all__) | set(plasma.__all__)
+    expected |= set(a for a in dir(streamline) if a[0] != '_' and a.isupper())
+    missing = expected - set(viscid.__all__)
+    if missing:
+        raise RuntimeError("viscid.__all__ is missing {0}".format(missing))
+    for name in viscid.__all__:
+        if not hasattr(viscid, name):
+            raise RuntimeError("viscid has no attribute {0}".format(name))
+
+def run_reader_registry_test():
+    script = ("import sys, viscid\n"
+              "from viscid.readers.vfile import VFile\n"
+              "print(VFile.detect_type('run.npz').__name__)\n"
+              "print(' '.join(sorted(sys.modules)))\n")
+    ftype, modules = _run_fresh(script)
+    modules = modules.split()
+    if ftype != "FileNumpyNPZ":
+        raise RuntimeError("npz file detected as {0}".format(ftype))
+    if sys.version_info >= (3, 7):
+        if "viscid.readers.xdmf" in modules or "h5py" in modules:
+            raise RuntimeError("detecting a npz file imported unrelated "
+                               "readers")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-time", type=float, default=None,
+                        help="fail if importing takes longer than this (s)")
+    args = vutil.common_argparse(parser)
+
+    run_import_time_test(nr_runs=args.runs, max_time=args.max_time)
+    run_lazy_names_test()
+    run_reader_registry_test()
+
+if __name__ == "__main__":
+    main()
+
+##
+## EOF
+##
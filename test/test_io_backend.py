@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+""" test overlapped byte range reads and prefetching on a slow filesystem """
+
+from __future__ import print_function
+import sys
+import os
+import argparse
+import shutil
+import struct
+import tempfile
+import time
+
+import numpy as np
+
+_viscid_root = os.path.realpath(os.path.dirname(__file__) + '/../viscid/')
+if not _viscid_root in sys.path:
+    sys.path.append(_viscid_root)
+
+import viscid
+from viscid import vutil
+from viscid import profiling
+from viscid.readers import ggcm_fortbin
+from viscid.readers import io_backend
+
+LATENCY = 0.1
+
+def write_fortbin(fname, arrs):
+    """write (name, xyz array) pairs in the OpenGGCM fortbin format"""
+    with open(fname, 'wb') as f:
+        for name, arr in arrs:
+            f.write(struct.pack('<3i', 2, 600, arr.ndim))
+            f.write(struct.pack('<{0}i'.format(arr.ndim), *arr.shape))
+            f.write(name.ljust(80).encode())
+            f.write("time= 600.0 x 2000:01:01:00:10:00.000".ljust(80).encode())
+            f.write(np.asarray(arr, dtype='<f4').tobytes(order='F'))
+
+def make_grid(fname, arrs, crds, t):
+    write_fortbin(fname, arrs)
+    file_wrapper = ggcm_fortbin.GGCMFortbinFileWrapper(fname)
+    with file_wrapper as f:
+        f.inquire_all_fields()
+    grid = viscid.grid.Grid(name="<FortbinGrid>")
+    grid.time = t
+    grid.set_crds(crds)
+    for name, _ in arrs:
+        meta = file_wrapper.fields_seen[name]
+        data = ggcm_fortbin.FortbinDataWrapper(file_wrapper, name,
+                                               meta['dims'],
+                                               meta['file_position'])
+        grid.add_field(viscid.wrap_field(data, crds, name=name,
+                                         center="cell", zyx_native=True))
+    return grid
+
+def run_queue_test(tmpdir):
+    fnames = [os.path.join(tmpdir, "raw{0}".format(i)) for i in range(8)]
+    for i, fname in enumerate(fnames):
+        with open(fname, 'wb') as f:
+            f.write(np.arange(1024 * i, 1024 * (i + 1), dtype='i4').tobytes())
+
+    # adjacent ranges in one file are a single request
+    backend = io_backend.LatencyBackend(latency=LATENCY)
+    queue = io_backend.ReadQueue(backend=backend, nr_threads=8)
+    ranges = [(fnames[1], 40 * i, 40) for i in range(20)][::-1]
+    reqs = queue.submit_many(ranges)
+    for (_, offset, _), req in zip(ranges, reqs):
+        arr = np.frombuffer(req.result(), dtype='i4')
+        if not np.all(arr == 1024 + offset // 4 + np.arange(10)):
+            raise RuntimeError("coalesced read has the wrong bytes")
+    if backend.nr_requests != 1:
+        raise RuntimeError("adjacent ranges weren't coalesced: {0} requests"
+                           "".format(backend.nr_requests))
+
+    # ranges in different files are all in flight at once
+    t0 = time.time()
+    reqs = queue.submit_many([(fname, 0, 4096) for fname in fnames])
+    bufs = [req.result() for req in reqs]
+    dt = time.time() - t0
+    if backend.nr_requests != 9 or dt > 0.5 * len(fnames) * LATENCY:
+        raise RuntimeError("reads weren't overlapped: {0} requests in {1} s"
+                           "".format(backend.nr_requests - 1, dt))
+    if np.frombuffer(bufs[3], dtype='i4')[0] != 3 * 1024:
+        raise RuntimeError("read the wrong file")
+
+    # errors come back from result()
+    req = queue.submit(os.path.join(tmpdir, "nope"), 0, 10)
+    try:
+        req.result()
+    except IOError:
+        pass
+    else:
+        raise RuntimeError("a missing file should raise IOError")
+    queue.close()
+
+def run_prefetch_test(tmpdir):
+    crds = viscid.wrap_crds("nonuniform_cartesian",
+                            (('x', np.linspace(-5, 5, 9)),
+                             ('y', np.linspace(-3, 3, 7)),
+                             ('z', np.linspace(-1, 1, 5))))
+    all_arrs = []
+    dset = viscid.dataset.DatasetTemporal(name="slow")
+    for t in range(3):
+        arrs = [(name, np.random.rand(8, 6, 4)) for name in ("rr", "pp",
+                                                             "vx")]
+        fname = os.path.join(tmpdir, "run.3df.{0:06d}.b".format(t))
+        dset.add(make_grid(fname, arrs, crds, float(t)))
+        all_arrs.append(dict(arrs))
+
+    old_backend = io_backend.backend
+    io_backend.backend = io_backend.LatencyBackend(latency=LATENCY)
+    profiling.enabled = True
+    profiling.reset()
+    try:
+        for i, grid in enumerate(dset.iter_times(":", prefetch=["rr", "pp"])):
+            if i == 0:
+                # the first step wasn't prefetched
+                if grid.prefetch() != 3:
+                    raise RuntimeError("grid didn't prefetch its fields")
+            time.sleep(2 * LATENCY)
+            for name in ("rr", "pp", "vx"):
+                if not np.allclose(grid[name].data, all_arrs[i][name]):
+                    raise RuntimeError("{0} at t={1} was read wrong"
+                                       "".format(name, i))
+        counters = profiling.get_counters()
+    finally:
+        io_backend.backend = old_backend
+        profiling.enabled = False
+        profiling.reset()
+
+    # fields next to each other in a file are read in one request, and
+    # only the fields that weren't prefetched are read with a file open
+    if counters.get("io.requests") != 3:
+        raise RuntimeError("bad number of io requests: {0}".format(counters))
+    if counters.get("fortbin.opens") != 2:
+        raise RuntimeError("prefetched fields were read again: {0}"
+                           "".format(counters))
+
+    # prefetched data that isn't used is forgotten by clear_cache
+    grid = dset.get_grid()
+    grid.prefetch(["rr"])
+    grid.clear_cache()
+    # pylint: disable=protected-access
+    if grid.fields["rr"]._src_data._prefetched is not None:
+        raise RuntimeError("clear_cache didn't drop the prefetch")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--show", "--plot", action="store_true")
+    args = vutil.common_argparse(parser)  # pylint: disable=unused-variable
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        run_queue_test(tmpdir)
+        run_prefetch_test(tmpdir)
+    finally:
+        shutil.rmtree(tmpdir)
+
+if __name__ == "__main__":
+    main()
+
+##
+## EOF
+##
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+""" test reading many fields of a grid in one pass """
+
+from __future__ import print_function
+import sys
+import os
+import argparse
+import shutil
+import struct
+import tempfile
+
+import numpy as np
+
+_viscid_root = os.path.realpath(os.path.dirname(__file__) + '/../viscid/')
+if not _viscid_root in sys.path:
+    sys.path.append(_viscid_root)
+
+import viscid
+from viscid import vutil
+from viscid import profiling
+from viscid.readers import ggcm_fortbin
+
+def write_fortbin(fname, arrs):
+    """write (name, xyz array) pairs in the OpenGGCM fortbin format"""
+    with open(fname, 'wb') as f:
+        for name, arr in arrs:
+            f.write(struct.pack('<3i', 2, 600, arr.ndim))
+            f.write(struct.pack('<{0}i'.format(arr.ndim), *arr.shape))
+            f.write(name.ljust(80).encode())
+            f.write("time= 600.0 x 2000:01:01:00:10:00.000".ljust(80).encode())
+            f.write(np.asarray(arr, dtype='<f4').tobytes(order='F'))
+
+def run_fortbin_test(tmpdir):
+    crds = viscid.wrap_crds("nonuniform_cartesian",
+                            (('x', np.linspace(-5, 5, 9)),
+                             ('y', np.linspace(-3, 3, 7)),
+                             ('z', np.linspace(-1, 1, 5))))
+    arrs = [(name, np.random.rand(8, 6, 4)) for name in ("rr", "pp", "vx",
+                                                         "vy")]
+    fname = os.path.join(tmpdir, "run.3df.000600.b")
+    write_fortbin(fname, arrs)
+
+    file_wrapper = ggcm_fortbin.GGCMFortbinFileWrapper(fname)
+    with file_wrapper as f:
+        f.inquire_all_fields()
+    grid = viscid.grid.Grid(name="<FortbinGrid>")
+    grid.set_crds(crds)
+    for name, _ in arrs:
+        meta = file_wrapper.fields_seen[name]
+        data = ggcm_fortbin.FortbinDataWrapper(file_wrapper, name,
+                                               meta['dims'],
+                                               meta['file_position'])
+        grid.add_field(viscid.wrap_field(data, crds, name=name,
+                                         center="cell", zyx_native=True))
+
+    profiling.enabled = True
+    profiling.reset()
+    try:
+        flds = grid.load_fields(["vy", "rr", "pp"])
+        counters = profiling.get_counters()
+    finally:
+        profiling.enabled = False
+        profiling.reset()
+    if counters.get("fortbin.opens") != 1:
+        raise RuntimeError("load_fields should open the file once: {0}"
+                           "".format(counters))
+    if [f.name for f in flds] != ["vy", "rr", "pp"]:
+        raise RuntimeError("load_fields returned the wrong fields")
+    for name, arr in arrs:
+        if (name == "vx") == grid.fields[name].is_loaded():
+            raise RuntimeError("wrong fields were loaded")
+        if not np.allclose(grid[name].data, arr):
+            raise RuntimeError("{0} was read wrong".format(name))
+    if grid["rr"] is not grid.fields["rr"]:
+        raise RuntimeError("grid didn't hand out the loaded field")
+    grid.clear_cache()
+    if grid.fields["rr"].is_loaded():
+        raise RuntimeError("clear_cache didn't unload the field")
+
+def run_hdf5_test(tmpdir):
+    x = np.linspace(-2, 2, 12)
+    psi = viscid.empty([x, x, x], name='psi', center='node')
+    b = viscid.empty([x, x, x], nr_comps=3, name='b', center='cell',
+                     layout='interlaced')
+    psi[...] = np.random.rand(*psi.shape)
+    b[...] = np.random.rand(*b.shape)
+    h5_fname = os.path.join(tmpdir, "fields.h5")
+    viscid.save_fields(h5_fname, [psi, b])
+
+    f = viscid.load_file(h5_fname[:-3] + ".xdmf")
+    grid = f.get_grid()
+    grid.preload()
+    for name in grid.field_names:
+        if not grid.fields[name].is_loaded():
+            raise RuntimeError("{0} wasn't preloaded".format(name))
+    if not np.allclose(grid['psi'].data, psi.data):
+        raise RuntimeError("psi was read wrong")
+    for c in "xyz":
+        if not np.allclose(grid['b'][c].data, b[c].data):
+            raise RuntimeError("b{0} was read wrong".format(c))
+    try:
+        grid.load_fields(["nope"])
+    except KeyError:
+        pass
+    else:
+        raise RuntimeError("loading a missing field should be a KeyError")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--show", "--plot", action="store_true")
+    args = vutil.common_argparse(parser)  # pylint: disable=unused-variable
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        run_fortbin_test(tmpdir)
+        run_hdf5_test(tmpdir)
+    finally:
+        shutil.rmtree(tmpdir)
+
+if __name__ == "__main__":
+    main()
+
+##
+## EOF
+##
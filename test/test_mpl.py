@@ -77,6 +77,91 @@ def run_mpl_testB(show=False):
     if show:
         mpl.mplshow()
 
+def run_mpl_update_test(show=False):
+    logger.info("update a 2D plot in place")
+
+    x = np.array(np.linspace(-10, 10, 64), dtype=dtype)
+    y = np.array(np.linspace(-10, 10, 48), dtype=dtype)
+    z = np.array([0.0], dtype=dtype)
+
+    fld0 = viscid.empty([x, y, z], center='node')
+    fld1 = viscid.empty([x, y, z], center='node')
+    X, Y, Z = fld0.get_crds_nc(shaped=True)  # pylint: disable=unused-variable
+    fld0[:, :, :] = ne.evaluate("sin(X) + cos(Y)")
+    fld1[:, :, :] = ne.evaluate("2 * cos(X) * sin(Y)")
+
+    plt.clf()
+    p, _ = mpl.plot(fld0, "z=0f", show=False)
+    if not mpl.update_plot2d_field(p, fld1, selection="z=0f"):
+        raise RuntimeError("update_plot2d_field refused a compatible field")
+    updated = np.asarray(p.get_array()).ravel()
+    plt.clf()
+    p, _ = mpl.plot(fld1, "z=0f", show=False)
+    fresh = np.asarray(p.get_array()).ravel()
+    if not np.allclose(updated, fresh):
+        raise RuntimeError("updated plot doesn't match a fresh plot")
+    if tuple(p.get_clim()) != (fld1.min(), fld1.max()):
+        raise RuntimeError("updated color limits are wrong")
+
+    # different crds means the plot must be redrawn
+    fld2 = viscid.empty([x[::2], y, z], center='node')
+    if mpl.update_plot2d_field(p, fld2, selection="z=0f"):
+        raise RuntimeError("update_plot2d_field accepted different crds")
+
+    if show:
+        mpl.mplshow()
+    plt.clf()
+
+def run_mpl_downsample_test(show=False):
+    logger.info("downsample big 2D plots to the screen resolution")
+
+    x = np.array(np.sinh(np.linspace(-3, 3, 2049)), dtype=dtype)
+    y = np.array(np.linspace(-5, 5, 1025), dtype=dtype)
+    z = np.array([0.0], dtype=dtype)
+
+    fld = viscid.empty([x, y, z], center='cell')
+    X, Y, Z = fld.get_crds_cc(shaped=True)  # pylint: disable=unused-variable
+    fld[:, :, :] = ne.evaluate("sin(X) * cos(3 * Y)")
+
+    plt.figure(figsize=(4, 2), dpi=100)
+    p, _ = mpl.plot(fld, "z=0f", show=False)
+    dat = p.get_array()
+    if not dat.size < fld.size // 16:
+        raise RuntimeError("plot wasn't downsampled")
+    if dat.max() > fld.max() or dat.min() < fld.min():
+        raise RuntimeError("block mean is out of the data range")
+
+    p, _ = mpl.plot(fld, "z=0f", downsample='max', show=False)
+    if not np.isclose(p.get_array().max(), fld.max()):
+        raise RuntimeError("block max lost the max")
+
+    # mod rescales the axes, but shouldn't change how much is kept
+    sizes = []
+    for mod in (None, [0.1, 0.1], [10.0, 10.0]):
+        plt.clf()
+        p, _ = mpl.plot(fld, "z=0f", mod=mod, show=False)
+        sizes.append(p.get_array().size)
+        if sizes[-1] != sizes[0]:
+            raise RuntimeError("mod={0} changed the downsampling: {1} != {2}"
+                               "".format(mod, sizes[-1], sizes[0]))
+
+    p, _ = mpl.plot(fld, "z=0f", downsample=False, show=False)
+    if p.get_array().size != fld.size:
+        raise RuntimeError("downsample=False still downsampled")
+
+    # weighted means on nonuniform crds
+    xnc = np.array([0.0, 1.0, 3.0, 6.0, 7.0])
+    ync = np.array([0.0, 1.0])
+    X, Y, dat = mpl._downsample2d(xnc, ync, np.array([[1.0, 2.0, 3.0, 4.0]]),
+                                  (3.0, 0.1))
+    if not (np.allclose(X, [0, 3, 6, 7]) and np.allclose(Y, ync) and
+            np.allclose(dat, [[5.0 / 3.0, 3.0, 4.0]])):
+        raise RuntimeError("bad downsample on nonuniform crds")
+
+    if show:
+        mpl.mplshow()
+    plt.close()
+
 def main():
     parser = argparse.ArgumentParser(description="Test calc")
     parser.add_argument("--show", "--plot", action="store_true")
@@ -84,6 +169,8 @@ def main():
 
     run_mpl_testA(show=args.show)
     run_mpl_testB(show=args.show)
+    run_mpl_update_test(show=args.show)
+    run_mpl_downsample_test(show=args.show)
 
 
 if __name__ == "__main__":
@@ -41,6 +41,13 @@ def main():
     scp.module_manager.scalar_lut_manager.reverse_lut = True
     scp.module_manager.scalar_lut_manager.show_scalar_bar = True
 
+    # new values on the same grid should go into the existing source
+    if not mvi.update_field_source(pp_src, 2 * pp):
+        raise RuntimeError("update_field_source refused a compatible field")
+    if mvi.update_field_source(pp_src, b):
+        raise RuntimeError("update_field_source took a vector for a scalar")
+    mvi.update_field_source(pp_src, pp)
+
     # calculate B field lines && topology in viscid and plot them
     seeds = viscid.SphericalPatch([0, 0, 0], [2, 0, 1], 30, 15, r=5.0,
                                   nalpha=5, nbeta=5)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+""" test pushing tracers / particles through time dependent fields """
+
+from __future__ import print_function
+import sys
+import os
+import argparse
+
+import numpy as np
+
+_viscid_root = os.path.realpath(os.path.dirname(__file__) + '/../viscid/')
+if not _viscid_root in sys.path:
+    sys.path.append(_viscid_root)
+
+import viscid
+from viscid import vutil
+from viscid.dataset import DatasetTemporal
+from viscid.cython import pathline
+
+def make_vector(crds, comps, name):
+    shape = crds.shape_nc
+    arr = np.array([np.ones(shape) * c for c in comps])
+    return viscid.wrap_field(arr, crds, name=name, fldtype="vector",
+                             layout="flat")
+
+def make_dataset(crds, times, flds_at):
+    dset = DatasetTemporal(name="dset")
+    for t in times:
+        grid = viscid.grid.Grid(name="grid")
+        grid.time = t
+        grid.set_crds(crds)
+        for fld in flds_at(t):
+            grid.add_field(fld)
+        dset.add(grid)
+    return dset
+
+def run_pathline_test(crds):
+    X, Y, _ = crds.get_crds_nc(shaped=True)
+    zero = 0.0 * X
+
+    # solid body rotation, a quarter turn
+    rot = make_vector(crds, [-Y, X, zero], "v")
+    pts, alive = pathline.advect_tracers(rot, rot, [[1.0], [0.0], [0.0]],
+                                         0.0, 0.5 * np.pi, nr_steps=32)
+    if not np.allclose(pts[:, 0], [0.0, 1.0, 0.0], atol=1e-6) or not alive[0]:
+        raise RuntimeError("RK4 pathline of a rotation is wrong")
+
+    # vx = 1 + 2t is linear in time, so the snapshots are exact
+    dset = make_dataset(crds, [0.0, 0.5, 1.0, 1.5],
+                        lambda t: [make_vector(crds, [1.0 + 2.0 * t, 0, 0],
+                                               "v")])
+    seeds = np.array([[-3.5, -1.0, 1.0], [0.0, 0.0, 0.0], [0.0, 0.5, 0.0]])
+    for prefetch in (True, False):
+        times, hist = viscid.vlab.trace_pathlines(dset.iter_times(":"),
+                                                  seeds, nr_steps=4,
+                                                  prefetch=prefetch)
+        if not np.allclose(times, [0.0, 0.5, 1.0, 1.5]):
+            raise RuntimeError("trace_pathlines gave the wrong times")
+        exact = seeds[0, :2, None] + times + times**2
+        if not np.allclose(hist[:, 0, :2], exact.T):
+            raise RuntimeError("pathline didn't follow v(t)")
+        # the last tracer leaves the domain, and is NaN after that
+        if not np.all(np.isnan(hist[3:, :, 2])) or np.any(np.isnan(hist[:3])):
+            raise RuntimeError("tracers that left the domain weren't "
+                               "marked")
+
+def run_boris_test(crds):
+    X, _, _ = crds.get_crds_nc(shaped=True)
+    zero = 0.0 * X
+    b = make_vector(crds, [zero, zero, zero + 1.0], "b")
+
+    # one gyro period in a uniform B, |v| is conserved exactly
+    e = make_vector(crds, [zero, zero, zero], "e")
+    x, v, alive = pathline.push_particles(e, e, b, b, [[0.0], [-1.0], [0.0]],
+                                          [[1.0], [0.0], [0.0]], 0.0,
+                                          2.0 * np.pi, nr_steps=512)
+    if not np.isclose(np.linalg.norm(v[:, 0]), 1.0, rtol=1e-12):
+        raise RuntimeError("Boris push didn't conserve |v|")
+    if not np.allclose(x[:, 0], [0.0, -1.0, 0.0], atol=1e-3) or not alive[0]:
+        raise RuntimeError("Boris push didn't make a gyro orbit")
+
+    # E x B drift in a field that's read from a dataset
+    dset = make_dataset(crds, np.linspace(0, 6 * np.pi, 4),
+                        lambda t: [make_vector(crds, [0, 0.1, 0], "e"),
+                                   make_vector(crds, [0, 0, 1.0], "b")])
+    times, x, v = viscid.vlab.trace_particles(dset.iter_times(":"),
+                                              np.zeros((3, 1)),
+                                              np.zeros((3, 1)), q_m=1.0,
+                                              nr_steps=512)
+    if not np.allclose(x[-1, :, 0], [0.1 * times[-1], 0.0, 0.0], atol=1e-3):
+        raise RuntimeError("Boris push didn't E x B drift")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--show", "--plot", action="store_true")
+    args = vutil.common_argparse(parser)  # pylint: disable=unused-variable
+
+    x = np.linspace(-4.0, 4.0, 33)
+    crds = viscid.arrays2crds([x, x, np.linspace(-1.0, 1.0, 5)])
+    run_pathline_test(crds)
+    run_boris_test(crds)
+
+if __name__ == "__main__":
+    main()
+
+##
+## EOF
+##
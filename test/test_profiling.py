@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+""" test the opt-in profiling counters and timers """
+
+from __future__ import print_function
+import sys
+import os
+import argparse
+import json
+import shutil
+import tempfile
+
+import numpy as np
+
+_viscid_root = os.path.realpath(os.path.dirname(__file__) + '/../viscid/')
+if not _viscid_root in sys.path:
+    sys.path.append(_viscid_root)
+
+import viscid
+from viscid import vutil
+from viscid import profiling
+
+def make_b(layout="flat"):
+    x = np.linspace(-2, 2, 16)
+    b = viscid.empty([x, x, x], nr_comps=3, name='b', center='node',
+                     layout=layout)
+    X, Y, Z = b.get_crds_nc("xyz", shaped=True)
+    b['x'] = -Y
+    b['y'] = X
+    b['z'] = 0.1 + 0.0 * Z
+    return b
+
+def run_disabled_test():
+    profiling.enabled = False
+    profiling.reset()
+    if profiling.timer("a") is not profiling.timer("b"):
+        raise RuntimeError("disabled timers should be a shared no-op")
+    profiling.count("a")
+    b = make_b()
+    viscid.calc_streamlines(b, viscid.Point([[1.0, 0.0, 0.0]]),
+                            maxit=100)
+    if profiling.get_counters() or profiling.get_timers():
+        raise RuntimeError("profiling recorded something while disabled")
+
+def run_enabled_test(tmpdir):
+    profiling.enabled = True
+    profiling.reset()
+    try:
+        # reads and cache hits / misses
+        b = make_b()
+        bx = b['x']
+        fname = os.path.join(tmpdir, "bx.npz")
+        viscid.save_fields(fname, [bx])
+        f = viscid.load_file(fname)
+        fld = f['bx']
+        fld.data  # pylint: disable=pointless-statement
+        fld.data  # pylint: disable=pointless-statement
+        counters = profiling.get_counters()
+        if counters.get("read.npz.bytes", 0) < bx.data.nbytes:
+            raise RuntimeError("bytes read weren't counted: {0}"
+                               "".format(counters))
+        if counters.get("field.cache_miss", 0) < 1 or \
+           counters.get("field.cache_hit", 0) < 1:
+            raise RuntimeError("field cache wasn't counted")
+
+        # layout conversion makes a copy
+        profiling.reset()
+        bi = viscid.wrap_field(np.array(b.data), b.crds, name="bi",
+                               fldtype="vector", layout="flat",
+                               _force_layout="interlaced")
+        bi.data  # pylint: disable=pointless-statement
+        if profiling.get_timers().get("field.relayout", {}).get("calls") != 1:
+            raise RuntimeError("relayout wasn't timed")
+        if profiling.get_counters().get("field.copy_bytes", 0) < b.data.nbytes:
+            raise RuntimeError("relayout copy wasn't counted")
+
+        # cython setup and integration
+        profiling.reset()
+        seeds = viscid.Point([[1.0, 0.0, 0.0], [0.5, 0.0, 0.0]])
+        for _ in range(2):
+            viscid.calc_streamlines(b, seeds, maxit=100)
+        counters = profiling.get_counters()
+        if counters.get("cyfield.cache_miss") != 1 or \
+           counters.get("cyamrfield.cache_hit") != 1:
+            raise RuntimeError("cyfield cache wasn't counted: {0}"
+                               "".format(counters))
+        if counters.get("streamline.lines") != 4 or \
+           counters.get("streamline.segments", 0) < 4:
+            raise RuntimeError("streamline segments weren't counted")
+        if profiling.get_timers()["streamline.calc"]["calls"] != 2:
+            raise RuntimeError("streamlines weren't timed")
+
+        # exports
+        table = profiling.summary()
+        for name in ("streamline.calc", "streamline.segments"):
+            if name not in table:
+                raise RuntimeError("{0} isn't in the summary".format(name))
+        trace_fname = os.path.join(tmpdir, "trace.json")
+        profiling.save_chrome_trace(trace_fname)
+        with open(trace_fname) as fin:
+            events = json.load(fin)["traceEvents"]
+        phases = set(ev["ph"] for ev in events)
+        if phases != set(["X", "C"]):
+            raise RuntimeError("bad chrome trace phases {0}".format(phases))
+        if not all(ev["dur"] >= 0.0 for ev in events if ev["ph"] == "X"):
+            raise RuntimeError("bad chrome trace durations")
+    finally:
+        profiling.enabled = False
+        profiling.reset()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--show", "--plot", action="store_true")
+    args = vutil.common_argparse(parser)  # pylint: disable=unused-variable
+
+    run_disabled_test()
+    tmpdir = tempfile.mkdtemp()
+    try:
+        run_enabled_test(tmpdir)
+    finally:
+        shutil.rmtree(tmpdir)
+
+if __name__ == "__main__":
+    main()
+
+##
+## EOF
+##
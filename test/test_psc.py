@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+""" test chunked reading / binning of psc particle files """
+
+from __future__ import print_function
+import sys
+import os
+import argparse
+import shutil
+import tempfile
+
+import numpy as np
+import h5py
+
+_viscid_root = os.path.realpath(os.path.dirname(__file__) + '/../viscid/')
+if not _viscid_root in sys.path:
+    sys.path.append(_viscid_root)
+
+import viscid
+from viscid import vutil
+from viscid.readers import psc
+
+PRT_DTYPE = np.dtype([('x', 'f4'), ('y', 'f4'), ('z', 'f4'),
+                      ('px', 'f4'), ('py', 'f4'), ('pz', 'f4'),
+                      ('q', 'f4'), ('m', 'f4'), ('w', 'f4')])
+
+def make_prt_files(path, step, nr_files=3, nr_prts=5000):
+    rng = np.random.RandomState(42)
+    allprts = []
+    for i in range(nr_files):
+        prts = np.empty(nr_prts, dtype=PRT_DTYPE)
+        for name in ('x', 'y', 'z'):
+            prts[name] = rng.uniform(0.0, 10.0, nr_prts)
+        for name in ('px', 'py', 'pz'):
+            prts[name] = rng.normal(0.0, 0.5, nr_prts)
+        is_elec = rng.uniform(size=nr_prts) < 0.5
+        prts['q'] = np.where(is_elec, -1.0, 1.0)
+        prts['m'] = np.where(is_elec, 1.0, 25.0)
+        prts['w'] = rng.uniform(0.5, 1.5, nr_prts)
+        fname = "{0}/prt.{1:06d}_p{2:06d}.h5".format(path, step, i)
+        with h5py.File(fname, 'w') as f:
+            f.create_dataset("particles/p0/1d", data=prts)
+        allprts.append(prts)
+    return np.concatenate(allprts)
+
+def run_psc_particle_test(nr_procs=2):
+    path = tempfile.mkdtemp()
+    try:
+        ref = make_prt_files(path, 100)
+        prts = psc.PscParticles(path, 100)
+        if prts.nr_particles != len(ref) or len(prts.filenames) != 3:
+            raise RuntimeError("Didn't find all the particle files")
+
+        # chunked iteration with a box and species
+        box = {'x': (2.0, 7.0), 'z': (0.0, 5.0)}
+        sel = list(prts.iter_chunks(box=box, species='e', chunk_size=1000))
+        sel = np.concatenate(sel)
+        mask = ((ref['x'] >= 2.0) & (ref['x'] < 7.0) & (ref['z'] >= 0.0) &
+                (ref['z'] < 5.0) & (ref['q'] == -1.0))
+        if not np.array_equal(sel, ref[mask]):
+            raise RuntimeError("iter_chunks selected the wrong particles")
+
+        # 2d phase space, in parallel, compared to numpy
+        hist = prts.histogram(['x', 'px'], bins=[20, 16],
+                              ranges=[(0, 10), (-2, 2)], species='e',
+                              nr_procs=nr_procs, chunk_size=1000)
+        elec = ref[ref['q'] == -1.0]
+        href, _ = np.histogramdd(np.array([elec['x'], elec['px']]).T,
+                                 bins=[20, 16], range=[(0, 10), (-2, 2)],
+                                 weights=elec['w'])
+        if list(hist.shape) != [20, 16] or hist.crds.axes != ['x', 'px']:
+            raise RuntimeError("Wrong histogram shape / crds")
+        if not np.allclose(hist.data, href):
+            raise RuntimeError("Phase space histogram doesn't match numpy")
+
+        # energy spectrum with log bins and ranges found from the data
+        ebins = np.logspace(-4, 1, 33)
+        spec = prts.histogram('ek', bins=ebins, weights=None,
+                              species=(1.0, None), chunk_size=1234)
+        ions = ref[ref['q'] == 1.0]
+        ek = ions['m'] * (np.sqrt(1.0 + ions['px'].astype('f8')**2 +
+                                  ions['py']**2 + ions['pz']**2) - 1.0)
+        sref, _ = np.histogram(ek, bins=ebins)
+        if not np.allclose(spec.data, sref):
+            raise RuntimeError("Energy spectrum doesn't match numpy")
+
+        auto = prts.histogram(['y', 'py', 'pz'], bins=8, chunk_size=4096)
+        total = np.sum(ref['w'], dtype='f8')
+        if list(auto.shape) != [8, 8, 8] or not np.isclose(np.sum(auto.data),
+                                                           total):
+            raise RuntimeError("3d histogram lost particles")
+    finally:
+        shutil.rmtree(path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--show", "--plot", action="store_true")
+    parser.add_argument("-n", "--nr_procs", type=int, default=2)
+    args = vutil.common_argparse(parser)
+
+    run_psc_particle_test(nr_procs=args.nr_procs)
+
+if __name__ == "__main__":
+    main()
+
+##
+## EOF
+##
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+""" test multi-resolution pyramids and plotting from them """
+
+from __future__ import print_function
+import sys
+import os
+import argparse
+import shutil
+import tempfile
+
+import numpy as np
+
+_viscid_root = os.path.realpath(os.path.dirname(__file__) + '/../viscid/')
+if not _viscid_root in sys.path:
+    sys.path.append(_viscid_root)
+
+import viscid
+from viscid import vutil
+from viscid import pyramid
+from viscid.plot import mpl
+from viscid.plot.mpl import plt
+
+def make_fld(nx, ny, nz, center='cell'):
+    x = np.linspace(-2.0, 2.0, nx + 1)
+    y = np.linspace(-1.0, 1.0, ny + 1)
+    z = np.linspace(-1.0, 1.0, nz + 1)
+    fld = viscid.empty([x, y, z], name='f', center=center)
+    if center == 'cell':
+        X, Y, Z = fld.get_crds_cc(shaped=True)
+    else:
+        X, Y, Z = fld.get_crds_nc(shaped=True)
+    fld[...] = np.sin(3 * X) * np.cos(2 * Y) + Z
+    return fld
+
+def run_levels_test():
+    fld = make_fld(64, 33, 1)
+    pyr = pyramid.FieldPyramid(fld)
+    dat = fld.data
+    # odd axes end in a block of 3 cells
+    shapes = [list(pyr.level(k).sshape) for k in range(pyr.nr_levels)]
+    if shapes != [[64, 33, 1], [32, 16, 1], [16, 8, 1]]:
+        raise RuntimeError("bad pyramid shapes {0}".format(shapes))
+    lvl = pyr.level(1)
+    if not np.allclose(lvl.crds.get_nc('y')[[0, -1]], [-1.0, 1.0]):
+        raise RuntimeError("pyramid level doesn't cover the field")
+    if not np.isclose(lvl.data[3, 15, 0], np.mean(dat[6:8, 30:33, 0])):
+        raise RuntimeError("pyramid mean is wrong")
+    if not np.isclose(pyr.level(2, 'max').data[1, 2, 0],
+                      np.max(dat[4:8, 8:12, 0])):
+        raise RuntimeError("pyramid max is wrong")
+    if not np.isclose(np.min(pyr.level(2, 'min')), np.min(dat)):
+        raise RuntimeError("pyramid min lost the extrema")
+    if not np.allclose(pyr.level(2, 'absmax'),
+                       np.maximum(-pyr.level(2, 'min').data,
+                                  pyr.level(2, 'max').data)):
+        raise RuntimeError("pyramid absmax is wrong")
+    if pyr.choose_level([0.13, 0.2], axes=['x', 'y']) != 1:
+        raise RuntimeError("chose the wrong level")
+    if pyr.choose_level_by_size(16 * 8) != 2:
+        raise RuntimeError("chose the wrong level by size")
+
+    down = make_fld(64, 32, 1).downsample()
+    if list(down.sshape) != [32, 16, 1] or not down.crds.istype("uniform"):
+        raise RuntimeError("downsample has the wrong crds")
+
+def run_disk_cache_test(tmpdir):
+    pyramid.cache_dir = os.path.join(tmpdir, "pyramids")
+    pyramid.use_disk_cache = True
+    try:
+        fld = make_fld(64, 64, 8)
+        fname = os.path.join(tmpdir, "f.npz")
+        viscid.save_fields(fname, [fld])
+        f = viscid.load_file(fname)
+        fld = f['f']
+        level1 = pyramid.get_pyramid(fld).level(1).data
+        if pyramid.get_pyramid(fld) is not pyramid.get_pyramid(fld):
+            raise RuntimeError("pyramid isn't remembered on the field")
+        if len(os.listdir(pyramid.cache_dir)) != 1:
+            raise RuntimeError("pyramid wasn't saved to disk")
+        fld.clear_cache()
+        if fld._pyramids is not None:  # pylint: disable=protected-access
+            raise RuntimeError("clear_cache didn't forget the pyramid")
+
+        # a new pyramid for the same field comes from the disk cache
+        pyr = pyramid.get_pyramid(fld)
+        if not np.all(pyr.level(1).data == level1) or fld.is_loaded():
+            raise RuntimeError("pyramid didn't come from the disk cache")
+
+        # the disk cache is kept under its size limit
+        pyramid.max_disk_cache_nbytes = 1
+        fld.clear_cache()
+        pyramid.get_pyramid(fld, selection="z=0f")
+        if os.listdir(pyramid.cache_dir):
+            raise RuntimeError("disk cache wasn't pruned")
+    finally:
+        pyramid.cache_dir = None
+        pyramid.use_disk_cache = False
+        pyramid.max_disk_cache_nbytes = 1024**3
+
+def run_plot_test():
+    old_min_size = pyramid.min_size
+    pyramid.min_size = 0
+    try:
+        # pylint: disable=protected-access
+        plt.figure(figsize=(1.0, 0.5), dpi=50)
+        fld = make_fld(256, 128, 4)
+        p0, _ = mpl.plot(fld, "z=0f", colorbar=False)
+        if list(fld._pyramids.keys()) != ["z=0f"]:
+            raise RuntimeError("plot didn't use a pyramid")
+        # only the plotted slice is coarsened
+        if list(fld._pyramids["z=0f"].level(0).sshape) != [256, 128, 1]:
+            raise RuntimeError("pyramid isn't of just the plotted slice")
+
+        # pyramid=False and selections by index use the whole field
+        fld = make_fld(256, 128, 4)
+        p1, _ = mpl.plot(fld, "z=0f", colorbar=False, pyramid=False)
+        mpl.plot(fld, "z=2", colorbar=False)
+        if fld._pyramids is not None:
+            raise RuntimeError("plot used a pyramid when it shouldn't")
+        # block edges aren't the same, so give or take a pixel
+        shape0 = np.array(p0.get_array().shape)
+        shape1 = np.array(p1.get_array().shape)
+        if np.any(np.abs(shape0 - shape1) > 1):
+            raise RuntimeError("pyramid plot has a different resolution")
+
+        # if the field's own cells are the right size, nothing is made
+        plt.figure(figsize=(6.0, 3.0), dpi=50)
+        mpl.plot(fld, "z=0f", colorbar=False)
+        if fld._pyramids is not None:
+            raise RuntimeError("plot made a pyramid it didn't use")
+        plt.close('all')
+    finally:
+        pyramid.min_size = old_min_size
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--show", "--plot", action="store_true")
+    args = vutil.common_argparse(parser)  # pylint: disable=unused-variable
+
+    run_levels_test()
+    tmpdir = tempfile.mkdtemp()
+    try:
+        run_disk_cache_test(tmpdir)
+    finally:
+        shutil.rmtree(tmpdir)
+    run_plot_test()
+
+if __name__ == "__main__":
+    main()
+
+##
+## EOF
+##
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+""" test the fused transpose / relayout kernel """
+
+from __future__ import print_function
+import sys
+import os
+import argparse
+
+import numpy as np
+
+_viscid_root = os.path.realpath(os.path.dirname(__file__) + '/../viscid/')
+if not _viscid_root in sys.path:
+    sys.path.append(_viscid_root)
+
+import viscid
+from viscid import vutil
+from viscid.cython import relayout
+from viscid.readers import openggcm
+
+def run_kernel_test():
+    old_min_nbytes = relayout.min_parallel_nbytes
+    try:
+        for min_nbytes in (relayout.min_parallel_nbytes, 0):
+            relayout.min_parallel_nbytes = min_nbytes
+            for dtype in ('f4', 'f8', 'i4', 'i8', '>f4'):
+                src = (100 * np.random.rand(3, 37, 40, 65)).astype(dtype)
+                src = np.transpose(src, (0, 3, 2, 1))[:, ::-1, :, 1::2]
+                dst = np.empty(src.shape, dtype=np.dtype(dtype).name)
+                relayout.relayout(src, dst, threads=4)
+                if not np.all(dst == src):
+                    raise RuntimeError("bad copy for {0}".format(dtype))
+
+                # move the component axis to the end and flip signs
+                src_i = np.moveaxis(src, 0, -1)
+                dst = np.empty(src_i.shape, dtype=np.dtype(dtype).name)
+                relayout.relayout(src_i, dst, comp_axis=-1,
+                                  comp_scale=[-1.0, -1.0, 1.0], threads=4)
+                ref = src_i * np.array([-1, -1, 1], dtype=dst.dtype)
+                if not np.all(dst == ref):
+                    raise RuntimeError("bad scaled copy for {0}".format(dtype))
+
+        # 2d, and a scale for everything
+        src = np.arange(12.0).reshape(3, 4).T
+        dst = relayout.relayout(src, np.empty_like(src), comp_scale=[-2.0])
+        if not np.all(dst == -2.0 * src):
+            raise RuntimeError("bad 2d copy")
+    finally:
+        relayout.min_parallel_nbytes = old_min_nbytes
+
+def make_zyx_fld(fldtype, layout, transform_func):
+    x = np.linspace(-3.0, 2.0, 12)
+    y = np.linspace(-1.5, 1.5, 9)
+    z = np.linspace(-1.0, 1.0, 6)
+    crds = viscid.wrap_crds("nonuniform_cartesian", (('x', x), ('y', y),
+                                                     ('z', z)))
+    crds = crds.with_reflections("xy")
+    if fldtype == "vector":
+        if layout == "flat":
+            shape = (3, len(z), len(y), len(x))
+        else:
+            shape = (len(z), len(y), len(x), 3)
+    else:
+        shape = (len(z), len(y), len(x))
+    dat = np.random.rand(*shape).astype('f4')
+    fld = viscid.wrap_field(dat, crds, name="f", fldtype=fldtype,
+                            center="node", zyx_native=True,
+                            post_reshape_transform_func=transform_func)
+    return dat, fld
+
+def run_field_test():
+    # flat zyx vector data with gse flips -> interlaced xyz
+    dat, fld = make_zyx_fld("vector", "flat", openggcm.mhd2gse_field_vector)
+    fld.layout = "interlaced"
+    ref = np.transpose(dat, (3, 2, 1, 0))[::-1, ::-1, :, :]
+    ref = ref * np.array([-1.0, -1.0, 1.0], dtype=ref.dtype)
+    if fld.data.shape != ref.shape or not np.all(fld.data == ref):
+        raise RuntimeError("fused relayout of a vector field is wrong")
+    if not fld.data.flags['C_CONTIGUOUS']:
+        raise RuntimeError("relayout didn't make a contiguous array")
+
+    # interlaced -> flat
+    dat, fld = make_zyx_fld("vector", "interlaced",
+                            openggcm.mhd2gse_field_vector)
+    fld.layout = "flat"
+    ref = np.transpose(dat, (3, 2, 1, 0))[:, ::-1, ::-1, :]
+    ref = ref * np.array([-1.0, -1.0, 1.0], dtype=ref.dtype).reshape(3, 1, 1, 1)
+    if not np.all(fld.data == ref):
+        raise RuntimeError("fused relayout to flat is wrong")
+
+    # scalar component that needs a flip
+    dat, fld = make_zyx_fld("scalar", None, openggcm.mhd2gse_field_scalar_m1)
+    ref = -1.0 * dat.T[::-1, ::-1, :]
+    if not np.all(fld.data == ref):
+        raise RuntimeError("fused relayout of a scalar field is wrong")
+
+    # a transform func without comp_scale goes the long way around
+    def halve(fld, crds, arr, **kwargs):  # pylint: disable=unused-argument
+        return 0.5 * arr
+    dat, fld = make_zyx_fld("scalar", None, halve)
+    if not np.allclose(fld.data, 0.5 * dat.T[::-1, ::-1, :]):
+        raise RuntimeError("transform func wasn't applied")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--show", "--plot", action="store_true")
+    args = vutil.common_argparse(parser)  # pylint: disable=unused-variable
+
+    run_kernel_test()
+    run_field_test()
+
+if __name__ == "__main__":
+    main()
+
+##
+## EOF
+##
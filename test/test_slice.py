@@ -28,10 +28,48 @@ def test_slice(selection, fld, dat_shape, nc_shape=None, cc_shape=None,
     if data:
         assert np.all(slced_fld == data)
 
+def _ref_index(arr, value, epsilon, above):
+    # brute force version of what vutil.extract_index looks for
+    diff = arr - value + epsilon
+    if above:
+        diff = np.ma.masked_less_equal(diff, 0)
+    else:
+        diff = np.ma.masked_greater_equal(diff, 0)
+    if np.ma.count(diff) == 0:
+        return None
+    return int(np.argmin(np.abs(diff)))
+
+def test_float_locations():
+    # pylint: disable=protected-access
+    rng = np.random.RandomState(1)
+    for dtype in ('f4', 'f8'):
+        for arr in (np.linspace(-5, 5, 101).astype(dtype),
+                    np.sort(rng.uniform(-5, 5, 64)).astype(dtype)):
+            for arr in (arr, arr[::-1]):
+                eps = 4 * np.finfo(arr.dtype).eps
+                values = list(arr[::7]) + list(rng.uniform(-6, 6, 20))
+                for v in values:
+                    v = float(v)
+                    assert vutil._closest_above(arr, v, eps) == \
+                           _ref_index(arr, v, eps, True)
+                    assert vutil._closest_below(arr, v, -eps) == \
+                           _ref_index(arr, v, -eps, False)
+                    assert vutil._closest_sorted(arr, v) == \
+                           int(np.argmin(np.abs(arr - v)))
+
+    # the same string selection on two different grids
+    fld1 = viscid.dat2field(np.arange(40.0).reshape(4, 10))
+    fld2 = viscid.dat2field(np.arange(40.0).reshape(10, 4))
+    for _ in range(3):
+        test_slice("y=2f:5.5f, x=1f", fld1, (4,), data=[12, 13, 14, 15])
+        test_slice("y=2f:5.5f, x=1f", fld2, (2,), data=[6, 7])
+
 def main():
     parser = argparse.ArgumentParser(description="Test slice")
     args = vutil.common_argparse(parser)
 
+    test_float_locations()
+
     # CELL CENTERED TESTS
     shape = [30, 40, 50]
     center = 'cell'
@@ -54,6 +54,121 @@ def run_test(_fld, _seeds, plot2d=True, plot3d=True, show=False, **kwargs):
     except ImportError:
         pass
 
+def run_accumulate_test(_fld, _seeds, **kwargs):
+    """compare on-the-fly line quantities to ones from the vertices"""
+    lines, _ = viscid.calc_streamlines(_fld, _seeds, **kwargs)
+    _, _, quants = viscid.calc_streamlines(_fld, _seeds,
+                                           output=viscid.OUTPUT_TOPOLOGY,
+                                           accumulate=["length", "volume",
+                                                       "endpoints"],
+                                           **kwargs)
+
+    for i, line in enumerate(lines):
+        ds = np.linalg.norm(np.diff(line, axis=1), axis=0)
+        bmag = np.linalg.norm(viscid.interp_trilin(_fld, line), axis=1)
+        volume = np.sum(0.5 * ds * (1.0 / bmag[1:] + 1.0 / bmag[:-1]))
+        assert np.isclose(quants['length'][i], np.sum(ds))
+        assert np.isclose(quants['volume'][i], volume)
+        assert np.allclose(quants['endpoints'][i, 0], line[:, 0])
+        assert np.allclose(quants['endpoints'][i, 1], line[:, -1])
+
+    # scalar accumulators need scalars
+    for acc in ("integral", "min", "max"):
+        try:
+            viscid.calc_streamlines(_fld, _seeds, output=viscid.OUTPUT_TOPOLOGY,
+                                    accumulate=acc, **kwargs)
+        except ValueError:
+            pass
+        else:
+            raise RuntimeError("accumulate='{0}' without scalars should be a "
+                               "ValueError".format(acc))
+
+    # ...unless they're only implied by 'all'
+    for acc in ("all", viscid.ACCUM_ALL):
+        _, _, quants_all = viscid.calc_streamlines(_fld, _seeds,
+                                                   output=viscid.OUTPUT_TOPOLOGY,
+                                                   accumulate=acc, **kwargs)
+        if sorted(quants_all.keys()) != sorted(quants.keys()):
+            raise RuntimeError("accumulate={0!r} without scalars gave {1}"
+                               "".format(acc, list(quants_all.keys())))
+        for key, val in quants.items():
+            assert np.allclose(quants_all[key], val)
+
+def run_layout_test(_fld, _seeds, **kwargs):
+    """kernels should give the same answer for any data layout"""
+    interlaced = _fld.as_interlaced()
+    flat = viscid.scalar_fields_to_vector(interlaced.component_fields(),
+                                          name=_fld.name)
+    assert flat.layout == viscid.field.LAYOUT_FLAT
+    # every other point along x, which is a non-contiguous view
+    strided = interlaced["x=::2"]
+    assert not strided.data.flags['C_CONTIGUOUS']
+    strided_ref = strided.wrap(np.array(strided.data))
+
+    for ref, other in ((interlaced, flat), (strided_ref, strided)):
+        for interp in (viscid.interp_trilin, viscid.interp_nearest):
+            assert np.all(interp(ref, _seeds) == interp(other, _seeds))
+        lines0, topo0 = viscid.calc_streamlines(ref, _seeds, **kwargs)
+        lines1, topo1 = viscid.calc_streamlines(other, _seeds, **kwargs)
+        assert np.all(topo0 == topo1)
+        assert all(np.all(l0 == l1) for l0, l1 in zip(lines0, lines1))
+
+def run_cyfield_cache_test():
+    """repeated kernel calls reuse the cython wrapper until data changes"""
+    B = viscid.vlab.get_dipole(m=[0, 0, -1], n=[32] * 3)
+    pt = viscid.Point(np.array([[1.0], [2.0], [0.5]]))
+    val0 = viscid.interp_trilin(B, pt)
+    cyfld = B._cyfield  # pylint: disable=protected-access
+    assert cyfld is not None
+    viscid.interp_trilin(B, pt)
+    viscid.calc_streamlines(B, pt, ibound=0.5)
+    assert B._cyfield is cyfld  # pylint: disable=protected-access
+
+    B["x=0f:2f, y=1f:3f, z=0f:1f"] = 0.0
+    assert B._cyfield is None  # pylint: disable=protected-access
+    assert np.all(viscid.interp_trilin(B, pt) == 0.0)
+    B.clear_cache()
+    assert B._cyfield is None  # pylint: disable=protected-access
+    assert np.all(viscid.interp_trilin(B, pt) == 0.0)
+    assert B._cyfield is not None  # pylint: disable=protected-access
+    assert np.any(val0 != 0.0)
+
+def run_precision_test(_fld, _seeds, **kwargs):
+    """float32 data is traced in double, and closer to the float64 lines"""
+    from viscid.cython import cyfield
+    lines64, topo64 = viscid.calc_streamlines(_fld, _seeds, **kwargs)
+    mixed = _fld.astype('f4')
+    assert viscid.interp_trilin(mixed, _seeds).dtype == np.dtype('f8')
+    lines_mixed, topo_mixed = viscid.calc_streamlines(mixed, _seeds, **kwargs)
+    cyfield.mixed_precision = False
+    try:
+        single = _fld.astype('f4')
+        lines32, topo32 = viscid.calc_streamlines(single, _seeds, **kwargs)
+    finally:
+        cyfield.mixed_precision = True
+    assert lines_mixed[0].dtype == np.dtype('f8')
+    assert lines32[0].dtype == np.dtype('f4')
+    assert np.all(topo_mixed == topo64) and np.all(topo32 == topo64)
+
+    def _end_err(lines):
+        return max(np.max(np.abs(l[:, -1] - l64[:, -1]))
+                   for l, l64 in zip(lines, lines64))
+    assert _end_err(lines_mixed) < _end_err(lines32)
+
+def run_lshell_test(method, **kwargs):
+    """lines in an untilted dipole should keep r / sin(theta)**2 fixed"""
+    B = viscid.vlab.get_dipole(m=[0, 0, -1], l=[-8] * 3, h=[8] * 3,
+                               n=[128] * 3)
+    seeds = viscid.Point(np.array([[3.0, 0.3, 0.0], [5.0, 1.0, 0.1],
+                                   [2.0, 0.0, 0.5], [4.0, -1.0, 0.2]]).T)
+    lines, _ = viscid.calc_streamlines(B, seeds, ibound=1.2, method=method,
+                                       **kwargs)
+    for line in lines:
+        rsq = np.sum(line**2, axis=0)
+        lshell = rsq**1.5 / (line[0]**2 + line[1]**2)
+        assert np.max(np.abs(lshell / lshell[0] - 1.0)) < 1e-2
+    return lines
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--notwo", dest='notwo', action="store_true")
@@ -80,6 +195,25 @@ def main():
     run_test(B, sphere, plot2d=plot2d, plot3d=plot3d, show=args.show,
              ibound=0.07, obound0=obound0, obound1=obound1, method=viscid.RK12)
 
+    viscid.logger.info("Testing adaptive integrators on a dipole...")
+    for method in (viscid.RK12, viscid.RK45, viscid.DP45):
+        run_lshell_test(method, tol_lo=1e-6, tol_hi=1e-5)
+
+    viscid.logger.info("Testing flat / strided data...")
+    run_layout_test(B, sphere, ibound=0.07, obound0=obound0,
+                    obound1=obound1, method=viscid.RK12)
+
+    viscid.logger.info("Testing float32 data with float64 crds...")
+    run_precision_test(B, sphere, ibound=0.07, obound0=obound0,
+                       obound1=obound1, method=viscid.RK45)
+
+    viscid.logger.info("Testing reuse of cython wrappers...")
+    run_cyfield_cache_test()
+
+    viscid.logger.info("Testing on-the-fly line quantities...")
+    run_accumulate_test(B, sphere, ibound=0.07, obound0=obound0,
+                        obound1=obound1, method=viscid.RK12)
+
 if __name__ == "__main__":
     main()
 
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+""" test info lookups through the tree and cached logfile parsing """
+
+from __future__ import print_function
+import sys
+import os
+import argparse
+import shutil
+import tempfile
+from timeit import default_timer as time
+
+import numpy as np
+
+_viscid_root = os.path.realpath(os.path.dirname(__file__) + '/../viscid/')
+if not _viscid_root in sys.path:
+    sys.path.append(_viscid_root)
+
+import viscid
+from viscid import vutil
+from viscid.tree import Node
+from viscid.readers import ggcm_logfile
+
+def run_find_info_test():
+    top = Node(name="top", info=dict(a=1, b=2))
+    mid = Node(name="mid", info=dict(b=3), parents=top)
+    side = Node(name="side", info=dict(c=4))
+    leaf = Node(name="leaf", parents=[mid])
+
+    if leaf.find_info('a') != 1 or leaf.find_info('b') != 3:
+        raise RuntimeError("find_info didn't follow the tree")
+    if leaf.find_info_owner('b') is not mid:
+        raise RuntimeError("find_info_owner isn't breadth first")
+
+    # the memo has to notice changes to info and parents anywhere uptree
+    top.set_info('a', 10)
+    mid.set_info('c', 5)
+    if leaf.find_info('a') != 10 or leaf.find_info('c') != 5:
+        raise RuntimeError("find_info used stale info")
+    try:
+        leaf.find_info('d')
+        raise RuntimeError("find_info found a key that doesn't exist")
+    except KeyError:
+        pass
+    side.set_info('d', 6)
+    side.prepare_child(mid)
+    if leaf.find_info('d') != 6:
+        raise RuntimeError("find_info missed a new parent")
+    side.tear_down_child(mid)
+    try:
+        leaf.find_info('d')
+        raise RuntimeError("find_info found info from a removed parent")
+    except KeyError:
+        pass
+    # so does replacing a whole parents list, here or uptree
+    other = Node(name="other", info=dict(a=20, b=30))
+    node = Node(name="node", parents=[top])
+    below = Node(name="below", parents=[node])
+    if node.find_info('a') != 10 or below.find_info('a') != 10:
+        raise RuntimeError("find_info didn't follow the tree")
+    node.parents = [other]
+    if node.find_info('a') != 20 or below.find_info('a') != 20:
+        raise RuntimeError("find_info used stale parents")
+    leaf.update_info('b', 7)
+    if mid.get_info('b') != 7 or leaf.has_info('b'):
+        raise RuntimeError("update_info didn't update the owner")
+
+    # memoized lookups of a deep tree
+    node = Node(name="root", info=dict(("k{0}".format(i), i)
+                                       for i in range(64)))
+    for i in range(16):
+        node = Node(parents=node, info=dict(x=i))
+    t0 = time()
+    for _ in range(2000):
+        node.find_info('k63')
+    t1 = time()
+    print("find_info on a 16 deep tree: {0:.2g} us".format(1e6 * (t1 - t0) / 2000))
+
+def run_logfile_cache_test():
+    fname = _viscid_root + '/../sample/sample.log'
+    ref = ggcm_logfile.GGCMLogFile._parse_info(fname)  # pylint: disable=protected-access
+
+    cache_dir = ggcm_logfile.cache_dir
+    ggcm_logfile.cache_dir = tempfile.mkdtemp()
+    try:
+        # the disk cache is off unless asked for
+        ggcm_logfile.clear_cache()
+        ggcm_logfile.GGCMLogFile(fname)
+        if os.listdir(ggcm_logfile.cache_dir):
+            raise RuntimeError("logfile disk cache should be opt-in")
+
+        ggcm_logfile.use_disk_cache = True
+        ggcm_logfile.clear_cache()
+        parsed = ggcm_logfile.GGCMLogFile(fname).info
+        cached = os.listdir(ggcm_logfile.cache_dir)
+        if len(cached) != 1 or not cached[0].endswith(".json"):
+            raise RuntimeError("logfile info wasn't saved to disk as json")
+        ggcm_logfile.clear_cache()
+        from_disk = ggcm_logfile.GGCMLogFile(fname).info
+        for info in (parsed, from_disk):
+            if sorted(info.keys()) != sorted(ref.keys()):
+                raise RuntimeError("cached logfile info has the wrong keys")
+            for key, val in ref.items():
+                if (type(info[key]) is not type(val) or
+                        not np.all(np.asarray(info[key]) == np.asarray(val))):
+                    raise RuntimeError("cached logfile info for {0} is wrong"
+                                       "".format(key))
+        ggcm_logfile.clear_cache(disk=True)
+        if os.listdir(ggcm_logfile.cache_dir):
+            raise RuntimeError("clear_cache didn't clear the disk cache")
+
+        # both caches are kept under their size limits
+        ggcm_logfile.max_disk_cache_nbytes = 1
+        ggcm_logfile.mem_cache_size = 0
+        ggcm_logfile.GGCMLogFile(fname)
+        if os.listdir(ggcm_logfile.cache_dir):
+            raise RuntimeError("disk cache wasn't pruned")
+        if ggcm_logfile._mem_cache:  # pylint: disable=protected-access
+            raise RuntimeError("memory cache wasn't bounded")
+    finally:
+        shutil.rmtree(ggcm_logfile.cache_dir)
+        ggcm_logfile.cache_dir = cache_dir
+        ggcm_logfile.use_disk_cache = False
+        ggcm_logfile.max_disk_cache_nbytes = 64 * 1024**2
+        ggcm_logfile.mem_cache_size = 64
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--show", "--plot", action="store_true")
+    args = vutil.common_argparse(parser)  # pylint: disable=unused-variable
+
+    run_find_info_test()
+    run_logfile_cache_test()
+
+if __name__ == "__main__":
+    main()
+
+##
+## EOF
+##
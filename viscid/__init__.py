@@ -7,6 +7,11 @@ Note:
     Modules in calculator and plot must be imported explicitly since
     they have side effects on import.
 
+Note:
+    The readers, calculators and cython code are imported the first
+    time they're used, so ``import viscid`` stays quick for scripts
+    that don't need them.
+
 Attributes:
     logger (logging.Logger): a logging object whose verbosity can be
         set from the command line using
@@ -23,7 +28,10 @@ __all__ = ['amr_field',  # Modules
            'field',
            'grid',
            'parallel',
+           'profiling',
            'pyeval',
+           'pyramid',
+           'reduction',
            'seed',
            'verror',
            'vjson',
@@ -56,8 +64,10 @@ __all__ = ['amr_field',  # Modules
            # viscid.seed.* is added below
           ]
 
+import importlib
 # setup logger for use throughout viscid
 import logging
+import sys
 logger = logging.getLogger("viscid")
 _handler = logging.StreamHandler()
 _handler.setFormatter(logging.Formatter(fmt="%(levelname)s: %(message)s"))
@@ -71,17 +81,6 @@ logger.addFilter(CustomFilter())
 logger.propagate = False
 del _handler
 
-# pull file reading helpers into namespace
-from viscid import readers
-load_file = readers.load_file
-load_files = readers.load_files
-unload_file = readers.unload_file
-reload_file = readers.reload_file
-get_file = readers.get_file
-save_grid = readers.save_grid
-save_field = readers.save_field
-save_fields = readers.save_fields
-
 # pull field and coordnate helpers into the namespace
 from viscid import field
 arrays2field = field.arrays2field
@@ -103,46 +102,92 @@ from viscid.seed import *  # pylint: disable=wildcard-import
 from viscid import seed
 __all__ += seed.__all__
 
-from viscid.calculator.topology import topology2color
-__all__ += ["topology2color"]
+# Readers (h5py), calculators (numexpr) and the cython code are slow to
+# import, so they're only imported the first time one of these names is
+# used (PEP 562). name -> (module, attribute or None for the module)
+_lazy_attrs = {}
 
-from viscid.calculator.plasma import *
-from viscid.calculator import plasma
-__all__ += plasma.__all__
+def _add_lazy(modname, names, attr_is_module=False):
+    for name in names:
+        _lazy_attrs[name] = (modname, None if attr_is_module else name)
 
-from viscid.calculator.calc import *  # pylint: disable=wildcard-import
-from viscid.calculator import calc
-__all__ += calc.__all__
-
-from viscid.cython import interp_nearest
-from viscid.cython import interp_trilin
-from viscid.cython import calc_streamlines
-
-from viscid.cython import streamline
-for attr in dir(streamline):
-    if attr[0] != '_' and attr.isupper():
-        vars()[attr] = getattr(streamline, attr)
-        __all__.append(attr)
-del streamline
+# pull file reading helpers into namespace
+_add_lazy("viscid.readers", ["load_file", "load_files", "unload_file",
+                             "reload_file", "get_file", "save_grid",
+                             "save_field", "save_fields"])
+_add_lazy("viscid.calculator.topology", ["topology2color"])
+# these lists must match plasma.__all__ and calc.__all__
+_add_lazy("viscid.calculator.plasma", ["calc_psi", "calc_beta"])
+_add_lazy("viscid.calculator.calc", ['add', 'diff', 'mul', 'relative_diff',
+                                     'abs_diff', 'abs_val', 'abs_max',
+                                     'abs_min', 'magnitude', 'dot', 'cross',
+                                     'div', 'curl', 'project',
+                                     'integrate_along_lines',
+                                     'jacobian_at_point', 'jacobian_at_ind',
+                                     'jacobian_eig_at_point',
+                                     'jacobian_eig_at_ind', 'div_at_point',
+                                     'curl_at_point'])
+_add_lazy("viscid.cython", ["interp_nearest", "interp_trilin",
+                            "calc_streamlines"])
+# constants from viscid.cython.streamline, these must match its
+# upper case attributes
+_add_lazy("viscid.cython.streamline", [
+    'ACCUMULATOR', 'ACCUM_ALL', 'ACCUM_ENDPOINTS', 'ACCUM_INTEGRAL',
+    'ACCUM_LENGTH', 'ACCUM_MAX', 'ACCUM_MIN', 'ACCUM_NONE', 'ACCUM_VOLUME',
+    'DIR_BACKWARD', 'DIR_BOTH', 'DIR_FORWARD', 'DP45', 'END_CYCLIC',
+    'END_IBOUND', 'END_IBOUND_NORTH', 'END_IBOUND_SOUTH', 'END_MAXIT',
+    'END_MAX_LENGTH', 'END_NONE', 'END_OBOUND', 'END_OBOUND_XH',
+    'END_OBOUND_XL', 'END_OBOUND_YH', 'END_OBOUND_YL', 'END_OBOUND_ZH',
+    'END_OBOUND_ZL', 'END_OTHER', 'END_ZERO_LENGTH', 'EULER1', 'EULER1A',
+    'METHOD', 'OUTPUT_BOTH', 'OUTPUT_STREAMLINES', 'OUTPUT_TOPOLOGY', 'RK12',
+    'RK2', 'RK45', 'TOPOLOGY_MS_CLOSED', 'TOPOLOGY_MS_NONE',
+    'TOPOLOGY_MS_OPEN_NORTH', 'TOPOLOGY_MS_OPEN_SOUTH', 'TOPOLOGY_MS_SW'])
+# modules, plot is intentionally left out of the viscid namespace since
+# importing some of its modules (like mpl and mvi) has side effects
+_add_lazy("viscid", ["amr_field", "amr_grid", "calculator", "readers",
+                     "vlab"], attr_is_module=True)
+
+for _name in _lazy_attrs:
+    if _name not in __all__:
+        __all__.append(_name)
+del _name
+
+def __getattr__(name):
+    try:
+        modname, attr = _lazy_attrs[name]
+    except KeyError:
+        raise AttributeError("module '{0}' has no attribute '{1}'"
+                             "".format(__name__, name))
+    if attr is None:
+        val = importlib.import_module(modname + "." + name)
+    else:
+        val = getattr(importlib.import_module(modname), attr)
+    globals()[name] = val
+    return val
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attrs))
 
 # pull other useful modules into the namespace
-# Note: plot and calculator are intentionally left
-#       out of the viscid namespace since importing
-#       some of these modules (like mpl and mvi) have
-#       side effects
-from viscid import amr_field
-from viscid import amr_grid
 from viscid import bucket
 from viscid import dataset
 from viscid import grid
 from viscid import parallel
+from viscid import profiling
 from viscid import pyeval
+from viscid import pyramid
+from viscid import reduction
 from viscid import tree
 from viscid import verror
 from viscid import vjson
-from viscid import vlab
 from viscid import vutil
 
+if sys.version_info < (3, 7):
+    # no module __getattr__, so just import everything now
+    for _name in list(_lazy_attrs):
+        __getattr__(_name)
+    del _name
+
 # apply settings in the rc file
 from viscid import _rc
 _rc.load_rc_file("~/.viscidrc")
@@ -11,6 +11,7 @@ import numpy as np
 import viscid
 # from viscid.compat import string_types
 from viscid.field import Field
+from viscid import reduction
 
 try:
     from viscid.calculator import cycalc
@@ -383,8 +384,12 @@ class AMRField(object):
         return self.wrap_field_method("__ge__", other)
 
     def any(self, **kwargs):
+        if reduction.is_full_reduction(kwargs):
+            return reduction.chunked_reduce(self, "any")
         return self.wrap_field_method("any", **kwargs)
     def all(self, **kwargs):
+        if reduction.is_full_reduction(kwargs):
+            return reduction.chunked_reduce(self, "all")
         return self.wrap_field_method("all", **kwargs)
     def argmax(self, **kwargs):
         return self.wrap_field_method("argmax", **kwargs)
@@ -399,18 +404,28 @@ class AMRField(object):
     def cumsum(self, **kwargs):
         return self.wrap_field_method("cumsum", **kwargs)
     def max(self, **kwargs):
+        if reduction.is_full_reduction(kwargs):
+            return reduction.chunked_reduce(self, "max")
         return self.wrap_field_method("max", **kwargs)
     def mean(self, **kwargs):
+        if reduction.is_full_reduction(kwargs):
+            return reduction.chunked_reduce(self, "mean")
         return self.wrap_field_method("mean", **kwargs)
     def min(self, **kwargs):
+        if reduction.is_full_reduction(kwargs):
+            return reduction.chunked_reduce(self, "min")
         return self.wrap_field_method("min", **kwargs)
     def partition(self, **kwargs):
         return self.wrap_field_method("partition", **kwargs)
     def prod(self, **kwargs):
         return self.wrap_field_method("prod", **kwargs)
     def std(self, **kwargs):
+        if reduction.is_full_reduction(kwargs, allowed=("ddof",)):
+            return reduction.chunked_reduce(self, "std", ddof=kwargs.get("ddof", 0))
         return self.wrap_field_method("std", **kwargs)
     def sum(self, **kwargs):
+        if reduction.is_full_reduction(kwargs):
+            return reduction.chunked_reduce(self, "sum")
         return self.wrap_field_method("sum", **kwargs)
 
     def __getattr__(self, name):
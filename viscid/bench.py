@@ -0,0 +1,393 @@
+#!/usr/bin/env python
+"""Benchmarks for readers, slicing, interpolation and streamlines
+
+Run the whole suite with::
+
+    python -m viscid.bench -o results.json
+
+and check a later build against those numbers with::
+
+    python -m viscid.bench --compare results.json
+
+Data is synthetic, made with :py:func:`viscid.vlab.get_dipole`, and
+written to a temporary directory as a numpy npz file, an hdf5 + xdmf
+pair, and an OpenGGCM style fortbin run with its grid2 file, so the
+suite doesn't depend on any files being around.
+
+Each benchmark is run `number` times in a loop, where `number` is
+picked so the loop takes at least `min_time`, and that loop is
+repeated `repeat` times. The per-call best / median / mean of those
+repeats are saved as JSON along with some info about the machine.
+When comparing, the best times are used, and the exit status is 1 if
+any benchmark got slower than `threshold` times its old time.
+"""
+
+from __future__ import print_function, division
+import argparse
+from collections import OrderedDict
+import datetime
+import json
+import os
+import platform
+import re
+import shutil
+import struct
+import sys
+import tempfile
+from timeit import default_timer as time
+
+import numpy as np
+
+import viscid
+from viscid import logger
+
+__all__ = ["time_func", "run", "compare", "save_results", "load_results",
+           "main"]
+
+
+# list of (group name, function that takes a _BenchData and yields
+# (name, callable) pairs), filled in by _register
+_BENCHMARKS = []
+
+STREAM_METHODS = ["euler1", "rk2", "rk12", "euler1a", "rk45", "dp45"]
+
+
+def _register(func):
+    _BENCHMARKS.append((func.__name__[len("bench_"):], func))
+    return func
+
+def time_func(func, repeat=5, min_time=0.2, max_number=100000):
+    """Time a function of no arguments
+
+    Parameters:
+        func (callable): the thing to time
+        repeat (int): number of timing loops
+        min_time (float): each timing loop calls func enough times to
+            take at least this long
+        max_number (int): upper bound on calls per loop
+
+    Returns:
+        dict: per call 'best', 'median', 'mean' in seconds, and the
+        'number' of calls per loop and 'repeat'
+    """
+    # the calibration loops also count as samples
+    number = 1
+    while True:
+        t0 = time()
+        for _ in range(number):
+            func()
+        elapsed = time() - t0
+        if elapsed >= min_time or number >= max_number:
+            break
+        if elapsed <= 0.0:
+            number *= 10
+        else:
+            number = int(min(max(2 * number,
+                                 1.2 * number * min_time / elapsed),
+                             max_number))
+    times = [elapsed / number]
+    for _ in range(repeat - 1):
+        t0 = time()
+        for _ in range(number):
+            func()
+        times.append((time() - t0) / number)
+    return dict(best=float(np.min(times)), median=float(np.median(times)),
+                mean=float(np.mean(times)), number=number, repeat=repeat)
+
+
+class _BenchData(object):
+    """Synthetic fields and the files written from them"""
+    def __init__(self, tmpdir, n=64, nr_points=10000, nr_seeds=16):
+        self.tmpdir = tmpdir
+        self.n = n
+        self.B = viscid.vlab.get_dipole(m=[0.2, 0.3, -0.9], n=[n] * 3)
+        self.B.name = "b"
+        # the dipole blows up at the origin, which overflows float32
+        with np.errstate(over='ignore'):
+            self.B32 = self.B.astype('f4')
+        rng = np.random.RandomState(1234)
+        self.points = viscid.Point(rng.uniform(-3.5, 3.5, (3, nr_points)))
+        self.seeds = viscid.Sphere((0.0, 0.0, 0.0), 2.0, ntheta=nr_seeds,
+                                   nphi=nr_seeds)
+        self._amr_B = None
+
+    @property
+    def components(self):
+        comps = []
+        for comp in "xyz":
+            fld = self.B[comp]
+            fld.name = "b" + comp
+            comps.append(fld)
+        return comps
+
+    @property
+    def amr_B(self):
+        """The same dipole split into 2x2x2 patches"""
+        if self._amr_B is None:
+            from viscid.dataset import Dataset
+            from viscid.grid import Grid
+            from viscid.amr_grid import dataset_to_amr_grid
+
+            dset = Dataset(name="patches")
+            n = self.n // 2
+            for i, j, k in np.ndindex(2, 2, 2):
+                lo = [-4.0 + 4.0 * i, -4.0 + 4.0 * j, -4.0 + 4.0 * k]
+                hi = [x + 4.0 for x in lo]
+                patch = viscid.vlab.get_dipole(m=[0.2, 0.3, -0.9], l=lo,
+                                               h=hi, n=[n] * 3)
+                patch.name = "b"
+                grid = Grid(name="patch{0}{1}{2}".format(i, j, k))
+                grid.set_crds(patch.crds)
+                grid.add_field(patch)
+                dset.add(grid)
+            grid, _ = dataset_to_amr_grid(dset)
+            self._amr_B = grid["b"]
+        return self._amr_B
+
+    def write_npz(self):
+        fname = os.path.join(self.tmpdir, "bench.npz")
+        viscid.readers.numpy_binary.FileNumpyNPZ.save_fields(fname,
+                                                             self.components)
+        return fname
+
+    def write_hdf5(self):
+        from viscid.readers import hdf5
+        fname = os.path.join(self.tmpdir, "bench.h5")
+        hdf5.FileHDF5.save_fields(fname, self.components)
+        return os.path.join(self.tmpdir, "bench.xdmf")
+
+    def write_fortbin(self):
+        d = os.path.join(self.tmpdir, "fortbin")
+        if not os.path.isdir(d):
+            os.makedirs(d)
+        crds = [self.B.get_crd(ax) for ax in "xyz"]
+        with open(os.path.join(d, "bench.grid2"), 'w') as f:
+            for crd in crds:
+                f.write("{0}\n".format(len(crd)))
+                f.write("".join("{0!r}\n".format(float(c)) for c in crd))
+        fname = os.path.join(d, "bench.3df.000000.b")
+        _write_fortbin(fname, self.components)
+        return fname
+
+def _write_fortbin(fname, flds, time=0.0):
+    """Write scalar fields in OpenGGCM's fortbin format"""
+    timestr = "time= {0:.3f} UT= 1967:01:01:00:00:00.000".format(time)
+    with open(fname, 'wb') as f:
+        for fld in flds:
+            with np.errstate(over='ignore'):
+                arr = np.asarray(fld.data, dtype='<f4')
+            dims = arr.shape
+            f.write(struct.pack("<3i", 2, int(time), len(dims)))
+            f.write(struct.pack("<{0}i".format(len(dims)), *dims))
+            f.write(fld.name.ljust(80).encode())
+            f.write(timestr.ljust(80).encode())
+            f.write(arr.ravel(order='F').tobytes())
+
+def _fresh_load(fname):
+    """Open a file without the file bucket handing back a cached one"""
+    from viscid.readers.vfile_bucket import VFileBucket
+    return VFileBucket().load_file(fname)
+
+def _reload_data(fld):
+    def _reload():
+        fld.clear_cache()
+        return fld.data
+    return _reload
+
+@_register
+def bench_readers(data):
+    for ftype, write in (("npz", data.write_npz), ("hdf5", data.write_hdf5),
+                         ("fortbin", data.write_fortbin)):
+        try:
+            fname = write()
+        except ImportError as e:
+            logger.info("Skipping %s readers: %s", ftype, e)
+            continue
+        yield "open_" + ftype, lambda fname=fname: _fresh_load(fname)
+        fld = _fresh_load(fname)["bx"]
+        yield "load_" + ftype, _reload_data(fld)
+
+@_register
+def bench_slicing(data):
+    B = data.B
+    yield "slice_plane_index", lambda: B["x=0"]
+    yield "slice_plane_float", lambda: B["y=0.5f"]
+    yield "slice_box_float", lambda: B["x=-2f:2f, y=-1f:1f, z=0f"]
+    yield "slice_strided", lambda: B["x=::2, y=::2, z=::2"]
+
+@_register
+def bench_interp(data):
+    pts = data.points
+    yield "interp_trilin_f8", lambda: viscid.interp_trilin(data.B, pts)
+    yield "interp_trilin_f4", lambda: viscid.interp_trilin(data.B32, pts)
+    yield "interp_nearest_f8", lambda: viscid.interp_nearest(data.B, pts)
+    yield "interp_trilin_amr1", lambda: viscid.interp_trilin(
+        data.B, pts, force_amr_version=True)
+    yield "interp_trilin_amr8", lambda: viscid.interp_trilin(data.amr_B, pts)
+
+@_register
+def bench_streamlines(data):
+    kw = dict(ibound=0.5, ds0=0.02, max_length=40.0, maxit=20000)
+    for method in STREAM_METHODS:
+        yield ("streamlines_" + method,
+               lambda m=method: viscid.calc_streamlines(
+                   data.B, data.seeds, method=viscid.METHOD[m], **kw))
+    yield "streamlines_rk12_f4", lambda: viscid.calc_streamlines(
+        data.B32, data.seeds, method=viscid.RK12, **kw)
+    yield "streamlines_rk12_amr8", lambda: viscid.calc_streamlines(
+        data.amr_B, data.seeds, method=viscid.RK12, **kw)
+    yield "streamlines_rk12_procs2", lambda: viscid.calc_streamlines(
+        data.B, data.seeds, method=viscid.RK12, nr_procs=2, **kw)
+
+@_register
+def bench_multiplot(data):
+    try:
+        import matplotlib
+        matplotlib.use("agg")
+        from matplotlib import pyplot as plt
+        fname = data.write_hdf5()
+    except ImportError as e:
+        logger.info("Skipping multiplot: %s", e)
+        return
+    vfile = _fresh_load(fname)
+    out_prefix = os.path.join(data.tmpdir, "frame")
+
+    def _frame():
+        plt.clf()
+        viscid.vlab.multiplot(vfile, plot_vars=[["bz,y=0f", {}]],
+                              kwopts=dict(out_prefix=out_prefix))
+    yield "multiplot_frame", _frame
+    plt.close("all")
+
+def run(pattern=None, n=64, repeat=5, min_time=0.2, verbose=True):
+    """Run the benchmarks whose names match a regex
+
+    Parameters:
+        pattern (str): regex searched for in benchmark names, None for
+            all of them
+        n (int): size of the synthetic grid along each axis
+        repeat (int): passed to :py:func:`time_func`
+        min_time (float): passed to :py:func:`time_func`
+        verbose (bool): print each result as it finishes
+
+    Returns:
+        OrderedDict: benchmark name -> :py:func:`time_func` result
+    """
+    results = OrderedDict()
+    tmpdir = tempfile.mkdtemp(prefix="viscid_bench_")
+    try:
+        data = _BenchData(tmpdir, n=n)
+        for _, gen in _BENCHMARKS:
+            for name, func in gen(data):
+                if pattern is not None and not re.search(pattern, name):
+                    continue
+                results[name] = time_func(func, repeat=repeat,
+                                          min_time=min_time)
+                if verbose:
+                    print("{0:<28s} {1}".format(name,
+                                                _fmt(results[name]["best"])))
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return results
+
+def _fmt(t):
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if t >= scale:
+            return "{0:8.3f} {1}".format(t / scale, unit)
+    return "{0:8.3f} ns".format(t / 1e-9)
+
+def _environment(**kwargs):
+    env = OrderedDict()
+    env["date"] = datetime.datetime.now().isoformat()
+    env["python"] = platform.python_version()
+    env["numpy"] = np.__version__
+    env["platform"] = platform.platform()
+    env["machine"] = platform.machine()
+    env["processor"] = platform.processor()
+    env.update(kwargs)
+    return env
+
+def save_results(fname, results, **env):
+    """Save results from :py:func:`run` as JSON, with machine info"""
+    with open(fname, 'w') as f:
+        json.dump(OrderedDict([("environment", _environment(**env)),
+                               ("results", results)]), f, indent=2)
+
+def load_results(fname):
+    """Load results saved by :py:func:`save_results`"""
+    with open(fname, 'r') as f:
+        return json.load(f, object_pairs_hook=OrderedDict)["results"]
+
+def compare(old, new, threshold=1.2, verbose=True):
+    """Compare two sets of results by their best times
+
+    Parameters:
+        old (dict): results, like from :py:func:`load_results`
+        new (dict): results, like from :py:func:`run`
+        threshold (float): ratio new / old above which a benchmark
+            is called a regression
+        verbose (bool): print a table of ratios
+
+    Returns:
+        list: names of benchmarks that got slower than threshold
+    """
+    regressions = []
+    for name, res in new.items():
+        if name not in old:
+            continue
+        ratio = res["best"] / old[name]["best"]
+        flag = ""
+        if ratio > threshold:
+            regressions.append(name)
+            flag = "  <-- slower"
+        elif ratio < 1.0 / threshold:
+            flag = "  faster"
+        if verbose:
+            print("{0:<28s} {1} -> {2}  x{3:.2f}{4}"
+                  "".format(name, _fmt(old[name]["best"]), _fmt(res["best"]),
+                            ratio, flag))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-o", "--output", default=None,
+                        help="save results to this JSON file")
+    parser.add_argument("--compare", default=None,
+                        help="JSON file from an earlier run to compare to")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="slowdown ratio that counts as a regression")
+    parser.add_argument("-k", "--filter", default=None,
+                        help="only run benchmarks matching this regex")
+    parser.add_argument("-n", type=int, default=64,
+                        help="grid size along each axis")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--list", action="store_true",
+                        help="list benchmark groups and exit")
+    args = viscid.vutil.common_argparse(parser, args=argv)
+
+    if args.list:
+        for group, _ in _BENCHMARKS:
+            print(group)
+        return 0
+
+    results = run(pattern=args.filter, n=args.n, repeat=args.repeat,
+                  min_time=args.min_time)
+    if args.output:
+        save_results(args.output, results, n=args.n)
+
+    if args.compare:
+        regressions = compare(load_results(args.compare), results,
+                              threshold=args.threshold)
+        if regressions:
+            print("Slower than x{0:g}: {1}".format(args.threshold,
+                                                   ", ".join(regressions)))
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+##
+## EOF
+##
@@ -6,19 +6,26 @@ etc.
 
 """
 
-__all__ = ["calc", "evaluator", "plasma", "topology"]
+import importlib
+import sys
 
-from viscid.calculator import evaluator
-from viscid.calculator import calc
-from viscid.calculator import plasma
-from viscid.calculator import topology
-from viscid import seed
+__all__ = ["calc", "evaluator", "plasma", "topology"]
 
-from viscid.calculator.evaluator import evaluate
-from viscid.calculator.calc import *  # pylint: disable=wildcard-import
-from viscid.calculator.plasma import *  # pylint: disable=wildcard-import
-from viscid.calculator.topology import *  # pylint: disable=wildcard-import
-from viscid.seed import *  # pylint: disable=wildcard-import
+# Nothing here is imported until it's used (PEP 562) since numexpr and
+# the cython code take a while to load. Public names are looked up in
+# these modules, and like the `import *`s they replace, the last one wins
+_star_modules = ["viscid.calculator.calc", "viscid.calculator.plasma",
+                 "viscid.calculator.topology", "viscid.seed"]
+# other names, name -> (module, attribute or None for the module itself)
+_lazy_attrs = {"seed": ("viscid.seed", None),
+               "evaluate": ("viscid.calculator.evaluator", "evaluate"),
+               # import the cython code for legacy
+               "interp_nearest": ("viscid.cython", "interp_nearest"),
+               "interp_trilin": ("viscid.cython", "interp_trilin"),
+               "calc_streamlines": ("viscid.cython", "calc_streamlines"),
+               "cycalc": ("viscid.cython", "cycalc"),
+               "streamline": ("viscid.cython", "streamline"),
+              }
 
 # # I'm not sure this should be public since it should be accessed through
 # # viscid.calculator.calc
@@ -27,13 +34,43 @@ from viscid.seed import *  # pylint: disable=wildcard-import
 # except ImportError:
 #     necalc = _dummy("numexpr not installed")
 
-# import the cython code for legacy
-from viscid.cython import interp_nearest
-from viscid.cython import interp_trilin
-from viscid.cython import calc_streamlines
+def _public_names(mod):
+    try:
+        return mod.__all__
+    except AttributeError:
+        return [n for n in dir(mod) if not n.startswith('_')]
+
+def _find_public(name):
+    if not name.startswith('_'):
+        for modname in reversed(_star_modules):
+            mod = importlib.import_module(modname)
+            if name in _public_names(mod):
+                return getattr(mod, name)
+    raise AttributeError("module '{0}' has no attribute '{1}'"
+                         "".format(__name__, name))
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(__name__ + "." + name)
+
+    if name in _lazy_attrs:
+        modname, attr = _lazy_attrs[name]
+        val = importlib.import_module(modname)
+        if attr is not None:
+            val = getattr(val, attr)
+    else:
+        val = _find_public(name)
+    globals()[name] = val
+    return val
 
-from viscid.cython import cycalc
-from viscid.cython import streamline
+if sys.version_info < (3, 7):
+    # no module __getattr__, so just import everything now
+    for _name in __all__ + list(_lazy_attrs):
+        __getattr__(_name)
+    for _modname in _star_modules:
+        for _name in _public_names(importlib.import_module(_modname)):
+            __getattr__(_name)
+    del _name, _modname
 
 ##
 ## EOF
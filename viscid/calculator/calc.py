@@ -35,7 +35,7 @@ __all__ = ['add', 'diff', 'mul', 'relative_diff', 'abs_diff', 'abs_val',
 
 
 class Operation(object):
-    default_backends = ["numexpr", "cython", "numpy"]
+    default_backends = ["chunked", "numexpr", "cython", "numpy"]
 
     _imps = None  # implementations
     opname = None
@@ -112,6 +112,13 @@ project = BinaryOperation("project", "dot mag")
 div = UnaryOperation("div", "div")
 curl = UnaryOperation("curl", "curl")
 
+# chunked + threaded reductions never hold more than a few chunks of
+# abs(a) in memory at once
+abs_max.add_implementation("chunked",
+                           lambda a: viscid.reduction.chunked_reduce(a, "absmax"))
+abs_min.add_implementation("chunked",
+                           lambda a: viscid.reduction.chunked_reduce(a, "absmin"))
+
 if has_numexpr:
     add.add_implementation("numexpr", necalc.add)
     diff.add_implementation("numexpr", necalc.diff)
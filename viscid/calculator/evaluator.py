@@ -7,10 +7,25 @@ functionality should NOT be used on untrusted input. To make
 this super clear, the user MUST enable this functionality on
 a per-script basis, or by setting calculator.evaluator.enabled: true
 in their viscidrc.
+
+Equations are parsed once into a plan which is cached by equation
+string. Identical sub-expressions are only computed once. If every
+operation in the equation is elementwise (arithmetic, comparisons and
+numpy ufuncs) and all the fields have the same shape, the plan is run
+in blocks of `block_size` elements, so temporaries stay in cache and
+no full-size temporaries are made. Anything else (like `div(B)`) is
+evaluated on the whole fields with numpy / viscid.calculator.calc.
+
+Attributes:
+    enabled (bool): must be set to True to use the evaluator
+    block_size (int): number of elements per block for elementwise
+        plans
 """
 
 from __future__ import print_function, division
-import re
+import ast
+from contextlib import contextmanager
+import threading
 
 import numpy as np
 try:
@@ -20,12 +35,302 @@ try:
 except ImportError:
     _has_numexpr = False
 
-from viscid import logger
 from viscid import field
+from viscid.pyeval import PyEvalError
 from viscid.calculator import calc
 
 enabled = False
+block_size = 16384
+
+_plan_cache = dict()
+_shared = threading.local()
+
+_BINOPS = {ast.Add: (np.add, "+"),
+           ast.Sub: (np.subtract, "-"),
+           ast.Mult: (np.multiply, "*"),
+           ast.Div: (np.true_divide, "/"),
+           ast.Pow: (np.power, "**"),
+           ast.Mod: (np.mod, "%"),
+           ast.FloorDiv: (np.floor_divide, "//"),
+          }
+_UNARYOPS = {ast.USub: (np.negative, "-"),
+             ast.UAdd: (np.positive, "+"),
+             ast.Not: (np.logical_not, "~"),
+            }
+_CMPOPS = {ast.Lt: (np.less, "<"),
+           ast.LtE: (np.less_equal, "<="),
+           ast.Gt: (np.greater, ">"),
+           ast.GtE: (np.greater_equal, ">="),
+           ast.Eq: (np.equal, "=="),
+           ast.NotEq: (np.not_equal, "!="),
+          }
+_POW_SHORTCUTS = {('c', 2): (np.square, "square"),
+                  ('c', 0.5): (np.sqrt, "sqrt"),
+                 }
+# functions that numexpr knows about, anything else goes to numpy
+_NE_FUNCS = ["sin", "cos", "tan", "arcsin", "arccos", "arctan", "arctan2",
+             "sinh", "cosh", "tanh", "arcsinh", "arccosh", "arctanh",
+             "log", "log10", "log1p", "exp", "expm1", "sqrt", "abs",
+             "where", "real", "imag", "complex", "conj"]
+
+
+class _Plan(object):
+    """A parsed equation
+
+    Attributes:
+        eqn (str): the equation
+        var_names (list): names to look up in the grid, in order
+        steps (list): (ufunc, args) for each unique sub-expression,
+            args are tuples of ('v', ivar), ('c', value) or ('s', istep),
+            or ('x', n) for a sub-expression that only whole-field
+            evaluation can do
+        result (tuple): reference to the result, same form as args
+        elementwise (bool): True if all steps are ufuncs
+        code: compiled code object for whole-field evaluation
+        ne_expr (str): equation for numexpr, None if numexpr can't do it
+    """
+    def __init__(self, eqn):
+        self.eqn = eqn
+        self.var_names = []
+        self.func_names = []
+        self.steps = []
+        self.elementwise = True
+        self.ne_expr = None
+        self._memo = dict()
+        self._nr_opaque = 0
+
+        try:
+            tree = ast.parse(eqn.strip(), mode='eval')
+        except SyntaxError as e:
+            raise PyEvalError("Could not parse equation '{0}': {1}"
+                              "".format(eqn, e))
+        self.result = self._visit(tree.body)
+        self._memo = None
+
+        if self.elementwise and _has_numexpr:
+            if all(fname in _NE_FUNCS for fname in self.func_names):
+                self.ne_expr = self._ne_expr(self.result)
+
+        tree = _Salter().visit(tree)
+        ast.fix_missing_locations(tree)
+        self.code = compile(tree, "<viscid eqn>", "eval")
+
+    def _var(self, name):
+        if name not in self.var_names:
+            self.var_names.append(name)
+        return ('v', self.var_names.index(name))
+
+    def _step(self, func, args):
+        key = (func, args)
+        if key not in self._memo:
+            self.steps.append(key)
+            self._memo[key] = ('s', len(self.steps) - 1)
+        return self._memo[key]
+
+    def _visit(self, node):
+        if isinstance(node, ast.Name):
+            return self._var(node.id)
+        elif _is_constant(node):
+            return ('c', _constant_value(node))
+        elif isinstance(node, ast.BinOp) and type(node.op) in _BINOPS:
+            args = (self._visit(node.left), self._visit(node.right))
+            if isinstance(node.op, ast.Pow) and args[1] in _POW_SHORTCUTS:
+                # like ndarray.__pow__, np.power doesn't special case these
+                return self._step(_POW_SHORTCUTS[args[1]], args[:1])
+            return self._step(_BINOPS[type(node.op)], args)
+        elif isinstance(node, ast.UnaryOp) and type(node.op) in _UNARYOPS:
+            return self._step(_UNARYOPS[type(node.op)],
+                              (self._visit(node.operand), ))
+        elif (isinstance(node, ast.Compare) and
+              all(type(op) in _CMPOPS for op in node.ops)):
+            # a < b < c is (a < b) & (b < c)
+            operands = [self._visit(node.left)]
+            operands += [self._visit(c) for c in node.comparators]
+            ret = None
+            for i, op in enumerate(node.ops):
+                cmp_ref = self._step(_CMPOPS[type(op)], tuple(operands[i:i + 2]))
+                if ret is None:
+                    ret = cmp_ref
+                else:
+                    ret = self._step((np.logical_and, "&"), (ret, cmp_ref))
+            return ret
+        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and
+              not node.keywords):
+            fname = node.func.id
+            if fname not in self.func_names:
+                self.func_names.append(fname)
+            args = tuple(self._visit(arg) for arg in node.args)
+            func = _lookup_func(fname)
+            if not isinstance(func, np.ufunc):
+                self.elementwise = False
+                func = None
+            return self._step((func, fname), args)
+        else:
+            # anything else (subscripts, strings, if / else, ...) is left
+            # to whole-field evaluation, just find the names it uses
+            self.elementwise = False
+            self._find_names(node)
+            self._nr_opaque += 1
+            return ('x', self._nr_opaque)
+
+    def _find_names(self, node):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            if node.func.id not in self.func_names:
+                self.func_names.append(node.func.id)
+            children = node.args + [kw.value for kw in node.keywords]
+        elif isinstance(node, ast.Name):
+            self._var(node.id)
+            children = []
+        else:
+            children = ast.iter_child_nodes(node)
+        for child in children:
+            self._find_names(child)
+
+    def _ne_expr(self, ref):
+        kind, val = ref
+        if kind == 'v':
+            return "v{0}".format(val)
+        elif kind == 'c':
+            return repr(val)
+        func, args = self.steps[val]
+        args = [self._ne_expr(a) for a in args]
+        if func[1] == "square":
+            return "({0} ** 2)".format(args[0])
+        elif func[0] is None or func[1].isalnum():
+            return "{0}({1})".format(func[1], ", ".join(args))
+        elif len(args) == 1:
+            return "({0}{1})".format(func[1], args[0])
+        else:
+            return "({0} {1} {2})".format(args[0], func[1], args[1])
+
+    def run(self, operands, out=None, bufs=None):
+        """Run all the steps on operands (numpy arrays or scalars)
+
+        If bufs is given, it's a list of output arrays for each step,
+        and out, if given, receives the result of the last step.
+
+        Returns:
+            list of the results of each step
+        """
+        results = [None] * len(self.steps)
+
+        def _get(ref):
+            kind, val = ref
+            if kind == 'v':
+                return operands[val]
+            elif kind == 'c':
+                return val
+            return results[val]
+
+        last = len(self.steps) - 1
+        for i, (func, args) in enumerate(self.steps):
+            kwargs = {}
+            if i == last and out is not None:
+                kwargs['out'] = out
+            elif bufs is not None:
+                kwargs['out'] = bufs[i]
+            results[i] = func[0](*[_get(a) for a in args], **kwargs)
+        return results
+
+
+class _Salter(ast.NodeTransformer):
+    """Rename functions / variables so they can't collide in eval"""
+    def visit_Call(self, node):
+        node.args = [self.visit(arg) for arg in node.args]
+        for kw in node.keywords:
+            kw.value = self.visit(kw.value)
+        if isinstance(node.func, ast.Name):
+            node.func = ast.copy_location(ast.Name("SALTf" + node.func.id,
+                                                   ast.Load()), node.func)
+        else:
+            node.func = self.visit(node.func)
+        return node
+
+    def visit_Name(self, node):
+        return ast.copy_location(ast.Name("SALTv" + node.id, ast.Load()), node)
+
+
+def _is_constant(node):
+    if hasattr(ast, "Constant") and isinstance(node, ast.Constant):
+        return isinstance(node.value, (int, float, complex, bool))
+    return isinstance(node, ast.Num)
+
+def _constant_value(node):
+    if hasattr(ast, "Constant") and isinstance(node, ast.Constant):
+        return node.value
+    return node.n
 
+def _lookup_func(fname):
+    if fname == "abs":
+        return np.abs
+    elif hasattr(calc, fname):
+        return getattr(calc, fname)
+    elif hasattr(np, fname):
+        return getattr(np, fname)
+    raise PyEvalError("Unknown function '{0}'".format(fname))
+
+def _get_plan(eqn):
+    try:
+        return _plan_cache[eqn]
+    except KeyError:
+        plan = _Plan(eqn)
+        _plan_cache[eqn] = plan
+        return plan
+
+@contextmanager
+def shared_operands():
+    """Share fields used by all equations evaluated in this context
+
+    Within the context, each field that an equation refers to is only
+    fetched from its grid (and read from disk) once, even if it
+    appears in several equations. On exit, fields that weren't
+    already loaded before the context are dropped.
+
+    Example:
+        >>> with evaluator.shared_operands():
+        >>>     ke = grid["ke=0.5*rr*(vx**2+vy**2+vz**2)"]
+        >>>     speed = grid["speed=sqrt(vx**2+vy**2+vz**2)"]
+    """
+    prev = getattr(_shared, "operands", None)
+    if prev is None:
+        _shared.operands = dict()
+    try:
+        yield
+    finally:
+        if prev is None:
+            for fld, was_loaded in _shared.operands.values():
+                if was_loaded:
+                    continue
+                try:
+                    fld.clear_cache()
+                except AttributeError:
+                    pass
+            _shared.operands = None
+
+def _get_operand(grid, name, slc):
+    cache = getattr(_shared, "operands", None)
+    # slices aren't hashable
+    key = (id(grid), name, repr(slc))
+    if cache is not None and key in cache:
+        return cache[key][0]
+
+    # get_field can hand out the grid's own field, so remember if it
+    # was already loaded so shared_operands doesn't unload it
+    try:
+        was_loaded = grid.fields[name].is_loaded()
+    except (AttributeError, KeyError, TypeError):
+        was_loaded = False
+    try:
+        ret = grid.get_field(name, slc=slc)
+    except KeyError:
+        val = getattr(np, name, None)
+        if isinstance(val, (int, float)):
+            ret = val
+        else:
+            raise
+    if cache is not None:
+        cache[key] = (ret, was_loaded)
+    return ret
 
 def evaluate(grid, result_name, eqn, try_numexpr=True, slc=None):
     """Evaluate an equation on a grid
@@ -54,6 +359,9 @@ def evaluate(grid, result_name, eqn, try_numexpr=True, slc=None):
         eqn (str): the equation, if a symbol exists in the numpy
             namespace, then that's how it is interpreted, otherwise,
             the symbol will be looked up in the grid
+        try_numexpr (bool): use numexpr for elementwise equations if
+            it's installed
+        slc: selection given to grid.get_field for each operand
 
     Returns:
         Field instance
@@ -63,111 +371,69 @@ def evaluate(grid, result_name, eqn, try_numexpr=True, slc=None):
                            "`viscid.calculator.evaluator.enabled = True`, "
                            "or in your viscidrc.")
 
-    if try_numexpr:
-        try:
-            return _evaluate_numexpr(grid, result_name, eqn, slc=slc)
-        except RuntimeError:
-            pass
-        except TypeError:
-            logger.warn("Numexpr couldn't understand a math function you "
-                        "tried to use in '{0}', falling back to numpy"
-                        "".format(eqn))
-    return _evaluate_numpy(grid, result_name, eqn, slc=slc)
-
-def _evaluate_numexpr(grid, result_name, eqn, slc=None):
-    """
-    Returns:
-        Field
-
-    Raises:
-        RuntimeError, if no numexpr, or if evaluate is not enabled
-        TypeError, if numexpr couldn't understand a math input
-    """
-    if not _has_numexpr:
-        raise RuntimeError("Evaluate not enabled, or numexpr not installed.")
-
-    # salt symbols that don't look like math functions and look them up
-    # in the grid
-    salt = "SALT"
-    _symbol_re = r"\b([_A-Za-z][_a-zA-Z0-9]*)\b"
-    var_re = _symbol_re + r"(?!\s*\()"
-    flds = []
     # for security
     eqn = eqn.replace("__", "")
-    local_dict = dict()
+    plan = _get_plan(eqn)
+    operands = [_get_operand(grid, name, slc) for name in plan.var_names]
+    flds = [op for op in operands if isinstance(op, field.Field)]
 
-    def var_salter(symbols):
-        symbol = symbols.groups()[0]
-        salted_symbol = salt + symbol
-        # yes, i'm not using dict.update on purpose since grid's
-        # getitem might copy the array
-        if not salted_symbol in local_dict:
-            this_fld = grid.get_field(symbol, slc=slc)
-            local_dict[salted_symbol] = this_fld
-            if len(flds) == 0:
-                if isinstance(this_fld, field.Field):
-                    flds.append(this_fld)
-                else:
-                    raise RuntimeError("reduced to scalar, no need for numexpr")
-        return salted_symbol
+    if (plan.elementwise and plan.steps and flds and
+            all(f.shape == flds[0].shape for f in flds)):
+        if try_numexpr and plan.ne_expr is not None:
+            arrs = [op.data if isinstance(op, field.Field) else op
+                    for op in operands]
+            local_dict = dict(("v{0}".format(i), a) for i, a in enumerate(arrs))
+            arr = ne.evaluate(plan.ne_expr, local_dict=local_dict,
+                              global_dict={"__builtins__": {}})
+        else:
+            arr = _run_blocked(plan, operands, flds[0].shape)
+        ctx = dict(name=result_name, pretty_name=result_name)
+        return flds[0].wrap(arr, context=ctx)
 
-    salted_eqn = re.sub(var_re, var_salter, eqn)
+    return _evaluate_numpy(plan, operands, result_name)
 
-    arr = ne.evaluate(salted_eqn, local_dict=local_dict,
-                      global_dict={"__builtins__": {}})
+def _run_blocked(plan, operands, shape):
+    """Run an elementwise plan in blocks of block_size elements"""
+    arrs = []
+    for op in operands:
+        if isinstance(op, field.Field):
+            arrs.append(np.ravel(op.data))
+        else:
+            arrs.append(op)
+    is_arr = [isinstance(a, np.ndarray) for a in arrs]
+    n = int(np.prod(shape))
 
-    # FIXME: actually detect the type of field instead of asserting it's
-    # a scalar... also maybe auto-detect reduction operations?
-    if len(flds) > 0:
-        ctx = dict(name=result_name, pretty_name=result_name)
-        return flds[0].wrap(arr, context=ctx)
-    else:
-        logger.warn("Strange input to numexpr evaluator: %s", eqn)
-        return field.wrap_field(arr, grid.crds, name=result_name)
+    # run on 1 element to find the dtypes of all the steps
+    probe = [a[:1] if isarr else a for a, isarr in zip(arrs, is_arr)]
+    dtypes = [np.result_type(r) for r in plan.run(probe)]
+    out = np.empty((n,), dtype=dtypes[-1])
 
-def _evaluate_numpy(grid, result_name, eqn, slc=None):
-    """
-    Returns:
-        Field
-    """
-    if not enabled:
-        raise RuntimeError("Evaluate is not enabled")
+    nblk = max(1, min(block_size, n))
+    bufs = [np.empty((nblk,), dtype=dt) for dt in dtypes]
+    for start in range(0, n, nblk):
+        stop = min(start + nblk, n)
+        blk = [a[start:stop] if isarr else a for a, isarr in zip(arrs, is_arr)]
+        blk_bufs = [b[:stop - start] for b in bufs]
+        plan.run(blk, out=out[start:stop], bufs=blk_bufs)
+    return out.reshape(shape)
 
-    # salt variable names
-    salt = "SALT"
-    _symbol_re = r"(['\"]?\b[_A-Za-z][_a-zA-Z0-9]*)\b"
-    var_re = _symbol_re + r"(?!\s*\()"
-    # for security
-    eqn = eqn.replace("__", "")
+def _evaluate_numpy(plan, operands, result_name):
+    """Evaluate a plan on whole fields with numpy / calc"""
     local_dict = dict()
+    for name, op in zip(plan.var_names, operands):
+        local_dict["SALTv" + name] = op
+    for fname in plan.func_names:
+        local_dict["SALTf" + fname] = _lookup_func(fname)
+
+    fld = eval(plan.code, {"__builtins__": {}}, local_dict)  # pylint: disable=eval-used
 
-    def var_salter(symbols):
-        symbol = symbols.groups()[0]
-        if symbol.startswith("'"):
-            return symbol
-        salted_symbol = salt + symbol
-        # yes, i'm not using dict.update on purpose since grid's
-        # getitem might copy the array
-        if not salted_symbol in local_dict:
-            local_dict[salted_symbol] = grid.get_field(symbol, slc=slc)
-        return salted_symbol
-    salted_eqn = re.sub(var_re, var_salter, eqn)
-
-    # salt function names
-    func_re = _symbol_re + r"(\s*\()"
-    def func_salter(symbols):
-        symbol = symbols.groups()[0]
-        salted_symbol = salt + symbol
-        if salted_symbol not in local_dict:
-            if hasattr(calc, symbol):
-                local_dict[salted_symbol] = getattr(calc, symbol)
-            elif hasattr(np, symbol):
-                local_dict[salted_symbol] = getattr(np, symbol)
-        return salted_symbol + "("
-    salted_eqn = re.sub(func_re, func_salter, salted_eqn)
-
-    # run eval
-    fld = eval(salted_eqn, {"__builtins__": {}}, local_dict)  # pylint: disable=eval-used
+    # functions like numpy.where return bare ndarrays, so wrap them like
+    # the fields they came from
+    if isinstance(fld, np.ndarray) and not isinstance(fld, field.Field):
+        for op in operands:
+            if isinstance(op, field.Field) and tuple(op.shape) == fld.shape:
+                ctx = dict(name=result_name, pretty_name=result_name)
+                return op.wrap(fld, context=ctx)
     try:
         fld.name = result_name
         fld.pretty_name = result_name
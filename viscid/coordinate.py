@@ -18,12 +18,22 @@ FIXME: uniform coordinates are generally unsupported, but they're just
        a special case of nonuniform coordinates, so the functionality
        is still there... it's just unnatural to use full crd arrays
        with uniform coordinates
+
+Crds objects that come from the same grid (the same grid2 file, the
+same XDMF geometry, ...) can be shared between all the grids of a run
+with :py:func:`intern_crds`. Derived crds (reflected, extended by half a
+cell, ...) are memoized on the crds object, so sharing crds also shares
+all their coordinate arrays.
 """
 
 from __future__ import print_function
 # from timeit import default_timer as time
+from collections import OrderedDict
+import copy
+import hashlib
 import itertools
 import sys
+import weakref
 
 import numpy as np
 
@@ -73,6 +83,48 @@ def arrays2crds(crd_arrs, crd_names="xyzuvw"):
         crds = wrap_crds("nonuniform", clist)
     return crds
 
+# parsed string selections, keyed on (selection, axes)
+_parsed_selections = OrderedDict()
+_parsed_selections_size = 256
+
+# crds shared by intern_crds, keyed on their content
+_interned_crds = weakref.WeakValueDictionary()
+
+def intern_crds(crds):
+    """Get a shared crds object with the same content as crds
+
+    If an equivalent crds object is still alive somewhere, that's
+    returned instead of crds, so many grids that share a geometry
+    share one crds object (and all its cached coordinate arrays).
+    Interned crds are shared, so don't modify them in place.
+
+    Args:
+        crds (Coordinates): some crds
+
+    Returns:
+        Coordinates, either crds or an equivalent interned crds
+    """
+    try:
+        key = crds._content_key()  # pylint: disable=protected-access
+    except (AttributeError, NotImplementedError):
+        return crds
+
+    interned = _interned_crds.get(key, None)
+    # check the key again since interned crds may have been changed
+    # after the fact (setting reflect_axes for instance)
+    if interned is not None and interned._content_key() == key:  # pylint: disable=protected-access
+        return interned
+    _interned_crds[key] = crds
+    return crds
+
+def _array_digest(arr):
+    """Hashable summary of an array's contents"""
+    if arr is None:
+        return None
+    arr = np.ascontiguousarray(arr)
+    digest = hashlib.sha1(arr.view(np.uint8)).hexdigest()
+    return (arr.dtype.str, arr.shape, digest)
+
 def lookup_crds_type(type_name):
     for cls in vutil.subclass_spider(Coordinates):
         if cls.istype(type_name):
@@ -129,6 +181,9 @@ class StructuredCrds(Coordinates):
     _reflect_axes = None
     has_cc = None
 
+    # crds derived from these crds, see _derived_crds
+    _derived = None
+
     def __init__(self, init_clist, has_cc=True, reflect_axes=None,
                  **kwargs):
         """ if caled with an init_clist, then the coordinate names
@@ -215,7 +270,9 @@ class StructuredCrds(Coordinates):
     def reflect_axes(self, val):
         if not val:
             val = []
-        self._reflect_axes = val
+        if val != self._reflect_axes:
+            self._reflect_axes = val
+            self.clear_cache()
 
     @property
     def _crds(self):
@@ -235,6 +292,36 @@ class StructuredCrds(Coordinates):
 
     def clear_cache(self):
         self.__crds = None
+        self._derived = None
+
+    def _derived_crds(self, name, make_crds):
+        """Memoize crds that are derived from self
+
+        Args:
+            name (str): what kind of derived crds
+            make_crds (callable): makes the derived crds if they
+                aren't cached yet
+
+        Returns:
+            the cached result of make_crds()
+        """
+        if self._derived is None:
+            self._derived = {}
+        try:
+            return self._derived[name]
+        except KeyError:
+            crds = make_crds()
+            self._derived[name] = crds
+            return crds
+
+    def _content_key(self):
+        """Hashable description of these crds, used by intern_crds"""
+        src_nc = tuple((ax, _array_digest(self._src_crds_nc.get(ax, None)))
+                       for ax in self.axes)
+        src_cc = tuple((ax, _array_digest(self._src_crds_cc.get(ax, None)))
+                       for ax in self.axes)
+        return (type(self), tuple(self.axes), tuple(self.reflect_axes),
+                self.has_cc, src_nc, src_cc)
 
     def set_crds(self, clist):
         """ called with a list of lists:
@@ -251,6 +338,30 @@ class StructuredCrds(Coordinates):
             self._src_crds_nc[axis.lower()] = ci[1]
             if len(ci) > 2:
                 self._src_crds_cc[axis.lower()] = ci[2]
+        self.clear_cache()
+
+    def with_reflections(self, reflect_axes):
+        """Get crds like self, but with different reflect_axes
+
+        Unlike setting reflect_axes, this leaves self alone, which
+        matters if self is shared with other grids.
+
+        Returns:
+            Coordinates, interned with :py:func:`intern_crds`
+        """
+        if list(reflect_axes or []) == list(self.reflect_axes):
+            return self
+
+        def _make_crds():
+            crds = copy.copy(self)
+            crds._src_crds_nc = dict(self._src_crds_nc)
+            crds._src_crds_cc = dict(self._src_crds_cc)
+            crds.reflect_axes = reflect_axes
+            crds.clear_cache()
+            return intern_crds(crds)
+
+        key = ("with_reflections", tuple(reflect_axes or []))
+        return self._derived_crds(key, _make_crds)
 
     def apply_reflections(self):
         """
@@ -258,8 +369,8 @@ class StructuredCrds(Coordinates):
             Coordinates with reflections applied
         """
         if len(self.reflect_axes) > 0:
-            return type(self)(self.get_clist(), has_cc=self.has_cc,
-                              dtype=self.dtype)
+            return self._derived_crds("reflected", lambda: type(self)(
+                self.get_clist(), has_cc=self.has_cc, dtype=self.dtype))
         else:
             return self
 
@@ -451,6 +562,26 @@ class StructuredCrds(Coordinates):
     def _parse_slice(self, selection):
         """Resolve axes names, Ellipsis, and np.newaxis from selection
 
+        Same as :py:meth:`_parse_selection`, but string selections are
+        remembered, so slicing in a loop only splits the string once.
+        """
+        if not isinstance(selection, string_types):
+            return self._parse_selection(selection)
+
+        key = (selection, tuple(self.axes))
+        try:
+            axes, sel = _parsed_selections.pop(key)
+        except KeyError:
+            axes, sel = self._parse_selection(selection)
+        _parsed_selections[key] = (axes, sel)
+        while len(_parsed_selections) > _parsed_selections_size:
+            _parsed_selections.popitem(last=False)
+        # callers are free to mutate what they get back
+        return list(axes), list(sel)
+
+    def _parse_selection(self, selection):
+        """Resolve axes names, Ellipsis, and np.newaxis from selection
+
         Args:
             selection (str, list): Something to select a subset of a
                 field
@@ -617,8 +748,12 @@ class StructuredCrds(Coordinates):
         changing the data, just the coordinates.
 
         Returns:
-            New coordinates instance with same type as self
+            Coordinates with same type as self, the result is cached,
+            so don't modify it in place
         """
+        return self._derived_crds("extend_by_half", self._extend_by_half)
+
+    def _extend_by_half(self):
         axes = self.axes
         crds_cc = self.get_crds_cc()
         for i, x in enumerate(crds_cc):
@@ -630,6 +765,19 @@ class StructuredCrds(Coordinates):
         new_clist = [(ax, nc) for ax, nc in zip(axes, crds_cc)]
         return type(self)(new_clist)
 
+    def cc_as_nc(self):
+        """Coordinates whose nodes are the cell centers of self
+
+        Used for turning cell centered fields to node centered without
+        changing the data, just the coordinates.
+
+        Returns:
+            Coordinates with same type as self, the result is cached,
+            so don't modify it in place
+        """
+        return self._derived_crds("cc_as_nc", lambda: type(self)(
+            self.get_clist(center="cell")))
+
     def make_slice(self, selection, cc=False):
         """Turns a slice string into a slice (should be private?)
 
@@ -1331,8 +1479,12 @@ class UniformCrds(StructuredCrds):
         changing the data, just the coordinates.
 
         Returns:
-            New coordinates instance with same type as self
+            Coordinates with same type as self, the result is cached,
+            so don't modify it in place
         """
+        return self._derived_crds("extend_by_half", self._extend_by_half)
+
+    def _extend_by_half(self):
         axes = self.axes
         xl, xh = self.get_xl(), self.get_xh()
         dx = (xh - xl) / self.shape_nc
@@ -1381,6 +1533,12 @@ class UniformCrds(StructuredCrds):
                 lst.append([ax, ls_args])
         return lst
 
+    def _content_key(self):
+        args = tuple(tuple(float(v) for v in a[:2]) + (int(a[2]),)
+                     for a in self._nc_linspace_args)
+        return (type(self), tuple(self.axes), tuple(self.reflect_axes),
+                self.has_cc, np.dtype(self.dtype).str, args)
+
     def _fill_crds_dict(self):
         assert len(self._nc_linspace_args) == len(self._axes)
         self._src_crds_nc = {}
@@ -12,7 +12,11 @@ probably assume it's the path of least resistance in the whole Cython
 mess.
 """
 
-__all__ = ["cyamr", "cycalc", "cyfield", "integrate", "streamline"]
+import importlib
+import sys
+
+__all__ = ["cyamr", "cycalc", "cyfield", "integrate", "pathline",
+           "relayout", "streamline"]
 
 class CythonNotBuilt(Exception):
     pass
@@ -28,32 +32,57 @@ class _dummy(object):
         else:
             super(_dummy, self).__setattr__(name, value)
 
-try:
-    from viscid.cython import cyamr
-    from viscid.cython import cycalc
-    from viscid.cython import streamline
-
-    from viscid.cython.cycalc import interp_nearest
-    from viscid.cython.cycalc import interp_trilin
-    from viscid.cython.streamline import calc_streamlines
-    streamlines = calc_streamlines
-except ImportError:
-    cython_msg = ("Cython module calculator.{0} not available. Cython code "
-                  "must be built using Viscid/setup.py (Note: Cython is "
-                  "not required for the build, just a c compiler)")
-
-    def interp_nearest(*args, **kwargs):  # pylint: disable=unused-argument
-        raise CythonNotBuilt(cython_msg.format("interp_nearest"))
-    def interp_trilin(*args, **kwargs):  # pylint: disable=unused-argument
-        raise CythonNotBuilt(cython_msg.format("interp_trilin"))
-    def streamlines(*args, **kwargs):  # pylint: disable=unused-argument
-        raise CythonNotBuilt(cython_msg.format("streamlines"))
-    def calc_streamlines(*args, **kwargs):  # pylint: disable=unused-argument
-        raise CythonNotBuilt(cython_msg.format("calc_streamlines"))
-
-    cyamr = _dummy(cython_msg.format("cyamr"))
-    cycalc = _dummy(cython_msg.format("cycalc"))
-    streamline = _dummy(cython_msg.format("streamline"))
+cython_msg = ("Cython module calculator.{0} not available. Cython code "
+              "must be built using Viscid/setup.py (Note: Cython is "
+              "not required for the build, just a c compiler)")
+
+# The extension modules are imported the first time one of these names
+# is used (PEP 562), so `import viscid` doesn't pay for loading them.
+# name -> (module, attribute in that module or None for the module itself)
+_lazy_attrs = {"cyamr": ("cyamr", None),
+               "cycalc": ("cycalc", None),
+               "cyfield": ("cyfield", None),
+               "integrate": ("integrate", None),
+               "pathline": ("pathline", None),
+               "relayout": ("relayout", None),
+               "streamline": ("streamline", None),
+               "interp_nearest": ("cycalc", "interp_nearest"),
+               "interp_trilin": ("cycalc", "interp_trilin"),
+               "calc_streamlines": ("streamline", "calc_streamlines"),
+               "streamlines": ("streamline", "calc_streamlines"),
+              }
+
+def _not_built(name):
+    def _raiser(*args, **kwargs):  # pylint: disable=unused-argument
+        raise CythonNotBuilt(cython_msg.format(name))
+    _raiser.__name__ = name
+    return _raiser
+
+def __getattr__(name):
+    try:
+        modname, attr = _lazy_attrs[name]
+    except KeyError:
+        raise AttributeError("module '{0}' has no attribute '{1}'"
+                             "".format(__name__, name))
+    try:
+        mod = importlib.import_module(__name__ + "." + modname)
+        val = mod if attr is None else getattr(mod, attr)
+    except ImportError:
+        if attr is None:
+            val = _dummy(cython_msg.format(name))
+        else:
+            val = _not_built(name)
+    globals()[name] = val
+    return val
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attrs))
+
+if sys.version_info < (3, 7):
+    # no module __getattr__, so just import everything now
+    for _name in list(_lazy_attrs):
+        __getattr__(_name)
+    del _name
 
 ##
 ## EOF
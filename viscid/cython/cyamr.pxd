@@ -2,7 +2,8 @@ cimport numpy as cnp
 
 from viscid.cython.cyfield cimport real_t, CyField
 from viscid.cython.cyfield cimport Field_I4_Crd_F8, Field_I8_Crd_F8
-from viscid.cython.cyfield cimport Field_F4_Crd_F4, Field_F8_Crd_F8
+from viscid.cython.cyfield cimport Field_F4_Crd_F4, Field_F4_Crd_F8
+from viscid.cython.cyfield cimport Field_F8_Crd_F8
 
 cdef class CyAMRField:
     cdef str crd_dtype
@@ -34,6 +35,13 @@ cdef class AMRField_F4_Crd_F4(CyAMRField):
     cdef cnp.float32_t min_dx
     cdef Field_F4_Crd_F4 active_patch
 
+cdef class AMRField_F4_Crd_F8(CyAMRField):
+    cdef cnp.float64_t[:, ::1] xl, xm, xh
+    cdef cnp.float64_t global_xl[3]
+    cdef cnp.float64_t global_xh[3]
+    cdef cnp.float64_t min_dx
+    cdef Field_F4_Crd_F8 active_patch
+
 cdef class AMRField_F8_Crd_F8(CyAMRField):
     cdef cnp.float64_t[:, ::1] xl, xm, xh
     cdef cnp.float64_t global_xl[3]
@@ -45,6 +53,7 @@ ctypedef fused FusedAMRField:
     AMRField_I4_Crd_F8
     AMRField_I8_Crd_F8
     AMRField_F4_Crd_F4
+    AMRField_F4_Crd_F8
     AMRField_F8_Crd_F8
 
 
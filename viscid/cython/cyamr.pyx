@@ -4,6 +4,8 @@ from __future__ import print_function
 
 import numpy as np
 
+from viscid import profiling
+
 ###########
 # cimports
 cimport cython
@@ -110,19 +112,42 @@ def _py_discover_neighbors(skel, real_t[:, ::1] xm, real_t[:, ::1] L,
 
 
 cdef CyAMRField make_cyamrfield(vfield):
+    cdef CyAMRField cached = getattr(vfield, "_cyamrfield", None)
+    # reuse the last wrapper as long as none of the patches have
+    # forgotten their CyFields
+    if cached is not None:
+        patches = vfield.patches
+        if len(patches) == len(cached.patches) and all(
+                getattr(p, "_cyfield", None) is cp
+                for p, cp in zip(patches, cached.patches)):
+            if profiling.enabled:
+                profiling.count("cyamrfield.cache_hit")
+            return cached
+    if profiling.enabled:
+        profiling.count("cyamrfield.cache_miss")
+
     fld_dtype = np.dtype(vfield.dtype)
 
     if fld_dtype == np.dtype('i4'):
         amrfld = _init_cyamrfield(AMRField_I4_Crd_F8(), vfield, 'f8')
     elif fld_dtype == np.dtype('i8'):
         amrfld = _init_cyamrfield(AMRField_I8_Crd_F8(), vfield, 'f8')
-    if fld_dtype == np.dtype('f4'):
-        amrfld = _init_cyamrfield(AMRField_F4_Crd_F4(), vfield, 'f4')
+    elif fld_dtype == np.dtype('f4'):
+        # match whatever precision the patches were wrapped with
+        if isinstance(make_cyfield(vfield.patches[0]), Field_F4_Crd_F8):
+            amrfld = _init_cyamrfield(AMRField_F4_Crd_F8(), vfield, 'f8')
+        else:
+            amrfld = _init_cyamrfield(AMRField_F4_Crd_F4(), vfield, 'f4')
     elif fld_dtype == np.dtype('f8'):
         amrfld = _init_cyamrfield(AMRField_F8_Crd_F8(), vfield, 'f8')
     else:
         raise RuntimeError("Bad field dtype for cython code {0}"
                            "".format(fld_dtype))
+
+    try:
+        vfield._cyamrfield = amrfld
+    except AttributeError:
+        pass
     return amrfld
 
 cdef FusedAMRField _init_cyamrfield(FusedAMRField amrfld, vfield, crd_dtype):
@@ -3,6 +3,8 @@ from viscid.cython.cyfield cimport FusedField
 
 # heavy lifting interpolation functions
 cdef real_t _c_interp_trilin(FusedField fld, int m, real_t x[3]) nogil
+cdef void _c_interp_trilin_vec(FusedField fld, real_t x[3], real_t *out,
+                               int nr_comps) nogil
 cdef real_t _c_interp_nearest(FusedField fld, int m, real_t x[3]) nogil
 
 # finding closest indices
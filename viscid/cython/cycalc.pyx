@@ -69,7 +69,7 @@ def interp_nearest(vfield, seeds, force_amr_version=False):
         Vector field.
     """
     seeds = to_seeds(seeds)
-    cdef int nr_points = seeds.nr_points(center=vfield.center)
+    cdef int nr_points = seeds.get_nr_points(center=vfield.center)
     cdef int nr_comps = vfield.nr_comps
     if nr_comps == 0:
         scalar = True
@@ -92,49 +92,47 @@ def interp_nearest(vfield, seeds, force_amr_version=False):
     return result
 
 def _py_interp_trilin(FusedField fld, points, real_t[:, ::1] result):
-    cdef int i, m
+    cdef int i
     cdef int nr_comps = result.shape[1]
     cdef real_t x[3]
 
     i = 0
     for pt in points:
-        for m in range(nr_comps):
-            assert len(pt) == 3
-            x[0] = pt[0]
-            x[1] = pt[1]
-            x[2] = pt[2]
-            result[i, m] = _c_interp_trilin(fld, m, x)
+        assert len(pt) == 3, "Seeds must have 3 spatial dimensions"
+        x[0] = pt[0]
+        x[1] = pt[1]
+        x[2] = pt[2]
+        _c_interp_trilin_vec(fld, x, &result[i, 0], nr_comps)
         i += 1
 
 def _py_interp_trilin_amr(FusedAMRField amrfld, points, real_t[:, ::1] result):
-    cdef int i, m
+    cdef int i
     cdef int nr_comps = result.shape[1]
     cdef real_t x[3]
 
     i = 0
     for pt in points:
-        for m in range(nr_comps):
-            assert len(pt) == 3, "Seeds must have 3 spatial dimensions"
-            x[0] = pt[0]
-            x[1] = pt[1]
-            x[2] = pt[2]
-            activate_patch[FusedAMRField, real_t](amrfld, x)
-            result[i, m] = _c_interp_trilin(amrfld.active_patch, m, x)
+        assert len(pt) == 3, "Seeds must have 3 spatial dimensions"
+        x[0] = pt[0]
+        x[1] = pt[1]
+        x[2] = pt[2]
+        activate_patch[FusedAMRField, real_t](amrfld, x)
+        _c_interp_trilin_vec(amrfld.active_patch, x, &result[i, 0], nr_comps)
         i += 1
 
-cdef real_t _c_interp_trilin(FusedField fld, int m, real_t x[3]) nogil:
-    cdef int d, ind
-    cdef int ix[3]
-    cdef int p[3]  # increment, used for 2d fields
-    cdef real_t xd[3]
+cdef inline void _c_locate_cell(FusedField fld, real_t x[3], int ix[3],
+                                int p[3], real_t xd[3]) nogil:
+    """Find the cell containing x, and the fractional position in it
 
-    cdef real_t c00, c10, c01, c11, c0, c1, c
+    Sets `ix` to the lower index of the cell, `p` to the increment to
+    the upper corner (0 on axes where we fall back to nearest
+    neighbor), and `xd` to the trilinear weights along each axis.
+    """
+    cdef int d, ind
 
-    # find closest inds
     for d in range(3):
         if fld.n[d] == 1 or x[d] <= fld.xl[d]:
             ind = 0
-            ix[d] = ind
             p[d] = 0
             xd[d] = 0.0
         elif x[d] >= fld.xh[d]:
@@ -149,6 +147,15 @@ cdef real_t _c_interp_trilin(FusedField fld, int m, real_t x[3]) nogil:
                      (fld.crds[d, ind + 1] - fld.crds[d, ind]))
         ix[d] = ind
 
+cdef real_t _c_interp_trilin(FusedField fld, int m, real_t x[3]) nogil:
+    cdef int ix[3]
+    cdef int p[3]  # increment, used for 2d fields
+    cdef real_t xd[3]
+
+    cdef real_t c00, c10, c01, c11, c0, c1, c
+
+    _c_locate_cell(fld, x, ix, p, xd)
+
     # INTERLACED ... x first
     c00 = (fld.data[ix[0], ix[1]       , ix[2]       , m] +
            xd[0] * (fld.data[ix[0] + p[0], ix[1]       , ix[2]       , m] -
@@ -165,23 +172,46 @@ cdef real_t _c_interp_trilin(FusedField fld, int m, real_t x[3]) nogil:
     c0 = c00 + xd[1] * (c10 - c00)
     c1 = c01 + xd[1] * (c11 - c01)
     c = c0 + xd[2] * (c1 - c0)
-
-    # if c == 0.0:
-    #     # print("??0:", c00, c10, c01, c11, '|', c0, c1, c, '|', xd[0], xd[1], xd[2])
-    #     # print("!!0:", crds[0][ix[0]], crds[1][ix[1]], crds[2][ix[2]], '|',
-    #     #       x[0], x[1], x[2], '|',
-    #     #       crds[0][ix[0] + 1], crds[1][ix[1] + 1], crds[2][ix[2] + 1])
-    #     print("**0", ix[0], ix[1], ix[2], '|', p[0], p[1], p[2])
-    #     print("AA0:", s[ix[0]       , ix[1]       , ix[2]       , m],
-    #                   s[ix[0] + p[0], ix[1]       , ix[2]       , m])
-    #     print("BB0:", s[ix[0]       , ix[1] + p[1], ix[2]       , m],
-    #                   s[ix[0] + p[0], ix[1] + p[1], ix[2]       , m])
-    #     print("CC0:", s[ix[0]       , ix[1]       , ix[2] + p[2], m],
-    #                   s[ix[0] + p[0], ix[1]       , ix[2] + p[2], m])
-    #     print("DD0:", s[ix[0]       , ix[1] + p[1], ix[2] + p[2], m],
-    #                   s[ix[0] + p[0], ix[1] + p[1], ix[2] + p[2], m])
     return c
 
+cdef void _c_interp_trilin_vec(FusedField fld, real_t x[3], real_t *out,
+                               int nr_comps) nogil:
+    """Interpolate components [0, nr_comps) of fld at x into out
+
+    Same as calling `_c_interp_trilin` for each component, but the cell
+    lookup and weights are only computed once.
+    """
+    cdef int m
+    cdef int ix[3]
+    cdef int p[3]  # increment, used for 2d fields
+    cdef real_t xd[3]
+    cdef int i0, i1, j0, j1, k0, k1
+
+    cdef real_t c00, c10, c01, c11, c0, c1
+
+    _c_locate_cell(fld, x, ix, p, xd)
+
+    i0 = ix[0]
+    i1 = ix[0] + p[0]
+    j0 = ix[1]
+    j1 = ix[1] + p[1]
+    k0 = ix[2]
+    k1 = ix[2] + p[2]
+
+    # INTERLACED ... x first
+    for m in range(nr_comps):
+        c00 = (fld.data[i0, j0, k0, m] +
+               xd[0] * (fld.data[i1, j0, k0, m] - fld.data[i0, j0, k0, m]))
+        c10 = (fld.data[i0, j1, k0, m] +
+               xd[0] * (fld.data[i1, j1, k0, m] - fld.data[i0, j1, k0, m]))
+        c01 = (fld.data[i0, j0, k1, m] +
+               xd[0] * (fld.data[i1, j0, k1, m] - fld.data[i0, j0, k1, m]))
+        c11 = (fld.data[i0, j1, k1, m] +
+               xd[0] * (fld.data[i1, j1, k1, m] - fld.data[i0, j1, k1, m]))
+        c0 = c00 + xd[1] * (c10 - c00)
+        c1 = c01 + xd[1] * (c11 - c01)
+        out[m] = c0 + xd[2] * (c1 - c0)
+
 def _py_interp_nearest(FusedField fld, points, real_t[:, ::1] result):
     cdef int i, m
     cdef int nr_comps = result.shape[1]
@@ -244,10 +274,15 @@ cdef inline int closest_preceeding_ind(FusedField fld, int d, real_t value) nogi
 
     if n == 1:
         ind = 0
-    elif fld.uniform_crds:
+    elif fld.uniform_axis[d]:
+        # no search needed, the cell falls right out of the crd spacing
         frac = (value - fld.xl[d]) / (fld.L[d])
         i = <int> floor((fld.nm1[d]) * frac)
         ind = int_min(int_max(i, 0), fld.nm2[d])
+    elif (fld.crds[d, startind] <= value and startind < n - 1 and
+          value < fld.crds[d, startind + 1]):
+        # still in the same cell as last time, common when tracing
+        ind = startind
     else:
         found_ind = 0
         if fld.crds[d, startind] <= value:
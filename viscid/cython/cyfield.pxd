@@ -13,7 +13,8 @@ cdef class CyField:
     cdef str fld_dtype
     cdef str crd_dtype
     cdef str center
-    cdef int uniform_crds
+    cdef int uniform_crds  # all axes are uniform
+    cdef int uniform_axis[3]  # find indices arithmetically along this axis
     cdef int is_cc
     cdef int n[3]
     cdef int nm1[3]  # fld.n - 1
@@ -24,7 +25,7 @@ cdef class CyField:
     cdef cnp.float64_t min_dx
 
 cdef class Field_I4_Crd_F8(CyField):
-    cdef cnp.int32_t[:,:,:,::1] data
+    cdef cnp.int32_t[:,:,:,:] data  # x, y, z, component; any strides
     cdef cnp.float64_t[:] x, y, z
     cdef cnp.float64_t[:] xnc, ync, znc
     cdef cnp.float64_t[:] xcc, ycc, zcc
@@ -34,10 +35,10 @@ cdef class Field_I4_Crd_F8(CyField):
     cdef cnp.float64_t[3] xl, xlnc, xlcc
     cdef cnp.float64_t[3] xh, xhnc, xhcc
     cdef cnp.float64_t[3] L  # xh - xl
-    cdef cnp.float64_t[3] dx  # cell width, = NaN if uniform_crds == False
+    cdef cnp.float64_t[3] dx  # cell width, = NaN if uniform_axis[i] == False
 
 cdef class Field_I8_Crd_F8(CyField):
-    cdef cnp.int64_t[:,:,:,::1] data
+    cdef cnp.int64_t[:,:,:,:] data  # x, y, z, component; any strides
     cdef cnp.float64_t[:] x, y, z
     cdef cnp.float64_t[:] xnc, ync, znc
     cdef cnp.float64_t[:] xcc, ycc, zcc
@@ -47,10 +48,10 @@ cdef class Field_I8_Crd_F8(CyField):
     cdef cnp.float64_t[3] xl, xlnc, xlcc
     cdef cnp.float64_t[3] xh, xhnc, xhcc
     cdef cnp.float64_t[3] L  # xh - xl
-    cdef cnp.float64_t[3] dx  # cell width, = NaN if uniform_crds == False
+    cdef cnp.float64_t[3] dx  # cell width, = NaN if uniform_axis[i] == False
 
 cdef class Field_F4_Crd_F4(CyField):
-    cdef cnp.float32_t[:,:,:,::1] data
+    cdef cnp.float32_t[:,:,:,:] data  # x, y, z, component; any strides
     cdef cnp.float32_t[:] x, y, z
     cdef cnp.float32_t[:] xnc, ync, znc
     cdef cnp.float32_t[:] xcc, ycc, zcc
@@ -60,10 +61,23 @@ cdef class Field_F4_Crd_F4(CyField):
     cdef cnp.float32_t[3] xl, xlnc, xlcc
     cdef cnp.float32_t[3] xh, xhnc, xhcc
     cdef cnp.float32_t[3] L  # xh - xl
-    cdef cnp.float32_t[3] dx  # cell width, = NaN if uniform_crds == False
+    cdef cnp.float32_t[3] dx  # cell width, = NaN if uniform_axis[i] == False
+
+cdef class Field_F4_Crd_F8(CyField):
+    cdef cnp.float32_t[:,:,:,:] data  # x, y, z, component; any strides
+    cdef cnp.float64_t[:] x, y, z
+    cdef cnp.float64_t[:] xnc, ync, znc
+    cdef cnp.float64_t[:] xcc, ycc, zcc
+    cdef cnp.float64_t[:, ::1] crds     # [x, y, z]
+    cdef cnp.float64_t[:, ::1] crds_nc  # [xnc, ync, znc]
+    cdef cnp.float64_t[:, ::1] crds_cc  # [xcc, ycc, zcc]
+    cdef cnp.float64_t[3] xl, xlnc, xlcc
+    cdef cnp.float64_t[3] xh, xhnc, xhcc
+    cdef cnp.float64_t[3] L  # xh - xl
+    cdef cnp.float64_t[3] dx  # cell width, = NaN if uniform_axis[i] == False
 
 cdef class Field_F8_Crd_F8(CyField):
-    cdef cnp.float64_t[:,:,:,::1] data
+    cdef cnp.float64_t[:,:,:,:] data  # x, y, z, component; any strides
     cdef cnp.float64_t[:] x, y, z
     cdef cnp.float64_t[:] xnc, ync, znc
     cdef cnp.float64_t[:] xcc, ycc, zcc
@@ -73,12 +87,13 @@ cdef class Field_F8_Crd_F8(CyField):
     cdef cnp.float64_t[3] xl, xlnc, xlcc
     cdef cnp.float64_t[3] xh, xhnc, xhcc
     cdef cnp.float64_t[3] L  # xh - xl
-    cdef cnp.float64_t[3] dx  # cell width, = NaN if uniform_crds == False
+    cdef cnp.float64_t[3] dx  # cell width, = NaN if uniform_axis[i] == False
 
 ctypedef fused FusedField:
     Field_I4_Crd_F8
     Field_I8_Crd_F8
     Field_F4_Crd_F4
+    Field_F4_Crd_F8
     Field_F8_Crd_F8
 
 cdef CyField make_cyfield(vfield)
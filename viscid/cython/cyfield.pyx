@@ -3,11 +3,19 @@ from viscid.cython.cyfield cimport *
 
 import numpy as np
 
+from viscid import profiling
+
 # should be 3.4028235e+38 ?
 cdef float MAX_FLOAT = 1e37
 # should be 1.7976931348623157e+308 ?
 cdef double MAX_DOUBLE = 1e307
 
+# float32 data is wrapped with float64 crds, so interpolation results and
+# streamlines are computed in double without upcasting the data; set this
+# to False to get the old all float32 wrapper (Fields that already cached
+# a wrapper keep it until their clear_cache)
+mixed_precision = True
+
 
 cdef inline int _c_int_max(int a, int b):
     if a >= b:
@@ -16,27 +24,60 @@ cdef inline int _c_int_max(int a, int b):
         return b
 
 cdef CyField make_cyfield(vfield):
-    vfield = vfield.as_interlaced(force_c_contiguous=True).atleast_3d()
-    fld_dtype = np.dtype(vfield.dtype)
-
-    if fld_dtype == np.dtype('i4'):
-        fld = _init_cyfield(Field_I4_Crd_F8(), vfield, 'i4', 'f8')
-    elif fld_dtype == np.dtype('i8'):
-        fld = _init_cyfield(Field_I8_Crd_F8(), vfield, 'i8', 'f8')
-    if fld_dtype == np.dtype('f4'):
-        fld = _init_cyfield(Field_F4_Crd_F4(), vfield, 'f4', 'f4')
-    elif fld_dtype == np.dtype('f8'):
-        fld = _init_cyfield(Field_F8_Crd_F8(), vfield, 'f8', 'f8')
-    else:
-        raise RuntimeError("Bad field dtype for cython code {0}"
-                           "".format(fld_dtype))
+    # the wrapper is remembered on the Field, which forgets it in
+    # clear_cache / set_slice / when its crds change
+    cached = getattr(vfield, "_cyfield", None)
+    if cached is not None:
+        if profiling.enabled:
+            profiling.count("cyfield.cache_hit")
+        return cached
+    if profiling.enabled:
+        profiling.count("cyfield.cache_miss")
+
+    with profiling.timer("cyfield.setup"):
+        # the kernels read data through strides, so flat (component-major)
+        # or non-contiguous data doesn't need an interlaced copy
+        vfield3d = vfield.atleast_3d()
+        fld_dtype = np.dtype(vfield3d.dtype)
+
+        if fld_dtype == np.dtype('i4'):
+            fld = _init_cyfield(Field_I4_Crd_F8(), vfield3d, 'i4', 'f8')
+        elif fld_dtype == np.dtype('i8'):
+            fld = _init_cyfield(Field_I8_Crd_F8(), vfield3d, 'i8', 'f8')
+        elif fld_dtype == np.dtype('f4') and mixed_precision:
+            fld = _init_cyfield(Field_F4_Crd_F8(), vfield3d, 'f4', 'f8')
+        elif fld_dtype == np.dtype('f4'):
+            fld = _init_cyfield(Field_F4_Crd_F4(), vfield3d, 'f4', 'f4')
+        elif fld_dtype == np.dtype('f8'):
+            fld = _init_cyfield(Field_F8_Crd_F8(), vfield3d, 'f8', 'f8')
+        else:
+            raise RuntimeError("Bad field dtype for cython code {0}"
+                               "".format(fld_dtype))
 
+    try:
+        vfield._cyfield = fld
+    except AttributeError:
+        pass
     return fld
 
+def _is_uniform_arr(arr):
+    """True if arr is evenly spaced (to within float precision)"""
+    if len(arr) < 3:
+        return True
+    diff = np.diff(arr)
+    try:
+        atol = 100 * np.finfo(arr.dtype).eps * np.max(np.abs(arr))
+    except ValueError:
+        atol = 0
+    return np.allclose(diff, diff[0], rtol=0.0, atol=atol)
+
 cdef FusedField _init_cyfield(FusedField fld, vfield, fld_dtype, crd_dtype):
     dat = vfield.data
+    if vfield.nr_comps:
+        # view with the component axis last, whatever the layout
+        dat = np.moveaxis(dat, vfield.nr_comp, -1)
     while len(dat.shape) < 4:
-        dat = np.expand_dims(dat, axis=4)
+        dat = np.expand_dims(dat, axis=-1)
     fld.data = dat
 
     fld.center = vfield.center
@@ -74,6 +115,9 @@ cdef FusedField _init_cyfield(FusedField fld, vfield, fld_dtype, crd_dtype):
 
     fld.min_dx = np.min(vfield.crds.min_dx_nc)
 
+    is_uniform = vfield.crds._TYPE.startswith("uniform")
+    fld.uniform_crds = 1
+
     for i in range(3):
         fld.xlnc[i] = vfield.crds.xl_nc[i]
         fld.xhnc[i] = vfield.crds.xh_nc[i]
@@ -106,15 +150,19 @@ cdef FusedField _init_cyfield(FusedField fld, vfield, fld_dtype, crd_dtype):
             fld.crds_cc[i, j] = _crd_lst_cc[i][j]
 
         fld.cached_ind[i] = 0
-        fld.uniform_crds = vfield.crds._TYPE.startswith("uniform")
-        if fld.uniform_crds:
-            fld.dx[i] = (fld.xhnc[i] - fld.xlnc[i]) / fld.nr_nodes[i]
+        if fld.n[i] > 1 and (is_uniform or _is_uniform_arr(_crd_lst[i])):
+            fld.uniform_axis[i] = 1
+            fld.dx[i] = fld.L[i] / fld.nm1[i]
         else:
+            fld.uniform_axis[i] = 0
             fld.dx[i] = np.nan
 
         if fld.xh[i] < fld.xl[i]:
             raise RuntimeError("Forward crds only in cython code")
 
+        if fld.n[i] > 1 and not fld.uniform_axis[i]:
+            fld.uniform_crds = 0
+
     # print("??", sshape_max)
     # for i in range(3):
     #     print("!", i)
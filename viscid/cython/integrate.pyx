@@ -4,13 +4,61 @@ from __future__ import print_function
 from viscid import logger
 
 from cython.operator cimport dereference as deref
-from libc.math cimport sqrt, isnan, fabs
+from libc.math cimport sqrt, isnan, fabs, pow, copysign
 
 from viscid.cython.cyfield cimport real_t
 from viscid.cython.cyfield cimport FusedField
-from viscid.cython.cycalc cimport _c_interp_trilin
+from viscid.cython.cycalc cimport _c_interp_trilin_vec
 from viscid.cython.misc_inlines cimport real_min, real_max
 
+# Butcher tableaus for the embedded integrators; the a matrices are
+# flattened as a[7 * i + j], and e are the differences between the 5th
+# and 4th order weights, which give the local error estimate
+cdef double _RKF45_A[49]
+cdef double _RKF45_B[7]
+cdef double _RKF45_E[7]
+_RKF45_A[:] = [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0,
+               1.0 / 4.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0,
+               3.0 / 32.0, 9.0 / 32.0, 0.0, 0.0, 0.0, 0.0, 0.0,
+               1932.0 / 2197.0, -7200.0 / 2197.0, 7296.0 / 2197.0,
+               0.0, 0.0, 0.0, 0.0,
+               439.0 / 216.0, -8.0, 3680.0 / 513.0, -845.0 / 4104.0,
+               0.0, 0.0, 0.0,
+               -8.0 / 27.0, 2.0, -3544.0 / 2565.0, 1859.0 / 4104.0,
+               -11.0 / 40.0, 0.0, 0.0,
+               0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
+_RKF45_B[:] = [16.0 / 135.0, 0.0, 6656.0 / 12825.0, 28561.0 / 56430.0,
+               -9.0 / 50.0, 2.0 / 55.0, 0.0]
+_RKF45_E[:] = [1.0 / 360.0, 0.0, -128.0 / 4275.0, -2197.0 / 75240.0,
+               1.0 / 50.0, 2.0 / 55.0, 0.0]
+
+cdef double _DP45_A[49]
+cdef double _DP45_B[7]
+cdef double _DP45_E[7]
+_DP45_A[:] = [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0,
+              1.0 / 5.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0,
+              3.0 / 40.0, 9.0 / 40.0, 0.0, 0.0, 0.0, 0.0, 0.0,
+              44.0 / 45.0, -56.0 / 15.0, 32.0 / 9.0, 0.0, 0.0, 0.0, 0.0,
+              19372.0 / 6561.0, -25360.0 / 2187.0, 64448.0 / 6561.0,
+              -212.0 / 729.0, 0.0, 0.0, 0.0,
+              9017.0 / 3168.0, -355.0 / 33.0, 46732.0 / 5247.0,
+              49.0 / 176.0, -5103.0 / 18656.0, 0.0, 0.0,
+              35.0 / 384.0, 0.0, 500.0 / 1113.0, 125.0 / 192.0,
+              -2187.0 / 6784.0, 11.0 / 84.0, 0.0]
+_DP45_B[:] = [35.0 / 384.0, 0.0, 500.0 / 1113.0, 125.0 / 192.0,
+              -2187.0 / 6784.0, 11.0 / 84.0, 0.0]
+_DP45_E[:] = [71.0 / 57600.0, 0.0, -71.0 / 16695.0, 71.0 / 1920.0,
+              -17253.0 / 339200.0, 22.0 / 525.0, -1.0 / 40.0]
+
+
+cdef inline real_t _c_refine(real_t ds, real_t fac, real_t smallest_step) nogil:
+    """Shrink |ds| by fac, but not below smallest_step; keeps ds's sign"""
+    return copysign(real_max(fac * fabs(ds), smallest_step), ds)
+
+cdef inline real_t _c_coarsen(real_t ds, real_t fac, real_t largest_step) nogil:
+    """Grow |ds| by fac, but not above largest_step; keeps ds's sign"""
+    return copysign(real_min(fac * fabs(ds), largest_step), ds)
+
 
 cdef int _c_euler1(FusedField fld, real_t x[3], real_t *ds,
                    real_t tol_lo, real_t tol_hi,
@@ -20,9 +68,10 @@ cdef int _c_euler1(FusedField fld, real_t x[3], real_t *ds,
     """Simplest 1st order euler integration"""
     cdef real_t v[3]
     cdef real_t vmag
-    v[0] = vscale[0] * _c_interp_trilin[FusedField, real_t](fld, 0, x)
-    v[1] = vscale[1] * _c_interp_trilin[FusedField, real_t](fld, 1, x)
-    v[2] = vscale[2] * _c_interp_trilin[FusedField, real_t](fld, 2, x)
+    _c_interp_trilin_vec[FusedField, real_t](fld, x, v, 3)
+    v[0] *= vscale[0]
+    v[1] *= vscale[1]
+    v[2] *= vscale[2]
     vmag = sqrt(v[0]**2 + v[1]**2 + v[2]**2)
     if vmag == 0.0 or isnan(vmag):
         # logger.warn("vmag issue at: {0} {1} {2}, [{3}, {4}, {5}] == |{6}|".format(
@@ -44,9 +93,10 @@ cdef int _c_rk2(FusedField fld, real_t x[3], real_t *ds,
     cdef real_t v1[3]
     cdef real_t vmag0, vmag1
     cdef real_t ds_half = 0.5 * deref(ds)
-    v0[0] = vscale[0] * _c_interp_trilin[FusedField, real_t](fld, 0, x)
-    v0[1] = vscale[1] * _c_interp_trilin[FusedField, real_t](fld, 1, x)
-    v0[2] = vscale[2] * _c_interp_trilin[FusedField, real_t](fld, 2, x)
+    _c_interp_trilin_vec[FusedField, real_t](fld, x, v0, 3)
+    v0[0] *= vscale[0]
+    v0[1] *= vscale[1]
+    v0[2] *= vscale[2]
     vmag0 = sqrt(v0[0]**2 + v0[1]**2 + v0[2]**2)
     # logger.info("x: {0} | v0 : | vmag0: {1}".format([x[0], x[1], x[2]], vmag0))
     if vmag0 == 0.0 or isnan(vmag0):
@@ -56,9 +106,10 @@ cdef int _c_rk2(FusedField fld, real_t x[3], real_t *ds,
     x1[1] = x[1] + ds_half * v0[1] / vmag0
     x1[2] = x[2] + ds_half * v0[2] / vmag0
 
-    v1[0] = vscale[0] * _c_interp_trilin[FusedField, real_t](fld, 0, x1)
-    v1[1] = vscale[1] * _c_interp_trilin[FusedField, real_t](fld, 1, x1)
-    v1[2] = vscale[2] * _c_interp_trilin[FusedField, real_t](fld, 2, x1)
+    _c_interp_trilin_vec[FusedField, real_t](fld, x1, v1, 3)
+    v1[0] *= vscale[0]
+    v1[1] *= vscale[1]
+    v1[2] *= vscale[2]
     vmag1 = sqrt(v1[0]**2 + v1[1]**2 + v1[2]**2)
     # logger.info("x1: {0} | v0 : | vmag1: {1}".format([x1[0], x1[1], x1[2]], vmag1))
     if vmag1 == 0.0 or isnan(vmag1):
@@ -90,9 +141,10 @@ cdef int _c_rk12(FusedField fld, real_t x[3], real_t *ds,
         ds_half = 0.5 * deref(ds)
 
         # print("A", start_inds[0], start_inds[1], start_inds[2])
-        v0[0] = vscale[0] * _c_interp_trilin[FusedField, real_t](fld, 0, x)
-        v0[1] = vscale[1] * _c_interp_trilin[FusedField, real_t](fld, 1, x)
-        v0[2] = vscale[2] * _c_interp_trilin[FusedField, real_t](fld, 2, x)
+        _c_interp_trilin_vec[FusedField, real_t](fld, x, v0, 3)
+        v0[0] *= vscale[0]
+        v0[1] *= vscale[1]
+        v0[2] *= vscale[2]
         vmag0 = sqrt(v0[0]**2 + v0[1]**2 + v0[2]**2)
         # logger.info("x: {0} | v0 : | vmag0: {1}".format([x[0], x[1], x[2]], vmag0))
         if vmag0 == 0.0 or isnan(vmag0):
@@ -108,9 +160,10 @@ cdef int _c_rk12(FusedField fld, real_t x[3], real_t *ds,
         x1[2] = x[2] + ds_half * v0[2] / vmag0
 
         # print("B", start_inds[0], start_inds[1], start_inds[2])
-        v1[0] = vscale[0] * _c_interp_trilin[FusedField, real_t](fld, 0, x1)
-        v1[1] = vscale[1] * _c_interp_trilin[FusedField, real_t](fld, 1, x1)
-        v1[2] = vscale[2] * _c_interp_trilin[FusedField, real_t](fld, 2, x1)
+        _c_interp_trilin_vec[FusedField, real_t](fld, x1, v1, 3)
+        v1[0] *= vscale[0]
+        v1[1] *= vscale[1]
+        v1[2] *= vscale[2]
         vmag1 = sqrt(v1[0]**2 + v1[1]**2 + v1[2]**2)
         # logger.info("x1: {0} | v0 : | vmag1: {1}".format([x1[0], x1[1], x1[2]], vmag1))
         if vmag1 == 0.0 or isnan(vmag1):
@@ -127,15 +180,15 @@ cdef int _c_rk12(FusedField fld, real_t x[3], real_t *ds,
         if dist > tol_hi * fabs(deref(ds)):
             # logger.debug("Refining ds: {0} -> {1}".format(
             #     deref(ds), fac_refine * deref(ds)))
-            if ds[0] <= smallest_step:
+            if fabs(deref(ds)) <= smallest_step:
                 break
             else:
-                ds[0] = real_max(fac_refine * deref(ds), smallest_step)
+                ds[0] = _c_refine(deref(ds), fac_refine, smallest_step)
                 continue
         elif dist < tol_lo * fabs(deref(ds)):
             # logger.debug("Coarsening ds: {0} -> {1}".format(
             #     deref(ds), fac_coarsen * deref(ds)))
-            ds[0] = real_min(fac_coarsen * deref(ds), largest_step)
+            ds[0] = _c_coarsen(deref(ds), fac_coarsen, largest_step)
             break
         else:
             break
@@ -162,9 +215,10 @@ cdef int _c_euler1a(FusedField fld, real_t x[3], real_t *ds,
 
     while True:
         # go forward
-        v0[0] = vscale[0] * _c_interp_trilin[FusedField, real_t](fld, 0, x)
-        v0[1] = vscale[1] * _c_interp_trilin[FusedField, real_t](fld, 1, x)
-        v0[2] = vscale[2] * _c_interp_trilin[FusedField, real_t](fld, 2, x)
+        _c_interp_trilin_vec[FusedField, real_t](fld, x, v0, 3)
+        v0[0] *= vscale[0]
+        v0[1] *= vscale[1]
+        v0[2] *= vscale[2]
         vmag0 = sqrt(v0[0]**2 + v0[1]**2 + v0[2]**2)
         # logger.info("x0: {0} | v0 : | vmag0: {1}".format([x0[0], x0[1], x0[2]], vmag0))
         if vmag0 == 0.0 or isnan(vmag0):
@@ -176,9 +230,10 @@ cdef int _c_euler1a(FusedField fld, real_t x[3], real_t *ds,
         x1[2] = x[2] + deref(ds) * v0[2] / vmag0
 
         # now go backward
-        v1[0] = vscale[0] * _c_interp_trilin[FusedField, real_t](fld, 0, x1)
-        v1[1] = vscale[1] * _c_interp_trilin[FusedField, real_t](fld, 1, x1)
-        v1[2] = vscale[2] * _c_interp_trilin[FusedField, real_t](fld, 2, x1)
+        _c_interp_trilin_vec[FusedField, real_t](fld, x1, v1, 3)
+        v1[0] *= vscale[0]
+        v1[1] *= vscale[1]
+        v1[2] *= vscale[2]
         vmag1 = sqrt(v1[0]**2 + v1[1]**2 + v1[2]**2)
 
         # logger.info("x1: {0} | v0 : | vmag1: {1}".format([x1[0], x1[1], x1[2]], vmag1))
@@ -197,15 +252,15 @@ cdef int _c_euler1a(FusedField fld, real_t x[3], real_t *ds,
         if dist > tol_hi * fabs(deref(ds)):
             # logger.debug("Refining ds: {0} -> {1}".format(
             #     deref(ds), fac_refine * deref(ds)))
-            if ds[0] <= smallest_step:
+            if fabs(deref(ds)) <= smallest_step:
                 break
             else:
-                ds[0] = real_max(fac_refine * deref(ds), smallest_step)
+                ds[0] = _c_refine(deref(ds), fac_refine, smallest_step)
                 continue
         elif dist < tol_lo * fabs(deref(ds)):
             # logger.debug("Coarsening ds: {0} -> {1}".format(
             #     deref(ds), fac_coarsen * deref(ds)))
-            ds[0] = real_min(fac_coarsen * deref(ds), largest_step)
+            ds[0] = _c_coarsen(deref(ds), fac_coarsen, largest_step)
             break
         else:
             break
@@ -215,6 +270,108 @@ cdef int _c_euler1a(FusedField fld, real_t x[3], real_t *ds,
     x[2] = x1[2]
     return 0
 
+cdef int _c_rk45(FusedField fld, real_t x[3], real_t *ds,
+                 real_t tol_lo, real_t tol_hi,
+                 real_t fac_refine, real_t fac_coarsen,
+                 real_t smallest_step, real_t largest_step,
+                 real_t vscale[3]) nogil except -1:
+    """Runge-Kutta-Fehlberg 4(5) with adaptive step; the step is
+    advanced using the 5th order solution
+    """
+    return _c_embedded_rk45(fld, x, ds, tol_lo, tol_hi, fac_refine,
+                            fac_coarsen, smallest_step, largest_step,
+                            vscale, 6, _RKF45_A, _RKF45_B, _RKF45_E)
+
+cdef int _c_dp45(FusedField fld, real_t x[3], real_t *ds,
+                 real_t tol_lo, real_t tol_hi,
+                 real_t fac_refine, real_t fac_coarsen,
+                 real_t smallest_step, real_t largest_step,
+                 real_t vscale[3]) nogil except -1:
+    """Dormand-Prince 5(4) with adaptive step"""
+    return _c_embedded_rk45(fld, x, ds, tol_lo, tol_hi, fac_refine,
+                            fac_coarsen, smallest_step, largest_step,
+                            vscale, 7, _DP45_A, _DP45_B, _DP45_E)
+
+cdef inline int _c_unit_v(FusedField fld, real_t x[3], real_t vscale[3],
+                          real_t v[3]) nogil:
+    """Fill v with the unit vector of fld at x, returns 1 if |v| == 0"""
+    cdef real_t vmag
+    _c_interp_trilin_vec[FusedField, real_t](fld, x, v, 3)
+    v[0] *= vscale[0]
+    v[1] *= vscale[1]
+    v[2] *= vscale[2]
+    vmag = sqrt(v[0]**2 + v[1]**2 + v[2]**2)
+    if vmag == 0.0 or isnan(vmag):
+        return 1
+    v[0] /= vmag
+    v[1] /= vmag
+    v[2] /= vmag
+    return 0
+
+cdef inline int _c_embedded_rk45(FusedField fld, real_t x[3], real_t *ds,
+                                 real_t tol_lo, real_t tol_hi,
+                                 real_t fac_refine, real_t fac_coarsen,
+                                 real_t smallest_step, real_t largest_step,
+                                 real_t vscale[3], int nstages,
+                                 double *a, double *b, double *e) nogil:
+    """Take one step of an embedded Runge-Kutta 4(5) pair
+
+    The local error estimate is |ds * sum(e[i] * k[i])|. A step is
+    rejected and retried with a smaller ds if the error is larger than
+    tol_hi * |ds|. The new step scales the old one by the usual
+    0.9 * (tol / err)**(1/4), limited to fac_refine / fac_coarsen.
+    ds only grows if the error is less than tol_lo * |ds|.
+    """
+    cdef real_t k[7][3]
+    cdef real_t xt[3]
+    cdef real_t x5[3]
+    cdef real_t err[3]
+    cdef real_t h, dist, tol, fac
+    cdef int i, j, d
+
+    while True:
+        h = deref(ds)
+
+        for i in range(nstages):
+            for d in range(3):
+                xt[d] = x[d]
+                for j in range(i):
+                    xt[d] += h * a[7 * i + j] * k[j][d]
+            if _c_unit_v(fld, xt, vscale, k[i]):
+                return 1
+
+        for d in range(3):
+            x5[d] = x[d]
+            err[d] = 0.0
+            for i in range(nstages):
+                x5[d] += h * b[i] * k[i][d]
+                err[d] += h * e[i] * k[i][d]
+        dist = sqrt(err[0]**2 + err[1]**2 + err[2]**2)
+        tol = tol_hi * fabs(h)
+
+        if dist > tol:
+            if fabs(h) <= smallest_step:
+                break
+            fac = real_max(<real_t>(0.9 * pow(tol / dist, 0.25)), fac_refine)
+            ds[0] = _c_refine(h, fac, smallest_step)
+            continue
+        elif dist < tol_lo * fabs(h):
+            if dist > 0.0:
+                fac = real_min(<real_t>(0.9 * pow(tol / dist, 0.25)),
+                               fac_coarsen)
+            else:
+                fac = fac_coarsen
+            if fac > 1.0:
+                ds[0] = _c_coarsen(h, fac, largest_step)
+            break
+        else:
+            break
+
+    x[0] = x5[0]
+    x[1] = x5[1]
+    x[2] = x5[2]
+    return 0
+
 ##
 ## EOF
 ##
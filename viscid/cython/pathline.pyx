@@ -0,0 +1,262 @@
+# cython: boundscheck=False, wraparound=False, cdivision=True, profile=False
+"""Push tracers / test particles through time dependent fields
+
+Fields are only known at snapshots, so between two snapshots at times
+`t0` and `t1`, the field at a point is the trilinear interpolation in
+space of each snapshot, linearly interpolated in time. All tracers are
+pushed in one call without the GIL, so the next snapshot can be read
+in another thread while this one is being used.
+
+Tracers that leave the domain of either snapshot stop where they last
+were, and are marked as dead in the `alive` mask.
+"""
+
+from __future__ import print_function
+
+import numpy as np
+
+cimport numpy as cnp
+
+from viscid.cython.cyfield cimport CyField, FusedField, make_cyfield
+from viscid.cython.cycalc cimport _c_interp_trilin_vec
+
+
+def _as_cyfields(vfields, nr_comps=3):
+    """Wrap some Fields as CyFields that all have the same type"""
+    for vfield in vfields:
+        if vfield.nr_patches > 1:
+            raise ValueError("Pushing tracers through AMR fields isn't "
+                             "supported")
+        if vfield.nr_comps != nr_comps:
+            raise ValueError("{0} must have {1} components"
+                             "".format(vfield.name, nr_comps))
+    # fused functions need all their fields to be the same specialization
+    dtype = np.result_type(*[vfield.dtype for vfield in vfields])
+    if dtype.kind != 'f':
+        dtype = np.dtype('f8')
+    return [make_cyfield(vfield.astype(dtype)) for vfield in vfields]
+
+def _prepare(x, alive, t0, t1, t_start, t_end, nr_steps):
+    x = np.array(x, dtype='f8', order='C', copy=True)
+    if x.ndim != 2 or x.shape[0] != 3:
+        raise ValueError("positions should be shaped (3, n)")
+    x = np.ascontiguousarray(x.T)
+    if alive is None:
+        alive = np.ones((x.shape[0],), dtype='i4')
+    else:
+        alive = np.array(alive, dtype='i4', copy=True)
+    if t_start is None:
+        t_start = t0
+    if t_end is None:
+        t_end = t1
+    nr_steps = max(int(nr_steps), 1)
+    return x, alive, t_start, t_end, nr_steps
+
+def advect_tracers(v0, v1, x, t0, t1, t_start=None, t_end=None, nr_steps=8,
+                   speed_scale=1.0, alive=None):
+    """Advect tracers with velocity v from time t_start to t_end
+
+    Velocity is linear in time between `v0` at `t0` and `v1` at `t1`,
+    and tracers are integrated with fixed step RK4.
+
+    Parameters:
+        v0 (VectorField): velocity at t0
+        v1 (VectorField): velocity at t1
+        x (ndarray): positions shaped (3, n)
+        t0 (float): time of v0
+        t1 (float): time of v1
+        t_start (float): time of x, defaults to t0
+        t_end (float): push x to this time, defaults to t1
+        nr_steps (int): number of RK4 steps from t_start to t_end
+        speed_scale (float): speed_scale * v should be in units of
+            x / t
+        alive (ndarray): 1 for tracers to push, 0 to leave alone
+
+    Returns:
+        (x, alive) at t_end, as new arrays shaped like the inputs
+    """
+    fld0, fld1 = _as_cyfields([v0, v1])
+    x, alive, t_start, t_end, nr_steps = _prepare(x, alive, t0, t1,
+                                                  t_start, t_end, nr_steps)
+    _py_advect_tracers(fld0, fld1, x, alive, t0, t1, t_start, t_end,
+                       nr_steps, speed_scale)
+    return x.T.copy(), alive
+
+def push_particles(e0, e1, b0, b1, x, v, t0, t1, q_m=1.0, t_start=None,
+                   t_end=None, nr_steps=8, alive=None):
+    """Push charged test particles through E and B with Boris's method
+
+    The fields are linear in time between snapshots at `t0` and `t1`,
+    and the push is the usual half drift / Boris kick / half drift,
+    which is 2nd order and keeps |v| exact when E = 0.
+
+    Parameters:
+        e0, e1 (VectorField): electric field at t0, t1
+        b0, b1 (VectorField): magnetic field at t0, t1
+        x (ndarray): positions shaped (3, n)
+        v (ndarray): velocities shaped (3, n)
+        t0 (float): time of e0 and b0
+        t1 (float): time of e1 and b1
+        q_m (float): charge to mass ratio, with whatever factors make
+            dv / dt = q_m * (E + v x B) in the units of the fields
+        t_start (float): time of x and v, defaults to t0
+        t_end (float): push to this time, defaults to t1
+        nr_steps (int): number of steps from t_start to t_end, the step
+            should be small compared to the gyro period
+        alive (ndarray): 1 for particles to push, 0 to leave alone
+
+    Returns:
+        (x, v, alive) at t_end, as new arrays shaped like the inputs
+    """
+    flds = _as_cyfields([e0, e1, b0, b1])
+    x, alive, t_start, t_end, nr_steps = _prepare(x, alive, t0, t1,
+                                                  t_start, t_end, nr_steps)
+    v = np.array(v, dtype='f8', copy=True)
+    if v.shape != (3, x.shape[0]):
+        raise ValueError("velocities should be shaped like positions")
+    v = np.ascontiguousarray(v.T)
+    _py_push_boris(flds[0], flds[1], flds[2], flds[3], x, v, alive, t0, t1,
+                   t_start, t_end, nr_steps, q_m)
+    return x.T.copy(), v.T.copy(), alive
+
+cdef inline int _c_inside(FusedField fld, double x[3]) nogil:
+    cdef int d
+    for d in range(3):
+        if fld.n[d] > 1 and (x[d] < fld.xl[d] or x[d] > fld.xh[d]):
+            return 0
+    return 1
+
+cdef inline int _c_interp_t(FusedField fld0, FusedField fld1, double frac,
+                            double x[3], double out[3]) nogil:
+    """Field at x, a fraction frac of the way from fld0 to fld1"""
+    cdef double u0[3]
+    cdef double u1[3]
+    cdef int d
+
+    if not (_c_inside(fld0, x) and _c_inside(fld1, x)):
+        return 1
+    _c_interp_trilin_vec[FusedField, double](fld0, x, u0, 3)
+    _c_interp_trilin_vec[FusedField, double](fld1, x, u1, 3)
+    for d in range(3):
+        out[d] = u0[d] + frac * (u1[d] - u0[d])
+    return 0
+
+def _py_advect_tracers(FusedField fld0, FusedField fld1, double[:, ::1] xarr,
+                       int[::1] alive, double t0, double t1, double t_start,
+                       double t_end, int nr_steps, double speed_scale):
+    cdef int i, j, d
+    cdef int n = xarr.shape[0]
+    cdef double h = (t_end - t_start) / nr_steps
+    cdef double inv_span = 0.0
+    cdef double t, f0, fh, f1
+    cdef double x[3]
+    cdef double xt[3]
+    cdef double k1[3]
+    cdef double k2[3]
+    cdef double k3[3]
+    cdef double k4[3]
+
+    if t1 != t0:
+        inv_span = 1.0 / (t1 - t0)
+
+    with nogil:
+        for i in range(n):
+            if not alive[i]:
+                continue
+            for d in range(3):
+                x[d] = xarr[i, d]
+            t = t_start
+            for j in range(nr_steps):
+                f0 = (t - t0) * inv_span
+                fh = (t + 0.5 * h - t0) * inv_span
+                f1 = (t + h - t0) * inv_span
+                if _c_interp_t(fld0, fld1, f0, x, k1):
+                    alive[i] = 0
+                    break
+                for d in range(3):
+                    xt[d] = x[d] + 0.5 * h * speed_scale * k1[d]
+                if _c_interp_t(fld0, fld1, fh, xt, k2):
+                    alive[i] = 0
+                    break
+                for d in range(3):
+                    xt[d] = x[d] + 0.5 * h * speed_scale * k2[d]
+                if _c_interp_t(fld0, fld1, fh, xt, k3):
+                    alive[i] = 0
+                    break
+                for d in range(3):
+                    xt[d] = x[d] + h * speed_scale * k3[d]
+                if _c_interp_t(fld0, fld1, f1, xt, k4):
+                    alive[i] = 0
+                    break
+                for d in range(3):
+                    x[d] += (h * speed_scale / 6.0) * (k1[d] + 2.0 * k2[d] +
+                                                       2.0 * k3[d] + k4[d])
+                t += h
+            for d in range(3):
+                xarr[i, d] = x[d]
+
+def _py_push_boris(FusedField e0, FusedField e1, FusedField b0,
+                   FusedField b1, double[:, ::1] xarr, double[:, ::1] varr,
+                   int[::1] alive, double t0, double t1, double t_start,
+                   double t_end, int nr_steps, double q_m):
+    cdef int i, j, d
+    cdef int n = xarr.shape[0]
+    cdef double h = (t_end - t_start) / nr_steps
+    cdef double qmh = 0.5 * q_m * h
+    cdef double inv_span = 0.0
+    cdef double t, frac, tsq
+    cdef double x[3]
+    cdef double v[3]
+    cdef double E[3]
+    cdef double B[3]
+    cdef double vm[3]
+    cdef double vp[3]
+    cdef double tv[3]
+    cdef double sv[3]
+
+    if t1 != t0:
+        inv_span = 1.0 / (t1 - t0)
+
+    with nogil:
+        for i in range(n):
+            if not alive[i]:
+                continue
+            for d in range(3):
+                x[d] = xarr[i, d]
+                v[d] = varr[i, d]
+            t = t_start
+            for j in range(nr_steps):
+                # half drift, the fields are sampled at the half step
+                for d in range(3):
+                    x[d] += 0.5 * h * v[d]
+                frac = (t + 0.5 * h - t0) * inv_span
+                if (_c_interp_t(e0, e1, frac, x, E) or
+                    _c_interp_t(b0, b1, frac, x, B)):
+                    for d in range(3):
+                        x[d] -= 0.5 * h * v[d]
+                    alive[i] = 0
+                    break
+                # half kick from E, rotate around B, other half kick
+                for d in range(3):
+                    vm[d] = v[d] + qmh * E[d]
+                    tv[d] = qmh * B[d]
+                tsq = tv[0]**2 + tv[1]**2 + tv[2]**2
+                for d in range(3):
+                    sv[d] = 2.0 * tv[d] / (1.0 + tsq)
+                vp[0] = vm[0] + vm[1] * tv[2] - vm[2] * tv[1]
+                vp[1] = vm[1] + vm[2] * tv[0] - vm[0] * tv[2]
+                vp[2] = vm[2] + vm[0] * tv[1] - vm[1] * tv[0]
+                v[0] = vm[0] + vp[1] * sv[2] - vp[2] * sv[1] + qmh * E[0]
+                v[1] = vm[1] + vp[2] * sv[0] - vp[0] * sv[2] + qmh * E[1]
+                v[2] = vm[2] + vp[0] * sv[1] - vp[1] * sv[0] + qmh * E[2]
+                # second half drift
+                for d in range(3):
+                    x[d] += 0.5 * h * v[d]
+                t += h
+            for d in range(3):
+                xarr[i, d] = x[d]
+                varr[i, d] = v[d]
+
+##
+## EOF
+##
@@ -0,0 +1,180 @@
+# cython: boundscheck=False, wraparound=False, cdivision=True, profile=False
+"""Copy arrays between memory layouts in one cache blocked pass
+
+Fields are stored as zyx or xyz, flat or interlaced, and sometimes
+reflected with some components negated (like OpenGGCM's mhd -> gse
+transform). Numpy can express all of that as a view of the source
+array, so loading a field is just copying that view into a new C
+contiguous array. :py:func:`relayout` does that copy in tiles so both
+the source and destination are read / written in cache sized pieces,
+scales components on the way, and uses threads for big arrays.
+
+Attributes:
+    nr_threads (int): max number of threads, None means use
+        `multiprocessing.cpu_count()`
+    min_parallel_nbytes (int): arrays smaller than this are copied
+        in the calling thread
+
+These attributes can be set from `~/.viscidrc`, for instance
+``cython.relayout.nr_threads: 4``.
+"""
+
+from __future__ import print_function
+import multiprocessing as mp
+
+import numpy as np
+
+from viscid import parallel
+
+cimport numpy as cnp
+
+
+nr_threads = None
+min_parallel_nbytes = 32 * 1024**2
+
+# edge length of the 2d tiles in the fastest two axes
+cdef Py_ssize_t _BLOCK = 32
+
+ctypedef fused num_t:
+    cnp.float32_t
+    cnp.float64_t
+    cnp.int32_t
+    cnp.int64_t
+
+_SUPPORTED = [np.dtype(t) for t in ('f4', 'f8', 'i4', 'i8')]
+
+
+def relayout(src, dst, comp_axis=None, comp_scale=None, threads=None):
+    """Copy src into dst, which can have completely different strides
+
+    Parameters:
+        src (ndarray): any view with the same shape as dst, like a
+            transposed or reversed array
+        dst (ndarray): where to put the data
+        comp_axis (int): axis of dst that `comp_scale` goes along
+        comp_scale (sequence): multiply dst[..., i, ...] by
+            comp_scale[i] where i is the index along comp_axis; if
+            comp_axis is None, this should have one value that
+            multiplies everything
+        threads (int): max number of threads, defaults to
+            `nr_threads`
+
+    Returns:
+        dst
+    """
+    src = np.asarray(src)
+    if src.shape != dst.shape:
+        raise ValueError("relayout needs src and dst to have the same "
+                         "shape, not {0} and {1}".format(src.shape,
+                                                         dst.shape))
+    ndim = len(dst.shape)
+    if comp_scale is not None:
+        comp_scale = np.asarray(comp_scale, dtype='f8').reshape(-1)
+        if comp_axis is None and len(comp_scale) != 1:
+            raise ValueError("comp_scale needs a comp_axis")
+        if comp_axis is not None:
+            comp_axis = comp_axis % ndim
+            if len(comp_scale) != dst.shape[comp_axis]:
+                raise ValueError("comp_scale doesn't match the length of "
+                                 "comp_axis")
+        if np.all(comp_scale == 1.0):
+            comp_scale = None
+
+    if (ndim > 4 or src.dtype != dst.dtype or dst.dtype not in _SUPPORTED or
+            not dst.dtype.isnative or dst.size == 0):
+        return _np_relayout(src, dst, comp_axis, comp_scale)
+
+    # the kernel is 4d, so add length 1 axes in front
+    pad = (None, ) * (4 - ndim)
+    src4 = src[pad]
+    dst4 = dst[pad]
+    if comp_axis is not None:
+        comp_axis += 4 - ndim
+
+    # tile the fastest axes of dst and src, and split the slowest
+    # axis of dst between threads
+    d = _fastest_axis(dst4, ())
+    s = _fastest_axis(src4, (d, ))
+    outer = sorted([ax for ax in range(4) if ax not in (d, s)],
+                   key=lambda ax: -abs(dst4.strides[ax]))
+    perm = outer + [s, d]
+    src4 = np.transpose(src4, perm)
+    dst4 = np.transpose(dst4, perm)
+
+    scales = [np.ones((n, ), dtype='f8') for n in dst4.shape]
+    if comp_scale is not None:
+        if comp_axis is None:
+            scales[0] *= comp_scale[0]
+        else:
+            scales[perm.index(comp_axis)] = comp_scale
+    use_scale = 0 if comp_scale is None else 1
+
+    if threads is None:
+        threads = nr_threads
+    if threads is None:
+        threads = mp.cpu_count()
+    if dst.nbytes < min_parallel_nbytes:
+        threads = 1
+    threads = max(1, min(threads, dst4.shape[0]))
+
+    args = [(src4, dst4, scales[0], scales[1], scales[2], scales[3],
+             use_scale, start, stop)
+            for start, stop in parallel.chunk_slices(dst4.shape[0], threads)]
+    parallel.map(threads, _py_relayout, args, threads=True)
+    return dst
+
+def _fastest_axis(arr, exclude):
+    """Axis with the smallest stride that's longer than 1"""
+    axes = [ax for ax in range(arr.ndim) if ax not in exclude]
+    long_axes = [ax for ax in axes if arr.shape[ax] > 1]
+    if long_axes:
+        axes = long_axes
+    return min(axes[::-1], key=lambda ax: abs(arr.strides[ax]))
+
+def _np_relayout(src, dst, comp_axis, comp_scale):
+    """Numpy fallback for dtypes / shapes the kernel doesn't do"""
+    np.copyto(dst, src, casting='unsafe')
+    if comp_scale is not None:
+        shape = [1] * dst.ndim
+        if comp_axis is not None:
+            shape[comp_axis] = -1
+        dst *= comp_scale.reshape(shape).astype(dst.dtype)
+    return dst
+
+def _py_relayout(const num_t[:, :, :, :] src, num_t[:, :, :, :] dst,
+                 double[::1] s0, double[::1] s1, double[::1] s2,
+                 double[::1] s3, int use_scale, Py_ssize_t start,
+                 Py_ssize_t stop):
+    cdef Py_ssize_t i0, i1, j, k, jb, kb, j0, k0, jmax, kmax
+    cdef Py_ssize_t n1 = dst.shape[1]
+    cdef Py_ssize_t n2 = dst.shape[2]
+    cdef Py_ssize_t n3 = dst.shape[3]
+    cdef Py_ssize_t blk = _BLOCK
+    cdef Py_ssize_t nblk2 = (n2 + blk - 1) // blk
+    cdef Py_ssize_t nblk3 = (n3 + blk - 1) // blk
+    cdef double s01, sj
+
+    with nogil:
+        for i0 in range(start, stop):
+            for i1 in range(n1):
+                s01 = s0[i0] * s1[i1]
+                for jb in range(nblk2):
+                    j0 = jb * blk
+                    jmax = min(j0 + blk, n2)
+                    for kb in range(nblk3):
+                        k0 = kb * blk
+                        kmax = min(k0 + blk, n3)
+                        if use_scale:
+                            for j in range(j0, jmax):
+                                sj = s01 * s2[j]
+                                for k in range(k0, kmax):
+                                    dst[i0, i1, j, k] = <num_t>(
+                                        src[i0, i1, j, k] * sj * s3[k])
+                        else:
+                            for j in range(j0, jmax):
+                                for k in range(k0, kmax):
+                                    dst[i0, i1, j, k] = src[i0, i1, j, k]
+
+##
+## EOF
+##
@@ -27,27 +27,33 @@ import numpy as np
 
 import viscid
 from viscid import parallel
+from viscid import profiling
 from viscid.seed import to_seeds
 from viscid.compat import izip
 
 ###########
 # cimports
 cimport cython
-from libc.math cimport fabs
+from libc.math cimport fabs, sqrt
 cimport numpy as cnp
 
 from viscid.cython.cyfield cimport MAX_FLOAT, real_t
 from viscid.cython.cyamr cimport FusedAMRField, make_cyamrfield, activate_patch
 from viscid.cython.cyfield cimport CyField, FusedField, make_cyfield
+from viscid.cython.cycalc cimport _c_interp_trilin_vec
 from viscid.cython.integrate cimport _c_euler1, _c_rk2, _c_rk12, _c_euler1a
+from viscid.cython.integrate cimport _c_rk45, _c_dp45
 
 
 EULER1 = 1  # euler1 non-adaptive
 RK2 = 2  # rk2 non-adaptive
 RK12 = 3  # euler1 + rk2 adaptive
 EULER1A = 4  # euler 1st order adaptive
+RK45 = 5  # runge-kutta-fehlberg 4(5) adaptive
+DP45 = 6  # dormand-prince 5(4) adaptive
 METHOD = {"euler": EULER1, "euler1": EULER1, "rk2": RK2, "rk12": RK12,
-          "euler1a": EULER1A}
+          "euler1a": EULER1A, "rk45": RK45, "rkf45": RK45, "dp45": DP45,
+          "dopri5": DP45}
 
 DIR_FORWARD = 1
 DIR_BACKWARD = 2
@@ -57,6 +63,21 @@ OUTPUT_STREAMLINES = 1
 OUTPUT_TOPOLOGY = 2
 OUTPUT_BOTH = 3  # = OUTPUT_STREAMLINES | OUTPUT_TOPOLOGY
 
+# quantities that can be accumulated while tracing, these are or-ed together
+# for the `accumulate` argument; the integral / min / max flags apply to
+# every field given in `scalars`
+ACCUM_NONE = 0
+ACCUM_LENGTH = 1  # total length of the line
+ACCUM_VOLUME = 2  # flux tube volume, integral of ds / |B|
+ACCUM_ENDPOINTS = 4  # coordinates of the backward and forward end points
+ACCUM_INTEGRAL = 8  # integral of f ds for each scalar
+ACCUM_MIN = 16  # min of each scalar along the line
+ACCUM_MAX = 32  # max of each scalar along the line
+ACCUM_ALL = 63
+ACCUMULATOR = {"length": ACCUM_LENGTH, "volume": ACCUM_VOLUME,
+               "endpoints": ACCUM_ENDPOINTS, "integral": ACCUM_INTEGRAL,
+               "min": ACCUM_MIN, "max": ACCUM_MAX, "all": ACCUM_ALL}
+
 # topology will be 1+ of these flags binary or-ed together
 #                                bit #   4 2 0 8 6 4 2 0  Notes         bit
 END_NONE = 0                         # 0b000000000000000 not ended yet    X
@@ -121,6 +142,7 @@ cdef:
 # always set back to None when the streamlines are done
 # they need to be global so that the memory is shared with subprocesses
 _global_fld = None
+_global_scalars = None
 
 #####################
 # now the good stuff
@@ -152,7 +174,7 @@ def calc_streamlines(vfield, seed, nr_procs=1, force_subprocess=False,
         output (int): which output to provide, one of
             OUTPUT_STREAMLINE, OUTPUT_TOPOLOGY, or OUTPUT_BOTH
         method (int): integrator, one of EULER1, EULER1a (adaptive),
-            RK2, RK12 (adaptive)
+            RK2, RK12 (adaptive), RK45 (adaptive), DP45 (adaptive)
         tol_lo (float): lower acuracy tolerance for adaptive
             integrators. More acurate than this, ds goes up.
         tol_hi (float): upper acuracy tolerance for adaptive
@@ -164,24 +186,58 @@ def calc_streamlines(vfield, seed, nr_procs=1, force_subprocess=False,
         topo_style (str): how to map end point bitmask to a topology.
             'msphere' means map to ``TOPOLOGY_MS_*`` and 'generic'
             means leave topology as a bitmask of ``END_*``
+        accumulate (int, str, list): quantities to calculate on the fly
+            while tracing. Either a bitmask of ``ACCUM_*`` values, or
+            a list of keys in ``ACCUMULATOR``. Without `scalars`,
+            'all' leaves out the scalar accumulators
+        scalars (dict, list): scalar fields used for the ``ACCUM_INTEGRAL``,
+            ``ACCUM_MIN`` and ``ACCUM_MAX`` accumulators, either a
+            list of fields or a dict of {name: field}. They all must
+            share the same coordinates, but not necessarily the same
+            coordinates as `vfield`.
 
     Returns:
-        (lines, topo), either can be ``None`` depending on ``output``
+        (lines, topo), either can be ``None`` depending on ``output``.
+        If `accumulate` is given, then (lines, topo, quantities).
 
         * `lines`: list of nr_streams ndarrays, each ndarray has shape
           (3, nr_points_in_stream). The nr_points_in_stream can be
           different for each line
         * `topo`: ndarray with shape (nr_streams,) of topology
           bitmask with values depending on the topo_style
+        * `quantities`: dict of ndarrays with a leading nr_streams
+          dimension. Keys are 'length', 'volume', 'endpoints' (shaped
+          (nr_streams, 2, 3) for the backward and forward ends), and
+          'integral_{name}', 'min_{name}', 'max_{name}' for each of
+          the `scalars`
+
+    Note:
+        The accumulators are evaluated inside the integration loop,
+        so using them with ``output=OUTPUT_TOPOLOGY`` gives line
+        quantities without ever storing the line vertices.
     """
     # if not fld.layout == field.LAYOUT_INTERLACED:
-    #     raise ValueError("Streamlines only written for interlaced data.")
+    #     raise ValueError("Streamlines are only written for interlaced data.")
     if vfield.nr_sdims != 3 or vfield.nr_comps != 3:
         raise ValueError("Streamlines are only written in 3D.")
 
+    accumulate = kwargs.pop("accumulate", None)
+    scalars = kwargs.pop("scalars", None)
+    if accumulate is None:
+        accum_mask = ACCUM_NONE
+    else:
+        accum_mask = _parse_accumulate(accumulate, bool(scalars))
+    if accum_mask & (ACCUM_INTEGRAL | ACCUM_MIN | ACCUM_MAX) and not scalars:
+        raise ValueError("The integral, min and max accumulators need "
+                         "scalar fields, give them with scalars=...")
+    scalar_names, scalar_fld = _prepare_scalars(vfield, scalars, accum_mask)
+    accum_layout = _accumulator_layout(accum_mask, scalar_names)
+    kwargs["accumulate"] = accum_mask
+
     # fld = make_cyfield(vfield)
     # fld = make_cyfield(vfield.as_cell_centered())
-    fld = make_cyamrfield(vfield)
+    with profiling.timer("streamline.setup"):
+        fld = make_cyamrfield(vfield)
 
     seed = to_seeds(seed)
 
@@ -195,15 +251,21 @@ def calc_streamlines(vfield, seed, nr_procs=1, force_subprocess=False,
     # seed_slices = parallel.chunk_slices(nr_streams, nr_chunks)  # contiguous chunks
     chunk_sizes = parallel.chunk_sizes(nr_streams, nr_chunks)
 
-    global _global_fld
+    global _global_fld, _global_scalars
     if _global_fld is not None:
         raise RuntimeError("Another process is doing streamlines in this "
                            "global memory space")
     _global_fld = fld
+    _global_scalars = scalar_fld
     grid_iter = izip(chunk_sizes, repeat(seed), seed_slices)
-    r = parallel.map(nr_procs, _do_streamline_star, grid_iter, args_kw=kwargs,
-                     threads=threads, force_subprocess=force_subprocess)
-    _global_fld = None
+    try:
+        with profiling.timer("streamline.calc"):
+            r = parallel.map(nr_procs, _do_streamline_star, grid_iter,
+                             args_kw=kwargs, threads=threads,
+                             force_subprocess=force_subprocess)
+    finally:
+        _global_fld = None
+        _global_scalars = None
 
     # rearrange the output to be the exact same as if we just called
     # _py_streamline straight up (like for nr_procs == 1)
@@ -221,11 +283,97 @@ def calc_streamlines(vfield, seed, nr_procs=1, force_subprocess=False,
     else:
         topo = None
 
-    return lines, topo
+    if accumulate is None:
+        return lines, topo
+
+    accum = np.empty((nr_streams, r[0][2].shape[1]), dtype=r[0][2].dtype)
+    for i in range(nr_chunks):
+        accum[slice(*seed_slices[i])] = r[i][2]
+    quantities = {}
+    for name, start, stop in accum_layout:
+        if name == "endpoints":
+            quantities[name] = accum[:, start:stop].reshape(-1, 2, 3)
+        else:
+            quantities[name] = accum[:, start]
+    return lines, topo, quantities
 
 # for legacy code
 streamlines = calc_streamlines
 
+def _parse_accumulate(accumulate, has_scalars=True):
+    """Turn an int, str, or list of those into an ACCUM_* bitmask
+
+    Without scalars, 'all' (or ACCUM_ALL) means all the accumulators
+    that don't need scalars.
+    """
+    if not isinstance(accumulate, (list, tuple)):
+        accumulate = [accumulate]
+    mask = ACCUM_NONE
+    for acc in accumulate:
+        try:
+            acc_mask = ACCUMULATOR[acc.lower()]
+        except AttributeError:
+            acc_mask = int(acc)
+        except KeyError:
+            raise ValueError("Unknown accumulator '{0}', valid values are {1}"
+                             "".format(acc, list(ACCUMULATOR.keys())))
+        if acc_mask == ACCUM_ALL and not has_scalars:
+            acc_mask &= ~(ACCUM_INTEGRAL | ACCUM_MIN | ACCUM_MAX)
+        mask |= acc_mask
+    return mask
+
+def _prepare_scalars(vfield, scalars, accum_mask):
+    """Stack scalar fields into one interlaced field for the tracer
+
+    Returns:
+        (names, stacked_fld) where stacked_fld is a CyField with one
+        component per scalar, or None if no scalars are needed
+    """
+    if not scalars or not accum_mask & (ACCUM_INTEGRAL | ACCUM_MIN | ACCUM_MAX):
+        return [], None
+
+    if isinstance(scalars, dict):
+        names, flds = list(scalars.keys()), list(scalars.values())
+    else:
+        if not isinstance(scalars, (list, tuple)):
+            scalars = [scalars]
+        names, flds = [f.name for f in scalars], list(scalars)
+
+    if any(f.nr_patches > 1 for f in flds):
+        raise NotImplementedError("accumulating AMR scalars is not "
+                                  "implemented")
+
+    # the stacked field must have the same dtype as vfield so that it
+    # gets the same fused specialization as the active patch
+    dtype = np.dtype(vfield.dtype)
+    dat = np.empty(flds[0].sshape + [len(flds)], dtype=dtype)
+    for i, f in enumerate(flds):
+        dat[..., i] = f.data
+    stacked = viscid.wrap_field(dat, flds[0].crds, name="scalars",
+                                fldtype="vector", center=flds[0].center)
+    return names, make_cyfield(stacked)
+
+def _accumulator_layout(int accum_mask, scalar_names):
+    """Columns of the accumulator array as a list of (name, start, stop)"""
+    layout = []
+    col = 0
+    if accum_mask & ACCUM_LENGTH:
+        layout.append(("length", col, col + 1))
+        col += 1
+    if accum_mask & ACCUM_VOLUME:
+        layout.append(("volume", col, col + 1))
+        col += 1
+    if accum_mask & ACCUM_ENDPOINTS:
+        layout.append(("endpoints", col, col + 6))
+        col += 6
+    for flag, prefix in [(ACCUM_INTEGRAL, "integral"), (ACCUM_MIN, "min"),
+                         (ACCUM_MAX, "max")]:
+        if accum_mask & flag:
+            for name in scalar_names:
+                layout.append(("{0}_{1}".format(prefix, name), col, col + 1))
+                col += 1
+    return layout
+
 @cython.wraparound(True)
 def _do_streamline_star(*args, **kwargs):
     """Wrapper for running in parallel using :py:module`Viscid.parallel`'s
@@ -233,6 +381,7 @@ def _do_streamline_star(*args, **kwargs):
     """
     # print("_global_fld type::", type(_global_fld))
     gfld = _global_fld
+    kwargs["scalar_fld"] = _global_scalars
     return _streamline_fused_wrapper(gfld, *args, **kwargs)
 
 def _streamline_fused_wrapper(FusedAMRField fld, int nr_streams, seed,
@@ -257,7 +406,8 @@ def _py_streamline(FusedAMRField amrfld, FusedField active_patch,
                    real_t tol_lo=1e-3, real_t tol_hi=1e-2,
                    real_t fac_refine=0.5, real_t fac_coarsen=1.25,
                    real_t smallest_step=1e-4, real_t largest_step=1e2,
-                   str topo_style="msphere"):
+                   str topo_style="msphere", int accumulate=ACCUM_NONE,
+                   FusedField scalar_fld=None):
     r""" Start calculating a streamline at x0
 
     Args:
@@ -268,6 +418,10 @@ def _py_streamline(FusedAMRField amrfld, FusedField active_patch,
         seed: can be a Seeds instance or a Coordinates instance, or
             anything that exposes an iter_points method
         seed_slice (tuple): arguments for slice, (start, stop, [step])
+        accumulate (int): bitmask of ACCUM_* quantities
+        scalar_fld (FusedField): stacked scalars for the ACCUM_INTEGRAL,
+            ACCUM_MIN and ACCUM_MAX accumulators; it has the same ctype
+            as active_patch
 
 
     See Also:
@@ -282,6 +436,8 @@ def _py_streamline(FusedAMRField amrfld, FusedField active_patch,
           different for each line
         * `topo`: ndarray with shape (nr_streams,) of topology
           bitmask with values depending on the topo_style
+        * `accum`: ndarray with shape (nr_streams, nr_columns), only
+          returned if accumulate != ACCUM_NONE
     """
     cdef:
         # cdefed versions of arguments
@@ -302,6 +458,8 @@ def _py_streamline(FusedAMRField amrfld, FusedField active_patch,
         int i_stream
         int nprogress = max(nr_streams / 50, 1)  # progeress at every 5%
         int nr_segs = 0
+        int nr_patch_switches = 0
+        int prev_patch
 
         int ret  # return status of euler integrate
         int end_flags
@@ -322,11 +480,30 @@ def _py_streamline(FusedAMRField amrfld, FusedField active_patch,
         real_t[:,:,::1] line_mv = None
         real_t[:] dx
 
+        # on-the-fly accumulators
+        int k
+        int nr_scalars = 0
+        int need_bmag, need_scalars
+        int col_length = -1
+        int col_volume = -1
+        int col_end = -1
+        int col_int = -1
+        int col_min = -1
+        int col_max = -1
+        real_t seg_length
+        real_t s_prev[3]
+        real_t bmag_seed, bmag0, bmag1
+        real_t[:, ::1] accum_mv = None
+        real_t[:] f_seed = None
+        real_t[:] f0 = None
+        real_t[:] f1 = None
+
     _dir_d[:] = [-1, 1]
 
     lines = None
     line_ndarr = None
     topology_ndarr = None
+    accum_ndarr = None
 
     # set up ds0 and c_obound from the limits of fld if they're not already
     # given
@@ -369,6 +546,10 @@ def _py_streamline(FusedAMRField amrfld, FusedField active_patch,
         integrate_func = _c_rk12[FusedField, real_t]
     elif method == EULER1A:
         integrate_func = _c_euler1a[FusedField, real_t]
+    elif method == RK45:
+        integrate_func = _c_rk45[FusedField, real_t]
+    elif method == DP45:
+        integrate_func = _c_dp45[FusedField, real_t]
     else:
         raise ValueError("unknown integration method")
 
@@ -388,6 +569,36 @@ def _py_streamline(FusedAMRField amrfld, FusedField active_patch,
         topology_ndarr = np.empty((nr_streams,), dtype="i")
         topology_mv = topology_ndarr
 
+    if accumulate != ACCUM_NONE:
+        if scalar_fld is not None:
+            nr_scalars = scalar_fld.data.shape[3]
+        accum_layout = _accumulator_layout(accumulate, range(nr_scalars))
+        for name, start, _ in accum_layout:
+            if name == "length":
+                col_length = start
+            elif name == "volume":
+                col_volume = start
+            elif name == "endpoints":
+                col_end = start
+            elif name == "integral_0":
+                col_int = start
+            elif name == "min_0":
+                col_min = start
+            elif name == "max_0":
+                col_max = start
+        # an empty layout (scalar accumulators without scalars) gets no
+        # columns, and nothing is accumulated in the loop
+        accum_ndarr = np.zeros((nr_streams, accum_layout[-1][2] if accum_layout
+                                else 0), dtype=amrfld.crd_dtype)
+        if accum_layout:
+            accum_mv = accum_ndarr
+        f_seed = np.empty((max(nr_scalars, 1),), dtype=amrfld.crd_dtype)
+        f0 = np.empty_like(f_seed)
+        f1 = np.empty_like(f_seed)
+    need_bmag = col_volume >= 0
+    need_scalars = nr_scalars > 0 and (col_int >= 0 or col_min >= 0 or
+                                       col_max >= 0)
+
     # first one is for timing, second for status
     t0_all = time()
     t0 = time()
@@ -415,6 +626,22 @@ def _py_streamline(FusedAMRField amrfld, FusedField active_patch,
         line_ends[1] = 0
         end_flags = _C_END_NONE
 
+        if accum_mv is not None:
+            if need_bmag:
+                activate_patch[FusedAMRField, real_t](amrfld, x0)
+                bmag_seed = _c_vmag(amrfld.active_patch, x0)
+            if need_scalars:
+                _c_interp_trilin_vec[FusedField, real_t](scalar_fld, x0,
+                                                         &f_seed[0], nr_scalars)
+                for k in range(nr_scalars):
+                    if col_min >= 0:
+                        accum_mv[i_stream, col_min + k] = f_seed[k]
+                    if col_max >= 0:
+                        accum_mv[i_stream, col_max + k] = f_seed[k]
+            if col_end >= 0:
+                for k in range(6):
+                    accum_mv[i_stream, col_end + k] = x0[k % 3]
+
         for i in range(2):
             d = _dir_d[i]
             # i = 0, d = -1, backward ;; i = 1, d = 1, foreward
@@ -432,6 +659,14 @@ def _py_streamline(FusedAMRField amrfld, FusedField active_patch,
 
             it = line_ends[i]
 
+            if accum_mv is not None:
+                s_prev[0] = x0[0]
+                s_prev[1] = x0[1]
+                s_prev[2] = x0[2]
+                bmag0 = bmag_seed
+                for k in range(nr_scalars):
+                    f0[k] = f_seed[k]
+
             done = _C_END_NONE
             while 0 <= it and it < maxit:
                 nr_segs += 1
@@ -439,7 +674,10 @@ def _py_streamline(FusedAMRField amrfld, FusedField active_patch,
 
                 # this if statement appears to give no speedup
                 # if amrfld.nr_patches > 1:
+                prev_patch = amrfld.active_patch_index
                 activate_patch[FusedAMRField, real_t](amrfld, s)
+                if amrfld.active_patch_index != prev_patch:
+                    nr_patch_switches += 1
                 ret = integrate_func(amrfld.active_patch, s, &ds,
                                      tol_lo, tol_hi, fac_refine , fac_coarsen,
                                      smallest_step, largest_step, vscale)
@@ -456,6 +694,38 @@ def _py_streamline(FusedAMRField amrfld, FusedField active_patch,
                     done = _C_END_ZERO_LENGTH
                     break
 
+                # accumulate line quantities using the trapezoid rule; the
+                # segment length is the actual distance moved since
+                # adaptive integrators can change ds after taking a step
+                if accum_mv is not None:
+                    seg_length = sqrt((s[0] - s_prev[0])**2 +
+                                      (s[1] - s_prev[1])**2 +
+                                      (s[2] - s_prev[2])**2)
+                    s_prev[0] = s[0]
+                    s_prev[1] = s[1]
+                    s_prev[2] = s[2]
+                    if col_length >= 0:
+                        accum_mv[i_stream, col_length] += seg_length
+                    if need_bmag:
+                        activate_patch[FusedAMRField, real_t](amrfld, s)
+                        bmag1 = _c_vmag(amrfld.active_patch, s)
+                        accum_mv[i_stream, col_volume] += (0.5 * seg_length *
+                                                           (1.0 / bmag0 +
+                                                            1.0 / bmag1))
+                        bmag0 = bmag1
+                    if need_scalars:
+                        _c_interp_trilin_vec[FusedField, real_t](scalar_fld, s,
+                                                                 &f1[0], nr_scalars)
+                        for k in range(nr_scalars):
+                            if col_int >= 0:
+                                accum_mv[i_stream, col_int + k] += (0.5 * seg_length *
+                                                                    (f0[k] + f1[k]))
+                            if col_min >= 0 and f1[k] < accum_mv[i_stream, col_min + k]:
+                                accum_mv[i_stream, col_min + k] = f1[k]
+                            if col_max >= 0 and f1[k] > accum_mv[i_stream, col_max + k]:
+                                accum_mv[i_stream, col_max + k] = f1[k]
+                            f0[k] = f1[k]
+
                 if line_mv is not None:
                     line_mv[i, 0, it] = s[0]
                     line_mv[i, 1, it] = s[1]
@@ -475,6 +745,10 @@ def _py_streamline(FusedAMRField amrfld, FusedField active_patch,
             line_ends[i] = it
             end_flags |= done
 
+            if col_end >= 0:
+                for k in range(3):
+                    accum_mv[i_stream, col_end + 3 * i + k] = s[k]
+
         # now we have forward and background traces, process this streamline
         if line_mv is not None:
             # if i_stream == 0:
@@ -486,14 +760,27 @@ def _py_streamline(FusedAMRField amrfld, FusedField active_patch,
         if topology_mv is not None:
             topology_mv[i_stream] = end_flags_to_topology(end_flags)
 
+    if profiling.enabled:
+        profiling.count("streamline.lines", nr_streams)
+        profiling.count("streamline.segments", nr_segs)
+        profiling.count("streamline.patch_switches", nr_patch_switches)
+
     # for timing
     # t1_all = time()
     # t = t1_all - t0_all
     # print("=> in cython nr_segments: {0:.05e}".format(nr_segs))
     # print("=> in cython time: {0:.03f}s {1:.03e}s/seg".format(t, t / nr_segs))
 
+    if accum_ndarr is not None:
+        return lines, topology_ndarr, accum_ndarr
     return lines, topology_ndarr
 
+cdef inline real_t _c_vmag(FusedField fld, real_t x[3]) nogil:
+    """Magnitude of a 3 component vector field at x"""
+    cdef real_t v[3]
+    _c_interp_trilin_vec[FusedField, real_t](fld, x, v, 3)
+    return sqrt(v[0]**2 + v[1]**2 + v[2]**2)
+
 cdef inline int classify_endpoint(real_t pt[3], real_t length, real_t ibound,
                            real_t obound0[3], real_t obound1[3],
                            real_t max_length, real_t ds, real_t pt0[3]) nogil:
@@ -84,10 +84,10 @@ class Dataset(tree.Node):
                 pass
         raise RuntimeError("I find no temporal datasets")
 
-    def iter_times(self, slice_str=":"):
+    def iter_times(self, slice_str=":", prefetch=None):
         for child in self.children:
             try:
-                return child.iter_times(slice_str)
+                return child.iter_times(slice_str, prefetch=prefetch)
             except AttributeError:
                 pass
         raise RuntimeError("I find no temporal datasets")
@@ -388,16 +388,31 @@ class DatasetTemporal(Dataset):
         child_iterator = self._time_slice_to_iterator(slc)
         return len(list(child_iterator))
 
-    def iter_times(self, slice_str=":"):
+    def iter_times(self, slice_str=":", prefetch=None):
+        """Iterate over the grids in a slice of time
+
+        Parameters:
+            slice_str (str): which times, like ":" or "10.0f:20.0f"
+            prefetch (list): names of fields to start reading for the
+                next time step while the current one is in use, or True
+                for all fields; see :py:meth:`viscid.grid.Grid.prefetch`
+        """
         slc = self._slice_time(slice_str)
         child_iterator = self._time_slice_to_iterator(slc)
 
-        for child in child_iterator:
+        next_child = next(child_iterator, None)
+        while next_child is not None:
+            child, next_child = next_child, next(child_iterator, None)
             # FIXME: this isn't general, but so far the only files we're
             # read have only contained one Grid / AMRGrid. Without get_grid()
             # here, the context manager will unload the file when done, but
             # that's not what we wanted here, we wanted to just clear caches
             with child[1].get_grid() as target:
+                if prefetch and next_child is not None:
+                    names = None if prefetch is True else prefetch
+                    next_grid = next_child[1].get_grid()
+                    if hasattr(next_grid, "prefetch"):
+                        next_grid.prefetch(names)
                 yield target
 
     def get_times(self, slice_str=":"):
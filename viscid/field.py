@@ -17,9 +17,11 @@ import viscid
 from viscid import logger
 from viscid.compat import string_types, izip_longest
 from viscid import coordinate
+from viscid import profiling
+from viscid import pyramid
 from viscid import vutil
 from viscid import tree
-from viscid.cython import interp_trilin
+from viscid import reduction
 
 LAYOUT_DEFAULT = "none"  # do not translate
 LAYOUT_INTERLACED = "interlaced"
@@ -385,6 +387,11 @@ class Field(tree.Leaf):
     # set when data is retrieved
     _cache = None  # this will always be a numpy array
     _cached_xyz_src_view = None
+    # wrappers for the cython kernels, made by viscid.cython
+    _cyfield = None
+    _cyamrfield = None
+    # multi-resolution copies for plotting, made by viscid.pyramid
+    _pyramids = None
 
     def __init__(self, name, crds, data, center="Node", time=0.0, meta=None,
                  deep_meta=None, forget_source=False, pretty_name=None,
@@ -637,13 +644,18 @@ class Field(tree.Leaf):
     def crds(self, val):
         self._crds = None
         self._src_crds = val
+        self._clear_derived()
 
     @property
     def data(self):
         """ if you want to fill the cache, this will do it, note that
         to empty the cache later you can always use clear_cache """
         if self._cache is None:
+            if profiling.enabled:
+                profiling.count("field.cache_miss")
             self._fill_cache()
+        elif profiling.enabled:
+            profiling.count("field.cache_hit")
         return self._cache
     @data.setter
     def data(self, dat):
@@ -689,17 +701,44 @@ class Field(tree.Leaf):
         """ does not guarentee that the memory will be freed """
         self._cache = None
         self._cached_xyz_src_view = None
+        self._clear_derived()
         if self._parent_field is not None:
             self._parent_field._cache = self._cache
             self._parent_field._cached_xyz_src_view = self._cached_xyz_src_view
+            self._parent_field._clear_derived()
+
+    def _clear_derived(self):
+        """Forget the cython kernels' wrappers and the pyramids"""
+        self._cyfield = None
+        self._cyamrfield = None
+        self._pyramids = None
 
     def _fill_cache(self):
         """ actually load data into the cache """
-        self._cache = self._src_data_to_ndarray()
+        with profiling.timer("field.fill_cache"):
+            self._cache = self._src_data_to_ndarray()
         if self._parent_field is not None:
             self._parent_field._cache = self._cache
             # self._parent_field._cached_xyz_src_view = self._cached_xyz_src_view
 
+    def _fill_cache_from_src(self, src_data):
+        """Fill the cache using data that was already read from _src_data
+
+        Parameters:
+            src_data: what ``np.array(self._src_data)`` would give, or
+                a list of those if _src_data is a list; this is how
+                :py:meth:`viscid.grid.Grid.load_fields` hands over data
+                it read for many fields at once
+        """
+        orig_src_data = self._src_data
+        self._src_data = src_data
+        self._cached_xyz_src_view = None
+        try:
+            self._fill_cache()
+        finally:
+            self._src_data = orig_src_data
+            self._cached_xyz_src_view = None
+
     # um, what was this for? looks dangerous
     # def _translate_src_data(self):
     #     pass
@@ -735,6 +774,8 @@ class Field(tree.Leaf):
                     Tview = np.transpose(self._src_data.__array__(),
                                          spatial_transpose)
                     self._cached_xyz_src_view = np.array(Tview)
+                    if profiling.enabled:
+                        profiling.count("field.copy_bytes", Tview.nbytes)
 
             else:
                 self._cached_xyz_src_view = self._src_data
@@ -748,6 +789,11 @@ class Field(tree.Leaf):
         src_data_layout = self._detect_layout(self._src_data)
         force_layout = self.deep_meta["force_layout"]
 
+        # transposes, relayouts and sign flips in one pass if possible
+        arr = self._relayout_src_data(src_data_layout, force_layout)
+        if arr is not None:
+            return arr
+
         # we will preserve layout or we already have the correct layout,
         # do no translation
         if force_layout == LAYOUT_DEFAULT or \
@@ -766,12 +812,15 @@ class Field(tree.Leaf):
                 raise RuntimeError("I should not be here")
 
             nr_comps = self.nr_comps
-            data_dest = np.empty(self.shape, dtype=self.dtype)
-            for i in range(nr_comps):
-                # NOTE: I wonder if this is the fastest way to reorder
-                data_dest[i, ...] = self._xyz_src_data[..., i]
-                # NOTE: no special case for lists, they are not
-                # interpreted this way
+            with profiling.timer("field.relayout"):
+                data_dest = np.empty(self.shape, dtype=self.dtype)
+                for i in range(nr_comps):
+                    # NOTE: I wonder if this is the fastest way to reorder
+                    data_dest[i, ...] = self._xyz_src_data[..., i]
+                    # NOTE: no special case for lists, they are not
+                    # interpreted this way
+            if profiling.enabled:
+                profiling.count("field.copy_bytes", data_dest.nbytes)
             return self._dat_to_ndarray(data_dest)
 
         # ok, we demand INTERLACED arrays, make it so
@@ -781,9 +830,12 @@ class Field(tree.Leaf):
 
             nr_comps = self.nr_comps
             dtype = self.dtype
-            data_dest = np.empty(self.shape, dtype=dtype)
-            for i in range(nr_comps):
-                data_dest[..., i] = self._xyz_src_data[i]
+            with profiling.timer("field.relayout"):
+                data_dest = np.empty(self.shape, dtype=dtype)
+                for i in range(nr_comps):
+                    data_dest[..., i] = self._xyz_src_data[i]
+            if profiling.enabled:
+                profiling.count("field.copy_bytes", data_dest.nbytes)
 
             self._layout = LAYOUT_INTERLACED
             return self._dat_to_ndarray(data_dest)
@@ -796,6 +848,100 @@ class Field(tree.Leaf):
 
         raise RuntimeError("I should not be here")
 
+    def _relayout_src_data(self, src_data_layout, force_layout):
+        """Copy _src_data into the requested layout with one fused kernel
+
+        The zyx -> xyz transpose, flat <-> interlaced conversion and crd
+        reflections are all just views of the source data, and the
+        sign flips of post_reshape_transform_func are a scale factor per
+        component if the function has a `comp_scale` attribute. So
+        :py:func:`viscid.cython.relayout.relayout` can do everything
+        while copying the data into a new array, instead of making a
+        temporary copy at each step.
+
+        Returns:
+            ndarray, or None if the general path should be used, like
+            when there's nothing to relayout, the source is a list of
+            arrays, or the cython code isn't built
+        """
+        src = self._src_data
+        zyx_native = self.meta.get("zyx_native", False)
+        if isinstance(src, (list, tuple, np.ma.core.MaskedArray)):
+            return None
+        if src_data_layout not in (LAYOUT_SCALAR, LAYOUT_FLAT,
+                                   LAYOUT_INTERLACED):
+            return None
+        if force_layout in (LAYOUT_DEFAULT, src_data_layout):
+            dst_layout = src_data_layout
+        elif LAYOUT_SCALAR not in (src_data_layout, force_layout):
+            dst_layout = force_layout
+        else:
+            return None
+        if not zyx_native and dst_layout == src_data_layout:
+            return None
+
+        comp_scale = None
+        if self.post_reshape_transform_func is not None:
+            comp_scale = getattr(self.post_reshape_transform_func,
+                                 "comp_scale", None)
+            if comp_scale is None:
+                return None
+
+        try:
+            # imported here so that importing field doesn't load the
+            # cython code
+            from viscid.cython.relayout import relayout
+        except ImportError:
+            return None
+
+        # only do the simple cases where the shape of the source data
+        # matches the crds exactly (no length 1 dims trimmed off)
+        nr_sdims = self.nr_sdims
+        comp_axis = {LAYOUT_SCALAR: None, LAYOUT_FLAT: 0,
+                     LAYOUT_INTERLACED: nr_sdims}
+        src_comp = comp_axis[src_data_layout]
+        dst_comp = comp_axis[dst_layout]
+        src_shape = list(self.native_sshape)
+        xyz_shape = list(self.sshape)
+        if src_comp is not None:
+            nr_comps = self.nr_comps
+            src_shape.insert(src_comp, nr_comps)
+            xyz_shape.insert(dst_comp, nr_comps)
+        else:
+            nr_comps = None
+        if list(src.shape) != src_shape or xyz_shape != self.shape:
+            return None
+
+        with profiling.timer("field.relayout"):
+            if isinstance(src, np.ndarray):
+                view = src
+            else:
+                # a DataWrapper, this is where lazy data gets read
+                view = src.__array__()
+                if profiling.enabled:
+                    profiling.count("field.read_bytes", view.nbytes)
+
+            if zyx_native:
+                spatial_transpose = list(range(len(src_shape)))
+                if src_comp is not None:
+                    spatial_transpose.remove(src_comp)
+                    spatial_transpose = spatial_transpose[::-1]
+                    spatial_transpose.insert(src_comp, src_comp)
+                else:
+                    spatial_transpose = spatial_transpose[::-1]
+                view = np.transpose(view, spatial_transpose)
+            if src_comp != dst_comp:
+                view = np.moveaxis(view, src_comp, dst_comp)
+            view = self._src_crds.reflect_fld_arr(view, self.iscentered("Cell"),
+                                                  dst_comp, nr_comps)
+
+            # dtype.name is for pruning endianness out of dtype
+            arr = np.empty(self.shape, dtype=view.dtype.name)
+            relayout(view, arr, comp_axis=dst_comp, comp_scale=comp_scale)
+        if profiling.enabled:
+            profiling.count("field.copy_bytes", arr.nbytes)
+        return arr
+
     def _dat_to_ndarray(self, dat):
         """ This should be the last thing called for all data that gets put
         into the cache. It makes dimensions jive correctly. This will translate
@@ -823,6 +969,16 @@ class Field(tree.Leaf):
         else:
             arr = np.array(dat, dtype=dat.dtype.name, copy=self.deep_meta["copy"])
 
+        if profiling.enabled:
+            if isinstance(dat, np.ndarray):
+                if not np.may_share_memory(arr, dat):
+                    profiling.count("field.copy_bytes", arr.nbytes)
+            elif isinstance(dat, (list, tuple)):
+                profiling.count("field.copy_bytes", arr.nbytes)
+            else:
+                # a DataWrapper, this is where lazy data gets read
+                profiling.count("field.read_bytes", arr.nbytes)
+
         arr = self._reshape_ndarray_to_crds(arr)
         try:
             nr_comp = self.nr_comp
@@ -1238,6 +1394,9 @@ class Field(tree.Leaf):
         return self._finalize_slice(slices, crdlst, reduced, crd_type, comp_slc)
 
     def interpolated_slice(self, selection):
+        # imported here so that importing field doesn't load the cython code
+        from viscid.cython import interp_trilin
+
         seeds = self.crds.slice_interp(selection, cc=self.iscentered('cell'))
         fld_dat = interp_trilin(self, seeds)
         new_fld = self.wrap(fld_dat, context=dict(crds=seeds))
@@ -1260,6 +1419,7 @@ class Field(tree.Leaf):
         except TypeError:
             pass
         self.data[tuple(slices)] = value
+        self._clear_derived()
         return None
 
     @classmethod
@@ -1475,10 +1635,7 @@ class Field(tree.Leaf):
 
         elif self.iscentered('cell'):
             # construct new crds
-            # axes = self._src_crds.axes
-            # crds_cc = self.get_crds_cc()
-            new_clist = self._src_crds.get_clist(center="cell")
-            new_crds = type(self._src_crds)(new_clist)
+            new_crds = self._src_crds.cc_as_nc()
 
             # this is similar to a shell copy, but it's intimately
             # linked to self as a parent
@@ -1749,8 +1906,12 @@ class Field(tree.Leaf):
         return self.wrap(self.data.__ge__(self._ow(other)), other=other)
 
     def any(self, **kwargs):
+        if reduction.is_full_reduction(kwargs):
+            return reduction.chunked_reduce(self, "any")
         return self.wrap(self.data.any(**kwargs), npkwargs=kwargs)
     def all(self, **kwargs):
+        if reduction.is_full_reduction(kwargs):
+            return reduction.chunked_reduce(self, "all")
         return self.wrap(self.data.all(**kwargs), npkwargs=kwargs)
     def argmax(self, axis=None, **kwargs):
         kwargs.update(axis=axis)
@@ -1770,18 +1931,28 @@ class Field(tree.Leaf):
         kwargs.update(axis=axis, dtype=dtype, order=order)
         return self.wrap(self.data.cumsum(**kwargs), npkwargs=kwargs)
     def max(self, **kwargs):
+        if reduction.is_full_reduction(kwargs):
+            return reduction.chunked_reduce(self, "max")
         return self.wrap(self.data.max(**kwargs), npkwargs=kwargs)
     def mean(self, **kwargs):
+        if reduction.is_full_reduction(kwargs):
+            return reduction.chunked_reduce(self, "mean")
         return self.wrap(self.data.mean(**kwargs), npkwargs=kwargs)
     def min(self, **kwargs):
+        if reduction.is_full_reduction(kwargs):
+            return reduction.chunked_reduce(self, "min")
         return self.wrap(self.data.min(**kwargs), npkwargs=kwargs)
     def partition(self, **kwargs):
         return self.wrap(self.data.partition(**kwargs), npkwargs=kwargs)
     def prod(self, **kwargs):
         return self.wrap(self.data.prod(**kwargs), npkwargs=kwargs)
     def std(self, **kwargs):
+        if reduction.is_full_reduction(kwargs, allowed=("ddof",)):
+            return reduction.chunked_reduce(self, "std", ddof=kwargs.get("ddof", 0))
         return self.wrap(self.data.std(**kwargs), npkwargs=kwargs)
     def sum(self, **kwargs):
+        if reduction.is_full_reduction(kwargs):
+            return reduction.chunked_reduce(self, "sum")
         return self.wrap(self.data.sum(**kwargs), npkwargs=kwargs)
 
     @property
@@ -1822,31 +1993,15 @@ class ScalarField(Field):
     # no downsample / transpose / swap axes for vectors yet since that would
     # have the added layer of checking the layout
     def downsample(self):
-        """ downsample the spatial dimensions by a factor of 2 """
-        # FIXME: this implementation assumes a lot about the field
-        end = np.array(self.sshape) // 2
-        dat = self.data
-
-        if self.nr_sdims == 1:
-            downdat = 0.5 * (dat[:end[0]:2] + dat[1:end[0]:2])
-        elif self.nr_sdims == 2:
-            downdat = 0.25 * (dat[:end[0]:2, :end[1]:2] +
-                              dat[1:end[0]:2, :end[1]:2] +
-                              dat[:end[0]:2, 1:end[1]:2] +
-                              dat[1:end[0]:2, 1:end[1]:2])
-        elif self.nr_sdims == 3:
-            downdat = 0.125 * (dat[:end[0]:2, :end[1]:2, :end[2]:2] +
-                               dat[1:end[0]:2, :end[1]:2, :end[2]:2] +
-                               dat[:end[0]:2, 1:end[1]:2, :end[2]:2] +
-                               dat[:end[0]:2, :end[1]:2, 1:end[2]:2] +
-                               dat[1:end[0]:2, 1:end[1]:2, :end[2]:2] +
-                               dat[1:end[0]:2, :end[1]:2, 1:end[2]:2] +
-                               dat[:end[0]:2, 1:end[1]:2, 1:end[2]:2] +
-                               dat[1:end[0]:2, 1:end[1]:2, 1:end[2]:2])
-
-        downclist = self._src_crds.get_clist(np.s_[::2])
-        downcrds = coordinate.wrap_crds("nonuniform_cartesian", downclist)
-        return self.wrap(downdat, {"crds": downcrds})
+        """Halve the resolution of the spatial dimensions
+
+        Cells are merged in blocks of 2 (3 at the end of odd axes) by
+        their mean, see :py:func:`viscid.pyramid.coarsen`.
+
+        Returns:
+            a cell centered Field
+        """
+        return pyramid.coarsen(self)
 
     def transpose(self, *axes):
         """ same behavior as numpy transpose, alse accessable
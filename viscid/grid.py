@@ -4,10 +4,11 @@
 from __future__ import print_function
 
 from viscid import field
+from viscid import profiling
 from viscid.bucket import Bucket
+from viscid.compat import OrderedDict
 from viscid import tree
 from viscid.vutil import tree_prefix
-from viscid.calculator.evaluator import evaluate
 
 class Grid(tree.Node):
     """Computational grid container
@@ -113,6 +114,104 @@ class Grid(tree.Node):
         """clear the cache on all child fields"""
         for fld in self.fields:
             fld.clear_cache()
+            for src in self._field_sources(fld):
+                if hasattr(src, "drop_prefetch"):
+                    src.drop_prefetch()
+
+    def _fields_named(self, names):
+        if names is None:
+            return list(self.fields)
+        flds = []
+        for name in names:
+            try:
+                flds.append(self.fields[name])
+            except KeyError:
+                raise KeyError("field not found: {0}".format(name))
+        return flds
+
+    @staticmethod
+    def _field_sources(fld):
+        src = fld._src_data  # pylint: disable=protected-access
+        return list(src) if isinstance(src, (list, tuple)) else [src]
+
+    def load_fields(self, names=None):
+        """Read many fields at once, with as few passes over files as possible
+
+        Fields are read using their DataWrapper's ``read_many``, so
+        readers that support it (fortbin, jrrle, hdf5) open each file
+        once and read the fields in the order they're stored instead
+        of opening / seeking / closing for every field. The fields
+        stay loaded until :py:meth:`clear_cache` (or the end of a
+        ``with grid:`` block), and until then, ``grid[name]`` returns
+        the loaded field itself, so derived quantities made from these
+        fields don't read them again.
+
+        Parameters:
+            names (list): names of fields to load, defaults to all
+                fields in the grid
+
+        Returns:
+            list of the loaded fields
+        """
+        flds = self._fields_named(names)
+
+        with profiling.timer("grid.load_fields"):
+            # wrapper type -> [(field, index in field's src list, wrapper)]
+            batches = OrderedDict()
+            pending = {}
+            for fld in flds:
+                if fld.is_loaded() or id(fld) in pending:
+                    continue
+                is_list = isinstance(fld._src_data, (list, tuple))  # pylint: disable=protected-access
+                srcs = self._field_sources(fld)
+                if not all(hasattr(s, "read_many") for s in srcs):
+                    fld.data  # pylint: disable=pointless-statement
+                    continue
+                pending[id(fld)] = (is_list, [None] * len(srcs))
+                for i, s in enumerate(srcs):
+                    batches.setdefault(type(s), []).append((fld, i, s))
+
+            # fill each field's cache as soon as all its data is read
+            for wrapper_type, items in batches.items():
+                wrappers = [s for _, _, s in items]
+                for j, arr in wrapper_type.read_many(wrappers):
+                    fld, i, _ = items[j]
+                    is_list, arrs = pending[id(fld)]
+                    arrs[i] = arr
+                    if all(a is not None for a in arrs):
+                        del pending[id(fld)]
+                        # pylint: disable=protected-access
+                        fld._fill_cache_from_src(arrs if is_list else arrs[0])
+        return flds
+
+    preload = load_fields
+
+    def prefetch(self, names=None, queue=None):
+        """Start reading fields in the background and return right away
+
+        Only fields whose DataWrappers can be read by byte range (like
+        fortbin) are prefetched, see
+        :py:mod:`viscid.readers.io_backend`. The data is used the next
+        time the fields are loaded, and forgotten by
+        :py:meth:`clear_cache` if that never happens.
+
+        Parameters:
+            names (list): names of fields to prefetch, defaults to all
+                fields in the grid
+            queue (ReadQueue): defaults to the shared queue
+
+        Returns:
+            int: number of DataWrappers being prefetched
+        """
+        # imported here since readers import grid
+        from viscid.readers import vfile
+
+        wrappers = []
+        for fld in self._fields_named(names):
+            if not fld.is_loaded():
+                wrappers += [s for s in self._field_sources(fld)
+                             if hasattr(s, "byte_ranges")]
+        return vfile.prefetch(wrappers, queue=queue)
 
     def nr_times(self, *args, **kwargs): #pylint: disable=W0613,R0201
         return 1
@@ -217,6 +316,9 @@ class Grid(tree.Node):
             if hasattr(self, func):
                 ret = getattr(self, func)()
             elif len(fldname.split('=')) == 2:
+                # imported here so that importing grid doesn't load numexpr
+                from viscid.calculator.evaluator import evaluate
+
                 result_name, eqn = (s.strip() for s in fldname.split('='))
                 ret = evaluate(self, result_name, eqn, slc=slc)
                 try_final_slice = False
@@ -16,7 +16,7 @@ from itertools import count
 import numpy as np
 import matplotlib
 import matplotlib.pyplot as plt
-from matplotlib.collections import LineCollection
+from matplotlib.collections import LineCollection, QuadMesh
 from matplotlib.colors import Normalize, LogNorm
 try:
     from mpl_toolkits.basemap import Basemap  # pylint: disable=no-name-in-module
@@ -26,6 +26,7 @@ except ImportError:
 
 import viscid
 from viscid import pyeval
+from viscid import pyramid
 from viscid import logger
 from viscid.compat import izip, string_types
 from viscid import coordinate
@@ -72,10 +73,17 @@ def plot(fld, selection=":", force_cartesian=False, **kwargs):
         Field slices are done using "slice_reduce", meaning extra
         dimensions are reduced out.
 
+    Note:
+        Big fields (see :py:mod:`viscid.pyramid`) that are sliced by
+        location (like "y=0f") are plotted from the coarsest level of
+        their pyramid that still has a cell per pixel. Give
+        ``pyramid=False`` to always plot full resolution data.
+
     Raises:
         TypeError: Description
         ValueError: Description
     """
+    fld = _pyramid_level(fld, selection, kwargs)
     fld = fld.slice_reduce(selection)
 
     if not hasattr(fld, "patches"):
@@ -99,6 +107,77 @@ def plot(fld, selection=":", force_cartesian=False, **kwargs):
                          "field yourself, or use the selection keyword "
                          "argument")
 
+def _pyramid_level(fld, selection, plot_kwargs):
+    """Swap a big field for the coarsest pyramid level the axes can show
+
+    The level is worked out from the crds first, so nothing is made if
+    the field itself is the best choice. Otherwise, the pyramid is only
+    made of the plotted slice of the field.
+
+    Returns:
+        either fld or a cell centered level of the pyramid of a slice
+        of fld
+    """
+    if not plot_kwargs.pop("pyramid", True):
+        return fld
+    if (fld.nr_patches != 1 or fld.nr_comps > 0 or fld.size < pyramid.min_size
+            or fld.patches[0].is_spherical() or fld.crds.reflect_axes):
+        return fld
+
+    opts = dict(plot_kwargs)
+    plot_opts_to_kwargs(opts.pop("plot_opts", None), opts)
+    downsample = opts.get("downsample", True)
+    if (not downsample or opts.get("show_grid", opts.get("g", False)) or
+            opts.get("style", "pcolormesh") not in ["pcolormesh", "pcolor"] or
+            opts.get("latlon", None)):
+        return fld
+    if downsample is True:
+        downsample = "mean"
+
+    # the pyramid's levels have different indices, so this only works
+    # for selections by location
+    try:
+        extent = fld.get_slice_extent(selection)
+    except ValueError:
+        return fld
+    # axes the selection leaves unbounded span the whole field
+    extent = np.where(np.isfinite(extent), extent,
+                      [fld.crds.get_xl(), fld.crds.get_xh()])
+    axes = [ax for i, ax in enumerate(fld.crds.axes)
+            if extent[0, i] != extent[1, i]]
+    if len(axes) != 2:
+        return fld
+    idx = [fld.crds.axes.index(ax) for ax in axes]
+
+    # x / y limits are in modded crds, like the plot options
+    mod = opts.get("mod", None) or (1.0, 1.0)
+    xlim, ylim = opts.get("x", None), opts.get("y", None)
+    if xlim is None:
+        xlim = [mod[0] * extent[0, idx[0]], mod[0] * extent[1, idx[0]]]
+    if ylim is None:
+        ylim = [mod[1] * extent[0, idx[1]], mod[1] * extent[1, idx[1]]]
+    flip_plot = opts.get("flipplot", opts.get("flip_plot", False))
+    ax = opts.get("ax", None) or plt.gca()
+    pixel_size = _downsample_pixel_size(ax, fld, axes[0], axes[1],
+                                        xlim=xlim, ylim=ylim,
+                                        mod=opts.get("mod", None),
+                                        flip_plot=flip_plot)
+
+    clist = []
+    for i, axis in zip(idx, axes):
+        xnc = fld.crds.get_nc(axis)
+        lo = max(np.searchsorted(xnc, extent[0, i], side='right') - 1, 0)
+        hi = np.searchsorted(xnc, extent[1, i], side='left')
+        clist.append(xnc[lo:hi + 1])
+    if pyramid.predict_level(clist, pixel_size) == 0:
+        return fld
+
+    pyr = pyramid.get_pyramid(fld, selection=selection)
+    level = pyr.choose_level(pixel_size, axes=axes)
+    if level == 0:
+        return fld
+    return pyr.level(level, kind=downsample)
+
 def plot_opts_to_kwargs(plot_opts, plot_kwargs):
     """Turn plot options from string to items in plot_kwargs
 
@@ -291,17 +370,103 @@ def _apply_axfmt(ax, majorfmt=None, minorfmt=None, majorloc=None, minorloc=None,
         if minorloc:
             _axis.set_minor_locator(minorloc)
 
-def _plot2d_single(ax, fld, style, namex, namey, mod, scale,
-                   masknan, latlon, flip_plot, patchec, patchlw, patchaa,
-                   all_masked, extra_args, **kwargs):
-    """Make a 2d plot of a single patch
+def _downsample_pixel_size(ax, fld, namex, namey, xlim=None, ylim=None,
+                           mod=None, flip_plot=False):
+    """Figure out how big one pixel of ax is in field coordinates
+
+    The size of the axes comes from the figure size and the larger of
+    the figure / savefig dpi. If the plot options give x / y limits, only
+    that part of the field is assumed to be visible.
 
     Returns:
-        result of the actual matplotlib plotting command
-        (pcolormesh, contourf, etc.)
+        (dx, dy) in the (unmodded, unflipped) coordinates of fld
     """
-    assert fld.nr_patches == 1
+    fig = ax.get_figure()
+    dpi = fig.dpi
+    savefig_dpi = plt.rcParams.get('savefig.dpi', 'figure')
+    if not isinstance(savefig_dpi, string_types):
+        dpi = max(dpi, savefig_dpi)
+    bbox = ax.get_position()
+    w_in, h_in = fig.get_size_inches()
+    npx = np.array([bbox.width * w_in * dpi, bbox.height * h_in * dpi])
+    if flip_plot:
+        npx = npx[::-1]
+        xlim, ylim = ylim, xlim
+
+    xl = np.min([p.crds.get_xl((namex, namey)) for p in fld.patches], axis=0)
+    xh = np.max([p.crds.get_xh((namex, namey)) for p in fld.patches], axis=0)
+    for i, lim in enumerate([xlim, ylim]):
+        if isinstance(lim, (list, tuple)) and len(lim) == 2:
+            try:
+                lim = np.sort(np.array(lim, dtype='f8'))
+                if mod:
+                    lim /= mod[i]
+                xl[i], xh[i] = lim
+            except (TypeError, ValueError):
+                pass
+    return tuple(np.abs(xh - xl) / np.maximum(npx, 1.0))
+
+def _downsample_edges(xnc, width):
+    """Indices of node crds xnc that split cells into blocks >= width wide
+
+    This just walks along the crds, so it works for nonuniform crds too.
+    The first and last nodes are always included.
+    """
+    n = len(xnc) - 1
+    if n < 2 or width <= 0.0 or np.any(np.diff(xnc) <= 0.0):
+        return None
+    targets = np.arange(xnc[0], xnc[-1], width)
+    idx = np.unique(np.searchsorted(xnc, targets, side='left'))
+    idx = idx[(idx > 0) & (idx < n)]
+    idx = np.concatenate([[0], idx, [n]])
+    if len(idx) - 1 == n:
+        return None
+    return idx
+
+def _downsample2d(X, Y, dat, pixel_size, method="mean"):
+    """Reduce cell data dat (ny x nx) to about one cell per pixel
+
+    Parameters:
+        X, Y (ndarray): 1d node crds, len nx + 1 and ny + 1
+        dat (ndarray): cell data with shape (ny, nx)
+        pixel_size (tuple): (dx, dy) of one pixel
+        method (str): 'mean' (cell width weighted), 'min', 'max',
+            or 'absmax'
+
+    Returns:
+        (X, Y, dat) that are no bigger than the input
+    """
+    if method is True:
+        method = "mean"
+    if method not in ("mean", "min", "max", "absmax"):
+        raise ValueError("downsample should be True, False, 'mean', 'min', "
+                         "'max', or 'absmax', not {0}".format(method))
+    for axis, (crd, width) in enumerate(zip([Y, X], pixel_size[::-1])):
+        idx = _downsample_edges(crd, width)
+        if idx is not None:
+            weights = np.diff(crd)
+            if not np.issubdtype(dat.dtype, np.floating):
+                dat = dat.astype('f8')
+            dat = pyramid.block_reduce(dat, idx[:-1], axis, method,
+                                       weights=weights)
+            if axis == 0:
+                Y = crd[idx]
+            else:
+                X = crd[idx]
+    return X, Y, dat
+
+def _plot2d_data(fld, style, namex, namey, mod, scale, masknan, latlon,
+                 flip_plot, downsample=None):
+    """Get the crds and data arrays that a 2d plot of fld will use
 
+    Parameters:
+        downsample (tuple): (method, (dx, dy)) to reduce the data to
+            about one cell per pixel before plotting, or None to
+            plot every cell
+
+    Returns:
+        (X, Y, dat, namex, namey)
+    """
     # pcolor mesh uses node coords, and cell data, if we have
     # node data, fake it by using cell centered coords and
     # trim the edges of the data... maybe i should just be
@@ -320,19 +485,24 @@ def _plot2d_single(ax, fld, style, namex, namey, mod, scale,
             X[0], X[-1] = Xnc[0], Xnc[-1]
             Y[0], Y[-1] = Ync[0], Ync[-1]
 
+    dat = fld.data.T
+    # the pixel size is in unmodded crds, so downsample before mod
+    if (downsample is not None and not latlon and np.ndim(X) == 1 and
+            not isinstance(dat, np.ma.MaskedArray)):
+        X, Y, dat = _downsample2d(X, Y, dat, downsample[1],
+                                  method=downsample[0])
+
     if latlon:
         # translate latitude from 0..180 to -90..90
         X, Y = np.meshgrid(X, 90 - Y)
     if mod:
-        X *= mod[0]
-        Y *= mod[1]
-
-    dat = fld.data.T
+        # not in place, X / Y may be the field's own crd arrays
+        X = X * mod[0]
+        Y = Y * mod[1]
     if scale is not None:
         dat *= scale
     if masknan:
         dat = np.ma.masked_where(np.isnan(dat), dat)
-        all_masked = all_masked and dat.mask.all()
 
     # Field.data is now xyz as are the crds
 
@@ -340,6 +510,24 @@ def _plot2d_single(ax, fld, style, namex, namey, mod, scale,
         X, Y = Y.T, X.T
         dat = dat.T
         namex, namey = namey, namex
+    return X, Y, dat, namex, namey
+
+def _plot2d_single(ax, fld, style, namex, namey, mod, scale,
+                   masknan, latlon, flip_plot, patchec, patchlw, patchaa,
+                   all_masked, extra_args, downsample=None, **kwargs):
+    """Make a 2d plot of a single patch
+
+    Returns:
+        result of the actual matplotlib plotting command
+        (pcolormesh, contourf, etc.)
+    """
+    assert fld.nr_patches == 1
+
+    X, Y, dat, namex, namey = _plot2d_data(fld, style, namex, namey, mod,
+                                           scale, masknan, latlon, flip_plot,
+                                           downsample=downsample)
+    if masknan:
+        all_masked = all_masked and dat.mask.all()
 
     if style == "pcolormesh":
         p = ax.pcolormesh(X, Y, dat, *extra_args, **kwargs)
@@ -373,6 +561,53 @@ def _plot2d_single(ax, fld, style, namex, namey, mod, scale,
 
     return p, all_masked
 
+def _plot2d_norm(fld, norm_dict):
+    """Make a norm for a 2d plot from the norm_dict options
+
+    Returns:
+        (norm, vscale, vmin, vmax)
+    """
+    patch0 = fld.patches[0]
+    vscale = norm_dict['vscale']
+    vmin, vmax = norm_dict['clim']
+
+    if vmin is None:
+        vmin = np.nanmin([np.nanmin(blk) for blk in fld.patches])
+    if vmax is None:
+        vmax = np.nanmax([np.nanmax(blk) for blk in fld.patches])
+
+    # vmin / vmax will only be nan if all values are nan
+    if np.isnan(vmin) or np.isnan(vmax):
+        logger.warn("All-Nan encountered in Field, {0}"
+                    "".format(patch0.name))
+        vmin, vmax = 1e38, 1e38
+        norm_dict['symmetric'] = False
+
+    if vscale == "lin":
+        if norm_dict['symmetric']:
+            maxval = max(abs(vmin), abs(vmax))
+            vmin = -1.0 * maxval
+            vmax = +1.0 * maxval
+        norm = Normalize(vmin, vmax)
+    elif vscale == "log":
+        if norm_dict['symmetric']:
+            raise ValueError("Can't use symmetric color bar with logscale")
+        if vmax <= 0.0:
+            logger.warn("Using log scale on a field with no "
+                        "positive values")
+            vmin, vmax = 1e-20, 1e-20
+        elif vmin <= 0.0:
+            logger.warn("Using log scale on a field with values "
+                        "<= 0. Only plotting 4 decades.")
+            vmin, vmax = vmax / 1e4, vmax
+        norm = LogNorm(vmin, vmax)
+    elif vscale is None:
+        norm = None
+    else:
+        raise ValueError("Unknown norm vscale: {0}".format(vscale))
+
+    return norm, vscale, vmin, vmax
+
 def plot2d_field(fld, ax=None, plot_opts=None, **plot_kwargs):
     """Plot a 2D Field using pcolormesh, contour, etc.
 
@@ -397,12 +632,14 @@ def plot2d_field(fld, ax=None, plot_opts=None, **plot_kwargs):
 
     # init the plot by figuring out the options to use
     extra_args = []
+    namex, namey = patch0.crds.axes # fld.crds.get_culled_axes()
 
     if not ax:
         ax = plt.gca()
 
     # parse plot_opts
     plot_opts_to_kwargs(plot_opts, plot_kwargs)
+    xlim, ylim = plot_kwargs.get("x", None), plot_kwargs.get("y", None)
     actions, norm_dict = _extract_actions_and_norm(ax, plot_kwargs,
                                                    defaults={'equalaxis': True})
 
@@ -437,12 +674,23 @@ def plot2d_field(fld, ax=None, plot_opts=None, **plot_kwargs):
     colorbar = plot_kwargs.pop("colorbar", True)
     cbarlabel = plot_kwargs.pop("cbarlabel", None)
     earth = plot_kwargs.pop("earth", False)
+    downsample = plot_kwargs.pop("downsample", True)
 
     # undocumented options
     latlon = plot_kwargs.pop("latlon", None)
     norm = plot_kwargs.pop("norm", None)
     action_ax = plot_kwargs.pop("action_ax", ax)  # for basemap projections
 
+    # only downsample if each cell is a solid color in a linear space
+    if (downsample and not show_grid and not latlon and
+        style in ["pcolormesh", "pcolor"] and norm_dict['crdscale'] == 'lin'):
+        pixel_size = _downsample_pixel_size(action_ax, fld, namex, namey,
+                                            xlim=xlim, ylim=ylim, mod=mod,
+                                            flip_plot=flip_plot)
+        downsample = (downsample, pixel_size)
+    else:
+        downsample = None
+
     # some plot_kwargs need a little more info
     if show_grid:
         if not isinstance(show_grid, string_types):
@@ -469,44 +717,7 @@ def plot2d_field(fld, ax=None, plot_opts=None, **plot_kwargs):
     #########################
     # figure out the norm...
     if norm is None:
-        vscale = norm_dict['vscale']
-        vmin, vmax = norm_dict['clim']
-
-        if vmin is None:
-            vmin = np.nanmin([np.nanmin(blk) for blk in fld.patches])
-        if vmax is None:
-            vmax = np.nanmax([np.nanmax(blk) for blk in fld.patches])
-
-        # vmin / vmax will only be nan if all values are nan
-        if np.isnan(vmin) or np.isnan(vmax):
-            logger.warn("All-Nan encountered in Field, {0}"
-                        "".format(patch0.name))
-            vmin, vmax = 1e38, 1e38
-            norm_dict['symmetric'] = False
-
-        if vscale == "lin":
-            if norm_dict['symmetric']:
-                maxval = max(abs(vmin), abs(vmax))
-                vmin = -1.0 * maxval
-                vmax = +1.0 * maxval
-            norm = Normalize(vmin, vmax)
-        elif vscale == "log":
-            if norm_dict['symmetric']:
-                raise ValueError("Can't use symmetric color bar with logscale")
-            if vmax <= 0.0:
-                logger.warn("Using log scale on a field with no "
-                            "positive values")
-                vmin, vmax = 1e-20, 1e-20
-            elif vmin <= 0.0:
-                logger.warn("Using log scale on a field with values "
-                            "<= 0. Only plotting 4 decades.")
-                vmin, vmax = vmax / 1e4, vmax
-            norm = LogNorm(vmin, vmax)
-        elif vscale is None:
-            norm = None
-        else:
-            raise ValueError("Unknown norm vscale: {0}".format(vscale))
-
+        norm, vscale, vmin, vmax = _plot2d_norm(fld, norm_dict)
         if norm is not None:
             plot_kwargs['norm'] = norm
     else:
@@ -537,15 +748,16 @@ def plot2d_field(fld, ax=None, plot_opts=None, **plot_kwargs):
 
     ##############################
     # now actually make the plots
-    namex, namey = patch0.crds.axes # fld.crds.get_culled_axes()
-
     all_masked = False
     for patch in fld.patches:
         p, all_masked = _plot2d_single(action_ax, patch, style,
                                        namex, namey, mod, scale, masknan,
                                        latlon, flip_plot,
                                        patchec, patchlw, patchaa,
-                                       all_masked, extra_args, **plot_kwargs)
+                                       all_masked, extra_args,
+                                       downsample=downsample, **plot_kwargs)
+        if downsample is not None:
+            p._viscid_pixel_size = downsample[1]  # pylint: disable=protected-access
 
     # apply option actions... this is for setting xlim / xscale / etc.
     _apply_actions(actions)
@@ -610,6 +822,86 @@ def plot2d_field(fld, ax=None, plot_opts=None, **plot_kwargs):
         mplshow()
     return p, cbar
 
+def update_plot2d_field(plot, fld, plot_opts=None, **plot_kwargs):
+    """Put new data into a pcolormesh made by :meth:`plot2d_field`
+
+    No new artists are made, so this is much faster than replotting
+    when making a movie. Only the data and color limits change, so
+    fld must be on the same crds as the original plot.
+
+    Parameters:
+        plot: the plot object returned by :meth:`plot2d_field`
+        fld (Field): the new data
+        plot_opts (str, optional): same plot options used to make plot
+        **plot_kwargs (str, optional): same plot options used to make plot
+
+    Returns:
+        bool: True if the plot was updated, False if it couldn't be
+        updated and must be replotted from scratch
+    """
+    fld = fld.slice_reduce(plot_kwargs.pop("selection", ":"))
+    if not hasattr(fld, "patches") or fld.nr_patches != 1:
+        return False
+    if fld.nr_comps > 1 or fld.patches[0].nr_sdims != 2:
+        return False
+    if fld.patches[0].is_spherical() and not plot_kwargs.pop("force_cartesian",
+                                                             False):
+        return False
+    if not isinstance(plot, QuadMesh):
+        return False
+
+    plot_opts_to_kwargs(plot_opts, plot_kwargs)
+    xlim, ylim = plot_kwargs.get("x", None), plot_kwargs.get("y", None)
+    _, norm_dict = _extract_actions_and_norm(plot.axes, plot_kwargs,
+                                             defaults={'equalaxis': True})
+    if plot_kwargs.pop("style", "pcolormesh") != "pcolormesh":
+        return False
+    scale = plot_kwargs.pop("scale", None)
+    masknan = plot_kwargs.pop("masknan", True)
+    flip_plot = plot_kwargs.pop("flip_plot", False)
+    flip_plot = plot_kwargs.pop("flipplot", flip_plot)
+    mod = plot_kwargs.pop("mod", None)
+    latlon = plot_kwargs.pop("latlon", None)
+    norm = plot_kwargs.pop("norm", None)
+    downsample = plot_kwargs.pop("downsample", True)
+    show_grid = plot_kwargs.pop("show_grid", False)
+    show_grid = plot_kwargs.pop("g", show_grid)
+
+    namex, namey = fld.patches[0].crds.axes
+    if (downsample and not show_grid and not latlon and
+        norm_dict['crdscale'] == 'lin'):
+        # the colorbar may have shrunk the axes since the plot was made,
+        # so use the same pixel size that the original plot used
+        pixel_size = getattr(plot, "_viscid_pixel_size", None)
+        if pixel_size is None:
+            pixel_size = _downsample_pixel_size(plot.axes, fld, namex, namey,
+                                                xlim=xlim, ylim=ylim, mod=mod,
+                                                flip_plot=flip_plot)
+        downsample = (downsample, pixel_size)
+    else:
+        downsample = None
+    X, Y, dat, _, _ = _plot2d_data(fld.patches[0], "pcolormesh", namex, namey,
+                                   mod, scale, masknan, latlon, flip_plot,
+                                   downsample=downsample)
+
+    # make sure the mesh is the same
+    try:
+        coords = plot.get_coordinates()
+    except AttributeError:
+        coords = plot._coordinates  # pylint: disable=protected-access
+    if np.ndim(X) == 1:
+        X, Y = np.meshgrid(X, Y)
+    if coords.shape[:2] != X.shape or not (np.allclose(coords[..., 0], X) and
+                                           np.allclose(coords[..., 1], Y)):
+        return False
+
+    plot.set_array(dat.ravel())
+    if norm is None:
+        norm, _, vmin, vmax = _plot2d_norm(fld, norm_dict)
+        if norm is not None:
+            plot.set_clim(vmin, vmax)
+    return True
+
 def _mlt_labels(longitude):
     return "{0:g}".format(longitude * 24.0 / 360.0)
 
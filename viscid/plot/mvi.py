@@ -104,19 +104,24 @@ def lines2source(lines, scalars=None, name="NoName"):
     r = viscid.vutil.prepare_lines(lines, scalars, do_connections=True)
     lines, scalars, connections, other = r
 
-    src = mlab.pipeline.scalar_scatter(lines[0], lines[1], lines[2])
+    # prepare_lines gives 3xN vertices that are a transposed view of Nx3
+    # points, so in the usual case, this is just a view
+    poly = tvtk.PolyData(points=_vtk_array(lines.T))
     if scalars is not None:
         if scalars.dtype == np.dtype('u1'):
             sc = tvtk.UnsignedCharArray()
-            sc.from_array(scalars.T)
+            sc.from_array(_vtk_array(scalars.T))
             scalars = sc
-        src.mlab_source.dataset.point_data.scalars = scalars
-        src.mlab_source.dataset.modified()
-    src.mlab_source.dataset.lines = connections
+        else:
+            scalars = _vtk_array(scalars)
+        poly.point_data.scalars = scalars
+        poly.point_data.scalars.name = "scalars"
+    poly.lines = connections
+    src = VTKDataSource(data=poly)
     src.name = name
     return src
 
-def field2source(fld, center=None, name=None):
+def field2source(fld, center=None, name=None, pyramid=True):
     """Convert a field to a vtk data source
 
     This dispatches to either :meth:`field_to_point_source` or
@@ -128,6 +133,9 @@ def field2source(fld, center=None, name=None):
         center (str): Either "cell", "node", or "" to use the
             same centering as fld
         name (str): Add specific name. Leave as "" to use fld.name
+        pyramid (bool): if fld has more than
+            ``viscid.pyramid.max_3d_size`` cells, use a coarser
+            level of its pyramid (which is cell centered)
 
     Returns:
         mayavi source
@@ -136,6 +144,14 @@ def field2source(fld, center=None, name=None):
         NotImplementedError: If center (or fld.center) is not
             recognized
     """
+    if (pyramid and fld.nr_patches == 1 and
+            fld.size > viscid.pyramid.max_3d_size):
+        pyr = viscid.pyramid.get_pyramid(fld)
+        level = pyr.choose_level_by_size(viscid.pyramid.max_3d_size)
+        if level > 0:
+            fld = pyr.level(level)
+            center = "cell"
+
     if not center:
         center = fld.center
     center = center.lower()
@@ -155,15 +171,9 @@ def field2point_source(fld, name=None):
     dat_target = grid.point_data
 
     if fld.iscentered("Cell"):
-        grid.dimensions = tuple(fld.crds.shape_cc)
-        grid.x_coordinates = fld.get_crd_cc(0)  # ('x')
-        grid.y_coordinates = fld.get_crd_cc(1)  # ('y')
-        grid.z_coordinates = fld.get_crd_cc(2)  # ('z')
+        _set_grid_crds(grid, fld, "cell")
     elif fld.iscentered("Node"):
-        grid.dimensions = tuple(fld.crds.shape_nc)
-        grid.x_coordinates = fld.get_crd_nc(0)  # ('x')
-        grid.y_coordinates = fld.get_crd_nc(1)  # ('y')
-        grid.z_coordinates = fld.get_crd_nc(2)  # ('z')
+        _set_grid_crds(grid, fld, "node")
     else:
         raise ValueError("cell or node only please")
 
@@ -178,10 +188,7 @@ def field2cell_source(fld, name=None):
     dat_target = grid.cell_data
 
     if fld.iscentered("Cell"):
-        grid.dimensions = tuple(fld.crds.shape_nc)
-        grid.x_coordinates = fld.get_crd_nc(0)  # ('x')
-        grid.y_coordinates = fld.get_crd_nc(1)  # ('y')
-        grid.z_coordinates = fld.get_crd_nc(2)  # ('z')
+        _set_grid_crds(grid, fld, "node")
     elif fld.iscentered("Node"):
         raise NotImplementedError("can't do lossless cell data from nodes yet")
     else:
@@ -192,31 +199,115 @@ def field2cell_source(fld, name=None):
         src.name = name
     return src
 
+def update_field_source(src, fld):
+    """Put new values into a source made by :py:func:`field2source`
 
-def _prep_field(fld):
-    grid = tvtk.RectilinearGrid()
+    The RectilinearGrid and its coordinates are reused, so this is
+    cheaper than making a new source when only the values of a field
+    change between time steps.
 
-    # note, the transpose operations are b/c fld.data is now xyz ordered,
-    # but vtk expects zyx data
+    Args:
+        src (VTKDataSource): source made by :py:func:`field2source`
+        fld (Field): new field, must be the same type of field on the
+            same crds as the one used to make src
+
+    Returns:
+        bool: True if src was updated, False if fld doesn't fit into
+        src and a new source needs to be made
+    """
+    grid = src.data
+    if not isinstance(grid, tvtk.RectilinearGrid):
+        return False
+
+    if isinstance(fld, field.ScalarField):
+        attr = "scalars"
+    elif isinstance(fld, field.VectorField):
+        attr = "vectors"
+    else:
+        return False
+
+    if getattr(grid.point_data, attr) is not None:
+        dat_target = grid.point_data
+        crd_center = fld.center.lower()
+    elif getattr(grid.cell_data, attr) is not None:
+        dat_target = grid.cell_data
+        crd_center = "node"
+    else:
+        return False
+
+    shape, crds = _grid_crds(fld, crd_center)
+    if tuple(grid.dimensions) != shape:
+        return False
+    for old, new in zip([grid.x_coordinates, grid.y_coordinates,
+                         grid.z_coordinates], crds):
+        if not np.array_equal(old.to_array(), new):
+            return False
+
+    _, arr = _prep_field(fld, make_grid=False)
+    setattr(dat_target, attr, arr)
+    getattr(dat_target, attr).name = fld.name
+    grid.modified()
+    src.update()
+    return True
+
+def _vtk_array(arr):
+    """Make arr C contiguous and native endian in at most one copy
+
+    tvtk hands arrays like this to VTK without copying them again, it
+    just holds a reference so the memory stays alive.
+    """
+    arr = np.asarray(arr)
+    if not arr.dtype.isnative:
+        arr = np.array(arr, dtype=arr.dtype.newbyteorder('='), order='C')
+    elif not arr.flags['C_CONTIGUOUS']:
+        arr = np.ascontiguousarray(arr)
+    return arr
+
+def _grid_crds(fld, center):
+    """Get (dimensions, (x, y, z)) of a vtk grid for fld"""
+    center = center.lower()
+    if center == "cell":
+        shape = tuple(fld.crds.shape_cc)
+        crds = [fld.get_crd_cc(i) for i in range(3)]
+    else:
+        shape = tuple(fld.crds.shape_nc)
+        crds = [fld.get_crd_nc(i) for i in range(3)]
+    return shape, [_vtk_array(c) for c in crds]
+
+def _set_grid_crds(grid, fld, center):
+    shape, crds = _grid_crds(fld, center)
+    grid.dimensions = shape
+    grid.x_coordinates = crds[0]
+    grid.y_coordinates = crds[1]
+    grid.z_coordinates = crds[2]
+
+def _prep_field(fld, make_grid=True):
+    grid = tvtk.RectilinearGrid() if make_grid else None
+
+    # note, the transpose operations are b/c fld.data is xyz ordered,
+    # but vtk expects zyx data (x varies fastest). If the data is
+    # already laid out that way (like zyx-native data from a file),
+    # these are all views and the array goes to vtk without a copy,
+    # otherwise, the data is repacked in exactly one copy, which also
+    # fixes the byte order if needed
 
     if isinstance(fld, field.ScalarField):
-        zyx_dat = fld.data.T
-        arr = np.reshape(zyx_dat, (-1,))
-        # vtk expects zyx data, but fld.data is now xyz
+        arr = _vtk_array(fld.data.T).reshape(-1)
     elif isinstance(fld, field.VectorField):
         if fld.layout == field.LAYOUT_INTERLACED:
             zyx_dat = np.transpose(fld.data, (2, 1, 0, 3))
-            arr = np.reshape(zyx_dat, (-1, 3))
+            arr = _vtk_array(zyx_dat).reshape(-1, 3)
         elif fld.layout == field.LAYOUT_FLAT:
-            zyx_dat = np.transpose(fld.data, (0, 3, 2, 1))
-            arr = np.reshape(np.rollaxis(zyx_dat, 0, len(fld.shape)), (-1, 3))
+            dat = fld.data
+            shape = dat.shape[1:][::-1] + (dat.shape[0], )
+            arr = np.empty(shape, dtype=dat.dtype.newbyteorder('='))
+            for i in range(dat.shape[0]):
+                arr[..., i] = dat[i].T
+            arr = arr.reshape(-1, 3)
         else:
             raise ValueError()
     else:
         raise ValueError("Unexpected fld type: {0}".format(type(fld)))
-    # swap endian if needed
-    if str(arr.dtype).startswith(">"):
-        arr = arr.byteswap().newbyteorder()
     return grid, arr
 
 def _finalize_source(fld, arr, grid, dat_target):
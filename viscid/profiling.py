@@ -0,0 +1,254 @@
+"""Opt-in counters and timers for finding where a slow job spends time
+
+Viscid's hot paths (reader header scans, DataWrapper reads, layout
+conversions when filling a Field's cache, cython field setup and
+streamline integration) report here, but only when profiling is
+enabled. Call sites check ``profiling.enabled`` before doing any work,
+so when it's off the cost is one attribute lookup.
+
+Timers record how often and how long a block runs, and each call is
+also kept as an event that can be saved in Chrome's trace format and
+viewed in chrome://tracing or https://ui.perfetto.dev. Counters just
+accumulate numbers like bytes read or cache hits. Work done in other
+threads is recorded, but work done in subprocesses (like streamlines
+with nr_procs > 1) is not.
+
+Example:
+    >>> viscid.profiling.enabled = True
+    >>> lines, topo = viscid.calc_streamlines(b, seeds)
+    >>> viscid.profiling.print_summary()
+    >>> viscid.profiling.save_chrome_trace("streamlines.json")
+
+Attributes:
+    enabled (bool): record counters and timers; it's also turned on
+        if the environment variable VISCID_PROFILE is set to anything
+        other than "" or "0". If VISCID_PROFILE ends in ".json", a
+        Chrome trace is written there and a summary is printed when
+        the interpreter exits
+    max_events (int): stop keeping timer events (but not totals)
+        after this many, so long jobs don't use unbounded memory
+
+These attributes can be set from `~/.viscidrc`, for instance
+``profiling.enabled: true``.
+"""
+
+from __future__ import print_function, division
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+from timeit import default_timer as _clock
+
+__all__ = ["count", "timer", "timed", "reset", "get_counters", "get_timers",
+           "summary", "print_summary", "save_chrome_trace"]
+
+
+enabled = False
+max_events = 1000000
+
+_lock = threading.Lock()
+_counters = {}
+# name -> [nr_calls, total, min, max] in seconds
+_timers = {}
+_events = []
+_t_origin = _clock()
+
+
+def count(name, n=1):
+    """Add `n` to the counter `name`
+
+    In hot code, check ``profiling.enabled`` first to skip the call.
+    """
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+def _add_time(name, t0, t1):
+    dt = t1 - t0
+    with _lock:
+        stats = _timers.get(name, None)
+        if stats is None:
+            _timers[name] = [1, dt, dt, dt]
+        else:
+            stats[0] += 1
+            stats[1] += dt
+            if dt < stats[2]:
+                stats[2] = dt
+            if dt > stats[3]:
+                stats[3] = dt
+        if len(_events) < max_events:
+            _events.append((name, t0, dt, threading.current_thread().ident))
+
+
+class _Timer(object):
+    __slots__ = ["name", "t0"]
+
+    def __init__(self, name):
+        self.name = name
+        self.t0 = None
+
+    def __enter__(self):
+        self.t0 = _clock()
+        return self
+
+    def __exit__(self, exc_type, value, traceback):
+        _add_time(self.name, self.t0, _clock())
+        return False
+
+
+class _NullTimer(object):
+    __slots__ = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, value, traceback):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name):
+    """Context manager that times its block as `name`
+
+    When profiling is disabled this returns a shared object that does
+    nothing.
+    """
+    if not enabled:
+        return _NULL_TIMER
+    return _Timer(name)
+
+def timed(name=None):
+    """Decorator that times each call to a function
+
+    Parameters:
+        name (str): timer name, defaults to module.function
+    """
+    def decorator(func):
+        label = name
+        if label is None:
+            label = "{0}.{1}".format(func.__module__, func.__name__)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            with _Timer(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def reset():
+    """Forget all counters, timers and events"""
+    global _t_origin
+    with _lock:
+        _counters.clear()
+        _timers.clear()
+        del _events[:]
+        _t_origin = _clock()
+
+def get_counters():
+    """Returns a dict of {name: value} for all counters"""
+    with _lock:
+        return dict(_counters)
+
+def get_timers():
+    """Returns a dict of {name: dict} for all timers
+
+    The inner dicts have keys 'calls', 'total', 'min' and 'max' with
+    times in seconds.
+    """
+    with _lock:
+        return dict((name, dict(calls=s[0], total=s[1], min=s[2], max=s[3]))
+                    for name, s in _timers.items())
+
+def summary():
+    """Make a table of the timers (slowest first) and counters
+
+    Returns:
+        str
+    """
+    timers = get_timers()
+    counters = get_counters()
+    lines = []
+    if timers:
+        width = max(len(name) for name in timers)
+        lines.append("{0:<{w}s}  {1:>8s}  {2:>10s}  {3:>10s}  {4:>10s}"
+                     "".format("timer", "calls", "total (s)", "mean (ms)",
+                               "max (ms)", w=width))
+        for name in sorted(timers, key=lambda k: -timers[k]['total']):
+            t = timers[name]
+            lines.append("{0:<{w}s}  {1:>8d}  {2:>10.4f}  {3:>10.3f}  "
+                         "{4:>10.3f}".format(name, t['calls'], t['total'],
+                                             1e3 * t['total'] / t['calls'],
+                                             1e3 * t['max'], w=width))
+    if counters:
+        if lines:
+            lines.append("")
+        width = max(len(name) for name in counters)
+        lines.append("{0:<{w}s}  {1:>14s}".format("counter", "value",
+                                                 w=width))
+        for name in sorted(counters):
+            lines.append("{0:<{w}s}  {1:>14}".format(name, counters[name],
+                                                    w=width))
+    if not lines:
+        lines.append("nothing was profiled, is viscid.profiling.enabled?")
+    return "\n".join(lines)
+
+def print_summary(file=None):  # pylint: disable=redefined-builtin
+    """Print :py:func:`summary` to `file` (stdout by default)"""
+    print(summary(), file=sys.stdout if file is None else file)
+
+def save_chrome_trace(fname):
+    """Save timer events and counters in Chrome's trace event format
+
+    Timers become complete ('X') events and counters are added as a
+    single counter ('C') event at the end of the trace.
+
+    Parameters:
+        fname (str): file name, usually ending in .json
+    """
+    pid = os.getpid()
+    with _lock:
+        events = list(_events)
+        counters = dict(_counters)
+        origin = _t_origin
+    trace = []
+    for name, t0, dt, tid in events:
+        trace.append(dict(name=name, cat=name.split('.', 1)[0], ph="X",
+                          ts=1e6 * (t0 - origin), dur=1e6 * dt, pid=pid,
+                          tid=tid))
+    if counters:
+        t_end = max([1e6 * (t0 + dt - origin) for _, t0, dt, _ in events] +
+                    [0.0])
+        for name in sorted(counters):
+            trace.append(dict(name=name, cat=name.split('.', 1)[0], ph="C",
+                              ts=t_end, pid=pid, tid=0,
+                              args={"value": counters[name]}))
+    fname = os.path.expanduser(os.path.expandvars(fname))
+    with open(fname, 'w') as f:
+        json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+
+def _report_at_exit(trace_fname):
+    if not enabled:
+        return
+    print_summary(file=sys.stderr)
+    try:
+        save_chrome_trace(trace_fname)
+    except (IOError, OSError) as e:
+        print("viscid.profiling: couldn't save trace:", e, file=sys.stderr)
+
+
+_env = os.environ.get("VISCID_PROFILE", "").strip()
+if _env not in ("", "0"):
+    enabled = True
+    if _env.endswith(".json"):
+        atexit.register(_report_at_exit, _env)
+del _env
+
+##
+## EOF
+##
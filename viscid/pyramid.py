@@ -0,0 +1,450 @@
+"""Multi-resolution pyramids of Fields for fast interactive plotting
+
+Level 0 of a pyramid is the field itself, and level k is about 2**k
+times coarser along every spatial axis that has more than one cell.
+Each level is made from the one before it by block reductions, so
+making a whole pyramid only reads the field once. Levels keep the block
+mean (weighted by cell width, NaNs are skipped) and the block min / max
+so extrema don't get washed out. Odd numbers of cells are handled by
+making the last block 3 cells wide, so the levels always cover the
+same domain as the field. Levels are cell centered; node centered
+fields are treated as cells around their nodes, like
+:py:meth:`viscid.field.Field.as_cell_centered`.
+
+If `use_disk_cache` is True, pyramids of fields that were read from a
+file are saved next to viscid's other caches as .npz files keyed by the
+file's path, mtime and size and the field's name and time, so browsing
+a run a second time doesn't need to read the full resolution data at
+all. Levels are read from the cache one at a time as they're needed.
+
+:py:func:`viscid.plot.mpl.plot` uses these automatically for fields
+with at least `min_size` cells. It works out the coarsest level that
+still has at least one cell per pixel from the crds alone, and if that
+isn't the field itself, makes a pyramid of just the plotted slice.
+:py:mod:`viscid.plot.mvi` uses the finest level of the whole field
+with at most `max_3d_size` cells.
+
+Attributes:
+    min_size (int): fields with fewer cells than this aren't worth a
+        pyramid, so plotting uses them directly
+    max_3d_size (int): most cells to give mayavi for a 3d field
+    min_cells (int): stop making levels once no axis has more than
+        this many cells
+    use_disk_cache (bool): save / load pyramids to / from `cache_dir`
+        (default: False)
+    cache_dir (str): where to put the .npz files, defaults to
+        $XDG_CACHE_HOME/viscid/pyramids (~/.cache/viscid/pyramids)
+    max_disk_cache_nbytes (int): least recently used pyramids are
+        deleted from `cache_dir` to keep it under this size, None
+        means no limit
+
+These attributes can be set from `~/.viscidrc`, for instance
+``pyramid.use_disk_cache: true``.
+"""
+
+from __future__ import print_function, division
+import hashlib
+import os
+
+import numpy as np
+
+from viscid import logger
+from viscid import coordinate
+from viscid import profiling
+from viscid.vutil import user_cache_dir, prune_cache_dir
+
+__all__ = ["FieldPyramid", "get_pyramid", "predict_level", "coarsen",
+           "block_reduce", "clear_cache"]
+
+
+min_size = 256**2 * 16
+max_3d_size = 256**3
+min_cells = 16
+use_disk_cache = False
+cache_dir = None
+max_disk_cache_nbytes = 1024**3
+
+KINDS = ("mean", "min", "max")
+
+
+def _get_cache_dir():
+    return user_cache_dir("pyramids", override=cache_dir)
+
+def block_reduce(dat, starts, axis, method="mean", weights=None):
+    """Reduce blocks of dat along axis; blocks start at `starts`
+
+    Parameters:
+        dat (ndarray): data
+        starts (sequence): index of the first element of each block
+        axis (int): axis of dat to reduce
+        method (str): 'mean', 'min', 'max', or 'absmax'. Mean is
+            weighted by `weights` and all of them skip NaNs. Blocks
+            that are all NaN stay NaN.
+        weights (ndarray): 1d weights for the mean, like cell widths
+
+    Returns:
+        ndarray with len(starts) elements along axis
+    """
+    if method == "mean":
+        shape = [1] * dat.ndim
+        shape[axis] = -1
+        uniform = weights is None or np.allclose(weights, weights[0])
+        if uniform and not np.isnan(np.sum(dat)):
+            # fast path, no temporaries bigger than the result
+            nr = np.diff(np.append(starts, dat.shape[axis]))
+            vsum = np.add.reduceat(dat, starts, axis=axis)
+            vsum /= np.reshape(nr, shape).astype(vsum.dtype)
+            return vsum
+        if weights is None:
+            weights = np.ones((dat.shape[axis],), dtype=dat.dtype)
+        w = np.reshape(weights, shape)
+        good = ~np.isnan(dat)
+        wsum = np.add.reduceat(np.where(good, w, 0.0), starts, axis=axis)
+        vsum = np.add.reduceat(np.where(good, dat * w, 0.0), starts,
+                               axis=axis)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (vsum / wsum).astype(dat.dtype, copy=False)
+    elif method == "min":
+        return np.fmin.reduceat(dat, starts, axis=axis)
+    elif method == "max":
+        return np.fmax.reduceat(dat, starts, axis=axis)
+    elif method == "absmax":
+        return np.fmax.reduceat(np.abs(dat), starts, axis=axis)
+    else:
+        raise ValueError("method should be 'mean', 'min', 'max', or "
+                         "'absmax', not {0}".format(method))
+
+def _spatial_axes(fld):
+    """Axes of fld.data that are spatial, in crds order"""
+    axes = list(range(len(fld.shape)))
+    if fld.nr_comps > 0:
+        axes.remove(fld.nr_comp)
+    return axes
+
+def _coarsen_crds(clist):
+    """Halve the number of cells in a list of node crd arrays
+
+    Returns:
+        (new clist, list of block starts, or None for axes that are
+        already 1 cell wide)
+    """
+    new_clist, starts = [], []
+    for xnc in clist:
+        n = len(xnc) - 1
+        if n < 2:
+            new_clist.append(xnc)
+            starts.append(None)
+        else:
+            s = np.arange(0, n - 1, 2)
+            new_clist.append(np.concatenate([xnc[s], xnc[-1:]]))
+            starts.append(s)
+    return new_clist, starts
+
+def predict_level(clist, cell_size):
+    """Level a pyramid would choose, without making the pyramid
+
+    This is :py:meth:`FieldPyramid.choose_level` using only crds.
+
+    Parameters:
+        clist (list): node crd arrays of the axes being looked at
+        cell_size (sequence): largest acceptable cell width along each
+            axis in clist
+
+    Returns:
+        int: a level, 0 if even the finest cells are too big
+    """
+    best = 0
+    k = 0
+    while max(len(xnc) - 1 for xnc in clist) > min_cells:
+        clist, _ = _coarsen_crds(clist)
+        k += 1
+        if all(len(xnc) < 2 or np.max(np.diff(xnc)) <= dx
+               for xnc, dx in zip(clist, cell_size)):
+            best = k
+        else:
+            break
+    return best
+
+def _coarsen(arr, clist, spatial, kind):
+    """Halve the resolution of arr whose node crds are clist
+
+    Returns:
+        (new arr, new clist)
+    """
+    new_clist, starts = _coarsen_crds(clist)
+    for xnc, s, axis in zip(clist, starts, spatial):
+        if s is not None:
+            arr = block_reduce(arr, s, axis, kind, weights=np.diff(xnc))
+    return arr, new_clist
+
+def coarsen(fld, kind="mean"):
+    """Halve the resolution of a field with block reductions
+
+    This is one level of a pyramid, see :py:class:`FieldPyramid`.
+
+    Parameters:
+        fld (Field): a single patch field
+        kind (str): 'mean', 'min', 'max', or 'absmax'
+
+    Returns:
+        a cell centered Field
+    """
+    cfld = fld.as_cell_centered()
+    axes = list(cfld.crds.axes)
+    dat = cfld.data
+    if not np.issubdtype(dat.dtype, np.floating):
+        dat = dat.astype('f8')
+    arr, new_clist = _coarsen(dat, [cfld.crds.get_nc(ax) for ax in axes],
+                              _spatial_axes(cfld), kind)
+    crds = coordinate.arrays2crds(new_clist, crd_names=axes)
+    return cfld.wrap(arr, {"crds": crds, "center": "cell"})
+
+
+class FieldPyramid(object):
+    """Block reduced copies of a Field that are 2, 4, 8... times coarser
+
+    Parameters:
+        fld (Field): a single patch field
+        key (str): used to name the disk cache, or None to only keep
+            the pyramid in memory
+    """
+    def __init__(self, fld, key=None):
+        if fld.nr_patches != 1:
+            raise ValueError("Pyramids of AMR fields aren't supported")
+        self.fld = fld
+        self.key = key
+        self._cfld = fld.as_cell_centered()
+        self._axes = list(self._cfld.crds.axes)
+        # node crds of each level, level 0 is the field's
+        self._clists = [[(ax, self._cfld.crds.get_nc(ax))
+                         for ax in self._axes]]
+        self._levels = {}
+        self._fname = None
+
+        if key is not None and use_disk_cache:
+            fname = os.path.join(_get_cache_dir(), key + ".npz")
+            if self._load_index(fname):
+                self._fname = fname
+                if profiling.enabled:
+                    profiling.count("pyramid.disk_cache_hit")
+                return
+        if profiling.enabled:
+            profiling.count("pyramid.disk_cache_miss")
+        self._build()
+        if key is not None and use_disk_cache:
+            self._save(os.path.join(_get_cache_dir(), key + ".npz"))
+
+    @property
+    def nr_levels(self):
+        return len(self._clists)
+
+    def _level_shape(self, clist):
+        return [len(xnc) - 1 for _, xnc in clist]
+
+    def _build(self):
+        dat = self._cfld.data
+        if not np.issubdtype(dat.dtype, np.floating):
+            dat = dat.astype('f8')
+        spatial = _spatial_axes(self._cfld)
+        prev = dict((kind, dat) for kind in KINDS)
+        clist = self._clists[0]
+        with profiling.timer("pyramid.build"):
+            while max(self._level_shape(clist)) > min_cells:
+                crds = [xnc for _, xnc in clist]
+                level = {}
+                for kind in KINDS:
+                    level[kind], new_crds = _coarsen(prev[kind], crds,
+                                                     spatial, kind)
+                clist = list(zip(self._axes, new_crds))
+                self._clists.append(clist)
+                k = len(self._clists) - 1
+                for kind in KINDS:
+                    self._levels[(k, kind)] = level[kind]
+                prev = level
+
+    def _save(self, fname):
+        arrs = {"nr_levels": np.array(self.nr_levels)}
+        for k in range(1, self.nr_levels):
+            for name, xnc in self._clists[k]:
+                arrs["crd{0}_{1}".format(k, name)] = xnc
+            for kind in KINDS:
+                arrs["{0}{1}".format(kind, k)] = self._levels[(k, kind)]
+        d = os.path.dirname(fname)
+        tmp = "{0}.{1}.tmp.npz".format(fname[:-4], os.getpid())
+        try:
+            if not os.path.isdir(d):
+                os.makedirs(d)
+            np.savez(tmp, **arrs)
+            os.rename(tmp, fname)
+            self._fname = fname
+            prune_cache_dir(d, max_disk_cache_nbytes, suffix=".npz")
+        except (IOError, OSError) as e:
+            logger.debug("Could not cache pyramid %s: %s", fname, e)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def _load_index(self, fname):
+        """Read just the crds of each level from a cache file"""
+        try:
+            with np.load(fname) as f:
+                nr_levels = int(f["nr_levels"])
+                for k in range(1, nr_levels):
+                    self._clists.append([(name, f["crd{0}_{1}".format(k,
+                                                                      name)])
+                                         for name in self._axes])
+        except (IOError, OSError, KeyError, ValueError):
+            self._clists = self._clists[:1]
+            return False
+        try:
+            # the mtime is the last used time for prune_cache_dir
+            os.utime(fname, None)
+        except OSError:
+            pass
+        return True
+
+    def level_crds(self, k):
+        """Coordinates of level k"""
+        if k == 0:
+            return self._cfld.crds
+        return coordinate.arrays2crds([xnc for _, xnc in self._clists[k]],
+                                      crd_names=self._axes)
+
+    def level(self, k, kind="mean"):
+        """Get a level of the pyramid as a cell centered Field
+
+        Parameters:
+            k (int): level, 0 is the field itself; this is clipped to
+                the range of levels
+            kind (str): 'mean', 'min', 'max', or 'absmax' (the larger
+                of -min and max)
+
+        Returns:
+            Field
+        """
+        k = int(np.clip(k, 0, self.nr_levels - 1))
+        if k == 0:
+            return self._cfld
+        if kind == "absmax":
+            arr = np.fmax(-self._level_data(k, "min"),
+                          self._level_data(k, "max"))
+        elif kind in KINDS:
+            arr = self._level_data(k, kind)
+        else:
+            raise ValueError("kind should be 'mean', 'min', 'max', or "
+                             "'absmax', not {0}".format(kind))
+        return self._cfld.wrap(arr, {"crds": self.level_crds(k),
+                                     "center": "cell"})
+
+    def _level_data(self, k, kind):
+        arr = self._levels.get((k, kind), None)
+        if arr is None:
+            with profiling.timer("pyramid.load"), np.load(self._fname) as f:
+                arr = f["{0}{1}".format(kind, k)]
+            self._levels[(k, kind)] = arr
+        return arr
+
+    def choose_level(self, cell_size, axes=None):
+        """Find the coarsest level with cells no bigger than cell_size
+
+        Parameters:
+            cell_size (sequence): largest acceptable cell width along
+                each of `axes`, like the size of one pixel
+            axes (sequence): axis names, defaults to all axes
+
+        Returns:
+            int: a level, 0 if even the field's cells are too big
+        """
+        if axes is None:
+            axes = self._axes
+        idx = [self._axes.index(ax) for ax in axes]
+        best = 0
+        for k in range(1, self.nr_levels):
+            clist = self._clists[k]
+            if all(np.max(np.diff(clist[i][1])) <= dx
+                   for i, dx in zip(idx, cell_size)):
+                best = k
+            else:
+                break
+        return best
+
+    def choose_level_by_size(self, max_size):
+        """Find the finest level with no more than max_size cells
+
+        Returns:
+            int: a level, the coarsest one if they're all too big
+        """
+        for k in range(self.nr_levels):
+            if np.prod(self._level_shape(self._clists[k])) <= max_size:
+                return k
+        return self.nr_levels - 1
+
+
+def _source_key(fld, selection=None):
+    """Key for the disk cache, or None if fld isn't backed by a file"""
+    srcs = fld._src_data  # pylint: disable=protected-access
+    if not isinstance(srcs, (list, tuple)):
+        srcs = [srcs]
+    parts = [fld.name, repr(fld.time), fld.center, repr(fld.shape),
+             np.dtype(fld.dtype).str, repr(min_cells), repr(selection)]
+    for src in srcs:
+        fname = getattr(src, "fname", None) or getattr(src, "filename", None)
+        if fname is None or isinstance(src, np.ndarray):
+            return None
+        try:
+            st = os.stat(fname)
+        except OSError:
+            return None
+        mtime = getattr(st, "st_mtime_ns", int(st.st_mtime * 1e9))
+        parts += [os.path.abspath(fname), str(mtime), str(st.st_size),
+                  repr(getattr(src, "loc", None)),
+                  repr(getattr(src, "fld_name", None)),
+                  repr(getattr(src, "comp_idx", None))]
+    s = ":".join(parts)
+    return hashlib.sha1(s.encode('utf-8')).hexdigest()
+
+def get_pyramid(fld, selection=None):
+    """Get the pyramid of a field, making it if needed
+
+    The pyramid is remembered on the field until its clear_cache, and
+    on disk if `use_disk_cache` is True and the field was read from a
+    file.
+
+    Parameters:
+        fld (Field): a single patch field
+        selection (str): if given, make a pyramid of just
+            ``fld.slice_and_keep(selection)``, like the plane that a
+            2d plot shows
+
+    Returns:
+        FieldPyramid
+    """
+    pyramids = getattr(fld, "_pyramids", None)
+    if pyramids is None:
+        pyramids = {}
+        try:
+            fld._pyramids = pyramids  # pylint: disable=protected-access
+        except AttributeError:
+            pass
+    pyr = pyramids.get(selection, None)
+    if pyr is None:
+        src = fld if selection is None else fld.slice_and_keep(selection)
+        pyr = FieldPyramid(src, key=_source_key(fld, selection=selection))
+        pyramids[selection] = pyr
+    return pyr
+
+def clear_cache():
+    """Delete all the pyramids saved on disk"""
+    d = _get_cache_dir()
+    if os.path.isdir(d):
+        for fn in os.listdir(d):
+            if fn.endswith(".npz"):
+                try:
+                    os.remove(os.path.join(d, fn))
+                except OSError:
+                    pass
+
+##
+## EOF
+##
@@ -1,40 +1,56 @@
 """ docstring for readers """
 
-# To add a new file type, subclass VFile and import the module here.
-# This registers the file type class as a subclass of VFile, and
-# it automatically becomes part of the file detection cascade...
+# To add a new file type, subclass VFile and register the module here
+# with a regex that matches the files it reads. The module is imported
+# the first time a matching file is opened, which registers the file
+# type class as a subclass of VFile, and it automatically becomes part
+# of the file detection cascade...
 # Note that subclasses are given precedence in type detection, so
-# care must be taken when crafting the detector regex.
+# care must be taken when crafting the detector regex. The modules are
+# imported in the order they're registered here.
 # Also, look at csv for an example of overriding detect_type(...)
 
-__DEBUG_IMPORT_ERRORS = False
+import importlib
+import sys
 
 import viscid
 # import vfile
-from viscid.readers.vfile import VFile
+from viscid.readers.vfile import VFile, register_reader, import_readers
 from viscid.readers import vfile_bucket
 
-# these imports are necessary to register file types
-from viscid.readers import xdmf
-from viscid.readers import hdf5
-from viscid.readers import numpy_binary
-from viscid.readers import ascii
+# these modules register file types
+register_reader(r".*\.(xmf|xdmf)\s*$", "viscid.readers.xdmf")
+register_reader(r".*\.h5\s*$", "viscid.readers.hdf5")
+register_reader(r".*\.npz\s*$", "viscid.readers.numpy_binary")
+register_reader(r".*\.(txt|asc)\s*$", "viscid.readers.ascii")
 
-# these imports register convenience readers for data from
+# these modules register convenience readers for data from
 # specific sim packages
-from viscid.readers import ggcm_xdmf
-from viscid.readers import ggcm_fortbin
-from viscid.readers import psc
-from viscid.readers import gkeyll
-from viscid.readers import athena_bin
-from viscid.readers import athena_tab
-from viscid.readers import athena_hst
-from viscid.readers import athena_xdmf
-try:
-    from viscid.readers import ggcm_jrrle
-except ImportError:
-    if __DEBUG_IMPORT_ERRORS:
-        raise
+register_reader(r".*\.(xmf|xdmf)\s*$", "viscid.readers.ggcm_xdmf")
+register_reader(r".*\.b\s*$", "viscid.readers.ggcm_fortbin")
+register_reader(r".*fd(?:\.[0-9]{6})?\.xdmf", "viscid.readers.psc")
+register_reader(r".*\.h5\s*$", "viscid.readers.gkeyll")
+register_reader(r".*\.bin\s*$", "viscid.readers.athena_bin")
+register_reader(r".*\.tab\s*$", "viscid.readers.athena_tab")
+register_reader(r".*\.hst\s*$", "viscid.readers.athena_hst")
+register_reader(r".*\.xdmf\s*$", "viscid.readers.athena_xdmf")
+register_reader(r".*\.[0-9]{6}\s*$", "viscid.readers.ggcm_jrrle")
+
+_reader_modules = ["xdmf", "hdf5", "numpy_binary", "ascii", "ggcm_xdmf",
+                   "ggcm_fortbin", "psc", "gkeyll", "athena_bin",
+                   "athena_tab", "athena_hst", "athena_xdmf", "ggcm_jrrle",
+                   "openggcm", "athena", "text_table"]
+
+def __getattr__(name):
+    # so viscid.readers.xdmf and friends work without an explicit import
+    if name in _reader_modules:
+        return importlib.import_module(__name__ + "." + name)
+    raise AttributeError("module '{0}' has no attribute '{1}'"
+                         "".format(__name__, name))
+
+if sys.version_info < (3, 7):
+    # no module __getattr__, so just import everything now
+    import_readers()
 
 __filebucket__ = vfile_bucket.VFileBucket()
 
@@ -14,6 +14,7 @@ import numpy as np
 
 # from viscid import logger
 from viscid.readers import vfile
+from viscid.readers.text_table import load_table
 from viscid import coordinate
 from viscid import field
 
@@ -28,14 +29,17 @@ class FileASCII(vfile.VFile):  # pylint: disable=W0223
     def _parse(self):
         g = self._make_grid(self)
 
-        arr = np.loadtxt(self.fname)
-        crds = coordinate.wrap_crds("nonuniform_cartesian", [['x', arr[:, 0]]])
+        # load_table's result is shared with its cache, so fields get
+        # their own copy of each column
+        arr = load_table(self.fname)
+        crds = coordinate.wrap_crds("nonuniform_cartesian",
+                                    [['x', np.array(arr[:, 0])]])
         g.set_crds(crds)
 
         if len(arr.shape) > 1:
             for i in range(1, arr.shape[1]):
                 fld = self._make_field(g, "Scalar", 'c' + str(i), crds,
-                                       arr[:, i])
+                                       np.array(arr[:, i]))
                 g.add_field(fld)
 
         self.add(g)
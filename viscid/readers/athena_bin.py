@@ -14,6 +14,7 @@ from viscid.readers import vfile
 from viscid.readers.vfile_bucket import ContainerFile
 from viscid.readers import athena
 from viscid import coordinate
+from viscid import profiling
 
 
 class AthenaBinFile(athena.AthenaFile, ContainerFile):  # pylint: disable=abstract-method
@@ -367,8 +368,10 @@ class AthenaBinDataWrapper(vfile.DataWrapper):
         return self.file_wrapper.float_dtype
 
     def __array__(self, *args, **kwargs):
-        with self.file_wrapper as f:
+        with profiling.timer("read.athena_bin"), self.file_wrapper as f:
             arr = f.read_field(self.fld_number).reshape(self.expected_shape)
+        if profiling.enabled:
+            profiling.count("read.athena_bin.bytes", arr.nbytes)
         return arr.astype(self.dtype)
 
     def read_direct(self, *args, **kwargs):
@@ -6,6 +6,7 @@ import re
 import numpy as np
 
 from viscid.readers import vfile
+from viscid.readers.text_table import load_table
 from viscid import field
 from viscid import coordinate
 
@@ -31,7 +32,8 @@ class AthenaHstFile(vfile.VFile):  # pylint: disable=abstract-method
             fld_names = [fn.strip() for fn in fld_names]
 
         # crds here are really times
-        dat = np.loadtxt(self.fname, unpack=True)
+        # load_table's result is shared with its cache, so copy it
+        dat = np.array(load_table(self.fname).T)
         t = dat[0]
         crds = coordinate.wrap_crds("nonuniform_cartesian", [('t', t)])
 
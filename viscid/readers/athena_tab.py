@@ -10,6 +10,7 @@ import numpy as np
 from viscid.readers.vfile_bucket import ContainerFile
 from viscid.readers import athena
 from viscid.readers import vfile
+from viscid.readers.text_table import load_table
 from viscid import coordinate
 
 
@@ -148,8 +149,7 @@ class AthenaTabFile(athena.AthenaFile, ContainerFile):  # pylint: disable=abstra
         # dims are xyz order unlike all other interfaces
         if dims is None:
             dims = cls.parse_header(fname)['dims']
-        dat = np.loadtxt(fname, usecols=list(range(len(dims), 2 * len(dims))),
-                         unpack=True, ndmin=2)
+        dat = load_table(fname)[:, len(dims):2 * len(dims)].T
 
         dxmin = np.inf
         cclist = []
@@ -159,7 +159,8 @@ class AthenaTabFile(athena.AthenaFile, ContainerFile):  # pylint: disable=abstra
             stop = int(np.prod(dims[:i + 1]))
             step = int(np.prod(dims[:i]))
             cc = dat[i][:stop:step]
-            dxmin = np.min(dxmin, np.min(cc[1:] - cc[:-1]))
+            if len(cc) > 1:
+                dxmin = min(dxmin, np.min(cc[1:] - cc[:-1]))
             assert len(cc) == dim
             cclist.append((axis, cc))
 
@@ -209,7 +210,9 @@ class AthenaTabDataWrapper(vfile.DataWrapper):
     def __array__(self, *args, **kwargs):
         # the first 2 * nr_dims columns are for coordinates
         col = 2 * len(self.shape) + self.fld_number
-        arr = np.loadtxt(self.filename, usecols=(col,), unpack=True)
+        # the table is cached, so the file is only parsed once for all
+        # the fields in it
+        arr = load_table(self.filename)[:, col]
         arr = arr.reshape(self.shape).astype(self.dtype)
         return arr
 
@@ -7,6 +7,7 @@ from datetime import datetime, timedelta
 import numpy as np
 
 from viscid import grid
+from viscid import profiling
 from viscid.readers import vfile
 from viscid.readers import openggcm
 from viscid.compat import OrderedDict
@@ -236,6 +237,8 @@ class GGCMFortbinFileWrapper(object):
 
     def open(self):
         if self._file is None:
+            if profiling.enabled:
+                profiling.count("fortbin.opens")
             self._file = open(self.filename, 'rb')
             try:
                 if self._endian is None or self._file_meta is None:
@@ -279,6 +282,9 @@ class GGCMFortbinFileWrapper(object):
         if not self.isopen:
             raise RuntimeError("Trying to read header, but file is closed.")
 
+        if profiling.enabled:
+            profiling.count("fortbin.header_scans")
+
         try:
             pos = self._file.tell()
             endian_marker = self._file.read(4)
@@ -352,12 +358,58 @@ class FortbinDataWrapper(vfile.DataWrapper):
     def dtype(self):
         return np.dtype("float32")
 
+    def byte_ranges(self):
+        # one range for the header and data
+        ndim = len(self.expected_shape)
+        header_size = 4 + 4 + 4 + (4 * ndim) + (2 * 80)
+        nbytes = header_size + 4 * int(np.prod(self.expected_shape))
+        return [(self.filename, self.file_position, nbytes)]
+
     def __array__(self, *args, **kwargs):
+        bufs = self._pop_prefetched()
+        if bufs is not None:
+            return self._from_bytes(bufs[0])
         with self.file_wrapper as f:
-            # fld_name, meta, arr = f.read_field_at(self.loc, ndim)
+            return self._read(f)
+
+    def _from_bytes(self, buf):
+        """Parse the header and data from prefetched bytes"""
+        ndim = len(self.expected_shape)
+        header_size = 4 + 4 + 4 + (4 * ndim) + (2 * 80)
+        nelem = int(np.prod(self.expected_shape))
+        if len(buf) < header_size + 4 * nelem:
+            raise IOError("Short read for field '{0}' from file '{1}'"
+                          "".format(self.fld_name, self.filename))
+        if bytes(buf[:4]) == struct.pack('<i', 2):
+            endian = '<'
+        elif bytes(buf[:4]) == struct.pack('>i', 2):
+            endian = '>'
+        else:
+            raise IOError("Can't detect endian, not a fortbin file: "
+                          "{0}".format(self.filename))
+        dims = struct.unpack(endian + '{0}i'.format(ndim),
+                             bytes(buf[12:12 + 4 * ndim]))
+        fld_name = bytes(buf[12 + 4 * ndim:92 + 4 * ndim]).decode().strip()
+        if fld_name != self.fld_name or dims != tuple(self.expected_shape):
+            raise RuntimeError("Field '{0}' from file '{1}' isn't where "
+                               "it's expected to be".format(self.fld_name,
+                                                            self.filename))
+        arr = np.frombuffer(buf, dtype=np.dtype(endian + 'f'), count=nelem,
+                            offset=header_size)
+        # fortran ordered xyz is the same as C ordered zyx
+        arr = np.array(arr.reshape(dims[::-1]), dtype=self.dtype)
+        if profiling.enabled:
+            profiling.count("read.fortbin.bytes", arr.nbytes)
+        return arr
+
+    def _read(self, f):
+        """Read the data given an open GGCMFortbinFileWrapper"""
+        with profiling.timer("read.fortbin"):
             meta, arr = f.read_field(self.fld_name, pos=self.file_position)
-            arr = np.array(arr.flatten(order='F').reshape(meta['dims'][::-1]),
-                           order='C')
+            # arr is fortran ordered xyz, so its transpose is C ordered zyx
+            arr = np.ascontiguousarray(arr.T, dtype=self.dtype)
+        if profiling.enabled:
+            profiling.count("read.fortbin.bytes", arr.nbytes)
 
         # meta's dims are xyz (from file), but ex
         if meta['dims'] != self.expected_shape:
@@ -366,7 +418,27 @@ class FortbinDataWrapper(vfile.DataWrapper):
                                    self.fld_name,
                                    self.filename, meta['dims'],
                                    self.expected_shape))
-        return arr.astype(self.dtype)
+        return arr
+
+    @classmethod
+    def read_many(cls, wrappers):
+        """Open each file once and read its fields in the order they're
+        stored"""
+        by_file = OrderedDict()
+        for i, wrapper in enumerate(wrappers):
+            if wrapper._prefetched is not None:
+                yield i, wrapper.__array__()
+            else:
+                by_file.setdefault(wrapper.file_wrapper, []).append(i)
+
+        for file_wrapper, idxs in by_file.items():
+            idxs.sort(key=lambda i: wrappers[i].file_position)
+            with file_wrapper as f:
+                start = wrappers[idxs[0]].file_position
+                stop = wrappers[idxs[-1]].file_position + f.file_meta['nbytes']
+                vfile.readahead(f.filename, start, stop - start)
+                for i in idxs:
+                    yield i, wrappers[i]._read(f)
 
     def read_direct(self, *args, **kwargs):
         return self.__array__()
@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 import numpy as np
 
 from viscid import grid
+from viscid import profiling
 from viscid.readers import vfile
 from viscid.readers import openggcm
 from viscid.readers._fortfile_wrapper import FortranFile
@@ -130,6 +131,11 @@ class JrrleFileWrapper(FortranFile):
         self.seen_all_fields = False
         super(JrrleFileWrapper, self).__init__(filename)
 
+    def open(self):
+        if profiling.enabled:
+            profiling.count("jrrle.opens")
+        super(JrrleFileWrapper, self).open()
+
     def read_field(self, fld_name, ndim):
         """Read a field given a seekable location
 
@@ -197,6 +203,9 @@ class JrrleFileWrapper(FortranFile):
         if not self.isopen:
             raise RuntimeError("file is not open")
 
+        if profiling.enabled:
+            profiling.count("jrrle.header_scans")
+
         varname = np.array(" "*80, dtype="S80")
         tstring = np.array(" "*80, dtype="S80")
         found_field, ndim, nx, ny, nz, it = _jrrle.inquire_next(self._unit,
@@ -257,11 +266,18 @@ class JrrleDataWrapper(vfile.DataWrapper):
 
     def __array__(self, *args, **kwargs):
         with self.file_wrapper as f:
+            return self._read(f)
+
+    def _read(self, f):
+        """Read the data given an open JrrleFileWrapper"""
+        with profiling.timer("read.jrrle"):
             ndim = len(self.expected_shape)
             # fld_name, meta, arr = f.read_field_at(self.loc, ndim)
             meta, arr = f.read_field(self.fld_name, ndim)
-            arr = np.array(arr.flatten(order='F').reshape(meta['dims'][::-1]),
-                           order='C')
+            # arr is fortran ordered xyz, so its transpose is C ordered zyx
+            arr = np.ascontiguousarray(arr.T, dtype=self.dtype)
+        if profiling.enabled:
+            profiling.count("read.jrrle.bytes", arr.nbytes)
 
         # meta's dims are xyz (from file), but ex
         if meta['dims'] != self.expected_shape:
@@ -269,7 +285,28 @@ class JrrleDataWrapper(vfile.DataWrapper):
                                "instead of {3}".format(self.fld_name,
                                self.filename, meta['dims'],
                                self.expected_shape))
-        return arr.astype(self.dtype)
+        return arr
+
+    @classmethod
+    def read_many(cls, wrappers):
+        """Open each file once and read its fields in the order they're
+        stored"""
+        by_file = OrderedDict()
+        for i, wrapper in enumerate(wrappers):
+            by_file.setdefault(wrapper.file_wrapper, []).append(i)
+
+        for file_wrapper, idxs in by_file.items():
+            with file_wrapper as f:
+                # one scan through the headers to find where everything is
+                f.inquire_all_fields()
+
+                def _position(i):
+                    meta = f.fields_seen.get(wrappers[i].fld_name, None)
+                    return -1 if meta is None else meta['file_position']
+                idxs.sort(key=_position)
+                vfile.readahead(f.filename, max(_position(idxs[0]), 0))
+                for i in idxs:
+                    yield i, wrappers[i]._read(f)
 
     def read_direct(self, *args, **kwargs):
         return self.__array__()
@@ -1,14 +1,47 @@
 """Loads a ggcm log file
 
-Parses the view info """
+Parses the view info. Parsed info is cached in memory, and optionally
+on disk (as json in `cache_dir`), keyed by the log's path, mtime and
+size, so each run's log is only parsed once even if thousands of files
+are opened.
+
+Attributes:
+    use_disk_cache (bool): save / load parsed info to / from
+        `cache_dir` (default: False)
+    cache_dir (str): where to put the caches, defaults to
+        $XDG_CACHE_HOME/viscid/logfiles (~/.cache/viscid/logfiles)
+    max_disk_cache_nbytes (int): least recently used caches are
+        deleted from `cache_dir` to keep it under this size, None
+        means no limit
+    mem_cache_size (int): number of parsed logs to keep in memory
+
+These attributes can be set from `~/.viscidrc`, for instance
+``readers.ggcm_logfile.use_disk_cache: true``.
+"""
 
 from __future__ import print_function
+from collections import OrderedDict
+import hashlib
 import itertools
+import json
+import os
 import re
 
 import numpy as np
 
+from viscid import logger
 from viscid.readers import vfile
+from viscid.vutil import user_cache_dir, prune_cache_dir
+
+use_disk_cache = False
+cache_dir = None
+max_disk_cache_nbytes = 64 * 1024**2
+mem_cache_size = 64
+
+# bump this if the parser changes so old disk caches are ignored
+_PARSER_VERSION = 2
+_mem_cache = OrderedDict()
+
 
 class GGCMLogFile(vfile.VFile):  # pylint: disable=W0223
     """Libmrc log file reader
@@ -32,10 +65,52 @@ class GGCMLogFile(vfile.VFile):  # pylint: disable=W0223
     info = None
 
     def _parse(self):
+        # each file gets its own dict, but the values are shared
+        self.info = dict(self._cached_info(self.fname))
+
+    @classmethod
+    def _cache_key(cls, fname):
+        st = os.stat(fname)
+        mtime = getattr(st, "st_mtime_ns", int(st.st_mtime * 1e9))
+        s = "{0}:{1}:{2}:{3}:{4}".format(fname, mtime, st.st_size,
+                                         ",".join(cls.watched_classes),
+                                         _PARSER_VERSION)
+        return hashlib.sha1(s.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def _cached_info(cls, fname):
+        key = cls._cache_key(fname)
+        if key in _mem_cache:
+            _mem_cache[key] = _mem_cache.pop(key)
+            return _mem_cache[key]
+
+        info = None
+        path = os.path.join(user_cache_dir("logfiles", override=cache_dir),
+                            key + ".json")
+        if use_disk_cache:
+            try:
+                with open(path, 'r') as f:
+                    info = json.load(f, object_hook=_from_json)
+                # the mtime is the last used time for prune_cache_dir
+                os.utime(path, None)
+            except (IOError, OSError, ValueError):
+                info = None
+        if info is None:
+            info = cls._parse_info(fname)
+            if use_disk_cache:
+                _save_json(path, info)
+
+        _mem_cache[key] = info
+        while len(_mem_cache) > max(mem_cache_size, 0):
+            _mem_cache.popitem(last=False)
+        return info
+
+    @classmethod
+    def _parse_info(cls, fname):
         _info = {}
 
         armed = False
-        with open(self.fname, 'r') as f:
+        with open(fname, 'r') as f:
             # find end of view
             is_timestep = lambda s: not s.strip().startswith(('cp=', 'step='))
             lines_iter = itertools.takewhile(is_timestep, f)
@@ -43,7 +118,7 @@ class GGCMLogFile(vfile.VFile):  # pylint: disable=W0223
                 line = line.strip()
                 if armed:
                     try:
-                        key, val = self._parse_param(line)
+                        key, val = cls._parse_param(line)
                         _info["{0}_{1}".format(armed, key)] = val
                     except ValueError:
                         # this is expected for lines that look like
@@ -60,7 +135,7 @@ class GGCMLogFile(vfile.VFile):  # pylint: disable=W0223
                     try:
                         c = re.match(r"=+ class == (.+)", line).group(1)
                         c = c.strip()
-                        if c in self.watched_classes:
+                        if c in cls.watched_classes:
                             armed = c
                             # the next lines just say
                             # "parameter  | value"
@@ -72,7 +147,7 @@ class GGCMLogFile(vfile.VFile):  # pylint: disable=W0223
                         # not the start of a new class view, that's ok
                         pass
 
-        self.info = _info
+        return _info
 
     @staticmethod
     def _parse_value(s):
@@ -130,6 +205,54 @@ class GGCMLogFile(vfile.VFile):  # pylint: disable=W0223
         self.info = {}
         super(GGCMLogFile, self).unload(**kwargs)
 
+
+def _to_json(obj):
+    """info values are scalars, strings, lists, or small ndarrays"""
+    if isinstance(obj, np.ndarray):
+        return {"__ndarray__": obj.tolist(), "dtype": obj.dtype.str}
+    elif isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError("can't save {0} as json".format(type(obj)))
+
+def _from_json(dct):
+    if "__ndarray__" in dct:
+        return np.array(dct["__ndarray__"], dtype=dct["dtype"])
+    return dct
+
+def _save_json(path, obj):
+    d = os.path.dirname(path)
+    tmp = "{0}.{1}.tmp".format(path, os.getpid())
+    try:
+        if not os.path.isdir(d):
+            os.makedirs(d)
+        with open(tmp, 'w') as f:
+            json.dump(obj, f, default=_to_json)
+        os.rename(tmp, path)
+        prune_cache_dir(d, max_disk_cache_nbytes, suffix=".json")
+    except (IOError, OSError, TypeError, ValueError) as e:
+        logger.debug("Could not cache logfile info %s: %s", path, e)
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+def clear_cache(disk=False):
+    """Forget all parsed log files
+
+    Parameters:
+        disk (bool): also delete the files in the cache directory
+    """
+    _mem_cache.clear()
+    if disk:
+        d = user_cache_dir("logfiles", override=cache_dir)
+        if os.path.isdir(d):
+            for fn in os.listdir(d):
+                if fn.endswith(".json"):
+                    try:
+                        os.remove(os.path.join(d, fn))
+                    except OSError:
+                        pass
+
 ##
 ## EOF
 ##
@@ -1,9 +1,14 @@
 from __future__ import print_function
+import itertools
 import os
 
 import numpy as np
 
 from viscid import logger
+from viscid import coordinate
+from viscid import parallel
+from viscid import profiling
+from viscid.compat import izip, OrderedDict
 from viscid.readers import vfile
 
 try:
@@ -39,16 +44,19 @@ class H5pyDataWrapper(vfile.DataWrapper):
     def _read_info(self):
         try:
             with h5py.File(self.fname, 'r') as f:
-                dset = f[self.loc]
-                self._shape = list(dset.shape)
-                if self.comp_dim is not None:
-                    self._shape.pop(self.comp_dim)
-                self._shape = tuple(self._shape)
-                self._dtype = dset.dtype
+                self._read_info_from(f)
         except IOError:
             logger.error("Problem opening hdf5 file, '%s'", self.fname)
             raise
 
+    def _read_info_from(self, f):
+        dset = f[self.loc]
+        self._shape = list(dset.shape)
+        if self.comp_dim is not None:
+            self._shape.pop(self.comp_dim)
+        self._shape = tuple(self._shape)
+        self._dtype = dset.dtype
+
     @property
     def shape(self):
         """ only ask for this if you really need it; can be a speed problem
@@ -101,29 +109,58 @@ class H5pyDataWrapper(vfile.DataWrapper):
         return slc
 
     def read_direct(self, arr, **kwargs):
+        with profiling.timer("read.hdf5"), h5py.File(self.fname, 'r') as f:
+            self._read_direct_from(f, arr, **kwargs)
+
+    def _read_direct_from(self, f, arr, **kwargs):
         source_sel = kwargs.pop("source_sel", None)
         source_sel = self._inject_comp_slice(source_sel)
-        with h5py.File(self.fname, 'r') as f:
-            fill_arr = arr
-            if self.transpose:
-                # FIXME: the temp array here isn't pretty, but transposing
-                # the array is kind of a hack anyway. it is fixed by the
-                # ability for fields to specify their xyz/zyx order in the
-                # xyz branch, but that branch isn't fully tested yet
-                fill_arr = np.empty(arr.shape[::-1], dtype=arr.dtype)
-            f[self.loc].read_direct(fill_arr, source_sel=source_sel,
-                                    **kwargs)
-            if self.transpose:
-                arr[...] = fill_arr.T
+        fill_arr = arr
+        if self.transpose:
+            # FIXME: the temp array here isn't pretty, but transposing
+            # the array is kind of a hack anyway. it is fixed by the
+            # ability for fields to specify their xyz/zyx order in the
+            # xyz branch, but that branch isn't fully tested yet
+            fill_arr = np.empty(arr.shape[::-1], dtype=arr.dtype)
+        f[self.loc].read_direct(fill_arr, source_sel=source_sel, **kwargs)
+        if self.transpose:
+            arr[...] = fill_arr.T
+        if profiling.enabled:
+            profiling.count("read.hdf5.bytes", fill_arr.nbytes)
+
+    @classmethod
+    def read_many(cls, wrappers):
+        """Open each file once and read datasets in the order they're
+        stored (chunked datasets come last)"""
+        by_file = OrderedDict()
+        for i, wrapper in enumerate(wrappers):
+            by_file.setdefault(wrapper.fname, []).append(i)
+
+        for fname, idxs in by_file.items():
+            with h5py.File(fname, 'r') as f:
+                def _offset(i):
+                    offset = f[wrappers[i].loc].id.get_offset()
+                    return (offset is None, offset or 0)
+                idxs.sort(key=_offset)
+                for i in idxs:
+                    wrapper = wrappers[i]
+                    if wrapper._shape is None or wrapper._dtype is None:
+                        wrapper._read_info_from(f)
+                    arr = np.empty(wrapper.shape, dtype=wrapper.dtype)
+                    with profiling.timer("read.hdf5"):
+                        wrapper._read_direct_from(f, arr)
+                    yield i, arr
 
     def __getitem__(self, item):
         item = self._inject_comp_slice(item)
-        with h5py.File(self.fname, 'r') as f:
+        with profiling.timer("read.hdf5"), h5py.File(self.fname, 'r') as f:
             arr = f[self.loc][item]
-            if self.transpose:
-                return np.transpose(arr)
-            else:
-                return arr
+        if profiling.enabled:
+            profiling.count("read.hdf5.bytes", np.asarray(arr).nbytes)
+        if self.transpose:
+            return np.transpose(arr)
+        else:
+            return arr
 
 
 class FileLazyHDF5(vfile.VFile):
@@ -157,11 +194,22 @@ class FileHDF5(vfile.VFile): #pylint: disable=R0922
                    "face": "/flds_fc",
                    "edge": "/flds_ec"}
 
+    _STEP_GROUP_FMT = "/step_{0:06d}"
+    # target number of bytes for each slab that's written in one go,
+    # and the target chunk size on disk when chunks=True
+    _SLAB_NBYTES = 16 * 1024**2
+    _CHUNK_NBYTES = 1024**2
+
     _XDMF_TEMPLATE_BEGIN = \
 """<?xml version='1.0' ?>
 <Xdmf xmlns:xi='http://www.w3.org/2001/XInclude' Version='2.0'>
 <Domain>
-<Grid GridType="Collection" CollectionType="Spatial">
+"""
+    _XDMF_TEMPLATE_TEMPORAL_BEGIN = \
+"""<Grid GridType="Collection" CollectionType="Temporal">
+"""
+    _XDMF_TEMPLATE_SPATIAL_BEGIN = \
+"""<Grid GridType="Collection" CollectionType="Spatial">
   <Time Type="Single" Value="{time}" />
 """
     _XDMF_TEMPLATE_RECTILINEAR_GRID_BEGIN = \
@@ -178,6 +226,18 @@ class FileHDF5(vfile.VFile): #pylint: disable=R0922
        {h5fname}:{zloc}
     </DataItem>
     </Geometry>
+"""
+    _XDMF_TEMPLATE_CORECT_GRID_BEGIN = \
+"""  <Grid Name="{grid_name}" GridType="Uniform">
+    <Topology TopologyType="3DCoRectMesh" Dimensions="{crd_dims}"/>
+    <Geometry GeometryType="ORIGIN_DXDYDZ">
+    <DataItem Name="Origin" Dimensions="3" NumberType="Float" Precision="8" Format="XML">
+       {origin}
+    </DataItem>
+    <DataItem Name="Spacing" Dimensions="3" NumberType="Float" Precision="8" Format="XML">
+       {spacing}
+    </DataItem>
+    </Geometry>
 """
     _XDMF_TEMPLATE_ATTRIBUTE = \
 """    <Attribute Name="{fld_name}" AttributeType="{fld_type}" Center="{center}">
@@ -189,10 +249,15 @@ class FileHDF5(vfile.VFile): #pylint: disable=R0922
     _XDMF_TEMPLATE_GRID_END = \
 """  </Grid>
 """
-    _XDMF_TEMPLATE_END = \
+    _XDMF_TEMPLATE_COLLECTION_END = \
 """</Grid>
-</Domain>
+"""
+    _XDMF_TEMPLATE_END = \
+"""</Domain>
 </Xdmf>
+"""
+    _XDMF_TEMPLATE_INCLUDE = \
+"""  <xi:include href="{href}" xpointer="xpointer(//Xdmf/Domain/Grid)"/>
 """
 
     def __init__(self, fname, **kwargs):
@@ -208,67 +273,290 @@ class FileHDF5(vfile.VFile): #pylint: disable=R0922
         if fname is None:
             fname = self.fname
         flds = list(self.iter_fields)
-        self.save_fields(fname, flds)
+        self.save_fields(fname, flds, **kwargs)
 
     @classmethod
-    def save_fields(cls, fname, flds, **kwargs):
-        """ save some fields using the format given by the class """
+    def save_fields(cls, fname, flds, compression=None, compression_opts=None,
+                    shuffle=False, chunks=True, append=False, **kwargs):
+        """Save some fields to hdf5 with a companion xdmf file
+
+        Fields are written a slab at a time in the same zyx order as
+        other xdmf files, so they are never transposed as a whole, and
+        if a field is not loaded and its source can be hypersliced,
+        only one slab is ever in memory. Uniform crds are written as an
+        origin / spacing in the xdmf file, not as full arrays.
+
+        Parameters:
+            fname (str): hdf5 file name, the xdmf file gets the same
+                name with an .xdmf extension
+            flds (list): fields that all share the same crds
+            compression (str, int): 'gzip', 'lzf', or an int for gzip
+                at that level; None means no compression
+            compression_opts: passed to h5py's create_dataset
+            shuffle (bool): use the hdf5 shuffle filter, which helps
+                compression of floats
+            chunks (bool, tuple): True to chunk datasets along z
+                planes, False for contiguous datasets, or an explicit
+                chunk shape given to h5py
+            append (bool): add these fields as a new time step to fname
+                instead of overwriting it
+        """
         # FIXME: this is only good for writing cartesian rectilnear flds
         # FIXME: axes are renamed if flds[0] is 1D or 2D
         assert len(flds) > 0
         fname = os.path.expanduser(os.path.expandvars(fname))
 
-        # FIXME: all coordinates are saved as non-uniform, the proper
-        #        way to do this is to have let coordinate format its own
-        #        hdf5 / xdmf / numpy binary output
-        clist = flds[0].crds.get_clist(full_arrays=True)
-        crd_arrs = [np.array([0.0])] * 3
-        crd_names = ["x", "y", "z"]
-        for i, c in enumerate(clist):
-            crd_arrs[i] = c[1]
-        crd_shape = [len(arr) for arr in crd_arrs]
-        time = flds[0].time
-
-        # write arrays to the hdf5 file
-        with h5py.File(fname, 'w') as f:
-            for axis_name, arr in zip(crd_names, crd_arrs):
-                loc = cls._CRDS_GROUP + '/' + axis_name
-                f[loc] = arr
+        dset_kwargs = dict(shuffle=shuffle)
+        if isinstance(compression, int) and not isinstance(compression, bool):
+            compression, compression_opts = "gzip", compression
+        if compression:
+            dset_kwargs["compression"] = compression
+            dset_kwargs["compression_opts"] = compression_opts
+
+        mode = 'a' if append and os.path.isfile(fname) else 'w'
+        with h5py.File(fname, mode) as f:
+            if append:
+                grp = f.create_group(cls._STEP_GROUP_FMT.format(
+                    len(cls._find_steps(f))))
+            else:
+                grp = f
+            grp.attrs["time"] = flds[0].time
+            cls._write_crds(grp, flds[0].crds)
 
             for fld in flds:
-                loc = cls._FLD_GROUPS[fld.center.lower()] + '/' + fld.name
-                # xdmf files use kji ordering
-                f[loc] = fld.data.T
+                loc = cls._FLD_GROUPS[fld.center.lower()].lstrip('/')
+                loc += '/' + fld.name
+                cls._write_fld(grp, loc, fld, chunks, dset_kwargs)
+
+        cls.write_xdmf(fname)
+
+    @classmethod
+    def _write_crds(cls, grp, crds):
+        crd_grp = grp.create_group(cls._CRDS_GROUP.lstrip('/'))
+        if isinstance(crds, coordinate.UniformCrds):
+            xl = np.zeros((3,), dtype='f8')
+            dx = np.zeros((3,), dtype='f8')
+            n = np.ones((3,), dtype='i8')
+            nr_dims = len(crds.shape_nc)
+            xl[:nr_dims] = crds.xl_nc
+            n[:nr_dims] = crds.shape_nc
+            for i in range(nr_dims):
+                if n[i] > 1:
+                    dx[i] = (crds.xh_nc[i] - crds.xl_nc[i]) / (n[i] - 1)
+            crd_grp.attrs["origin"] = xl
+            crd_grp.attrs["spacing"] = dx
+            crd_grp.attrs["shape"] = n
+        else:
+            clist = crds.get_clist(full_arrays=True)
+            crd_arrs = [np.array([0.0])] * 3
+            for i, c in enumerate(clist):
+                crd_arrs[i] = c[1]
+            for axis_name, arr in zip("xyz", crd_arrs):
+                crd_grp[axis_name] = arr
+
+    @classmethod
+    def _write_fld(cls, grp, loc, fld, chunks, dset_kwargs):
+        """Stream fld into a new dataset grp[loc] one slab at a time"""
+        # xdmf files use kji ordering, so the dataset is fld.data.T
+        shape = tuple(fld.shape[::-1])
+        dtype = np.dtype(fld.dtype).newbyteorder('=')
+
+        # the z axis of fld is the slowest varying spatial axis on disk
+        spatial_axes = list(range(len(fld.shape)))
+        if fld.nr_comps > 0:
+            spatial_axes.remove(fld.nr_comp)
+        zax = spatial_axes[-1]
+        disk_zax = len(shape) - 1 - zax
+        nz = fld.shape[zax]
+        plane_nbytes = max(1, (np.prod(shape) // max(nz, 1)) * dtype.itemsize)
+
+        if chunks is True:
+            chunks = list(shape)
+            chunks[disk_zax] = int(min(nz, max(1, cls._CHUNK_NBYTES //
+                                                  plane_nbytes)))
+            chunks = tuple(chunks)
+        elif not chunks:
+            # h5py still picks chunks if a filter needs them
+            chunks = None
+
+        dset = grp.create_dataset(loc, shape=shape, dtype=dtype,
+                                  chunks=chunks, **dset_kwargs)
+        dset.attrs["center"] = fld.center
+        dset.attrs["fldtype"] = fld.fldtype
+
+        # read slabs lazily if the source is hypersliceable, otherwise
+        # the whole field gets read once anyway
+        was_loaded = fld.is_loaded()
+        lazy = (not was_loaded and
+                getattr(fld._src_data, "_hypersliceable", False))  # pylint: disable=protected-access
+        nplanes = int(max(1, cls._SLAB_NBYTES // plane_nbytes))
+        if isinstance(chunks, tuple):
+            # write whole chunks where possible
+            nplanes = max(chunks[disk_zax],
+                          (nplanes // chunks[disk_zax]) * chunks[disk_zax])
+
+        for k0 in range(0, nz, nplanes):
+            k1 = min(nz, k0 + nplanes)
+            if lazy:
+                sel = "{0}={1}:{2}".format(fld.crds.axes[-1], k0, k1)
+                sub = fld.slice_and_keep(sel)
+                slab = sub.data
+                if fld.nr_comps > 0 and sub.nr_comp != fld.nr_comp:
+                    # slices of flat fields can come back interlaced
+                    src, dst = sub.nr_comp, fld.nr_comp
+                    slab = np.rollaxis(slab, src, dst if dst < src else dst + 1)
+            else:
+                sel = [slice(None)] * len(fld.shape)
+                sel[zax] = slice(k0, k1)
+                slab = fld.data[tuple(sel)]
+            disk_sel = [slice(None)] * len(shape)
+            disk_sel[disk_zax] = slice(k0, k1)
+            dset[tuple(disk_sel)] = np.asarray(slab.T, dtype=dtype)
+
+        if not was_loaded:
+            fld.clear_cache()
+
+    @classmethod
+    def _find_steps(cls, f):
+        """Get a list of groups in an open hdf5 file that hold fields
+
+        If the root holds fields, it comes first, then all the step
+        groups written with append=True in order.
+        """
+        steps = []
+        if cls._CRDS_GROUP.lstrip('/') in f:
+            steps.append(f)
+        step_prefix = cls._STEP_GROUP_FMT.lstrip('/').split('{')[0]
+        names = sorted(k for k in f.keys() if k.startswith(step_prefix))
+        steps += [f[k] for k in names]
+        return steps
 
-        # now write an xdmf file
-        xdmf_fname = os.path.splitext(fname)[0] + ".xdmf"
+    @classmethod
+    def write_xdmf(cls, fname, xdmf_fname=None):
+        """(Re)write the xdmf file that describes an hdf5 file
+
+        This is done from the metadata saved in the hdf5 file, so it
+        describes all time steps in the file.
+
+        Parameters:
+            fname (str): hdf5 file written by :meth:`save_fields`
+            xdmf_fname (str): defaults to fname with an .xdmf extension
+        """
+        fname = os.path.expanduser(os.path.expandvars(fname))
+        if xdmf_fname is None:
+            xdmf_fname = os.path.splitext(fname)[0] + ".xdmf"
         relh5fname = "./" + os.path.basename(fname)
+
+        with h5py.File(fname, 'r') as h5:
+            steps = cls._find_steps(h5)
+            lines = [cls._XDMF_TEMPLATE_BEGIN]
+            if len(steps) > 1:
+                lines.append(cls._XDMF_TEMPLATE_TEMPORAL_BEGIN)
+            for step in steps:
+                lines.append(cls._xdmf_step(step, relh5fname))
+            if len(steps) > 1:
+                lines.append(cls._XDMF_TEMPLATE_COLLECTION_END)
+            lines.append(cls._XDMF_TEMPLATE_END)
+
         with open(xdmf_fname, 'w') as f:
-            xloc = cls._CRDS_GROUP + '/' + crd_names[0]
-            yloc = cls._CRDS_GROUP + '/' + crd_names[1]
-            zloc = cls._CRDS_GROUP + '/' + crd_names[2]
-            dim_str = " ".join([str(l) for l in crd_shape][::-1])
-            f.write(cls._XDMF_TEMPLATE_BEGIN.format(time=time))
-            s = cls._XDMF_TEMPLATE_RECTILINEAR_GRID_BEGIN.format(
-                grid_name="vgrid", crd_dims=dim_str, h5fname=relh5fname,
-                xdim=crd_shape[0], ydim=crd_shape[1], zdim=crd_shape[2],
-                xloc=xloc, yloc=yloc, zloc=zloc)
-            f.write(s)
+            f.write("".join(lines))
 
-            for fld in flds:
-                dt = fld.dtype.name.rstrip("0123456789").title()
-                precision = fld.dtype.itemsize
-                fld_dim_str = " ".join([str(l) for l in fld.shape])
-                loc = cls._FLD_GROUPS[fld.center.lower()] + '/' + fld.name
-                s = cls._XDMF_TEMPLATE_ATTRIBUTE.format(
-                    fld_name=fld.name,
-                    fld_type=fld.fldtype, center=fld.center.title(),
-                    dtype=dt, precision=precision, fld_dims=fld_dim_str,
-                    h5fname=relh5fname, fld_loc=loc)
-                f.write(s)
-
-            f.write(cls._XDMF_TEMPLATE_GRID_END)
-            f.write(cls._XDMF_TEMPLATE_END)
+    @classmethod
+    def _xdmf_step(cls, grp, relh5fname):
+        prefix = grp.name.rstrip('/')
+        crd_grp = grp[cls._CRDS_GROUP.lstrip('/')]
+        # files from the old writer have no attributes, their time
+        # isn't saved in the hdf5 file at all
+        s = cls._XDMF_TEMPLATE_SPATIAL_BEGIN.format(
+            time=grp.attrs.get("time", 0.0))
+
+        if "origin" in crd_grp.attrs:
+            crd_shape = [int(n) for n in crd_grp.attrs["shape"]]
+            s += cls._XDMF_TEMPLATE_CORECT_GRID_BEGIN.format(
+                grid_name="vgrid",
+                crd_dims=" ".join(str(n) for n in crd_shape[::-1]),
+                origin=" ".join(repr(float(x))
+                                for x in crd_grp.attrs["origin"][::-1]),
+                spacing=" ".join(repr(float(x))
+                                 for x in crd_grp.attrs["spacing"][::-1]))
+        else:
+            crd_shape = [len(crd_grp[ax]) for ax in "xyz"]
+            locs = [prefix + cls._CRDS_GROUP + '/' + ax for ax in "xyz"]
+            s += cls._XDMF_TEMPLATE_RECTILINEAR_GRID_BEGIN.format(
+                grid_name="vgrid",
+                crd_dims=" ".join(str(n) for n in crd_shape[::-1]),
+                h5fname=relh5fname,
+                xdim=crd_shape[0], ydim=crd_shape[1], zdim=crd_shape[2],
+                xloc=locs[0], yloc=locs[1], zloc=locs[2])
+
+        for center in ["node", "cell", "face", "edge"]:
+            fld_grp_name = cls._FLD_GROUPS[center].lstrip('/')
+            if fld_grp_name not in grp:
+                continue
+            for name, dset in grp[fld_grp_name].items():
+                dt = dset.dtype.name.rstrip("0123456789").title()
+                # the old writer only saved 3d fields, so an extra
+                # dimension means a vector
+                fldtype = dset.attrs.get("fldtype",
+                                         "Vector" if dset.ndim > 3 else "Scalar")
+                s += cls._XDMF_TEMPLATE_ATTRIBUTE.format(
+                    fld_name=name, fld_type=fldtype,
+                    center=dset.attrs.get("center", center).title(), dtype=dt,
+                    precision=dset.dtype.itemsize,
+                    fld_dims=" ".join(str(n) for n in dset.shape[::-1]),
+                    h5fname=relh5fname, fld_loc=dset.name)
+
+        s += cls._XDMF_TEMPLATE_GRID_END
+        s += cls._XDMF_TEMPLATE_COLLECTION_END
+        return s
+
+
+def _convert_grid(i, grid, out_prefix, fld_names, save_kwargs):
+    flds = [grid[name] for name in fld_names] if fld_names else \
+           list(grid.iter_fields())
+    h5fname = "{0}.{1:06d}.h5".format(out_prefix, i)
+    FileHDF5.save_fields(h5fname, flds, **save_kwargs)
+    return os.path.splitext(h5fname)[0] + ".xdmf"
+
+def convert_to_hdf5(run, out_prefix, fld_names=None, time_slice=":",
+                    nr_procs=1, **kwargs):
+    """Convert all the time steps of a run to hdf5 / xdmf
+
+    This is meant for runs in formats that can't be read a slice at a
+    time (like fortbin or jrrle), so that later reads can use hdf5
+    hyperslabs. Each time step is written to its own hdf5 file by one
+    of nr_procs processes, and a temporal xdmf file ties them together.
+
+    Parameters:
+        run (VFile): something with iter_times, like a loaded file
+        out_prefix (str): files are named out_prefix.000000.h5, etc.,
+            and the temporal file is out_prefix.xdmf
+        fld_names (list): names of fields to convert, None for all
+        time_slice (str): passed to run.iter_times
+        nr_procs (int): number of processes
+        **kwargs: passed to :meth:`FileHDF5.save_fields`, for instance
+            compression
+
+    Returns:
+        str: name of the temporal xdmf file
+    """
+    out_prefix = os.path.expanduser(os.path.expandvars(out_prefix))
+    grid_iter = izip(itertools.count(), run.iter_times(time_slice))
+    args_iter = ((i, grid, out_prefix, fld_names, kwargs)
+                 for i, grid in grid_iter)
+    xdmf_fnames = parallel.map(nr_procs, _convert_grid, args_iter)
+
+    xdmf_fname = out_prefix + ".xdmf"
+    xdmf_dir = os.path.dirname(os.path.abspath(xdmf_fname))
+    with open(xdmf_fname, 'w') as f:
+        f.write(FileHDF5._XDMF_TEMPLATE_BEGIN)  # pylint: disable=protected-access
+        f.write(FileHDF5._XDMF_TEMPLATE_TEMPORAL_BEGIN)  # pylint: disable=protected-access
+        for fn in xdmf_fnames:
+            href = "./" + os.path.relpath(os.path.abspath(fn), xdmf_dir)
+            f.write(FileHDF5._XDMF_TEMPLATE_INCLUDE.format(href=href))  # pylint: disable=protected-access
+        f.write(FileHDF5._XDMF_TEMPLATE_COLLECTION_END)  # pylint: disable=protected-access
+        f.write(FileHDF5._XDMF_TEMPLATE_END)  # pylint: disable=protected-access
+    return xdmf_fname
 
 ##
 ## EOF
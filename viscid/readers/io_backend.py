@@ -0,0 +1,212 @@
+"""Byte range reads that can be in flight all at once
+
+Readers normally do blocking reads one field (and one file) at a time,
+which leaves a high latency filesystem (sshfs, NFS over a WAN, etc.)
+idle most of the time. DataWrappers that know which bytes they need
+(see :py:meth:`viscid.readers.vfile.DataWrapper.byte_ranges`) can
+instead hand those ranges to a :py:class:`ReadQueue`, which keeps up
+to `nr_threads` requests outstanding, and merges ranges in the same
+file that are close together into a single request. This is used by
+:py:meth:`viscid.grid.Grid.prefetch` and by the `prefetch` argument of
+``iter_times``, which reads the next time step while the current one
+is being used.
+
+The bytes come from a backend, which is anything with a
+``read(fname, offset, length)`` method. :py:class:`LatencyBackend`
+adds a delay to every request to stand in for a slow filesystem in
+tests and benchmarks.
+
+Attributes:
+    backend: where the shared queue gets its bytes, a
+        :py:class:`LocalBackend` by default
+    nr_threads (int): number of requests the shared queue keeps in
+        flight
+    coalesce_gap (int): ranges in the same file that are separated by
+        fewer bytes than this are read with one request
+    max_request_size (int): don't merge ranges into requests bigger
+        than this many bytes
+
+These attributes can be set from `~/.viscidrc`, for instance
+``readers.io_backend.nr_threads: 16``.
+"""
+
+from __future__ import print_function
+import atexit
+from multiprocessing.pool import ThreadPool
+import threading
+import time
+
+from viscid import profiling
+
+__all__ = ["LocalBackend", "LatencyBackend", "ReadRequest", "ReadQueue",
+           "get_queue"]
+
+
+class LocalBackend(object):
+    """Read byte ranges from a file that the OS can open"""
+    def read(self, fname, offset, length):  # pylint: disable=no-self-use
+        with open(fname, 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+
+
+class LatencyBackend(object):
+    """Wrap another backend and make every request take longer
+
+    This is a stand-in for a high latency filesystem. It also counts
+    requests and bytes so tests can check how reads were batched.
+
+    Parameters:
+        latency (float): seconds added to each request
+        backend: where to really get the bytes, defaults to a
+            :py:class:`LocalBackend`
+    """
+    def __init__(self, latency=0.02, backend=None):
+        self.latency = latency
+        self.backend = LocalBackend() if backend is None else backend
+        self.nr_requests = 0
+        self.nr_bytes = 0
+        self._lock = threading.Lock()
+
+    def read(self, fname, offset, length):
+        time.sleep(self.latency)
+        buf = self.backend.read(fname, offset, length)
+        with self._lock:
+            self.nr_requests += 1
+            self.nr_bytes += len(buf)
+        return buf
+
+
+class ReadRequest(object):
+    """A read that may still be in flight"""
+    def __init__(self, async_result, start, stop):
+        self._async_result = async_result
+        self._start = start
+        self._stop = stop
+
+    def ready(self):
+        """True if the bytes have arrived (or the read failed)"""
+        return self._async_result.ready()
+
+    def result(self, timeout=None):
+        """Wait for the read and return its bytes
+
+        Exceptions raised by the backend are raised here.
+        """
+        buf = self._async_result.get(timeout)
+        if self._start == 0 and self._stop >= len(buf):
+            return buf
+        return memoryview(buf)[self._start:self._stop]
+
+
+class ReadQueue(object):
+    """Keep many byte range reads in flight using a pool of threads
+
+    Parameters:
+        backend: object with a ``read(fname, offset, length)`` method,
+            defaults to the module's `backend` at the time of each read
+        nr_threads (int): max number of outstanding requests, defaults
+            to the module's `nr_threads`
+    """
+    def __init__(self, backend=None, nr_threads=None):
+        self._backend = backend
+        self.nr_threads = nr_threads
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        return backend if self._backend is None else self._backend
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                n = nr_threads if self.nr_threads is None else self.nr_threads
+                self._pool = ThreadPool(max(1, int(n)))
+            return self._pool
+
+    def _read(self, fname, offset, length):
+        with profiling.timer("io.read"):
+            buf = self.backend.read(fname, offset, length)
+        if profiling.enabled:
+            profiling.count("io.requests")
+            profiling.count("io.bytes", len(buf))
+        return buf
+
+    def submit(self, fname, offset, length):
+        """Start reading one byte range
+
+        Returns:
+            :py:class:`ReadRequest`
+        """
+        return self.submit_many([(fname, offset, length)])[0]
+
+    def submit_many(self, ranges):
+        """Start reading many byte ranges, merging ones that are close
+
+        Parameters:
+            ranges (list): (fname, offset, length) tuples
+
+        Returns:
+            list of :py:class:`ReadRequest`, one for each range
+        """
+        reqs = [None] * len(ranges)
+        order = sorted(range(len(ranges)),
+                       key=lambda i: (ranges[i][0], ranges[i][1]))
+        group = []
+        g_fname, g_start, g_stop = None, 0, 0
+        for i in order:
+            fname, offset, length = ranges[i]
+            stop = offset + length
+            if (group and fname == g_fname and
+                    offset <= g_stop + coalesce_gap and
+                    max(stop, g_stop) - g_start <= max_request_size):
+                group.append(i)
+                g_stop = max(stop, g_stop)
+            else:
+                self._submit_group(group, g_fname, g_start, g_stop, ranges,
+                                   reqs)
+                group = [i]
+                g_fname, g_start, g_stop = fname, offset, stop
+        self._submit_group(group, g_fname, g_start, g_stop, ranges, reqs)
+        return reqs
+
+    def _submit_group(self, group, fname, start, stop, ranges, reqs):
+        if not group:
+            return
+        async_result = self._get_pool().apply_async(self._read,
+                                                    (fname, start,
+                                                     stop - start))
+        for i in group:
+            offset, length = ranges[i][1:]
+            reqs[i] = ReadRequest(async_result, offset - start,
+                                  offset - start + length)
+
+    def close(self):
+        """Wait for reads in flight and stop the threads"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool.join()
+                self._pool = None
+
+
+backend = LocalBackend()
+nr_threads = 8
+coalesce_gap = 64 * 1024
+max_request_size = 16 * 1024**2
+
+_queue = None
+
+
+def get_queue():
+    """Get the shared :py:class:`ReadQueue`"""
+    global _queue  # pylint: disable=global-statement
+    if _queue is None:
+        _queue = ReadQueue()
+        atexit.register(_queue.close)
+    return _queue
+
+##
+## EOF
+##
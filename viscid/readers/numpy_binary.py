@@ -11,6 +11,7 @@ import os
 import numpy as np
 
 from viscid import logger
+from viscid import profiling
 from viscid.readers import vfile
 from viscid import coordinate
 
@@ -57,8 +58,11 @@ class NPZDataWrapper(vfile.DataWrapper):
         return self._dtype
 
     def wrap_func(self, func_name, *args, **kwargs):
-        with np.load(self.fname) as f:
-            return getattr(f[self.loc], func_name)(*args, **kwargs)
+        with profiling.timer("read.npz"), np.load(self.fname) as f:
+            ret = getattr(f[self.loc], func_name)(*args, **kwargs)
+        if profiling.enabled and isinstance(ret, np.ndarray):
+            profiling.count("read.npz.bytes", ret.nbytes)
+        return ret
 
     def __array__(self, *args, **kwargs):
         return self.wrap_func("__array__", *args, **kwargs)
@@ -102,7 +106,7 @@ class FileNumpyNPZ(vfile.VFile):
         g = self._make_grid(self, **self._grid_opts)
 
         with np.load(self.fname) as f:
-            fld_names = f.keys()
+            fld_names = list(f.keys())
 
             crd_names = []
             # try to get crds names from an array of strings called _KEY_CRDS
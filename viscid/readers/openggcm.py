@@ -27,7 +27,7 @@ from viscid.readers.ggcm_logfile import GGCMLogFile
 from viscid import vutil
 from viscid import grid
 from viscid import field
-from viscid.coordinate import wrap_crds
+from viscid.coordinate import wrap_crds, intern_crds
 from viscid.calculator import plasma
 
 
@@ -151,6 +151,12 @@ def mhd2gse_field_vector(fld, crds, arr, comp_slc=None,
         arr *= factor
     return arr
 
+# Field can apply these while it copies data into its cache if it knows
+# the factor for each component
+mhd2gse_field_scalar_m1.comp_scale = (-1.0, )
+mhd2gse_field_scalar.comp_scale = (1.0, )
+mhd2gse_field_vector.comp_scale = (-1.0, -1.0, 1.0)
+
 # def mhd2gse_crds(crds, arr, copy_on_transform=False):  # pylint: disable=unused-argument
 #     # print("transforming crds")
 #     raise RuntimeError("This functionality is now in crds")
@@ -263,7 +269,12 @@ class GGCMGrid(grid.Grid):
             # transform_dict['x'] = mhd2gse_crds
             # crds_object.transform_funcs = transform_dict
             # crds_object.transform_kwargs = dict(copy_on_transform=self.copy_on_transform)
-            crds_object.reflect_axes = "xy"
+            # crds may be shared with other grids (see intern_crds), so
+            # don't reflect them in place
+            crds_object = crds_object.with_reflections("xy")
+            for f in self.fields:
+                if f._src_crds is not None:
+                    f.crds = f._src_crds.with_reflections("xy")
         super(GGCMGrid, self).set_crds(crds_object)
 
     def add_field(self, *fields):
@@ -280,6 +291,8 @@ class GGCMGrid(grid.Grid):
                 else:
                     f.post_reshape_transform_func = mhd2gse_field_scalar
                 f.transform_func_kwargs = dict(copy_on_transform=self.copy_on_transform)
+                if f._src_crds is not None:
+                    f.crds = f._src_crds.with_reflections("xy")
                 f.meta["crd_system"] = "gse"
             else:
                 f.meta["crd_system"] = "mhd"
@@ -401,22 +414,38 @@ class GGCMFile(object):  # pylint: disable=abstract-method
     # buffered, so maybe it's no big deal since we're only reading the
     # "views" printed at the beginning anyway
     read_log_file = False
+    # (run directory, cwd, run) -> log file name, so each run's log is only
+    # searched for once; the log's info is cached by GGCMLogFile
+    _log_fnames = {}
 
     _collection = None
 
+    def _find_logfile(self):
+        run = self.find_info('run')
+        key = (os.path.abspath(self.dirname), os.path.abspath("."), run)
+        log_fname = GGCMFile._log_fnames.get(key, None)
+        if log_fname is not None and os.path.isfile(log_fname):
+            return log_fname
+
+        log_basename = "{0}.log".format(run)
+        # FYI, default max_depth should be 8
+        log_fname = find_file_uptree(self.dirname, log_basename)
+        if log_fname is None:
+            log_fname = find_file_uptree(".", log_basename)
+        if log_fname is None:
+            log_fname = find_file_uptree(self.dirname, "log.txt")
+        if log_fname is None:
+            log_fname = find_file_uptree(self.dirname, "log.log")
+        if log_fname is None:
+            log_fname = find_file_uptree(self.dirname, "log")
+
+        if log_fname is not None:
+            GGCMFile._log_fnames[key] = log_fname
+        return log_fname
+
     def read_logfile(self):
         if self.read_log_file:
-            log_basename = "{0}.log".format(self.find_info('run'))
-            # FYI, default max_depth should be 8
-            log_fname = find_file_uptree(self.dirname, log_basename)
-            if log_fname is None:
-                log_fname = find_file_uptree(".", log_basename)
-            if log_fname is None:
-                log_fname = find_file_uptree(self.dirname, "log.txt")
-            if log_fname is None:
-                log_fname = find_file_uptree(self.dirname, "log.log")
-            if log_fname is None:
-                log_fname = find_file_uptree(self.dirname, "log")
+            log_fname = self._find_logfile()
 
             if log_fname is not None:
                 self.set_info("_viscid_log_fname", log_fname)
@@ -562,7 +591,7 @@ class GGCMFileFortran(GGCMFile, ContainerFile):  # pylint: disable=abstract-meth
     def _parse(self):
         # look for and parse grid2 file or whatever else needs be done
         if self._crds is None:
-            self._crds = self.make_crds()
+            self._crds = intern_crds(self.make_crds())
 
         if len(self._collection) == 1:
             # load a single file
@@ -1,7 +1,9 @@
 #! /usr/bin/env python
 
 from __future__ import print_function
+from glob import glob
 
+import numpy as np
 try:
     import h5py
     _HAVE_H5PY = True
@@ -10,6 +12,7 @@ except ImportError:
 
 from viscid import grid
 from viscid import field
+from viscid import parallel
 from viscid.readers import xdmf
 from viscid.calculator import plasma
 
@@ -80,18 +83,278 @@ class PscFieldFile(xdmf.FileXDMF):  # pylint: disable=W0223
 
 
 class PscParticles(object):
+    """Particles from the prt.NNNNNN_pNNNNNN.h5 files of one step
+
+    Particle dumps are often too big for memory, so everything here
+    works on chunks of `chunk_size` particles at a time, possibly in
+    parallel over chunks and over the files from different procs.
+
+    Particles can be selected with a spatial `box`, a dict like
+    ``{'x': (xlo, xhi), 'z': (zlo, zhi)}`` (lo <= x < hi), and a
+    `species`, which is a name in `self.species` or a (charge, mass)
+    tuple. A charge or mass of None matches anything.
+
+    Quantities can be any field of the particle records (x, y, z, px,
+    py, pz, q, m, w), one of the names in `PRT_QUANTITIES` (gamma, p,
+    ek), or a function that takes a record array of particles. Use
+    module level functions if nr_procs > 1 so they can be pickled.
+
+    Attributes:
+        data: h5py Dataset of the first file, for backward
+            compatability
+        filenames (list): all the files for this step
+        species (dict): name -> (charge, mass)
+    """
+    dset_path = "particles/p0/1d"
+    chunk_size = 2**20
+
     def __init__(self, path, step):
-        filename = "%s/prt.%06d_p%06d.h5" % (path, step, 0)
-        # print("Opening '%s'" % (filename))
         if not _HAVE_H5PY:
             raise RuntimeError("Can't load psc particles w/o h5py")
-        self._h5file = h5py.File(filename, 'r')
+        pattern = "%s/prt.%06d_p[0-9][0-9][0-9][0-9][0-9][0-9].h5" % (path, step)
+        self.filenames = sorted(glob(pattern))
+        if not self.filenames:
+            raise IOError("No psc particle files match '{0}'".format(pattern))
+        # print("Opening '%s'" % (self.filenames[0]))
+        self._h5file = h5py.File(self.filenames[0], 'r')
 
         # path = _find_path(self._h5file, "psc")
         # self.time = self._h5file[path].attrs["time"][0]
         # self.timestep = self._h5file[path].attrs["timestep"][0]
 
-        self.data = self._h5file["particles/p0/1d"]
+        self.data = self._h5file[self.dset_path]
+        self.species = {"e": (-1.0, 1.0), "i": (1.0, None)}
+
+    @property
+    def nr_particles(self):
+        return sum(n for _, n in self._file_sizes())
+
+    def _file_sizes(self):
+        sizes = []
+        for fname in self.filenames:
+            with h5py.File(fname, 'r') as f:
+                sizes.append((fname, f[self.dset_path].shape[0]))
+        return sizes
+
+    def _work_units(self, chunk_size=None):
+        """list of (fname, dset_path, start, stop) for each chunk"""
+        if chunk_size is None:
+            chunk_size = self.chunk_size
+        units = []
+        for fname, n in self._file_sizes():
+            for start in range(0, n, chunk_size):
+                units.append((fname, self.dset_path, start,
+                              min(start + chunk_size, n)))
+        return units
+
+    def _species_qm(self, species):
+        if species is None or isinstance(species, (list, tuple)):
+            return species
+        try:
+            return self.species[species]
+        except KeyError:
+            raise KeyError("Unknown species '{0}', should be one of {1} or a "
+                           "(charge, mass) tuple"
+                           "".format(species, list(self.species.keys())))
+
+    def iter_chunks(self, box=None, species=None, chunk_size=None):
+        """Iterate over the selected particles a chunk at a time
+
+        Parameters:
+            box (dict): {quantity: (lo, hi)}, see class docs
+            species (str, tuple): see class docs
+            chunk_size (int): number of particles read at a time
+
+        Yields:
+            record arrays of particles, each has at most chunk_size
+            particles
+        """
+        qm = self._species_qm(species)
+        for unit in self._work_units(chunk_size=chunk_size):
+            yield _read_chunk(unit, box, qm)
+
+    def histogram(self, axes, bins=64, ranges=None, weights="w", box=None,
+                  species=None, nr_procs=1, threads=False, chunk_size=None):
+        """Make a 1D / 2D / 3D histogram of the particles
+
+        For example, a phase space distribution is
+        ``prts.histogram(['x', 'px'], species='e')``, and an energy
+        spectrum is
+        ``prts.histogram('ek', bins=np.logspace(-3, 1, 64))``.
+
+        Parameters:
+            axes (str, callable, list): quantities to bin, see
+                class docs
+            bins (int, ndarray, list): number of bins, or bin edges,
+                or a list of these for each axis
+            ranges (list): (lo, hi) for each axis with a number of bins,
+                None means find the range with an extra pass over the
+                data
+            weights (str, callable, None): quantity that weights each
+                particle, the default 'w' is only used if the particle
+                records have a 'w' field
+            box (dict): {quantity: (lo, hi)}, see class docs
+            species (str, tuple): see class docs
+            nr_procs (int): number of workers
+            threads (bool): use threads instead of processes
+            chunk_size (int): number of particles read at a time
+
+        Returns:
+            A cell centered :py:class:`viscid.field.Field` whose
+            coordinates are the bin edges
+        """
+        if not isinstance(axes, (list, tuple)):
+            axes = [axes]
+        nax = len(axes)
+        if not isinstance(bins, (list, tuple)):
+            bins = [bins] * nax
+        if ranges is None:
+            ranges = [None] * nax
+        if len(bins) != nax or len(ranges) != nax:
+            raise ValueError("need bins and ranges for each of the {0} axes"
+                             "".format(nax))
+        if weights == "w" and "w" not in self.data.dtype.names:
+            weights = None
+
+        qm = self._species_qm(species)
+        units = self._work_units(chunk_size=chunk_size)
+        nr_workers = max(1, min(nr_procs, len(units)))
+        groups = parallel.chunk_list(units, nr_workers)
+
+        if any(np.isscalar(b) and r is None for b, r in zip(bins, ranges)):
+            parts = parallel.map(len(groups), _minmax_parts,
+                                 [(g, box, qm, axes) for g in groups],
+                                 threads=threads)
+            lo = np.min([p[0] for p in parts], axis=0)
+            hi = np.max([p[1] for p in parts], axis=0)
+            ranges = [(lo[i], hi[i]) if r is None else r
+                      for i, r in enumerate(ranges)]
+
+        edges = []
+        for b, r in zip(bins, ranges):
+            if np.isscalar(b):
+                lo, hi = (0.0, 1.0) if r is None else r
+                if not np.isfinite(lo) or not np.isfinite(hi):
+                    # no particles selected
+                    lo, hi = 0.0, 1.0
+                if hi <= lo:
+                    lo, hi = lo - 0.5, hi + 0.5
+                edges.append(np.linspace(lo, hi, int(b) + 1))
+            else:
+                edges.append(np.asarray(b, dtype='f8'))
+
+        parts = parallel.map(len(groups), _hist_parts,
+                             [(g, box, qm, axes, edges, weights)
+                              for g in groups], threads=threads)
+        hist = np.sum(parts, axis=0)
+        hist = hist.reshape([len(e) - 1 for e in edges])
+
+        names = [_quantity_name(ax) for ax in axes]
+        return field.arrays2field(hist, edges, name="hist_" + "_".join(names),
+                                  crd_names=names)
+
+
+def _gamma(prts):
+    return np.sqrt(1.0 + prts['px']**2 + prts['py']**2 + prts['pz']**2)
+
+def _momentum(prts):
+    return np.sqrt(prts['px']**2 + prts['py']**2 + prts['pz']**2)
+
+def _kinetic_energy(prts):
+    return prts['m'] * (_gamma(prts) - 1.0)
+
+# quantities that can be used like the fields of the particle records
+PRT_QUANTITIES = {"gamma": _gamma,
+                  "p": _momentum,
+                  "ek": _kinetic_energy,
+                 }
+
+def _quantity_name(quantity):
+    if callable(quantity):
+        return quantity.__name__.lstrip('_')
+    return quantity
+
+def _quantity(prts, quantity):
+    if callable(quantity):
+        return quantity(prts)
+    elif quantity in prts.dtype.names:
+        return prts[quantity]
+    elif quantity in PRT_QUANTITIES:
+        return PRT_QUANTITIES[quantity](prts)
+    else:
+        raise KeyError("Unknown particle quantity '{0}'".format(quantity))
+
+def _read_chunk(unit, box, qm):
+    """Read particles [start, stop) of one file and apply box / species"""
+    fname, dset_path, start, stop = unit
+    with h5py.File(fname, 'r') as f:
+        prts = f[dset_path][start:stop]
+
+    mask = None
+    if qm is not None:
+        for name, val in zip(('q', 'm'), qm):
+            if val is not None:
+                m = np.isclose(prts[name], val, rtol=1e-6, atol=0.0)
+                mask = m if mask is None else mask & m
+    if box:
+        for quantity, (lo, hi) in box.items():
+            v = _quantity(prts, quantity)
+            m = (v >= lo) & (v < hi)
+            mask = m if mask is None else mask & m
+    if mask is not None:
+        prts = prts[mask]
+    return prts
+
+def _minmax_parts(units, box, qm, axes):
+    lo = np.full(len(axes), np.inf)
+    hi = np.full(len(axes), -np.inf)
+    for unit in units:
+        prts = _read_chunk(unit, box, qm)
+        if len(prts):
+            for i, ax in enumerate(axes):
+                v = _quantity(prts, ax)
+                lo[i] = min(lo[i], np.min(v))
+                hi[i] = max(hi[i], np.max(v))
+    return lo, hi
+
+def _bin_index(vals, edges):
+    """Bin index of each value like np.histogram, and whether it's in range"""
+    nbins = len(edges) - 1
+    lo, hi = edges[0], edges[-1]
+    widths = np.diff(edges)
+    valid = (vals >= lo) & (vals <= hi)
+    if np.allclose(widths, widths[0]):
+        idx = np.floor((vals - lo) * (nbins / (hi - lo))).astype(np.intp)
+        np.clip(idx, 0, nbins - 1, out=idx)
+        # fix roundoff at the edges so this agrees with np.histogram
+        idx -= vals < edges[idx]
+        idx += (vals >= edges[idx + 1]) & (idx < nbins - 1)
+    else:
+        idx = np.searchsorted(edges, vals, side='right') - 1
+    # the last bin includes its right edge
+    idx[vals == hi] = nbins - 1
+    np.clip(idx, 0, nbins - 1, out=idx)
+    return idx, valid
+
+def _hist_parts(units, box, qm, axes, edges, weights):
+    """Accumulate a flat histogram over some chunks with np.bincount"""
+    shape = [len(e) - 1 for e in edges]
+    nbins = int(np.prod(shape))
+    hist = np.zeros(nbins, dtype='f8')
+    for unit in units:
+        prts = _read_chunk(unit, box, qm)
+        if len(prts) == 0:
+            continue
+        flat = np.zeros(len(prts), dtype=np.intp)
+        valid = np.ones(len(prts), dtype=bool)
+        for ax, e, n in zip(axes, edges, shape):
+            idx, ok = _bin_index(_quantity(prts, ax), e)
+            flat *= n
+            flat += idx
+            valid &= ok
+        w = None if weights is None else _quantity(prts, weights)[valid]
+        hist += np.bincount(flat[valid], weights=w, minlength=nbins)
+    return hist
 
 
 def open_psc_file(path, step, pfx="p"):
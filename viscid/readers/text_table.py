@@ -0,0 +1,192 @@
+"""Fast loader for whitespace separated tables of numbers
+
+This is shared by the readers of gnuplot-like ascii files, Athena .tab
+files and Athena .hst files. The whole file is parsed by a single call
+to numpy's C number parser, so it's much faster than ``np.loadtxt``.
+
+Parsed tables are cached in memory, and optionally on disk (as .npy
+files), keyed by the file's path, mtime and size and the parse options,
+so reloading a run's text outputs costs about the same as reading a
+numpy binary file.
+
+Attributes:
+    use_disk_cache (bool): save / load parsed tables to / from
+        `cache_dir` (default: False)
+    cache_dir (str): where to put the .npy caches, defaults to
+        $XDG_CACHE_HOME/viscid/tables (~/.cache/viscid/tables)
+    max_disk_cache_nbytes (int): least recently used tables are
+        deleted from `cache_dir` to keep it under this size, None
+        means no limit
+    mem_cache_size (int): number of tables to keep in memory
+
+These attributes can be set from `~/.viscidrc`, for instance
+``readers.text_table.use_disk_cache: true``.
+"""
+
+from __future__ import print_function
+from collections import OrderedDict
+import hashlib
+import os
+import re
+import warnings
+
+import numpy as np
+
+from viscid import logger
+from viscid import profiling
+from viscid.vutil import user_cache_dir, prune_cache_dir
+
+__all__ = ["load_table", "clear_cache"]
+
+
+use_disk_cache = False
+cache_dir = None
+max_disk_cache_nbytes = 512 * 1024**2
+mem_cache_size = 8
+
+_mem_cache = OrderedDict()
+
+
+def _get_cache_dir():
+    return user_cache_dir("tables", override=cache_dir)
+
+def _cache_key(fname, dtype, comments):
+    st = os.stat(fname)
+    mtime = getattr(st, "st_mtime_ns", int(st.st_mtime * 1e9))
+    s = "{0}:{1}:{2}:{3}:{4!r}".format(fname, mtime, st.st_size,
+                                       np.dtype(dtype).str, comments)
+    return hashlib.sha1(s.encode('utf-8')).hexdigest()
+
+def _parse(fname, dtype, comments):
+    """Parse a table with np.fromstring, fall back to np.loadtxt"""
+    with open(fname, 'rb') as f:
+        buf = f.read()
+    if comments:
+        cmt = comments.encode()
+        # comments are usually just a header, so skip those lines by hand
+        # and only run a regex over the whole file if there are more
+        start = 0
+        while buf[start:start + 256].lstrip().startswith(cmt):
+            eol = buf.find(b"\n", start)
+            start = len(buf) if eol < 0 else eol + 1
+        buf = buf[start:]
+        if cmt in buf:
+            pattern = br"^[ \t]*" + re.escape(cmt) + br"[^\n]*"
+            buf = re.sub(pattern, b"", buf, flags=re.MULTILINE)
+
+    # the number of columns comes from the first line with data
+    first_line = buf.lstrip().split(b"\n", 1)[0]
+    ncols = len(first_line.split())
+    if ncols == 0:
+        return np.empty((0, 0), dtype=dtype)
+
+    with warnings.catch_warnings():
+        # fromstring warns if it couldn't parse to the end of the string,
+        # which means there's something it doesn't understand in there
+        warnings.simplefilter("error")
+        try:
+            arr = np.fromstring(buf.decode('ascii'), dtype=dtype, sep=' ')
+        except (DeprecationWarning, ValueError, UnicodeDecodeError):
+            arr = None
+
+    if arr is None or arr.size % ncols != 0:
+        logger.debug("Falling back to np.loadtxt for %s", fname)
+        arr = np.loadtxt(fname, dtype=dtype, comments=comments, ndmin=2)
+    return arr.reshape(-1, ncols)
+
+def _load_from_disk(key):
+    path = os.path.join(_get_cache_dir(), key + ".npy")
+    try:
+        arr = np.load(path)
+    except (IOError, OSError, ValueError):
+        return None
+    try:
+        # the mtime is the last used time for prune_cache_dir
+        os.utime(path, None)
+    except OSError:
+        pass
+    return arr
+
+def _save_to_disk(key, arr):
+    d = _get_cache_dir()
+    path = os.path.join(d, key + ".npy")
+    tmp = "{0}.{1}.tmp.npy".format(path[:-4], os.getpid())
+    try:
+        if not os.path.isdir(d):
+            os.makedirs(d)
+        np.save(tmp, arr)
+        os.rename(tmp, path)
+        prune_cache_dir(d, max_disk_cache_nbytes, suffix=".npy")
+    except (IOError, OSError) as e:
+        logger.debug("Could not cache table %s: %s", path, e)
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+def load_table(fname, dtype='f8', comments='#', cache=True):
+    """Load a table of numbers as a 2d array, shape (nrows, ncols)
+
+    Lines that start with `comments` are skipped, and the number of
+    columns is taken from the first line of data.
+
+    Parameters:
+        fname (str): file name
+        dtype: data type of the result
+        comments (str): comment character, or None
+        cache (bool): use the memory / disk caches; the disk cache is
+            only used if `use_disk_cache` is also True
+
+    Returns:
+        ndarray: 2d array, don't modify it in place since it may be
+        shared with the cache
+    """
+    fname = os.path.abspath(os.path.expanduser(os.path.expandvars(fname)))
+    if not cache:
+        return _parse(fname, dtype, comments)
+
+    key = _cache_key(fname, dtype, comments)
+    if key in _mem_cache:
+        if profiling.enabled:
+            profiling.count("text_table.cache_hit")
+        _mem_cache[key] = _mem_cache.pop(key)
+        return _mem_cache[key]
+
+    arr = None
+    if use_disk_cache:
+        arr = _load_from_disk(key)
+    if arr is None:
+        if profiling.enabled:
+            profiling.count("text_table.cache_miss")
+        arr = _parse(fname, dtype, comments)
+        if use_disk_cache:
+            _save_to_disk(key, arr)
+    elif profiling.enabled:
+        profiling.count("text_table.disk_cache_hit")
+
+    arr.flags.writeable = False
+    _mem_cache[key] = arr
+    while len(_mem_cache) > max(mem_cache_size, 0):
+        _mem_cache.popitem(last=False)
+    return arr
+
+def clear_cache(disk=False):
+    """Forget all parsed tables
+
+    Parameters:
+        disk (bool): also delete the .npy files in the cache directory
+    """
+    _mem_cache.clear()
+    if disk:
+        d = _get_cache_dir()
+        if os.path.isdir(d):
+            for fn in os.listdir(d):
+                if fn.endswith(".npy"):
+                    try:
+                        os.remove(os.path.join(d, fn))
+                    except OSError:
+                        pass
+
+##
+## EOF
+##
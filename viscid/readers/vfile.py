@@ -5,6 +5,7 @@
 # backend for data input.
 
 from __future__ import print_function
+import importlib
 # import sys
 import os
 import re
@@ -15,12 +16,116 @@ from viscid.dataset import Dataset, DatasetTemporal
 from viscid import grid
 from viscid import field
 from viscid.compat import string_types
+from viscid.readers import io_backend
+
+# reader modules that haven't been imported yet, as a list of
+# (regex, module name) in the order they were registered
+_lazy_readers = []
+
+# give the OS readahead hints (posix_fadvise) when a reader knows it's
+# about to read a big chunk of a file, like in DataWrapper.read_many
+use_readahead = True
+
+
+def register_reader(pattern, module_name):
+    """Import a reader module the first time a matching file is opened
+
+    Parameters:
+        pattern (str): regex that matches (at least) every file name the
+            module's VFile subclasses can detect
+        module_name (str): fully qualified name of the module
+    """
+    _lazy_readers.append((pattern, module_name))
+
+def import_readers(fname=None):
+    """Import registered reader modules whose pattern matches fname
+
+    Modules are imported in the order they were registered, which
+    keeps the type detection precedence the same as if they were all
+    imported up front.
+
+    Parameters:
+        fname (str): file name, or None to import every reader
+
+    Returns:
+        int: number of modules imported
+    """
+    todo = [r for r in _lazy_readers
+            if fname is None or re.match(r[0], fname)]
+    for r in todo:
+        _lazy_readers.remove(r)
+        try:
+            importlib.import_module(r[1])
+        except ImportError as e:
+            logger.debug("Reader %s not available: %s", r[1], e)
+    return len(todo)
+
+def readahead(filename, offset=0, length=0):
+    """Hint to the OS that part of a file will be read soon
+
+    This is just posix_fadvise(..., POSIX_FADV_WILLNEED), so it does
+    nothing if the platform doesn't have posix_fadvise or if
+    `use_readahead` is False.
+
+    Parameters:
+        filename (str): file name
+        offset (int): where the read will start (in bytes)
+        length (int): how many bytes will be read, 0 means until EOF
+    """
+    if not use_readahead or not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(filename, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, offset, length, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+    except OSError as e:
+        logger.debug("readahead hint for %s failed: %s", filename, e)
+
+
+def prefetch(wrappers, queue=None):
+    """Start reading many DataWrappers in the background
+
+    All the byte ranges go to the queue at once so that ranges that
+    are close together in a file can be read with one request.
+    Wrappers that can't be read by byte range are skipped.
+
+    Parameters:
+        wrappers (list): DataWrappers
+        queue (ReadQueue): defaults to
+            :py:func:`viscid.readers.io_backend.get_queue`
+
+    Returns:
+        int: number of wrappers that are being prefetched
+    """
+    todo = []
+    ranges = []
+    for wrapper in wrappers:
+        if wrapper._prefetched is not None:  # pylint: disable=protected-access
+            continue
+        wrapper_ranges = wrapper.byte_ranges()
+        if wrapper_ranges:
+            todo.append((wrapper, len(ranges), len(wrapper_ranges)))
+            ranges += wrapper_ranges
+    if not todo:
+        return 0
+
+    if queue is None:
+        queue = io_backend.get_queue()
+    reqs = queue.submit_many(ranges)
+    for wrapper, start, n in todo:
+        wrapper._prefetched = reqs[start:start + n]  # pylint: disable=protected-access
+    return len(todo)
+
 
 class DataWrapper(object):
     _hypersliceable = False  # can read slices from disk
 
     _shape = None
     _dtype = None
+    # list of io_backend.ReadRequest, see prefetch
+    _prefetched = None
 
     def __init__(self):
         self._shape = None
@@ -46,6 +151,66 @@ class DataWrapper(object):
     def __getitem__(self, item):
         raise NotImplementedError()
 
+    def byte_ranges(self):
+        """Which bytes __array__ reads
+
+        Wrappers that return something here can be read in the
+        background with :py:meth:`prefetch`, and they should check
+        :py:meth:`_pop_prefetched` in __array__.
+
+        Returns:
+            list of (fname, offset, length) tuples, or None if this
+            wrapper can't be read by byte range
+        """
+        return None
+
+    def prefetch(self, queue=None):
+        """Start reading this wrapper's data in the background
+
+        Returns:
+            bool: False if this wrapper can't be prefetched
+        """
+        return prefetch([self], queue=queue) > 0
+
+    def drop_prefetch(self):
+        """Forget prefetched data that hasn't been used yet"""
+        self._prefetched = None
+
+    def _pop_prefetched(self):
+        """Wait for prefetched data
+
+        The data is forgotten so it's only used once.
+
+        Returns:
+            list of buffers, one for each of :py:meth:`byte_ranges`,
+            or None if nothing was prefetched
+        """
+        reqs = self._prefetched
+        if reqs is None:
+            return None
+        self._prefetched = None
+        return [req.result() for req in reqs]
+
+    @classmethod
+    def read_many(cls, wrappers):
+        """Read the data of many wrappers of this type
+
+        This is how :py:meth:`viscid.grid.Grid.load_fields` reads. The
+        default just reads the wrappers one at a time, but readers
+        should override it if they can get many fields out of a file
+        with a single open and a sequential scan.
+
+        Parameters:
+            wrappers (list): DataWrappers of this type
+
+        Yields:
+            tuples (i, ndarray) where the array is what
+            ``wrappers[i].__array__()`` would return; they can come
+            in any order
+        """
+        for i, wrapper in enumerate(wrappers):
+            yield i, wrapper.__array__()
+
 
 class VFile(Dataset):
     """Generic File
@@ -211,12 +376,15 @@ class VFile(Dataset):
         """ recursively detect a filetype using _detector regex string.
         this is called recursively for all subclasses and results
         further down the tree are given precedence.
-        NOTE: THIS WILL ONLY WORK FOR CLASSES THAT HAVE ALREADY BEEN IMPORTED.
-        THIS IS A FRAGILE MECHANISM IN THAT SENSE.
+        NOTE: THIS WILL ONLY WORK FOR CLASSES THAT HAVE ALREADY BEEN IMPORTED,
+        OR WHOSE MODULES ARE REGISTERED WITH register_reader.
         TODO: move this functionality into a more robust/extendable factory
         class... that can also take care of the bucket / circular reference
         problem maybe
         """
+        if cls is VFile:
+            import_readers(fname)
+
         # reversed gives precedence to the more recently declared classes
         for filetype in reversed(cls.__subclasses__()): #pylint: disable=E1101
             td = filetype.detect_type(fname, mode=mode)
@@ -226,6 +394,10 @@ class VFile(Dataset):
             if 'r' in mode and cls.SAVE_ONLY:
                 return None
             return cls
+
+        # in case a reader's registered pattern is too strict
+        if cls is VFile and import_readers():
+            return cls.detect_type(fname, mode=mode)
         return None
 
     @classmethod
@@ -392,7 +392,10 @@ class FileXDMF(ContainerFile):  # pylint: disable=abstract-method
         else:
             raise NotImplementedError("Unstructured grids not yet supported")
 
-        crds = coordinate.wrap_crds(crdtype, crdlist, **crdkwargs)
+        # all the grids of a run usually have the same geometry, so
+        # share one crds object between them
+        crds = coordinate.intern_crds(coordinate.wrap_crds(crdtype, crdlist,
+                                                           **crdkwargs))
         return crds, geoattrs
 
     def _parse_attribute(self, parent_node, item, crds, topoattrs, time=0.0):
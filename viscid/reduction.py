@@ -0,0 +1,235 @@
+"""Chunked, threaded reductions of Fields and AMRFields
+
+Full reductions (no `axis`) don't care about layout or memory order, so
+they can be done on pieces of a field and the partial results combined.
+The pieces are read lazily in worker threads, so if the field's data is
+not yet in memory and the source can be hypersliced (hdf5), only
+`nr_threads` chunks are ever in memory at once. numpy releases the GIL
+for most reductions, so this also uses more than one core.
+
+Attributes:
+    nr_threads (int): max number of worker threads, None means use
+        `multiprocessing.cpu_count()`
+    chunk_nbytes (int): target size of each chunk in bytes
+
+These attributes can be set from `~/.viscidrc`, for instance
+``reduction.nr_threads: 4``.
+"""
+
+from __future__ import print_function, division
+import multiprocessing as mp
+
+import numpy as np
+
+import viscid
+from viscid import parallel
+
+__all__ = ["chunked_reduce", "is_full_reduction", "REDUCTIONS"]
+
+
+nr_threads = None
+chunk_nbytes = 16 * 1024**2
+
+
+def _part_moments(arr):
+    """Partial result for mean / var / std: (n, mean, M2)"""
+    n = arr.size
+    if n == 0:
+        return 0, 0.0, 0.0
+    dtype = np.float64 if arr.dtype.kind in "biu" else arr.dtype.type
+    mean = np.mean(arr, dtype=dtype)
+    m2 = np.sum((arr - mean)**2, dtype=dtype)
+    return n, mean, m2
+
+def _combine_moments(parts):
+    """Combine (n, mean, M2) triples (Chan et al.'s parallel algorithm)"""
+    n, mean, m2 = parts[0]
+    for nb, meanb, m2b in parts[1:]:
+        if nb == 0:
+            continue
+        ntot = n + nb
+        delta = meanb - mean
+        mean = mean + delta * nb / ntot
+        m2 = m2 + m2b + delta**2 * n * nb / ntot
+        n = ntot
+    return n, mean, m2
+
+def _moments_dtype(parts):
+    """dtype numpy would give the mean / var / std of the parts"""
+    for n, mean, _ in parts:
+        if n:
+            return np.asarray(mean).dtype
+    return np.dtype(np.float64)
+
+def _combine_mean(parts, ddof=0):  # pylint: disable=unused-argument
+    return _moments_dtype(parts).type(_combine_moments(parts)[1])
+
+def _combine_var(parts, ddof=0):
+    n, _, m2 = _combine_moments(parts)
+    return _moments_dtype(parts).type(m2 / (n - ddof))
+
+def _combine_std(parts, ddof=0):
+    return np.sqrt(_combine_var(parts, ddof=ddof))
+
+def _wrap_combine(func):
+    return lambda parts, ddof=0: func(parts)
+
+def _absmin(arr):
+    return np.min(np.abs(arr))
+
+def _absmax(arr):
+    return np.max(np.abs(arr))
+
+# name -> (partial func, combine func)
+REDUCTIONS = {"min": (np.min, _wrap_combine(np.min)),
+              "max": (np.max, _wrap_combine(np.max)),
+              "absmin": (_absmin, _wrap_combine(np.min)),
+              "absmax": (_absmax, _wrap_combine(np.max)),
+              "sum": (np.sum, _wrap_combine(np.sum)),
+              "any": (np.any, _wrap_combine(np.any)),
+              "all": (np.all, _wrap_combine(np.all)),
+              "mean": (_part_moments, _combine_mean),
+              "var": (_part_moments, _combine_var),
+              "std": (_part_moments, _combine_std),
+             }
+
+
+def _array_chunks(arr, nbytes):
+    """Make a list of thunks that each return a piece of arr
+
+    Pieces are cut along the slowest varying axis that has more than
+    one element, so the pieces of a C-contiguous array are contiguous.
+    Only the slicing is done here; data is read when the thunk is
+    called, so this works on h5py-like wrappers too.
+    """
+    shape = tuple(arr.shape)
+    if len(shape) == 0 or np.prod(shape) == 0:
+        return [lambda: np.asarray(arr)]
+
+    itemsize = np.dtype(arr.dtype).itemsize
+    total = int(np.prod(shape)) * itemsize
+    nchunks = max(1, int(np.ceil(total / nbytes)))
+
+    axis = 0
+    for i, n in enumerate(shape):
+        if n > 1:
+            axis = i
+            break
+    nchunks = min(nchunks, shape[axis])
+    if nchunks == 1:
+        return [lambda: np.asarray(arr[...])]
+
+    thunks = []
+    for slc in parallel.chunk_slices(shape[axis], nchunks):
+        full_slc = [slice(None)] * len(shape)
+        full_slc[axis] = slice(*slc)
+        thunks.append(_make_thunk(arr, tuple(full_slc)))
+    return thunks
+
+def _make_thunk(arr, slc):
+    return lambda: np.asarray(arr[slc])
+
+def _field_chunks(fld, nbytes):
+    """Thunks for each chunk of a Field, AMRField, or array-like"""
+    if isinstance(fld, viscid.amr_field.AMRField):
+        thunks = []
+        for patch in fld.patches:
+            thunks += _field_chunks(patch, nbytes)
+        return thunks
+
+    if not isinstance(fld, viscid.field.Field):
+        if isinstance(fld, (list, tuple)):
+            thunks = []
+            for item in fld:
+                thunks += _field_chunks(item, nbytes)
+            return thunks
+        elif isinstance(fld, np.ndarray):
+            return _array_chunks(fld, nbytes)
+        elif getattr(fld, "_hypersliceable", False):
+            return _array_chunks(fld, nbytes)
+        else:
+            return [lambda: np.asarray(fld)]
+
+    if fld.is_loaded():
+        return _array_chunks(fld.data, nbytes)
+    elif fld.post_reshape_transform_func is not None:
+        # the transform may change the values, so go through .data
+        return _array_chunks(fld.data, nbytes)
+    else:
+        # values are the same as _src_data up to a reordering
+        return _field_chunks(fld._src_data, nbytes)  # pylint: disable=protected-access
+
+def _is_masked(fld):
+    if isinstance(fld, viscid.field.Field):
+        if fld.is_loaded():
+            fld = fld.data
+        else:
+            fld = fld._src_data  # pylint: disable=protected-access
+    if isinstance(fld, (list, tuple)):
+        return any(_is_masked(item) for item in fld)
+    return isinstance(fld, np.ma.MaskedArray)
+
+def is_full_reduction(npkwargs, allowed=()):
+    """True if numpy kwargs describe a reduction of all values to a scalar
+
+    Parameters:
+        npkwargs (dict): kwargs given to something like `Field.max`
+        allowed (sequence): other kwargs that chunked_reduce can handle
+    """
+    for key, val in npkwargs.items():
+        if key == "axis":
+            if val is not None:
+                return False
+        elif key not in allowed:
+            return False
+    return True
+
+def _run_part(func, thunk):
+    return func(thunk())
+
+def chunked_reduce(fld, op, ddof=0, threads=None, nbytes=None):
+    """Reduce all values of a field to a scalar chunk by chunk
+
+    Parameters:
+        fld (Field, AMRField, ndarray): thing to reduce
+        op (str): one of the keys in `REDUCTIONS`
+        ddof (int): delta degrees of freedom for var / std
+        threads (int): number of worker threads, defaults to
+            `reduction.nr_threads`
+        nbytes (int): target chunk size in bytes, defaults to
+            `reduction.chunk_nbytes`
+
+    Returns:
+        numpy scalar
+    """
+    try:
+        part_func, combine_func = REDUCTIONS[op]
+    except KeyError:
+        raise ValueError("Unknown reduction '{0}', should be one of {1}"
+                         "".format(op, list(REDUCTIONS.keys())))
+
+    if nbytes is None:
+        nbytes = chunk_nbytes
+    if threads is None:
+        threads = nr_threads
+    if threads is None:
+        threads = mp.cpu_count()
+
+    if _is_masked(fld):
+        # masked arrays are always in memory anyway, let numpy.ma do it
+        arr = fld.data if isinstance(fld, viscid.field.Field) else fld
+        func = getattr(np.ma, op.replace("abs", ""))
+        if op.startswith("abs"):
+            arr = np.ma.abs(arr)
+        kwargs = dict(ddof=ddof) if op in ("var", "std") else {}
+        return func(arr, **kwargs)
+
+    thunks = _field_chunks(fld, nbytes)
+    nr_workers = max(1, min(threads, len(thunks)))
+    parts = parallel.map(nr_workers, _run_part,
+                         [(part_func, t) for t in thunks], threads=True)
+    return combine_func(parts, ddof=ddof)
+
+##
+## EOF
+##
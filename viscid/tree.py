@@ -7,13 +7,113 @@ from datetime import datetime, timedelta
 from viscid.compat import string_types
 from viscid.vutil import format_time as generic_format_time
 
+# bumped by every change to any node's info or parents, if it hasn't
+# changed since a memoized lookup was made, that lookup is still valid
+_tree_version = [0]
+
+
+class _InfoDict(dict):
+    """dict that counts its modifications, so lookups can be memoized"""
+    _version = 0
+
+    def _changed(self):
+        self._version += 1
+        _tree_version[0] += 1
+
+    def __setitem__(self, key, val):
+        self._changed()
+        super(_InfoDict, self).__setitem__(key, val)
+
+    def __delitem__(self, key):
+        self._changed()
+        super(_InfoDict, self).__delitem__(key)
+
+    def clear(self):
+        self._changed()
+        super(_InfoDict, self).clear()
+
+    def pop(self, *args):
+        self._changed()
+        return super(_InfoDict, self).pop(*args)
+
+    def popitem(self):
+        self._changed()
+        return super(_InfoDict, self).popitem()
+
+    def setdefault(self, *args):
+        self._changed()
+        return super(_InfoDict, self).setdefault(*args)
+
+    def update(self, *args, **kwargs):
+        self._changed()
+        super(_InfoDict, self).update(*args, **kwargs)
+
+
+class _ParentList(list):
+    """list that counts its modifications, so lookups can be memoized"""
+    _version = 0
+
+    def _changed(self):
+        self._version += 1
+        _tree_version[0] += 1
+
+    def __setitem__(self, key, val):
+        self._changed()
+        super(_ParentList, self).__setitem__(key, val)
+
+    def __delitem__(self, key):
+        self._changed()
+        super(_ParentList, self).__delitem__(key)
+
+    def __iadd__(self, other):
+        self._changed()
+        return super(_ParentList, self).__iadd__(other)
+
+    def append(self, obj):
+        self._changed()
+        super(_ParentList, self).append(obj)
+
+    def extend(self, other):
+        self._changed()
+        super(_ParentList, self).extend(other)
+
+    def insert(self, index, obj):
+        self._changed()
+        super(_ParentList, self).insert(index, obj)
+
+    def pop(self, *args):
+        self._changed()
+        return super(_ParentList, self).pop(*args)
+
+    def remove(self, obj):
+        self._changed()
+        super(_ParentList, self).remove(obj)
+
+    def reverse(self):
+        self._changed()
+        super(_ParentList, self).reverse()
+
+    def sort(self, *args, **kwargs):
+        self._changed()
+        super(_ParentList, self).sort(*args, **kwargs)
+
+
 class Node(object):
-    """Base class for Datasets and Grids"""
+    """Base class for Datasets and Grids
+
+    Note:
+        find_info is memoized, so info should only be changed through
+        set_info / update_info (or the info dict itself), and parents
+        through the parents list, never by replacing self._info.
+    """
 
     name = None
     time = None
     _info = None
-    parents = None
+    _parents = None
+    # [tree version, ancestors, versions of their info / parents,
+    #  {key: owner or None}]
+    _info_lookup = None
 
     def __init__(self, name=None, time=None, info=None, parents=None):
         if name is None:
@@ -23,6 +123,8 @@ class Node(object):
 
         if info is None:
             info = dict()
+        if not isinstance(info, _InfoDict):
+            info = _InfoDict(info)
         self._info = info
 
         if parents is None:
@@ -31,6 +133,22 @@ class Node(object):
             parents = [parents]
         self.parents = parents
 
+    @property
+    def parents(self):
+        return self._parents
+
+    @parents.setter
+    def parents(self, val):
+        if not isinstance(val, _ParentList):
+            val = _ParentList(val)
+        # memoized lookups (here and downtree) watch the old list, so
+        # mark it as changed
+        if self._parents is not None:
+            self._parents._changed()  # pylint: disable=protected-access
+        _tree_version[0] += 1
+        self._info_lookup = None
+        self._parents = val
+
     def prepare_child(self, obj):
         if not self in obj.parents:
             obj.parents.append(self)
@@ -134,18 +252,56 @@ class Node(object):
     def set_info(self, key, val):
         self._info[key] = val
 
+    def _get_info_lookup(self):
+        """Flattened (breadth first) list of ancestors and a memo of owners
+
+        This is rebuilt only if the info or parents of this node or any
+        of its ancestors changed since the last call.
+        """
+        lookup = self._info_lookup
+        if lookup is not None:
+            if lookup[0] == _tree_version[0]:
+                return lookup
+            versions = lookup[2]
+            for i in range(0, len(versions), 2):
+                if versions[i]._version != versions[i + 1]:
+                    break
+            else:
+                lookup[0] = _tree_version[0]
+                return lookup
+
+        ancestors = []
+        versions = []
+        def condition(obj, val):  # pylint: disable=unused-argument
+            ancestors.append(obj)
+            versions.extend([obj._info, obj._info._version,  # pylint: disable=protected-access
+                             obj.parents, obj.parents._version])  # pylint: disable=protected-access
+            return False
+        self._parent_bfs(condition)
+        lookup = [_tree_version[0], ancestors, versions, {}]
+        self._info_lookup = lookup
+        return lookup
+
     def find_info_owner(self, key):
         """Go through the parents (breadth first) and find the info
 
         Raises:
             KeyError
         """
-        condition = lambda obj, val: obj.has_info(key)
-        matching_parent = self._parent_bfs(condition)
-        if matching_parent is None:
+        _, ancestors, _, memo = self._get_info_lookup()
+        try:
+            owner = memo[key]
+        except KeyError:
+            owner = None
+            for obj in ancestors:
+                if key in obj._info:  # pylint: disable=protected-access
+                    owner = obj
+                    break
+            memo[key] = owner
+
+        if owner is None:
             raise KeyError("info '{0}' is nowhere to be found".format(key))
-        else:
-            return matching_parent
+        return owner
 
     def find_info(self, key):
         """Go through the parents (breadth first) and find the info
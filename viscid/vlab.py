@@ -1,5 +1,7 @@
 from __future__ import print_function
 import itertools
+import subprocess as sub
+import threading
 
 import numpy as np
 try:
@@ -14,6 +16,7 @@ from viscid import parallel
 from viscid import field
 from viscid import coordinate
 from viscid.calculator import seed
+from viscid.calculator import evaluator
 from viscid.compat import izip
 
 # these compiled are needed for fluid following
@@ -21,6 +24,7 @@ try:
     from viscid import calc_streamlines
     from viscid.calculator import cycalc
     from viscid.calculator import streamline
+    from viscid.cython import pathline
 except ImportError:
     pass
 
@@ -133,18 +137,80 @@ def multiplot(vfile, plot_func=None, nr_procs=1, time_slice=":", **kwargs):
     args_kw["first_run"] = True
     args_kw["first_run_result"] = None
 
-    if "subplot_params" not in args_kw.get("kwopts", {}):
-        r = parallel.map(1, plot_func, [next(grid_iter)], args_kw=args_kw,
-                         force_subprocess=(nr_procs > 1))
+    # frame_cache carries the figure / ffmpeg pipe from frame to frame,
+    # which only makes sense if all frames are made in this process
+    kwopts = args_kw.get("kwopts", {}) or {}
+    frame_cache = None
+    if kwopts.get("reuse_frame", False) or kwopts.get("ffmpeg_movie", None):
+        if nr_procs > 1:
+            if kwopts.get("ffmpeg_movie", None):
+                raise ValueError("ffmpeg_movie needs nr_procs == 1")
+            logger.warn("reuse_frame is ignored when nr_procs > 1")
+        elif plot_func is _do_multiplot:
+            frame_cache = dict()
+            args_kw["frame_cache"] = frame_cache
+
+    r = [None]
+    try:
+        if "subplot_params" not in kwopts:
+            r = parallel.map(1, plot_func, [next(grid_iter)], args_kw=args_kw,
+                             force_subprocess=(nr_procs > 1))
+
+        # now get back to your regularly scheduled programming
+        args_kw["first_run"] = False
+        args_kw["first_run_result"] = r[0]
+        parallel.map(nr_procs, plot_func, grid_iter, args_kw=args_kw)
+    finally:
+        if frame_cache is not None:
+            _close_frame_cache(frame_cache)
+
+def _close_frame_cache(frame_cache):
+    import matplotlib.pyplot as plt
+
+    pipe = frame_cache.pop("pipe", None)
+    if pipe is not None:
+        pipe.stdin.close()
+        pipe.wait()
+    if frame_cache.get("plots", None):
+        plt.clf()
+    frame_cache.clear()
+
+def _pipe_frame(fig, frame_cache, movie, framerate):
+    """Send the pixels of fig to an ffmpeg process writing movie"""
+    fig.canvas.draw()
+    rgba = np.asarray(fig.canvas.buffer_rgba())
+    if "pipe" not in frame_cache:
+        cmd = ["ffmpeg", "-y", "-loglevel", "error",
+               "-f", "rawvideo", "-pix_fmt", "rgba",
+               "-s", "{0}x{1}".format(rgba.shape[1], rgba.shape[0]),
+               "-r", str(framerate), "-i", "-",
+               "-vf", "scale=trunc(iw/2)*2:trunc(ih/2)*2",
+               "-pix_fmt", "yuv420p", movie]
+        frame_cache["pipe"] = sub.Popen(cmd, stdin=sub.PIPE)
+    frame_cache["pipe"].stdin.write(rgba.tobytes())
+
+def _update_multiplot_frame(grid, frame_cache, timeformat):
+    """Put new data into the plots made for a previous frame
 
-    # now get back to your regularly scheduled programming
-    args_kw["first_run"] = False
-    args_kw["first_run_result"] = r[0]
-    parallel.map(nr_procs, plot_func, grid_iter, args_kw=args_kw)
+    Returns:
+        bool: False if any plot couldn't be updated in place
+    """
+    from viscid.plot import mpl
+
+    with evaluator.shared_operands():
+        for plot, fld_name, fld_slc, plot_kwargs in frame_cache["plots"]:
+            with grid.get_field(fld_name, slc=fld_slc) as fld:
+                if not mpl.update_plot2d_field(plot, fld, **plot_kwargs):
+                    return False
+    title = frame_cache.get("title", None)
+    if title is not None:
+        title.set_text(grid.format_time(timeformat))
+    return True
 
 def _do_multiplot(tind, grid, plot_vars=None, global_popts=None, kwopts=None,
                   share_axes=False, show=False, subplot_params=None,
-                  first_run_result=None, first_run=False, **kwargs):
+                  first_run_result=None, first_run=False, frame_cache=None,
+                  **kwargs):
     import matplotlib.pyplot as plt
     from viscid.plot import mpl
 
@@ -165,6 +231,9 @@ def _do_multiplot(tind, grid, plot_vars=None, global_popts=None, kwopts=None,
     selection = kwopts.get("selection", None)
     timeformat = kwopts.get("timeformat", ".02f")
     tighten = kwopts.get("tighten", False)
+    reuse_frame = kwopts.get("reuse_frame", False) and frame_cache is not None
+    ffmpeg_movie = kwopts.get("ffmpeg_movie", None)
+    framerate = kwopts.get("framerate", 10)
     # wicked hacky
     # subplot_params = kwopts.get("subplot_params", _subplot_params)
 
@@ -179,66 +248,83 @@ def _do_multiplot(tind, grid, plot_vars=None, global_popts=None, kwopts=None,
         return
 
     fig = plt.gcf()
+
+    if reuse_frame and frame_cache.get("plots", None):
+        if _update_multiplot_frame(grid, frame_cache, timeformat):
+            _finish_multiplot_frame(fig, tind, frame_cache, out_prefix,
+                                    out_format, ffmpeg_movie, framerate, show)
+            return None
+        # the crds must have changed or something, so start over
+        plt.clf()
+
     if plot_size is not None:
         fig.set_size_inches(*plot_size, forward=True)
     if dpi is not None:
         fig.set_dpi(dpi)
 
     shareax = None
-
-    this_row = -1
-    for i, fld_meta in enumerate(plot_vars):
-        if not fld_meta[0].startswith('^'):
-            this_row += 1
-            same_axis = False
-        else:
-            same_axis = True
-
-        fld_name_meta = fld_meta[0].lstrip('^')
-        fld_name_split = fld_name_meta.split(',')
-        if '=' in fld_name_split[0]:
-            # if fld_name is actually an equation, assume
-            # there's no slice, and commas are part of the
-            # equation
-            fld_name = ",".join(fld_name_split)
-            fld_slc = ""
-        else:
-            fld_name = fld_name_split[0]
-            fld_slc = ",".join(fld_name_split[1:])
-        if selection is not None:
-            # fld_slc += ",{0}".format(selection)
-            if fld_slc != "":
-                fld_slc = ",".join([fld_slc, selection])
+    plots = []
+
+    # fields used by several equations in this frame are only read once
+    with evaluator.shared_operands():
+        this_row = -1
+        for i, fld_meta in enumerate(plot_vars):
+            if not fld_meta[0].startswith('^'):
+                this_row += 1
+                same_axis = False
             else:
-                fld_slc = selection
-        if fld_slc.strip() == "":
-            fld_slc = None
-
-        # print("fld_time:", fld.time)
-        if this_row < 0:
-            raise ValueError("first plot can't begin with a +")
-        row = this_row
-        col = 0
-        if transpose:
-            row, col = col, row
-        if not same_axis:
-            ax = plt.subplot2grid((nrows, ncols), (row, col),
-                                  sharex=shareax, sharey=shareax)
-        if i == 0 and share_axes:
-            shareax = ax
-
-        if not "plot_opts" in fld_meta[1]:
-            fld_meta[1]["plot_opts"] = global_popts
-        elif global_popts is not None:
-            fld_meta[1]["plot_opts"] = "{0},{1}".format(
-                fld_meta[1]["plot_opts"], global_popts)
-
-        with grid.get_field(fld_name, slc=fld_slc) as fld:
-            mpl.plot(fld, masknan=True, **fld_meta[1])
-        # print("fld cache", grid[fld_meta[0]]._cache)
-
+                same_axis = True
+
+            fld_name_meta = fld_meta[0].lstrip('^')
+            fld_name_split = fld_name_meta.split(',')
+            if '=' in fld_name_split[0]:
+                # if fld_name is actually an equation, assume
+                # there's no slice, and commas are part of the
+                # equation
+                fld_name = ",".join(fld_name_split)
+                fld_slc = ""
+            else:
+                fld_name = fld_name_split[0]
+                fld_slc = ",".join(fld_name_split[1:])
+            if selection is not None:
+                # fld_slc += ",{0}".format(selection)
+                if fld_slc != "":
+                    fld_slc = ",".join([fld_slc, selection])
+                else:
+                    fld_slc = selection
+            if fld_slc.strip() == "":
+                fld_slc = None
+
+            # print("fld_time:", fld.time)
+            if this_row < 0:
+                raise ValueError("first plot can't begin with a +")
+            row = this_row
+            col = 0
+            if transpose:
+                row, col = col, row
+            if not same_axis:
+                ax = plt.subplot2grid((nrows, ncols), (row, col),
+                                      sharex=shareax, sharey=shareax)
+            if i == 0 and share_axes:
+                shareax = ax
+
+            if not "plot_opts" in fld_meta[1]:
+                fld_meta[1]["plot_opts"] = global_popts
+            elif global_popts is not None:
+                fld_meta[1]["plot_opts"] = "{0},{1}".format(
+                    fld_meta[1]["plot_opts"], global_popts)
+
+            plot_kwargs = dict(masknan=True)
+            plot_kwargs.update(fld_meta[1])
+            with grid.get_field(fld_name, slc=fld_slc) as fld:
+                ret = mpl.plot(fld, **plot_kwargs)
+            if isinstance(ret, tuple):
+                plots.append((ret[0], fld_name, fld_slc, plot_kwargs))
+            # print("fld cache", grid[fld_meta[0]]._cache)
+
+    title = None
     if timeformat and timeformat.lower() != "none":
-        plt.suptitle(grid.format_time(timeformat))
+        title = plt.suptitle(grid.format_time(timeformat))
 
     # for adjusting subplots / tight_layout and applying the various
     # hacks to keep plots from dancing around in movies
@@ -251,13 +337,27 @@ def _do_multiplot(tind, grid, plot_vars=None, global_popts=None, kwopts=None,
     if not first_run:
         ret = None
 
+    if reuse_frame:
+        frame_cache["plots"] = plots
+        frame_cache["title"] = title
+
+    _finish_multiplot_frame(fig, tind, frame_cache, out_prefix, out_format,
+                            ffmpeg_movie, framerate, show)
+    if not reuse_frame:
+        plt.clf()
+
+    return ret
+
+def _finish_multiplot_frame(fig, tind, frame_cache, out_prefix, out_format,
+                            ffmpeg_movie, framerate, show):
+    import matplotlib.pyplot as plt
+
     if out_prefix:
         plt.savefig("{0}_{1:06d}.{2}".format(out_prefix, tind + 1, out_format))
+    if ffmpeg_movie and frame_cache is not None:
+        _pipe_frame(fig, frame_cache, ffmpeg_movie, framerate)
     if show:
         plt.show()
-    plt.clf()
-
-    return ret
 
 def follow_fluid(vfile, time_slice, initial_seeds, plot_function,
                  stream_opts, **kwargs):
@@ -292,6 +392,11 @@ def follow_fluid_generic(grid_iter, dt, initial_seeds, plot_function,
                          speed_scale=1.0):
     """Trace fluid elements
 
+    Note:
+        This follows streamlines of each snapshot, see
+        :py:func:`trace_pathlines` to integrate the actual paths
+        through the time dependent field.
+
     Args:
         grid_iter (iterable): Some iterable that yields grids
         dt (float): Either one float for uniform dt, or a list
@@ -416,6 +521,162 @@ def _follow_fluid_step(i, dt, grid, root_seeds, plot_function, stream_opts,
     logger.debug("ok, done with all that :)")
     return root_pts
 
+def _read_ahead(func):
+    """Call func in a thread, and return a function that waits for it"""
+    box = []
+
+    def _target():
+        try:
+            box.append((True, func()))
+        except Exception as e:  # pylint: disable=broad-except
+            box.append((False, e))
+
+    th = threading.Thread(target=_target)
+    th.daemon = True
+    th.start()
+
+    def _wait():
+        th.join()
+        ok, val = box[0]
+        if not ok:
+            raise val
+        return val
+    return _wait
+
+def _iter_snapshots(grid_iter, fld_names, prefetch=True):
+    """Yield (time, [fields]) for each grid in grid_iter
+
+    The field data is read before it's yielded, and if prefetch, the
+    next grid is read in a thread while the caller works on this one.
+    The fields are detached from their grids, so they stay in memory
+    after a DatasetTemporal's iter_times clears a grid's cache.
+    """
+    grid_iter = iter(grid_iter)
+
+    def _next():
+        for grid in grid_iter:
+            flds = [grid[name] for name in fld_names]
+            return grid.time, [fld.wrap(fld.data) for fld in flds]
+        return None
+
+    if prefetch:
+        pending = _read_ahead(_next)
+        while True:
+            snapshot = pending()
+            if snapshot is None:
+                return
+            pending = _read_ahead(_next)
+            yield snapshot
+    else:
+        while True:
+            snapshot = _next()
+            if snapshot is None:
+                return
+            yield snapshot
+
+def trace_pathlines(grid_iter, initial_seeds, fld_name="v", nr_steps=8,
+                    speed_scale=1.0, prefetch=True, callback=None):
+    """Trace fluid elements through a time series of velocity fields
+
+    Unlike :py:func:`follow_fluid_generic`, this integrates the actual
+    pathlines: between two snapshots the velocity is interpolated
+    linearly in time, and all the fluid elements are pushed at once
+    with compiled RK4.
+
+    Parameters:
+        grid_iter (iterable): Some iterable that yields grids, like
+            `vfile.iter_times(":")`
+        initial_seeds: any SeedGen object or (3, n) ndarray, positions
+            at the time of the first grid
+        fld_name (str): name of the velocity field in each grid
+        nr_steps (int): number of RK4 steps between two snapshots
+        speed_scale (float): speed_scale * v should be in units of
+            x / t
+        prefetch (bool): read the next grid in a thread while pushing
+            through the current pair of snapshots
+        callback (callable): called for each grid as
+            ``callback(i, time, v, pts, alive)``
+
+    Returns:
+        (times, pts) where times is shaped (nr_times,) and pts is
+        shaped (nr_times, 3, n). Elements that left the domain are NaN
+        from then on.
+    """
+    pts = seed.to_seeds(initial_seeds).get_points()
+
+    def _push(flds0, flds1, t0, t1, state):
+        pts, alive = pathline.advect_tracers(flds0[0], flds1[0], state[0],
+                                             t0, t1, nr_steps=nr_steps,
+                                             speed_scale=speed_scale,
+                                             alive=state[-1])
+        return [pts, alive]
+
+    times, history = _push_through_time(grid_iter, [fld_name], [pts],
+                                        _push, prefetch, callback)
+    return times, history[0]
+
+def trace_particles(grid_iter, x0, v0, q_m=1.0, e_name="e", b_name="b",
+                    nr_steps=64, prefetch=True, callback=None):
+    """Push charged test particles through a time series of E and B
+
+    Particles are pushed with Boris's method, with the fields
+    interpolated linearly in time between snapshots.
+
+    Parameters:
+        grid_iter (iterable): Some iterable that yields grids
+        x0 (ndarray): initial positions, (3, n)
+        v0 (ndarray): initial velocities, (3, n)
+        q_m (float): charge to mass ratio in the units of the fields,
+            dv / dt = q_m * (E + v x B)
+        e_name (str): name of the electric field in each grid
+        b_name (str): name of the magnetic field in each grid
+        nr_steps (int): number of steps between two snapshots, the step
+            should be small compared to the gyro period
+        prefetch (bool): read the next grid in a thread while pushing
+            through the current pair of snapshots
+        callback (callable): called for each grid as
+            ``callback(i, time, e, b, x, v, alive)``
+
+    Returns:
+        (times, x, v) where times is shaped (nr_times,), and x and v
+        are shaped (nr_times, 3, n). Particles that left the domain
+        are NaN from then on.
+    """
+    x0 = np.array(x0, dtype='f8')
+    v0 = np.array(v0, dtype='f8')
+
+    def _push(flds0, flds1, t0, t1, state):
+        return list(pathline.push_particles(flds0[0], flds1[0], flds0[1],
+                                            flds1[1], state[0], state[1],
+                                            t0, t1, q_m=q_m,
+                                            nr_steps=nr_steps,
+                                            alive=state[-1]))
+
+    times, history = _push_through_time(grid_iter, [e_name, b_name],
+                                        [x0, v0], _push, prefetch, callback)
+    return times, history[0], history[1]
+
+def _push_through_time(grid_iter, fld_names, state, push, prefetch,
+                       callback):
+    state = list(state) + [np.ones((state[0].shape[1],), dtype='i4')]
+    snapshots = _iter_snapshots(grid_iter, fld_names, prefetch=prefetch)
+    times = []
+    history = [[] for _ in state[:-1]]
+    flds0 = None
+    for i, (t1, flds1) in enumerate(snapshots):
+        if flds0 is not None:
+            state = push(flds0, flds1, t0, t1, state)
+        logger.info("pushed to timestep {0} {1}".format(i, t1))
+        if callback is not None:
+            callback(i, t1, *(flds1 + state))
+        times.append(t1)
+        for arr, hist in zip(state[:-1], history):
+            arr = np.array(arr)
+            arr[:, state[-1] == 0] = np.nan
+            hist.append(arr)
+        t0, flds0 = t1, flds1
+    return np.array(times), [np.array(hist) for hist in history]
+
 ##
 ## EOF
 ##
@@ -68,11 +68,12 @@ def add_mpl_output_arguments(parser):
                         help="show plots with plt.show()")
     return parser
 
-def common_argparse(parser, default_verb=0):
+def common_argparse(parser, default_verb=0, args=None):
     """ add some common verbosity stuff to argparse, parse the
     command line args, and setup the logging levels
     parser should be an ArgumentParser instance, and kwargs
     should be options that get passed to logger.basicConfig
+    args is a list of arguments to parse instead of sys.argv
     returns the args namespace  """
     general = parser.add_argument_group("Viscid general options")
     general.add_argument("--log", action="store", type=str, default=None,
@@ -81,7 +82,7 @@ def common_argparse(parser, default_verb=0):
                          help="increase verbosity")
     general.add_argument("-q", action="count", default=0,
                          help="decrease verbosity")
-    args = parser.parse_args()
+    args = parser.parse_args(args)
 
     # setup the logging level
     if args.log is not None:
@@ -118,6 +119,55 @@ def subclass_spider(cls):
         lst += subclass_spider(c)
     return lst
 
+def user_cache_dir(name, override=None):
+    """Directory for viscid's on-disk caches
+
+    Parameters:
+        name (str): subdirectory for a specific cache
+        override (str): use this directory instead (user and
+            environment variables are expanded)
+
+    Returns:
+        str: $XDG_CACHE_HOME/viscid/name (~/.cache/viscid/name), it
+        may not exist yet
+    """
+    if override is not None:
+        return os.path.expanduser(os.path.expandvars(override))
+    root = os.environ.get("XDG_CACHE_HOME", os.path.join("~", ".cache"))
+    return os.path.join(os.path.expanduser(root), "viscid", name)
+
+def prune_cache_dir(path, max_nbytes, suffix=""):
+    """Delete the least recently used files in a cache directory
+
+    Files ending in `suffix` are removed, oldest mtime first, until
+    they take up no more than `max_nbytes`. Caches should touch files
+    when they're used so the mtime works as a last used time.
+
+    Parameters:
+        path (str): cache directory
+        max_nbytes (int): size limit, None means no limit
+        suffix (str): only look at files that end with this
+    """
+    if max_nbytes is None or not os.path.isdir(path):
+        return
+    entries = []
+    for fn in os.listdir(path):
+        if fn.endswith(suffix):
+            try:
+                st = os.stat(os.path.join(path, fn))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, fn))
+    total = sum(e[1] for e in entries)
+    for _, size, fn in sorted(entries):
+        if total <= max_nbytes:
+            break
+        try:
+            os.remove(os.path.join(path, fn))
+            total -= size
+        except OSError:
+            pass
+
 def timereps(reps, func, *args, **kwargs):
     arr = [None] * reps
     for i in range(reps):
@@ -399,6 +449,87 @@ def make_fwd_slice(shape, slices, reverse=None, cull_second=True):
     second_slc = [np.newaxis if s == "NEWAXIS" else s for s in second_slc]
     return first_slc, second_slc
 
+def _ascending(arr):
+    """arr as an ascending view, and whether it had to be reversed"""
+    if len(arr) > 1 and arr[0] > arr[-1]:
+        return arr[::-1], True
+    return arr, False
+
+def _unflip(asc, i, flipped):
+    """Index into the original arr of the first element equal to asc[i]
+
+    This matches the way argmin picks the first of several ties.
+    """
+    if flipped:
+        return len(asc) - int(np.searchsorted(asc, asc[i], side='right'))
+    return int(np.searchsorted(asc, asc[i], side='left'))
+
+def _count_not_above(asc, value, epsilon, inclusive):
+    """Number of leading elements of ascending asc that are not above
+
+    Above means asc - value + epsilon > 0 (or >= 0 if inclusive). This
+    is a binary search, so there are no temporaries the size of asc.
+    The result is nudged so the comparison agrees with the rounding of
+    asc - value + epsilon in asc's dtype.
+    """
+    n = len(asc)
+    side = 'left' if inclusive else 'right'
+    i = int(np.searchsorted(asc, value - epsilon, side=side))
+    if inclusive:
+        while i > 0 and (asc[i - 1:i] - value + epsilon)[0] >= 0:
+            i -= 1
+        while i < n and not (asc[i:i + 1] - value + epsilon)[0] >= 0:
+            i += 1
+    else:
+        while i > 0 and (asc[i - 1:i] - value + epsilon)[0] > 0:
+            i -= 1
+        while i < n and not (asc[i:i + 1] - value + epsilon)[0] > 0:
+            i += 1
+    return i
+
+def _closest_above(arr, value, epsilon):
+    """Index of the smallest element where arr - value + epsilon > 0
+
+    Same as argmin(abs(diff)) of diff masked where it's <= 0, but
+    O(log n) for a sorted arr.
+
+    Returns:
+        int, or None if there is no such element
+    """
+    asc, flipped = _ascending(arr)
+    i = _count_not_above(asc, value, epsilon, False)
+    if i == len(asc):
+        return None
+    return _unflip(asc, i, flipped)
+
+def _closest_below(arr, value, epsilon):
+    """Index of the largest element where arr - value + epsilon < 0
+
+    Same as argmin(abs(diff)) of diff masked where it's >= 0, but
+    O(log n) for a sorted arr.
+
+    Returns:
+        int, or None if there is no such element
+    """
+    asc, flipped = _ascending(arr)
+    i = _count_not_above(asc, value, epsilon, True) - 1
+    if i < 0:
+        return None
+    return _unflip(asc, i, flipped)
+
+def _closest_sorted(arr, value):
+    """Same as argmin(abs(arr - value)), but O(log n) for a sorted arr"""
+    asc, flipped = _ascending(arr)
+    i = int(np.searchsorted(asc, value))
+    lo = max(i - 1, 0)
+    dist = np.abs(asc[lo:i + 1] - value)
+    if flipped:
+        # ties go to the element that comes first in arr
+        i = lo + len(dist) - 1 - int(np.argmin(dist[::-1]))
+    else:
+        i = lo + int(np.argmin(dist))
+    return _unflip(asc, i, flipped)
+
 def _closest_index(arr, value):
     float_err_msg = ("Slicing by floats is no longer supported. If you "
                      "want to slice by location, suffix the value with "
@@ -410,7 +541,7 @@ def _closest_index(arr, value):
         if len(value) == 0:
             raise ValueError("Can't slice with nothing")
         elif value[-1] == 'f':
-            index = int(np.argmin(np.abs(np.asarray(arr) - float(value[:-1]))))
+            index = _closest_sorted(np.asarray(arr), float(value[:-1]))
         else:
             index = int(value)
 
@@ -473,7 +604,6 @@ def extract_index(arr, start=None, stop=None, step=None, endpoint=True,
         epsilon = 0.01
 
     _step = 1 if step is None else step
-    epsilon_step = epsilon if _step > 0 else -epsilon
 
     start = convert_deprecated_floats(start, "start")
     stop = convert_deprecated_floats(stop, "stop")
@@ -486,24 +616,20 @@ def extract_index(arr, start=None, stop=None, step=None, endpoint=True,
             start = None
         elif start[-1] == 'f':
             start = float(start[:-1])
-            diff = arr - start + epsilon_step
             if _step > 0:
-                diff = np.ma.masked_less_equal(diff, 0)
-            else:
-                diff = np.ma.masked_greater_equal(diff, 0)
-
-            if np.ma.count(diff) == 0:
-                # start value is past the wrong end of the array
-                if _step > 0:
+                start = _closest_above(arr, start, epsilon)
+                if start is None:
+                    # start value is past the wrong end of the array
                     start = len(arr)
-                else:
+            else:
+                start = _closest_below(arr, start, -epsilon)
+                if start is None:
+                    # start value is past the wrong end of the array
                     # start = -len(arr) - 1
                     # having a value < -len(arr) won't play
                     # nice with make_fwd_slice, but in this
                     # case, the slice will have no data, so...
                     return 0, 0, step
-            else:
-                start = int(np.argmin(np.abs(diff)))
     except AttributeError:
         pass
 
@@ -513,23 +639,19 @@ def extract_index(arr, start=None, stop=None, step=None, endpoint=True,
             stop = None
         elif stop[-1] == 'f':
             stop = float(stop.rstrip()[:-1])
-            diff = arr - stop - epsilon_step
             if _step > 0:
-                diff = np.ma.masked_greater_equal(diff, 0)
-                if np.ma.count(diff) == 0:
+                stop = _closest_below(arr, stop, -epsilon)
+                if stop is None:
                     # stop value is past the wong end of the array
                     stop = 0
-                else:
-                    stop = int(np.argmin(np.abs(diff)))
-                    if endpoint:
-                        stop += 1
+                elif endpoint:
+                    stop += 1
             else:
-                diff = np.ma.masked_less_equal(diff, 0)
-                if np.ma.count(diff) == 0:
+                stop = _closest_above(arr, stop, epsilon)
+                if stop is None:
                     # stop value is past the wrong end of the array
                     stop = len(arr)
                 else:
-                    stop = int(np.argmin(np.abs(diff)))
                     if endpoint:
                         if stop > 0:
                             stop -= 1
@@ -830,8 +952,10 @@ def prepare_lines(lines, scalars=None, do_connections=False, other=None):
     npts = [line.shape[1] for line in lines]
     N = np.sum(npts)
     first_idx = np.cumsum([0] + npts[:-1])
-    vertices = [np.asarray(line) for line in lines]
-    vertices = np.concatenate(lines, axis=1)
+    # concatenate as Nx3 and hand back the transposed view so that
+    # vertices.T is contiguous, which is the layout vtk wants for points
+    vertices = np.concatenate([np.asarray(line).T for line in lines],
+                              axis=0).T
 
     if vertices.shape[0] > 3:
         if scalars is not None:
@@ -912,13 +1036,15 @@ def prepare_lines(lines, scalars=None, do_connections=False, other=None):
                                        "".format(key))
 
     if do_connections:
-        connections = [None] * nlines
-        for i, ni in enumerate(npts):
-            # i0 is the index of the first point of the i'th line in lines
-            i0 = first_idx[i]
-            connections[i] = np.vstack([np.arange(i0, i0 + ni - 1.5),
-                                        np.arange(i0 + 1, i0 + ni - 0.5)]).T
-        connections = np.concatenate(connections, axis=0).astype('i')
+        # every point connects to the next one, except the last point
+        # of each line
+        is_start = np.ones((N, ), dtype='bool')
+        last_idx = (first_idx + npts - 1)[np.asarray(npts) > 0]
+        is_start[last_idx] = False
+        i0 = np.flatnonzero(is_start).astype('i')
+        connections = np.empty((len(i0), 2), dtype='i')
+        connections[:, 0] = i0
+        connections[:, 1] = i0 + 1
     else:
         connections = None
 